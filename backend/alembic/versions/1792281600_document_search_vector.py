@@ -0,0 +1,86 @@
+"""Full-text search vector for extended documents
+
+Adds a weighted tsvector column to documents_extended with a GIN index. A
+BEFORE INSERT/UPDATE trigger keeps it current from title, description,
+filename, extracted_text and ocr_text in the same statement as the row
+write; existing rows are backfilled.
+
+Revision ID: 1792281600_document_search_vector
+Revises: 1753312490_high_priority_database_indexes
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "1792281600_document_search_vector"
+down_revision = "1753312490_high_priority_database_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add, backfill and index documents_extended.search_vector."""
+    is_postgres = op.get_bind().dialect.name == "postgresql"
+
+    op.add_column(
+        "documents_extended",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR() if is_postgres else sa.Text(),
+            nullable=True,
+        ),
+    )
+
+    if not is_postgres:
+        # SQLite/development databases use the in-process search index
+        return
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION documents_extended_search_vector_update()
+        RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'B') ||
+                setweight(to_tsvector('simple', coalesce(NEW.filename, '')), 'B') ||
+                setweight(to_tsvector('simple', coalesce(NEW.extracted_text, '')), 'C') ||
+                setweight(to_tsvector('simple', coalesce(NEW.ocr_text, '')), 'D');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER documents_extended_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF title, description, filename, extracted_text, ocr_text
+        ON documents_extended
+        FOR EACH ROW EXECUTE FUNCTION documents_extended_search_vector_update();
+    """)
+
+    # Backfill existing rows through the trigger
+    op.execute("UPDATE documents_extended SET title = title;")
+
+    op.create_index(
+        "ix_documents_extended_search_vector",
+        "documents_extended",
+        ["search_vector"],
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    """Drop the search vector and its index."""
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(
+            "DROP TRIGGER IF EXISTS documents_extended_search_vector_trigger "
+            "ON documents_extended;"
+        )
+        op.execute("DROP FUNCTION IF EXISTS documents_extended_search_vector_update();")
+        op.drop_index(
+            "ix_documents_extended_search_vector", table_name="documents_extended"
+        )
+    op.drop_column("documents_extended", "search_vector")
@@ -0,0 +1,97 @@
+"""Add customer segment scores table
+
+Persisted RFM/LTV scores written by the batch scoring engine. Each scoring
+run stamps its rows with run_id so rows from earlier runs can be purged.
+
+Revision ID: 1792368000_customer_segment_scores
+Revises: 1792281600_document_search_vector
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "1792368000_customer_segment_scores"
+down_revision = "1792281600_document_search_vector"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create customer_segment_scores."""
+    op.create_table(
+        "customer_segment_scores",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("customer_id", sa.Integer(), nullable=False),
+        sa.Column("recency_days", sa.Integer(), nullable=False),
+        sa.Column("frequency_orders", sa.Integer(), nullable=False),
+        sa.Column("monetary_value", sa.Numeric(15, 2), nullable=False),
+        sa.Column("recency_score", sa.Integer(), nullable=False),
+        sa.Column("frequency_score", sa.Integer(), nullable=False),
+        sa.Column("monetary_score", sa.Integer(), nullable=False),
+        sa.Column(
+            "rfm_segment", sa.String(50), nullable=False, comment="RFMセグメント"
+        ),
+        sa.Column("predicted_ltv", sa.Numeric(15, 2), nullable=True),
+        sa.Column("ltv_segment", sa.String(50), nullable=True, comment="LTVセグメント"),
+        sa.Column("churn_probability", sa.Float(), nullable=True),
+        sa.Column("calculated_at", sa.DateTime(), nullable=False, comment="算出日時"),
+        sa.Column(
+            "run_id", sa.String(36), nullable=False, comment="スコアリング実行ID"
+        ),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["customer_id"], ["customers.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_customer_segment_scores_id", "customer_segment_scores", ["id"])
+    op.create_index(
+        "ix_customer_segment_scores_customer_id",
+        "customer_segment_scores",
+        ["customer_id"],
+        unique=True,
+    )
+    op.create_index(
+        "ix_customer_segment_scores_rfm_segment",
+        "customer_segment_scores",
+        ["rfm_segment"],
+    )
+    op.create_index(
+        "ix_customer_segment_scores_ltv_segment",
+        "customer_segment_scores",
+        ["ltv_segment"],
+    )
+    op.create_index(
+        "ix_customer_segment_scores_run_id", "customer_segment_scores", ["run_id"]
+    )
+
+
+def downgrade() -> None:
+    """Drop customer_segment_scores."""
+    op.drop_index(
+        "ix_customer_segment_scores_run_id", table_name="customer_segment_scores"
+    )
+    op.drop_index(
+        "ix_customer_segment_scores_ltv_segment", table_name="customer_segment_scores"
+    )
+    op.drop_index(
+        "ix_customer_segment_scores_rfm_segment", table_name="customer_segment_scores"
+    )
+    op.drop_index(
+        "ix_customer_segment_scores_customer_id", table_name="customer_segment_scores"
+    )
+    op.drop_index("ix_customer_segment_scores_id", table_name="customer_segment_scores")
+    op.drop_table("customer_segment_scores")
@@ -0,0 +1,74 @@
+"""Add account period balances table
+
+Posted debit/credit totals per account and financial period, maintained on
+posting and frozen when the period closes. Financial statements read closed
+periods from these rows and only aggregate journal lines of open periods.
+
+Revision ID: 1792454400_account_period_balances
+Revises: 1792368000_customer_segment_scores
+Create Date: 2026-10-20 00:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "1792454400_account_period_balances"
+down_revision = "1792368000_customer_segment_scores"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create finance_account_period_balances."""
+    op.create_table(
+        "finance_account_period_balances",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("organization_id", sa.String(), nullable=False),
+        sa.Column("account_id", sa.String(), nullable=False),
+        sa.Column("period_id", sa.String(), nullable=False),
+        sa.Column("debit_total", sa.Numeric(15, 2), nullable=False, server_default="0"),
+        sa.Column(
+            "credit_total", sa.Numeric(15, 2), nullable=False, server_default="0"
+        ),
+        sa.Column("is_frozen", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["organization_id"], ["organizations.id"]),
+        sa.ForeignKeyConstraint(["account_id"], ["finance_accounts.id"]),
+        sa.ForeignKeyConstraint(["period_id"], ["finance_periods.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "account_id", "period_id", name="uq_account_period_balance"
+        ),
+    )
+    op.create_index(
+        "ix_finance_account_period_balances_organization_id",
+        "finance_account_period_balances",
+        ["organization_id"],
+    )
+    op.create_index(
+        "ix_finance_account_period_balances_period_id",
+        "finance_account_period_balances",
+        ["period_id"],
+    )
+
+
+def downgrade() -> None:
+    """Drop finance_account_period_balances."""
+    op.drop_index(
+        "ix_finance_account_period_balances_period_id",
+        table_name="finance_account_period_balances",
+    )
+    op.drop_index(
+        "ix_finance_account_period_balances_organization_id",
+        table_name="finance_account_period_balances",
+    )
+    op.drop_table("finance_account_period_balances")
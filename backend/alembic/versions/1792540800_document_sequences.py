@@ -0,0 +1,55 @@
+"""Add document sequences table
+
+Next free document number per scope, series and period. Journal entries,
+employees, cycle counts, inventory movements and purchasing documents take
+their numbers from these rows instead of scanning for the highest number
+issued.
+
+Revision ID: 1792540800_document_sequences
+Revises: 1792454400_account_period_balances
+Create Date: 2026-10-21 00:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "1792540800_document_sequences"
+down_revision = "1792454400_account_period_balances"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create document_sequences."""
+    op.create_table(
+        "document_sequences",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("scope", sa.String(length=64), nullable=False),
+        sa.Column("series", sa.String(length=32), nullable=False),
+        sa.Column("period", sa.String(length=16), nullable=False),
+        sa.Column("next_value", sa.BigInteger(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("scope", "series", "period", name="uq_document_sequence"),
+    )
+    op.create_index("ix_document_sequences_id", "document_sequences", ["id"])
+
+
+def downgrade() -> None:
+    """Drop document_sequences."""
+    op.drop_index("ix_document_sequences_id", table_name="document_sequences")
+    op.drop_table("document_sequences")
@@ -0,0 +1,66 @@
+"""Add HR headcount snapshots table
+
+Workforce counts per organization and day, captured once a day so headcount
+trends read stored rows instead of recomputing history from employees.
+
+Revision ID: 1792627200_hr_headcount_snapshots
+Revises: 1792540800_document_sequences
+Create Date: 2026-10-22 00:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "1792627200_hr_headcount_snapshots"
+down_revision = "1792540800_document_sequences"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create hr_headcount_snapshots."""
+    op.create_table(
+        "hr_headcount_snapshots",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("organization_id", sa.String(), nullable=False),
+        sa.Column("snapshot_date", sa.Date(), nullable=False),
+        sa.Column("headcount", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("active_employees", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column(
+            "full_time_employees", sa.Integer(), nullable=False, server_default="0"
+        ),
+        sa.Column(
+            "part_time_employees", sa.Integer(), nullable=False, server_default="0"
+        ),
+        sa.Column(
+            "contract_employees", sa.Integer(), nullable=False, server_default="0"
+        ),
+        sa.Column("new_hires", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("terminations", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column(
+            "voluntary_terminations", sa.Integer(), nullable=False, server_default="0"
+        ),
+        sa.Column("captured_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["organization_id"], ["organizations.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "organization_id", "snapshot_date", name="uq_headcount_snapshot_date"
+        ),
+    )
+    op.create_index(
+        "ix_hr_headcount_snapshots_snapshot_date",
+        "hr_headcount_snapshots",
+        ["snapshot_date"],
+    )
+
+
+def downgrade() -> None:
+    """Drop hr_headcount_snapshots."""
+    op.drop_index(
+        "ix_hr_headcount_snapshots_snapshot_date",
+        table_name="hr_headcount_snapshots",
+    )
+    op.drop_table("hr_headcount_snapshots")
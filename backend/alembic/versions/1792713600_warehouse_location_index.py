@@ -0,0 +1,35 @@
+"""Add warehouse location utilization index
+
+Covers the per-warehouse count of total and occupied locations, so the
+utilization refresh reads the index instead of the location rows.
+
+Revision ID: 1792713600_warehouse_location_index
+Revises: 1792627200_hr_headcount_snapshots
+Create Date: 2026-10-23 00:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "1792713600_warehouse_location_index"
+down_revision = "1792627200_hr_headcount_snapshots"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create ix_warehouse_locations_warehouse_occupied."""
+    op.create_index(
+        "ix_warehouse_locations_warehouse_occupied",
+        "warehouse_locations",
+        ["warehouse_id", "is_occupied"],
+    )
+
+
+def downgrade() -> None:
+    """Drop ix_warehouse_locations_warehouse_occupied."""
+    op.drop_index(
+        "ix_warehouse_locations_warehouse_occupied",
+        table_name="warehouse_locations",
+    )
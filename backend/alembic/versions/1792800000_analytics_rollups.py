@@ -0,0 +1,89 @@
+"""Add analytics rollups and metric retention
+
+Data points are folded into 5-minute, hourly and daily rollup buckets so that
+metric trends read bucket rows instead of every stored data point. Metrics get
+a retention policy and the watermark up to which points are rolled up.
+
+Revision ID: 1792800000_analytics_rollups
+Revises: 1792713600_warehouse_location_index
+Create Date: 2026-10-24 00:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "1792800000_analytics_rollups"
+down_revision = "1792713600_warehouse_location_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create analytics_rollups and add rollup columns to analytics_metrics."""
+    op.add_column(
+        "analytics_metrics", sa.Column("retention_policy", sa.JSON(), nullable=True)
+    )
+    op.add_column(
+        "analytics_metrics", sa.Column("rollup_watermark", sa.DateTime(), nullable=True)
+    )
+    op.create_index(
+        "ix_analytics_data_points_metric_timestamp",
+        "analytics_data_points",
+        ["metric_id", "timestamp"],
+    )
+    op.create_table(
+        "analytics_rollups",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("organization_id", sa.String(), nullable=False),
+        sa.Column("metric_id", sa.String(), nullable=False),
+        sa.Column("resolution", sa.String(length=8), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column(
+            "sum_value",
+            sa.Numeric(precision=20, scale=4),
+            nullable=False,
+            server_default="0",
+        ),
+        sa.Column("sum_squares", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("min_value", sa.Numeric(precision=15, scale=4), nullable=True),
+        sa.Column("max_value", sa.Numeric(precision=15, scale=4), nullable=True),
+        sa.Column("quantile_sketch", sa.JSON(), nullable=True),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.ForeignKeyConstraint(["organization_id"], ["organizations.id"]),
+        sa.ForeignKeyConstraint(["metric_id"], ["analytics_metrics.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "metric_id",
+            "resolution",
+            "bucket_start",
+            name="uq_analytics_rollup_bucket",
+        ),
+    )
+    op.create_index(
+        "ix_analytics_rollups_resolution_bucket",
+        "analytics_rollups",
+        ["resolution", "bucket_start"],
+    )
+
+
+def downgrade() -> None:
+    """Drop analytics_rollups and the rollup columns of analytics_metrics."""
+    op.drop_index(
+        "ix_analytics_rollups_resolution_bucket", table_name="analytics_rollups"
+    )
+    op.drop_table("analytics_rollups")
+    op.drop_index(
+        "ix_analytics_data_points_metric_timestamp",
+        table_name="analytics_data_points",
+    )
+    op.drop_column("analytics_metrics", "rollup_watermark")
+    op.drop_column("analytics_metrics", "retention_policy")
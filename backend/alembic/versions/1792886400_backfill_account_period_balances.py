@@ -0,0 +1,106 @@
+"""Backfill account period balances
+
+Builds finance_account_period_balances from the posted journal lines of every
+period, freezing the rows of periods that are already closed. Periods closed
+before the table existed otherwise have no frozen rows for the reports to
+read.
+
+Revision ID: 1792886400_backfill_account_balances
+Revises: 1792800000_analytics_rollups
+Create Date: 2026-10-25 00:00:00.000000
+
+"""
+
+import uuid
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "1792886400_backfill_account_balances"
+down_revision = "1792800000_analytics_rollups"
+branch_labels = None
+depends_on = None
+
+periods = sa.table(
+    "finance_periods",
+    sa.column("id", sa.String),
+    sa.column("status", sa.String),
+)
+entries = sa.table(
+    "finance_journal_entries",
+    sa.column("id", sa.String),
+    sa.column("organization_id", sa.String),
+    sa.column("period_id", sa.String),
+    sa.column("is_posted", sa.Boolean),
+)
+lines = sa.table(
+    "finance_journal_entry_lines",
+    sa.column("journal_entry_id", sa.String),
+    sa.column("account_id", sa.String),
+    sa.column("debit_amount", sa.Numeric(15, 2)),
+    sa.column("credit_amount", sa.Numeric(15, 2)),
+)
+balances = sa.table(
+    "finance_account_period_balances",
+    sa.column("id", sa.String),
+    sa.column("organization_id", sa.String),
+    sa.column("account_id", sa.String),
+    sa.column("period_id", sa.String),
+    sa.column("debit_total", sa.Numeric(15, 2)),
+    sa.column("credit_total", sa.Numeric(15, 2)),
+    sa.column("is_frozen", sa.Boolean),
+)
+
+
+def upgrade() -> None:
+    """Rebuild every period's balances from its posted journal lines."""
+    bind = op.get_bind()
+    totals = bind.execute(
+        sa.select(
+            entries.c.organization_id,
+            lines.c.account_id,
+            entries.c.period_id,
+            sa.func.coalesce(sa.func.sum(lines.c.debit_amount), 0),
+            sa.func.coalesce(sa.func.sum(lines.c.credit_amount), 0),
+            sa.cast(periods.c.status, sa.String) == "CLOSED",
+        )
+        .select_from(
+            lines.join(entries, lines.c.journal_entry_id == entries.c.id).join(
+                periods, entries.c.period_id == periods.c.id
+            )
+        )
+        .where(entries.c.is_posted == sa.true())
+        .group_by(
+            entries.c.organization_id,
+            lines.c.account_id,
+            entries.c.period_id,
+            periods.c.status,
+        )
+    ).all()
+
+    # Rows added by postings since the table was created are partial totals
+    op.execute(balances.delete())
+    if totals:
+        op.bulk_insert(
+            balances,
+            [
+                {
+                    "id": str(uuid.uuid4()),
+                    "organization_id": organization_id,
+                    "account_id": account_id,
+                    "period_id": period_id,
+                    "debit_total": debits,
+                    "credit_total": credits,
+                    "is_frozen": bool(closed),
+                }
+                for organization_id, account_id, period_id, debits, credits, closed in (
+                    totals
+                )
+            ],
+        )
+
+
+def downgrade() -> None:
+    """Balances are kept; they are maintained by postings from here on."""
@@ -0,0 +1,61 @@
+"""Key analytics rollups by data point period type
+
+Rollup buckets were shared by every period type of a metric, so hourly and
+daily trends mixed points of other period types. Rollups now carry the
+period type of the points they fold. Existing rollups only ever folded DAY
+points, the one period type metric calculation stores.
+
+Revision ID: 1792972800_rollup_period_type
+Revises: 1792886400_backfill_account_balances
+Create Date: 2026-10-26 00:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "1792972800_rollup_period_type"
+down_revision = "1792886400_backfill_account_balances"
+branch_labels = None
+depends_on = None
+
+# Type created with analytics_data_points
+period_type = sa.Enum(
+    "HOUR",
+    "DAY",
+    "WEEK",
+    "MONTH",
+    "QUARTER",
+    "YEAR",
+    "CUSTOM",
+    name="periodtype",
+)
+
+
+def upgrade() -> None:
+    """Add analytics_rollups.period_type to the rollup bucket key."""
+    with op.batch_alter_table("analytics_rollups") as batch_op:
+        batch_op.add_column(
+            sa.Column("period_type", period_type, nullable=False, server_default="DAY")
+        )
+        batch_op.drop_constraint("uq_analytics_rollup_bucket", type_="unique")
+        batch_op.create_unique_constraint(
+            "uq_analytics_rollup_bucket",
+            ["metric_id", "period_type", "resolution", "bucket_start"],
+        )
+    with op.batch_alter_table("analytics_rollups") as batch_op:
+        batch_op.alter_column("period_type", server_default=None)
+
+
+def downgrade() -> None:
+    """Drop analytics_rollups.period_type, deleting non-DAY rollups."""
+    op.execute("DELETE FROM analytics_rollups WHERE period_type != 'DAY'")
+    with op.batch_alter_table("analytics_rollups") as batch_op:
+        batch_op.drop_constraint("uq_analytics_rollup_bucket", type_="unique")
+        batch_op.create_unique_constraint(
+            "uq_analytics_rollup_bucket",
+            ["metric_id", "resolution", "bucket_start"],
+        )
+        batch_op.drop_column("period_type")
@@ -5,12 +5,14 @@ Enterprise-grade API gateway with service mesh, load balancing, and security int
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 import time
-from datetime import datetime, timedelta
+from contextlib import suppress
+from datetime import datetime, timedelta, timezone
 from enum import Enum
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 from uuid import UUID, uuid4
 
 import httpx
@@ -24,10 +26,11 @@ from fastapi import (
     Request,
     Response,
 )
-from fastapi.middleware.base import BaseHTTPMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.middleware.base import BaseHTTPMiddleware
 
 from app.core.database import get_db
 from app.core.exceptions import BusinessLogicError
@@ -38,6 +41,30 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/v1/gateway", tags=["API Gateway v62"])
 
+# Connection pool per upstream base URL; idle keep-alive connections are
+# reused by later requests to the same upstream
+UPSTREAM_LIMITS = httpx.Limits(
+    max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0
+)
+UPSTREAM_CONNECT_TIMEOUT = 5.0
+
+# Seconds between batched writes of circuit breaker and health state to Redis
+STATE_SYNC_INTERVAL = 1.0
+
+# Connection-level headers that must not be forwarded by a proxy (RFC 9110)
+HOP_BY_HOP_HEADERS = frozenset(
+    {
+        "connection",
+        "keep-alive",
+        "proxy-authenticate",
+        "proxy-authorization",
+        "te",
+        "trailer",
+        "transfer-encoding",
+        "upgrade",
+    }
+)
+
 
 # Enums for API Gateway
 class ServiceStatus(str, Enum):
@@ -78,6 +105,14 @@ class RateLimitType(str, Enum):
     GLOBAL = "global"
 
 
+class RateLimitAlgorithm(str, Enum):
+    """Rate limiting algorithms"""
+
+    SLIDING_WINDOW_LOG = "sliding_window_log"
+    GCRA = "gcra"
+    TOKEN_BUCKET = "token_bucket"
+
+
 class CircuitBreakerState(str, Enum):
     """Circuit breaker states"""
 
@@ -204,6 +239,28 @@ class CircuitBreakerResponse(BaseModel):
     total_requests: int
 
 
+def _isoformat(value: Optional[datetime]) -> str:
+    return value.isoformat() if value else ""
+
+
+def _forward_headers(headers: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """Headers to pass through the proxy, without hop-by-hop headers"""
+    return [
+        (name.lower(), value)
+        for name, value in headers
+        if name.lower() not in HOP_BY_HOP_HEADERS and name.lower() != "host"
+    ]
+
+
+async def _relay_body(response: httpx.Response) -> AsyncIterator[bytes]:
+    """Stream an upstream body as received and release its connection"""
+    try:
+        async for chunk in response.aiter_raw():
+            yield chunk
+    finally:
+        await response.aclose()
+
+
 # Core Classes
 class ServiceRegistry:
     """Service registry for microservice discovery"""
@@ -211,6 +268,9 @@ class ServiceRegistry:
     def __init__(self, redis_client: redis.Redis) -> dict:
         self.redis = redis_client
         self.services: Dict[str, List[Dict[str, Any]]] = {}
+        # Health observed by proxied requests, waiting for ``sync_health``
+        self.pending_health: Dict[str, Dict[str, Any]] = {}
+        self.consecutive_failures: Dict[str, int] = {}
 
     async def register_service(
         self, request: ServiceRegistrationRequest
@@ -303,6 +363,48 @@ class ServiceRegistry:
         except Exception as e:
             logger.error(f"Error updating service health: {str(e)}")
 
+    def record_health(
+        self,
+        service_id: str,
+        status: ServiceStatus,
+        response_time: Optional[int] = None,
+    ) -> None:
+        """Record the outcome of a proxied request without a Redis round trip"""
+        if status == ServiceStatus.UNHEALTHY:
+            failures = self.consecutive_failures.get(service_id, 0) + 1
+        else:
+            failures = 0
+        self.consecutive_failures[service_id] = failures
+
+        updates = {
+            "status": status.value,
+            "last_heartbeat": datetime.utcnow().isoformat(),
+            "consecutive_failures": failures,
+        }
+        if response_time is not None:
+            updates["last_response_time"] = response_time
+
+        self.pending_health.setdefault(service_id, {}).update(updates)
+
+    async def sync_health(self) -> None:
+        """Write recorded health for all services to Redis in one pipeline"""
+        pending, self.pending_health = self.pending_health, {}
+        if not pending:
+            return
+
+        try:
+            async with self.redis.pipeline() as pipe:
+                for service_id, updates in pending.items():
+                    pipe.hset(f"service:{service_id}", mapping=updates)
+                await pipe.execute()
+
+        except Exception as e:
+            # Keep the updates for the next sync, behind anything newer
+            for service_id, updates in pending.items():
+                updates.update(self.pending_health.get(service_id, {}))
+                self.pending_health[service_id] = updates
+            logger.error(f"Error syncing service health: {str(e)}")
+
 
 class LoadBalancer:
     """Load balancer with multiple strategies"""
@@ -388,174 +490,503 @@ class LoadBalancer:
 
 
 class CircuitBreaker:
-    """Circuit breaker pattern implementation"""
+    """Circuit breaker pattern implementation
 
-    def __init__(self, redis_client: redis.Redis) -> dict:
+    Circuit state is kept in memory, so checking and recording requests does
+    not wait on Redis. Circuits changed since the last ``sync`` are written to
+    Redis in one pipeline.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        failure_threshold: int = 5,
+        recovery_threshold: int = 2,
+        open_seconds: int = 60,
+    ) -> dict:
         self.redis = redis_client
+        self.failure_threshold = failure_threshold
+        self.recovery_threshold = recovery_threshold
+        self.open_seconds = open_seconds
+        self.circuits: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.changed: set[Tuple[str, str]] = set()
+
+    def _circuit(self, service_name: str, route_path: str) -> Dict[str, Any]:
+        key = (service_name, route_path)
+        circuit = self.circuits.get(key)
+        if circuit is None:
+            circuit = self.circuits[key] = {
+                "service_name": service_name,
+                "route_path": route_path,
+                "state": CircuitBreakerState.CLOSED,
+                "failure_count": 0,
+                "failure_threshold": self.failure_threshold,
+                "recovery_threshold": self.recovery_threshold,
+                "last_failure": None,
+                "next_attempt": None,
+                "success_count": 0,
+                "total_requests": 0,
+                "half_open_successes": 0,
+            }
+        return circuit
+
+    def _set_state(self, circuit: Dict[str, Any], state: CircuitBreakerState) -> None:
+        circuit["state"] = state
+        circuit["half_open_successes"] = 0
+        if state == CircuitBreakerState.OPEN:
+            circuit["next_attempt"] = datetime.utcnow() + timedelta(
+                seconds=self.open_seconds
+            )
+        elif state == CircuitBreakerState.CLOSED:
+            circuit["failure_count"] = 0
+            circuit["next_attempt"] = None
 
     async def get_state(
         self, service_name: str, route_path: str
     ) -> CircuitBreakerState:
         """Get circuit breaker state"""
-        try:
-            key = f"circuit_breaker:{service_name}:{route_path}"
-            state = await self.redis.hget(key, "state")
-            return CircuitBreakerState(state) if state else CircuitBreakerState.CLOSED
-        except Exception:
-            return CircuitBreakerState.CLOSED
+        return self._circuit(service_name, route_path)["state"]
 
     async def record_success(self, service_name: str, route_path: str) -> None:
         """Record successful request"""
-        try:
-            key = f"circuit_breaker:{service_name}:{route_path}"
-
-            async with self.redis.pipeline() as pipe:
-                pipe.hincrby(key, "success_count", 1)
-                pipe.hset(key, "last_success", datetime.utcnow().isoformat())
-
-                # Reset failure count on success
-                current_state = await self.get_state(service_name, route_path)
-                if current_state == CircuitBreakerState.HALF_OPEN:
-                    success_count = await self.redis.hget(key, "success_count") or 0
-                    if int(success_count) >= 2:  # Recovery threshold
-                        pipe.hset(key, "state", CircuitBreakerState.CLOSED.value)
-                        pipe.hset(key, "failure_count", 0)
+        circuit = self._circuit(service_name, route_path)
+        circuit["success_count"] += 1
+        circuit["total_requests"] += 1
 
-                await pipe.execute()
+        if circuit["state"] == CircuitBreakerState.HALF_OPEN:
+            circuit["half_open_successes"] += 1
+            if circuit["half_open_successes"] >= self.recovery_threshold:
+                self._set_state(circuit, CircuitBreakerState.CLOSED)
+        else:
+            # Only consecutive failures open the circuit
+            circuit["failure_count"] = 0
 
-        except Exception as e:
-            logger.error(f"Error recording circuit breaker success: {str(e)}")
+        self.changed.add((service_name, route_path))
 
     async def record_failure(
         self, service_name: str, route_path: str
     ) -> CircuitBreakerState:
         """Record failed request and update state"""
-        try:
-            key = f"circuit_breaker:{service_name}:{route_path}"
+        circuit = self._circuit(service_name, route_path)
+        circuit["failure_count"] += 1
+        circuit["total_requests"] += 1
+        circuit["last_failure"] = datetime.utcnow()
+
+        # Failures of requests admitted before the circuit opened do not
+        # extend the open period
+        if circuit["state"] == CircuitBreakerState.HALF_OPEN or (
+            circuit["state"] == CircuitBreakerState.CLOSED
+            and circuit["failure_count"] >= self.failure_threshold
+        ):
+            self._set_state(circuit, CircuitBreakerState.OPEN)
+
+        self.changed.add((service_name, route_path))
+        return circuit["state"]
 
-            async with self.redis.pipeline() as pipe:
-                pipe.hincrby(key, "failure_count", 1)
-                pipe.hset(key, "last_failure", datetime.utcnow().isoformat())
+    async def can_execute(self, service_name: str, route_path: str) -> bool:
+        """Check if request can be executed"""
+        circuit = self._circuit(service_name, route_path)
+
+        if circuit["state"] == CircuitBreakerState.OPEN:
+            # Let trial requests through once the open period is over
+            if datetime.utcnow() < circuit["next_attempt"]:
+                return False
+            self._set_state(circuit, CircuitBreakerState.HALF_OPEN)
+            self.changed.add((service_name, route_path))
 
-                failure_count = await self.redis.hget(key, "failure_count") or 0
-                failure_threshold = 5  # Configurable
+        return True
+
+    def get_circuits(self, service_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Current circuits, optionally for one service"""
+        return [
+            {k: v for k, v in circuit.items() if k != "half_open_successes"}
+            for (name, _), circuit in self.circuits.items()
+            if service_name is None or name == service_name
+        ]
 
-                if int(failure_count) >= failure_threshold:
-                    pipe.hset(key, "state", CircuitBreakerState.OPEN.value)
-                    # Set timeout for half-open state
+    async def sync(self) -> None:
+        """Write circuits changed since the last sync to Redis"""
+        changed, self.changed = self.changed, set()
+        if not changed:
+            return
+
+        try:
+            async with self.redis.pipeline() as pipe:
+                for service_name, route_path in changed:
+                    circuit = self.circuits[(service_name, route_path)]
                     pipe.hset(
-                        key,
-                        "next_attempt",
-                        (datetime.utcnow() + timedelta(seconds=60)).isoformat(),
+                        f"circuit_breaker:{service_name}:{route_path}",
+                        mapping={
+                            "state": circuit["state"].value,
+                            "failure_count": circuit["failure_count"],
+                            "success_count": circuit["success_count"],
+                            "total_requests": circuit["total_requests"],
+                            "last_failure": _isoformat(circuit["last_failure"]),
+                            "next_attempt": _isoformat(circuit["next_attempt"]),
+                        },
                     )
-
                 await pipe.execute()
 
-            return await self.get_state(service_name, route_path)
-
         except Exception as e:
-            logger.error(f"Error recording circuit breaker failure: {str(e)}")
-            return CircuitBreakerState.CLOSED
+            self.changed |= changed
+            logger.error(f"Error syncing circuit breakers: {str(e)}")
+
+
+class SharedCircuitBreaker(CircuitBreaker):
+    """Circuit breaker whose state is shared by all gateway instances
+
+    Checking and recording are each one Lua script run atomically in Redis,
+    on the Redis clock. A circuit this instance has seen open is refused
+    locally until its next attempt time, without a round trip.
+    """
+
+    CHECK_SCRIPT = """
+    local key = KEYS[1]
+    local now_parts = redis.call('TIME')
+    local now = now_parts[1] * 1000 + math.floor(now_parts[2] / 1000)
+    local state = redis.call('HGET', key, 'state') or 'closed'
+    local next_attempt = tonumber(redis.call('HGET', key, 'next_attempt')) or 0
+    if state == 'open' then
+        if now < next_attempt then
+            return {0, state, next_attempt}
+        end
+        state = 'half_open'
+        redis.call('HSET', key, 'state', state, 'half_open_successes', 0)
+    end
+    return {1, state, next_attempt}
+    """
+
+    RECORD_SCRIPT = """
+    local key = KEYS[1]
+    local outcome = ARGV[1]
+    local failure_threshold = tonumber(ARGV[2])
+    local recovery_threshold = tonumber(ARGV[3])
+    local open_ms = tonumber(ARGV[4])
+    local now_parts = redis.call('TIME')
+    local now = now_parts[1] * 1000 + math.floor(now_parts[2] / 1000)
+    local state = redis.call('HGET', key, 'state') or 'closed'
+    redis.call('HINCRBY', key, 'total_requests', 1)
+    if outcome == 'success' then
+        redis.call('HINCRBY', key, 'success_count', 1)
+        if state == 'half_open' then
+            local successes = redis.call('HINCRBY', key, 'half_open_successes', 1)
+            if successes >= recovery_threshold then
+                state = 'closed'
+                redis.call('HSET', key, 'state', state, 'failure_count', 0)
+                redis.call('HDEL', key, 'next_attempt')
+            end
+        elseif state == 'closed' then
+            redis.call('HSET', key, 'failure_count', 0)
+        end
+    else
+        local failures = redis.call('HINCRBY', key, 'failure_count', 1)
+        redis.call('HSET', key, 'last_failure', now)
+        if state == 'half_open'
+            or (state == 'closed' and failures >= failure_threshold) then
+            state = 'open'
+            redis.call('HSET', key, 'state', state, 'next_attempt', now + open_ms)
+        end
+    end
+    local counts = redis.call(
+        'HMGET', key, 'failure_count', 'success_count', 'total_requests',
+        'next_attempt'
+    )
+    return {
+        state, tonumber(counts[1]) or 0, tonumber(counts[2]) or 0,
+        tonumber(counts[3]) or 0, tonumber(counts[4]) or 0
+    }
+    """
+
+    def _update(self, circuit: Dict[str, Any], state: Any, next_attempt: int) -> None:
+        if isinstance(state, bytes):
+            state = state.decode()
+        circuit["state"] = CircuitBreakerState(state)
+        circuit["next_attempt"] = (
+            datetime.fromtimestamp(int(next_attempt) / 1000, timezone.utc).replace(
+                tzinfo=None
+            )
+            if state == CircuitBreakerState.OPEN.value
+            else None
+        )
 
     async def can_execute(self, service_name: str, route_path: str) -> bool:
         """Check if request can be executed"""
-        try:
-            state = await self.get_state(service_name, route_path)
-
-            if state == CircuitBreakerState.CLOSED:
-                return True
-            elif state == CircuitBreakerState.OPEN:
-                # Check if we can transition to half-open
-                key = f"circuit_breaker:{service_name}:{route_path}"
-                next_attempt = await self.redis.hget(key, "next_attempt")
-
-                if next_attempt:
-                    next_attempt_time = datetime.fromisoformat(next_attempt)
-                    if datetime.utcnow() >= next_attempt_time:
-                        await self.redis.hset(
-                            key, "state", CircuitBreakerState.HALF_OPEN.value
-                        )
-                        return True
-
-                return False
-            elif state == CircuitBreakerState.HALF_OPEN:
-                return True
-
+        circuit = self._circuit(service_name, route_path)
+        if (
+            circuit["state"] == CircuitBreakerState.OPEN
+            and datetime.utcnow() < circuit["next_attempt"]
+        ):
             return False
 
+        try:
+            allowed, state, next_attempt = await self.redis.eval(
+                self.CHECK_SCRIPT, 1, f"circuit_breaker:{service_name}:{route_path}"
+            )
         except Exception as e:
             logger.error(f"Error checking circuit breaker: {str(e)}")
             return True  # Fail open
 
+        self._update(circuit, state, next_attempt)
+        return bool(allowed)
 
-class RateLimiter:
-    """Rate limiting with multiple strategies"""
+    async def record_success(self, service_name: str, route_path: str) -> None:
+        """Record successful request"""
+        await self._record(service_name, route_path, "success")
 
-    def __init__(self, redis_client: redis.Redis) -> dict:
-        self.redis = redis_client
+    async def record_failure(
+        self, service_name: str, route_path: str
+    ) -> CircuitBreakerState:
+        """Record failed request and update state"""
+        return await self._record(service_name, route_path, "failure")
 
-    async def is_allowed(
-        self, key: str, limit: int, window: int = 60
-    ) -> tuple[bool, Dict[str, Any]]:
-        """Check if request is allowed based on rate limit"""
+    async def _record(
+        self, service_name: str, route_path: str, outcome: str
+    ) -> CircuitBreakerState:
+        circuit = self._circuit(service_name, route_path)
         try:
-            current_time = int(time.time())
-            window_start = current_time - window
-
-            rate_key = f"rate_limit:{key}"
+            (
+                state,
+                circuit["failure_count"],
+                circuit["success_count"],
+                circuit["total_requests"],
+                next_attempt,
+            ) = await self.redis.eval(
+                self.RECORD_SCRIPT,
+                1,
+                f"circuit_breaker:{service_name}:{route_path}",
+                outcome,
+                self.failure_threshold,
+                self.recovery_threshold,
+                self.open_seconds * 1000,
+            )
+        except Exception as e:
+            logger.error(f"Error recording circuit breaker {outcome}: {str(e)}")
+            return circuit["state"]
 
-            async with self.redis.pipeline() as pipe:
-                # Remove old entries
-                pipe.zremrangebyscore(rate_key, 0, window_start)
+        if outcome == "failure":
+            circuit["last_failure"] = datetime.utcnow()
+        self._update(circuit, state, next_attempt)
+        return circuit["state"]
 
-                # Count current requests
-                pipe.zcard(rate_key)
 
-                # Add current request
-                pipe.zadd(rate_key, {str(current_time): current_time})
+class RateLimiter:
+    """Rate limiting with multiple strategies
+
+    Each check is one Lua script run atomically in Redis, on the Redis clock
+    so that gateway instances agree on time. Scripts reply with
+    ``{allowed, remaining, retry_after_ms, reset_after_ms}``. A key that was
+    refused is refused locally until its retry time, without a round trip.
+    """
+
+    # Log of admitted requests in microseconds; the member includes the log
+    # size so requests within the same second are all counted
+    SLIDING_WINDOW_LOG_SCRIPT = """
+    local key = KEYS[1]
+    local limit = tonumber(ARGV[1])
+    local window = tonumber(ARGV[2]) * 1000
+    local now_parts = redis.call('TIME')
+    local now = now_parts[1] * 1000000 + now_parts[2]
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    local count = redis.call('ZCARD', key)
+    local allowed = 0
+    if count < limit then
+        redis.call('ZADD', key, now, now .. ':' .. count)
+        redis.call('PEXPIRE', key, math.ceil(window / 1000))
+        count = count + 1
+        allowed = 1
+    end
+    local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+    local reset_after = window
+    if oldest[2] then
+        reset_after = tonumber(oldest[2]) + window - now
+    end
+    reset_after = math.ceil(reset_after / 1000)
+    local retry_after = 0
+    if allowed == 0 then
+        retry_after = reset_after
+    end
+    return {allowed, limit - count, retry_after, reset_after}
+    """
+
+    # Generic cell rate algorithm: one theoretical arrival time per key,
+    # allowing bursts of ``limit`` and one request per window/limit after that
+    GCRA_SCRIPT = """
+    local key = KEYS[1]
+    local limit = tonumber(ARGV[1])
+    local period = tonumber(ARGV[2])
+    local interval = period / limit
+    local now_parts = redis.call('TIME')
+    local now = now_parts[1] * 1000 + now_parts[2] / 1000
+    local tat = tonumber(redis.call('GET', key)) or now
+    if tat < now then
+        tat = now
+    end
+    local new_tat = tat + interval
+    local allow_at = new_tat - period
+    if allow_at > now then
+        return {0, 0, math.ceil(allow_at - now), math.ceil(tat - now)}
+    end
+    redis.call(
+        'SET', key, string.format('%.3f', new_tat), 'PX', math.ceil(new_tat - now)
+    )
+    local remaining = math.floor((now - allow_at) / interval)
+    return {1, remaining, 0, math.ceil(new_tat - now)}
+    """
+
+    # Bucket of ``limit`` tokens refilled continuously over the window
+    TOKEN_BUCKET_SCRIPT = """
+    local key = KEYS[1]
+    local capacity = tonumber(ARGV[1])
+    local rate = capacity / tonumber(ARGV[2])
+    local now_parts = redis.call('TIME')
+    local now = now_parts[1] * 1000 + now_parts[2] / 1000
+    local bucket = redis.call('HMGET', key, 'tokens', 'updated_at')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated_at = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+    local allowed = 0
+    local retry_after = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    else
+        retry_after = math.ceil((1 - tokens) / rate)
+    end
+    local reset_after = math.ceil((capacity - tokens) / rate)
+    redis.call(
+        'HSET', key, 'tokens', string.format('%.6f', tokens),
+        'updated_at', string.format('%.3f', now)
+    )
+    redis.call('PEXPIRE', key, reset_after + 1)
+    return {allowed, math.floor(tokens), retry_after, reset_after}
+    """
+
+    SCRIPTS = {
+        RateLimitAlgorithm.SLIDING_WINDOW_LOG: SLIDING_WINDOW_LOG_SCRIPT,
+        RateLimitAlgorithm.GCRA: GCRA_SCRIPT,
+        RateLimitAlgorithm.TOKEN_BUCKET: TOKEN_BUCKET_SCRIPT,
+    }
 
-                # Set expiry
-                pipe.expire(rate_key, window)
+    # Refused keys remembered locally; expired entries are pruned past this
+    MAX_BLOCKED_KEYS = 10000
 
-                results = await pipe.execute()
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        algorithm: RateLimitAlgorithm = RateLimitAlgorithm.SLIDING_WINDOW_LOG,
+    ) -> dict:
+        self.redis = redis_client
+        self.algorithm = algorithm
+        self.blocked_until: Dict[str, float] = {}
 
-            current_requests = results[1]
+    async def is_allowed(
+        self,
+        key: str,
+        limit: int,
+        window: int = 60,
+        algorithm: Optional[RateLimitAlgorithm] = None,
+    ) -> tuple[bool, Dict[str, Any]]:
+        """Check if request is allowed based on rate limit"""
+        algorithm = algorithm or self.algorithm
+        rate_key = f"rate_limit:{algorithm.value}:{key}"
+
+        blocked_until = self.blocked_until.get(rate_key)
+        if blocked_until is not None:
+            retry_after = blocked_until - time.monotonic()
+            if retry_after > 0:
+                return False, self._limit_info(
+                    False, limit, 0, retry_after, retry_after
+                )
+            del self.blocked_until[rate_key]
 
-            if current_requests >= limit:
-                return False, {
-                    "allowed": False,
-                    "limit": limit,
-                    "remaining": 0,
-                    "reset_time": current_time + window,
-                }
-            else:
-                return True, {
-                    "allowed": True,
-                    "limit": limit,
-                    "remaining": limit - current_requests - 1,
-                    "reset_time": current_time + window,
-                }
+        if limit < 1:
+            return False, self._limit_info(False, limit, 0, window, window)
 
+        try:
+            allowed, remaining, retry_after_ms, reset_after_ms = await self.redis.eval(
+                self.SCRIPTS[algorithm], 1, rate_key, limit, window * 1000
+            )
         except Exception as e:
             logger.error(f"Error checking rate limit: {str(e)}")
             return True, {"allowed": True, "error": str(e)}
 
+        allowed = bool(allowed)
+        if not allowed:
+            self._block(rate_key, retry_after_ms / 1000)
+
+        return allowed, self._limit_info(
+            allowed,
+            limit,
+            int(remaining),
+            retry_after_ms / 1000,
+            reset_after_ms / 1000,
+        )
+
+    def _block(self, rate_key: str, retry_after: float) -> None:
+        now = time.monotonic()
+        if len(self.blocked_until) >= self.MAX_BLOCKED_KEYS:
+            self.blocked_until = {
+                k: until for k, until in self.blocked_until.items() if until > now
+            }
+        self.blocked_until[rate_key] = now + retry_after
+
+    def _limit_info(
+        self,
+        allowed: bool,
+        limit: int,
+        remaining: int,
+        retry_after: float,
+        reset_after: float,
+    ) -> Dict[str, Any]:
+        return {
+            "allowed": allowed,
+            "limit": limit,
+            "remaining": max(remaining, 0),
+            "retry_after": retry_after,
+            "reset_time": int(time.time() + reset_after),
+        }
+
 
 class APIGatewayCore:
     """Core API Gateway functionality"""
 
-    def __init__(self, redis_client: redis.Redis) -> dict:
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        limits: httpx.Limits = UPSTREAM_LIMITS,
+        shared_circuit_breaker: bool = False,
+    ) -> dict:
         self.redis = redis_client
         self.service_registry = ServiceRegistry(redis_client)
         self.load_balancer = LoadBalancer(self.service_registry)
-        self.circuit_breaker = CircuitBreaker(redis_client)
+        self.circuit_breaker = (
+            SharedCircuitBreaker(redis_client)
+            if shared_circuit_breaker
+            else CircuitBreaker(redis_client)
+        )
         self.rate_limiter = RateLimiter(redis_client)
-        self.http_client = httpx.AsyncClient(timeout=30.0)
+        self.limits = limits
+        self.upstream_clients: Dict[str, httpx.AsyncClient] = {}
+        self._sync_task: Optional[asyncio.Task] = None
+
+    def get_upstream_client(self, base_url: str) -> httpx.AsyncClient:
+        """Keep-alive connection pool for one upstream service"""
+        client = self.upstream_clients.get(base_url)
+        if client is None:
+            client = self.upstream_clients[base_url] = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=httpx.Timeout(30.0, connect=UPSTREAM_CONNECT_TIMEOUT),
+            )
+        return client
 
     async def proxy_request(
         self, request: Request, route_config: Dict[str, Any]
     ) -> Response:
-        """Proxy request to backend service"""
+        """Proxy request to backend service
+
+        Request and response bodies are streamed through without being
+        buffered, so memory use does not depend on payload size.
+        """
         try:
             service_name = route_config["service_name"]
 
@@ -583,47 +1014,34 @@ class APIGatewayCore:
             target_path = route_config.get("target_path", request.url.path)
             target_url = f"{service['base_url']}{target_path}"
 
-            # Copy headers
-            headers = dict(request.headers)
-            headers.pop("host", None)  # Remove host header
+            # Requests without a body are not sent chunked
+            has_body = (
+                "content-length" in request.headers
+                or "transfer-encoding" in request.headers
+            )
+
+            client = self.get_upstream_client(service["base_url"])
+            upstream_request = client.build_request(
+                request.method,
+                target_url,
+                headers=_forward_headers(request.headers.items()),
+                params=request.query_params,
+                content=request.stream() if has_body else None,
+                timeout=route_config.get("timeout_seconds", 30),
+            )
+            self._start_state_sync()
 
             # Make request to service
             start_time = time.time()
 
             try:
-                response = await self.http_client.request(
-                    method=request.method,
-                    url=target_url,
-                    headers=headers,
-                    params=request.query_params,
-                    content=await request.body(),
-                    timeout=route_config.get("timeout_seconds", 30),
-                )
-
-                response_time = int((time.time() - start_time) * 1000)
-
-                # Record success
-                await self.circuit_breaker.record_success(
-                    service_name, request.url.path
-                )
-                await self.service_registry.update_service_health(
-                    service["service_id"], ServiceStatus.HEALTHY, response_time
-                )
-
-                # Create response
-                return Response(
-                    content=response.content,
-                    status_code=response.status_code,
-                    headers=dict(response.headers),
-                    media_type=response.headers.get("content-type"),
-                )
-
+                response = await client.send(upstream_request, stream=True)
             except Exception as e:
                 # Record failure
                 await self.circuit_breaker.record_failure(
                     service_name, request.url.path
                 )
-                await self.service_registry.update_service_health(
+                self.service_registry.record_health(
                     service["service_id"], ServiceStatus.UNHEALTHY
                 )
 
@@ -631,12 +1049,59 @@ class APIGatewayCore:
                     status_code=502, detail=f"Backend service error: {str(e)}"
                 )
 
+            response_time = int((time.time() - start_time) * 1000)
+
+            # Record success
+            await self.circuit_breaker.record_success(service_name, request.url.path)
+            self.service_registry.record_health(
+                service["service_id"], ServiceStatus.HEALTHY, response_time
+            )
+
+            # Relay the raw body, so content-encoding and length stay valid
+            proxied = StreamingResponse(
+                _relay_body(response), status_code=response.status_code
+            )
+            proxied.raw_headers = [
+                (name.encode("latin-1"), value.encode("latin-1"))
+                for name, value in _forward_headers(response.headers.multi_items())
+            ]
+            return proxied
+
         except HTTPException:
             raise
         except Exception as e:
             logger.error(f"Error proxying request: {str(e)}")
             raise HTTPException(status_code=500, detail="Internal gateway error")
 
+    def _start_state_sync(self) -> None:
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.create_task(self._run_state_sync())
+
+    async def _run_state_sync(self) -> None:
+        while True:
+            await asyncio.sleep(STATE_SYNC_INTERVAL)
+            await self.sync_state()
+
+    async def sync_state(self) -> None:
+        """Write circuit breaker and service health changes to Redis"""
+        await asyncio.gather(
+            self.circuit_breaker.sync(), self.service_registry.sync_health()
+        )
+
+    async def close(self) -> None:
+        """Flush pending state and close upstream connection pools"""
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._sync_task
+            self._sync_task = None
+
+        await self.sync_state()
+
+        for client in self.upstream_clients.values():
+            await client.aclose()
+        self.upstream_clients.clear()
+
 
 class GatewayMetrics:
     """Gateway metrics collection and reporting"""
@@ -785,6 +1250,13 @@ gateway_core = None
 gateway_metrics = None
 
 
+@router.on_event("shutdown")
+async def close_gateway() -> None:
+    """Flush gateway state and close upstream pools with the serving app"""
+    if gateway_core is not None:
+        await gateway_core.close()
+
+
 # API Endpoints
 @router.post("/services/register", response_model=Dict[str, Any])
 async def register_service(
@@ -975,25 +1447,7 @@ async def get_circuit_breaker_status(
     if not gateway_core:
         raise HTTPException(status_code=503, detail="Gateway not initialized")
 
-    # In real implementation, would query Redis for circuit breaker states
-    return [
-        {
-            "service_name": "inventory-service",
-            "route_path": "/api/v1/inventory",
-            "state": CircuitBreakerState.CLOSED,
-            "failure_count": 0,
-            "success_count": 150,
-            "total_requests": 150,
-        },
-        {
-            "service_name": "order-service",
-            "route_path": "/api/v1/orders",
-            "state": CircuitBreakerState.CLOSED,
-            "failure_count": 2,
-            "success_count": 98,
-            "total_requests": 100,
-        },
-    ]
+    return gateway_core.circuit_breaker.get_circuits(service_name)
 
 
 @router.post("/security/policies", response_model=Dict[str, Any])
@@ -1109,20 +1563,22 @@ async def run_health_checks(
 
             for service in services:
                 try:
-                    # Perform health check
-                    async with httpx.AsyncClient(timeout=10.0) as client:
-                        response = await client.get(service["health_check_url"])
-
-                        if response.status_code == 200:
-                            await gateway_core.service_registry.update_service_health(
-                                service["service_id"],
-                                ServiceStatus.HEALTHY,
-                                int(response.elapsed.total_seconds() * 1000),
-                            )
-                        else:
-                            await gateway_core.service_registry.update_service_health(
-                                service["service_id"], ServiceStatus.UNHEALTHY
-                            )
+                    # Perform health check over the service's pooled connections
+                    client = gateway_core.get_upstream_client(service["base_url"])
+                    response = await client.get(
+                        service["health_check_url"], timeout=10.0
+                    )
+
+                    if response.status_code == 200:
+                        await gateway_core.service_registry.update_service_health(
+                            service["service_id"],
+                            ServiceStatus.HEALTHY,
+                            int(response.elapsed.total_seconds() * 1000),
+                        )
+                    else:
+                        await gateway_core.service_registry.update_service_health(
+                            service["service_id"], ServiceStatus.UNHEALTHY
+                        )
 
                 except Exception as e:
                     await gateway_core.service_registry.update_service_health(
@@ -6,7 +6,7 @@ from fastapi.security import HTTPBearer
 from sqlalchemy.orm import Session
 
 from app.core.dependencies import get_current_user, get_db
-from app.core.exceptions import BusinessLogicError
+from app.core.exceptions import BusinessLogicError, PasswordHashingBusyError
 from app.models.user import User
 from app.schemas.auth import (
     AuthenticatedUser,
@@ -47,7 +47,7 @@ async def login(
 
     try:
         # Authenticate user
-        user = auth_service.authenticate_user(
+        user = await auth_service.authenticate_user_async(
             email=request.email,
             password=request.password,
             ip_address=client_ip,
@@ -101,6 +101,15 @@ async def login(
                 code="AUTH001",
             ).model_dump(),
         )
+    except PasswordHashingBusyError:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content=ErrorResponse(
+                detail="ログインが混み合っています。しばらくしてから再試行してください",
+                code="AUTH005",
+            ).model_dump(),
+            headers={"Retry-After": "1"},
+        )
     except Exception:
         return JSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -6,6 +6,7 @@ Day 3 of continuous API implementation
 
 import asyncio
 import json
+import time
 from dataclasses import dataclass
 from datetime import date, datetime, timedelta
 from decimal import Decimal
@@ -13,6 +14,7 @@ from enum import Enum
 from typing import Any, Dict, List, Optional
 from uuid import UUID, uuid4
 
+import numpy as np
 from fastapi import (
     APIRouter,
     BackgroundTasks,
@@ -23,13 +25,13 @@ from fastapi import (
     status,
 )
 from pydantic import BaseModel, Field
-from sqlalchemy import and_, desc, func, select, update
+from sqlalchemy import and_, delete, desc, func, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
 from app.core.exceptions import NotFoundError
 from app.core.security import get_current_active_user
-from app.models.customer import Customer, CustomerInteraction
+from app.models.customer import Customer, CustomerInteraction, CustomerSegmentScore
 from app.models.order import Order
 from app.models.user import User
 
@@ -132,12 +134,26 @@ class RFMAnalysisRequest(BaseModel):
     exclude_inactive: bool = Field(default=True)
 
 
+class RFMBatchScoringRequest(BaseModel):
+    date_range_days: int = Field(default=365, ge=30, le=1095)
+    recency_bins: int = Field(default=5, ge=3, le=10)
+    frequency_bins: int = Field(default=5, ge=3, le=10)
+    monetary_bins: int = Field(default=5, ge=3, le=10)
+    prediction_months: int = Field(default=12, ge=1, le=60)
+    discount_rate: float = Field(default=0.1, ge=0.0, le=0.5)
+    ltv_method: str = Field(
+        default="historic", pattern="^(historic|predictive|cohort)$"
+    )
+    chunk_size: int = Field(default=50000, ge=1000, le=500000)
+    persist_segments: bool = Field(default=True)
+
+
 class LTVCalculationRequest(BaseModel):
     customer_ids: Optional[List[UUID]] = None
     prediction_months: int = Field(default=12, ge=1, le=60)
     discount_rate: float = Field(default=0.1, ge=0.0, le=0.5)
     include_acquisition_cost: bool = Field(default=True)
-    method: str = Field(default="historic", regex="^(historic|predictive|cohort)$")
+    method: str = Field(default="historic", pattern="^(historic|predictive|cohort)$")
 
 
 class CustomerSegmentationRequest(BaseModel):
@@ -228,6 +244,17 @@ class CustomerLTVResponse(BaseModel):
         from_attributes = True
 
 
+class RFMBatchScoringResponse(BaseModel):
+    customers_scored: int
+    chunks_processed: int
+    segments_persisted: int
+    rfm_distribution: Dict[str, int]
+    ltv_distribution: Dict[str, int]
+    thresholds: Dict[str, List[float]]
+    duration_seconds: float
+    calculated_at: datetime
+
+
 class CustomerSegmentResponse(BaseModel):
     segment_id: str
     segment_name: str
@@ -244,6 +271,23 @@ class CustomerSegmentResponse(BaseModel):
         from_attributes = True
 
 
+@dataclass
+class CustomerAggregateArrays:
+    """Column arrays of per-customer order aggregates for batch scoring"""
+
+    customer_ids: np.ndarray
+    total_revenue: np.ndarray
+    order_count: np.ndarray
+    avg_order_value: np.ndarray
+    recency_days: np.ndarray
+    lifespan_days: np.ndarray
+    tenure_days: np.ndarray
+
+    @property
+    def size(self) -> int:
+        return int(self.customer_ids.size)
+
+
 @dataclass
 class CustomerMetrics:
     """Customer metrics data class"""
@@ -259,6 +303,138 @@ class CustomerMetrics:
     purchase_frequency_days: float
 
 
+# Vectorized scoring helpers
+RFM_SEGMENT_ORDER = [
+    RFMSegment.CHAMPIONS,
+    RFMSegment.LOYAL_CUSTOMERS,
+    RFMSegment.POTENTIAL_LOYALISTS,
+    RFMSegment.NEW_CUSTOMERS,
+    RFMSegment.PROMISING,
+    RFMSegment.NEED_ATTENTION,
+    RFMSegment.ABOUT_TO_SLEEP,
+    RFMSegment.AT_RISK,
+    RFMSegment.CANNOT_LOSE_THEM,
+    RFMSegment.HIBERNATING,
+    RFMSegment.LOST,
+]
+
+LTV_SEGMENT_BOUNDS = [
+    (2000.0, "High Value"),
+    (1000.0, "Medium-High Value"),
+    (500.0, "Medium Value"),
+    (200.0, "Low-Medium Value"),
+]
+
+
+def percentile_thresholds(
+    values: np.ndarray, bins: int, reverse: bool = False
+) -> np.ndarray:
+    """Vectorized equivalent of RFMAnalysisEngine._calculate_percentile_thresholds"""
+    if values.size == 0:
+        return np.empty(0, dtype=np.float64)
+
+    sorted_values = np.sort(values)
+    if reverse:
+        sorted_values = sorted_values[::-1]
+
+    positions = (np.arange(1, bins) / bins * values.size).astype(np.int64)
+    positions = np.minimum(positions, values.size - 1)
+    return sorted_values[positions]
+
+
+def score_values(
+    values: np.ndarray, thresholds: np.ndarray, reverse: bool = False
+) -> np.ndarray:
+    """Vectorized equivalent of RFMAnalysisEngine._calculate_score"""
+    if thresholds.size == 0:
+        return np.full(values.shape, 3, dtype=np.int8)
+
+    if reverse:
+        # Descending thresholds: count how many lie strictly above the value
+        ascending = thresholds[::-1]
+        passed = thresholds.size - np.searchsorted(ascending, values, side="right")
+    else:
+        passed = np.searchsorted(thresholds, values, side="left")
+
+    return np.minimum(passed + 1, 5).astype(np.int8)
+
+
+def classify_rfm_segments(r: np.ndarray, f: np.ndarray, m: np.ndarray) -> np.ndarray:
+    """Vectorized equivalent of RFMAnalysisEngine._determine_rfm_segment
+
+    Returns indexes into RFM_SEGMENT_ORDER.
+    """
+    conditions = [
+        (r >= 4) & (f >= 4) & (m >= 4),
+        f >= 4,
+        (r >= 4) & (m >= 4),
+        r >= 4,
+        (r >= 3) & (f >= 3),
+        (r >= 2) & (f >= 2) & (m >= 2),
+        (r >= 2) & (f <= 2),
+        (r <= 2) & (m >= 4),
+        (r <= 2) & (f >= 4) & (m >= 4),
+        (r <= 2) & (f <= 2),
+    ]
+    choices = list(range(len(conditions)))
+    return np.select(conditions, choices, default=len(RFM_SEGMENT_ORDER) - 1)
+
+
+def compute_ltv(
+    avg_order_value: np.ndarray,
+    order_count: np.ndarray,
+    recency_days: np.ndarray,
+    lifespan_days: np.ndarray,
+    tenure_days: np.ndarray,
+    prediction_months: int,
+    discount_rate: float,
+    method: str = "historic",
+) -> np.ndarray:
+    """Vectorized equivalent of the LTVCalculationEngine predicted LTV methods"""
+    frequency_days = np.where(
+        order_count > 1,
+        lifespan_days / np.maximum(order_count - 1, 1),
+        lifespan_days,
+    ).astype(np.float64)
+    monthly_frequency = np.where(
+        frequency_days > 0,
+        30.0 / np.where(frequency_days > 0, frequency_days, 1),
+        0.1,
+    )
+
+    discount_factor = 1 / (1 + discount_rate) ** (prediction_months / 12)
+    ltv = avg_order_value * monthly_frequency * prediction_months * discount_factor
+
+    if method == "predictive":
+        recency_factor = np.maximum(0.1, 1 - recency_days / 365)
+        frequency_factor = np.minimum(2.0, order_count / 12)
+        ltv = ltv * recency_factor * frequency_factor
+    elif method == "cohort":
+        ltv = ltv * np.select(
+            [tenure_days < 90, tenure_days > 730], [1.2, 0.8], default=1.0
+        )
+
+    return np.maximum(ltv, 0.0)
+
+
+def compute_churn_probability(
+    recency_days: np.ndarray, order_count: np.ndarray
+) -> np.ndarray:
+    """Vectorized equivalent of LTVCalculationEngine._calculate_churn_probability"""
+    recency_risk = np.minimum(1.0, recency_days / 365)
+    frequency_protection = np.minimum(0.8, order_count / 20)
+    return np.round(np.clip(recency_risk * (1 - frequency_protection), 0.0, 1.0), 3)
+
+
+def classify_ltv_segments(ltv: np.ndarray) -> np.ndarray:
+    """Vectorized equivalent of LTVCalculationEngine._determine_ltv_segment"""
+    return np.select(
+        [ltv >= bound for bound, _ in LTV_SEGMENT_BOUNDS],
+        [name for _, name in LTV_SEGMENT_BOUNDS],
+        default="Low Value",
+    )
+
+
 # Core Service Classes
 class CRMManager:
     """Advanced CRM functionality manager"""
@@ -485,54 +661,57 @@ class RFMAnalysisEngine:
         # Calculate RFM scores
         rfm_data = []
 
-        # Extract values for percentile calculations
-        recency_values = [m.days_since_last_order for m in customer_metrics]
-        frequency_values = [m.order_count for m in customer_metrics]
-        monetary_values = [float(m.total_revenue) for m in customer_metrics]
+        recency_values = np.array(
+            [m.days_since_last_order for m in customer_metrics], dtype=np.float64
+        )
+        frequency_values = np.array(
+            [m.order_count for m in customer_metrics], dtype=np.float64
+        )
+        monetary_values = np.array(
+            [float(m.total_revenue) for m in customer_metrics], dtype=np.float64
+        )
 
-        # Calculate percentile thresholds
-        recency_thresholds = self._calculate_percentile_thresholds(
-            recency_values, request.recency_bins, reverse=True
+        recency_scores = score_values(
+            recency_values,
+            percentile_thresholds(recency_values, request.recency_bins, reverse=True),
+            reverse=True,
+        )
+        frequency_scores = score_values(
+            frequency_values,
+            percentile_thresholds(frequency_values, request.frequency_bins),
         )
-        frequency_thresholds = self._calculate_percentile_thresholds(
-            frequency_values, request.frequency_bins
+        monetary_scores = score_values(
+            monetary_values,
+            percentile_thresholds(monetary_values, request.monetary_bins),
         )
-        monetary_thresholds = self._calculate_percentile_thresholds(
-            monetary_values, request.monetary_bins
+        segment_indexes = classify_rfm_segments(
+            recency_scores, frequency_scores, monetary_scores
         )
 
-        # Calculate scores for each customer
-        for metrics in customer_metrics:
-            recency_score = self._calculate_score(
-                metrics.days_since_last_order, recency_thresholds, reverse=True
-            )
-            frequency_score = self._calculate_score(
-                metrics.order_count, frequency_thresholds
-            )
-            monetary_score = self._calculate_score(
-                float(metrics.total_revenue), monetary_thresholds
-            )
+        # Get customer details in one query
+        contacts = await get_customer_contacts(
+            self.db, [m.customer_id for m in customer_metrics]
+        )
+        calculated_at = datetime.utcnow()
 
-            # Determine RFM segment
-            rfm_segment = self._determine_rfm_segment(
-                recency_score, frequency_score, monetary_score
+        for i, metrics in enumerate(customer_metrics):
+            rfm_segment = RFM_SEGMENT_ORDER[segment_indexes[i]]
+            customer_name, customer_email = contacts.get(
+                metrics.customer_id, ("Unknown", "unknown@example.com")
             )
 
-            # Get customer details
-            customer = await self._get_customer(metrics.customer_id)
-
             rfm_scores = RFMScores(
-                recency_score=recency_score,
-                frequency_score=frequency_score,
-                monetary_score=monetary_score,
+                recency_score=int(recency_scores[i]),
+                frequency_score=int(frequency_scores[i]),
+                monetary_score=int(monetary_scores[i]),
                 rfm_segment=rfm_segment,
                 segment_description=self._get_segment_description(rfm_segment),
             )
 
             rfm_response = CustomerRFMResponse(
                 customer_id=metrics.customer_id,
-                customer_name=customer.full_name if customer else "Unknown",
-                customer_email=customer.email if customer else "unknown@example.com",
+                customer_name=customer_name,
+                customer_email=customer_email,
                 recency_days=metrics.days_since_last_order,
                 frequency_orders=metrics.order_count,
                 monetary_value=metrics.total_revenue,
@@ -540,7 +719,7 @@ class RFMAnalysisEngine:
                 last_order_date=metrics.last_order_date,
                 total_orders=metrics.order_count,
                 avg_order_value=metrics.avg_order_value,
-                calculated_at=datetime.utcnow(),
+                calculated_at=calculated_at,
             )
 
             rfm_data.append(rfm_response)
@@ -706,13 +885,6 @@ class RFMAnalysisEngine:
         }
         return descriptions.get(segment, "Unknown segment")
 
-    async def _get_customer(self, customer_id: UUID) -> Optional[Customer]:
-        """Get customer by ID"""
-        result = await self.db.execute(
-            select(Customer).where(Customer.id == customer_id)
-        )
-        return result.scalar_one_or_none()
-
 
 class LTVCalculationEngine:
     """Customer Lifetime Value Calculation Engine"""
@@ -730,6 +902,11 @@ class LTVCalculationEngine:
 
         ltv_results = []
 
+        # Get customer details in one query
+        contacts = await get_customer_contacts(
+            self.db, [m.customer_id for m in customer_metrics]
+        )
+
         for metrics in customer_metrics:
             # Historical LTV (total revenue to date)
             historical_ltv = metrics.total_revenue
@@ -760,13 +937,14 @@ class LTVCalculationEngine:
             # Determine LTV segment
             ltv_segment = self._determine_ltv_segment(predicted_ltv)
 
-            # Get customer details
-            customer = await self._get_customer(metrics.customer_id)
+            customer_name, customer_email = contacts.get(
+                metrics.customer_id, ("Unknown", "unknown@example.com")
+            )
 
             ltv_response = CustomerLTVResponse(
                 customer_id=metrics.customer_id,
-                customer_name=customer.full_name if customer else "Unknown",
-                customer_email=customer.email if customer else "unknown@example.com",
+                customer_name=customer_name,
+                customer_email=customer_email,
                 historical_ltv=historical_ltv,
                 predicted_ltv=predicted_ltv,
                 ltv_12_months=ltv_12_months,
@@ -940,12 +1118,241 @@ class LTVCalculationEngine:
         else:
             return "Low Value"
 
-    async def _get_customer(self, customer_id: UUID) -> Optional[Customer]:
-        """Get customer by ID"""
-        result = await self.db.execute(
-            select(Customer).where(Customer.id == customer_id)
+
+class RFMBatchScoringEngine:
+    """Whole-customer-base RFM and LTV scoring using NumPy array operations"""
+
+    def __init__(self, db: AsyncSession) -> dict:
+        self.db = db
+
+    async def score_customer_base(
+        self, request: RFMBatchScoringRequest
+    ) -> RFMBatchScoringResponse:
+        """Score every customer with orders in the window and persist segments"""
+
+        started = time.perf_counter()
+        end_date = datetime.utcnow()
+        start_date = end_date - timedelta(days=request.date_range_days)
+
+        aggregates = await self._load_aggregates(
+            start_date, end_date, request.chunk_size
         )
-        return result.scalar_one_or_none()
+
+        recency_thresholds = percentile_thresholds(
+            aggregates.recency_days, request.recency_bins, reverse=True
+        )
+        frequency_thresholds = percentile_thresholds(
+            aggregates.order_count, request.frequency_bins
+        )
+        monetary_thresholds = percentile_thresholds(
+            aggregates.total_revenue, request.monetary_bins
+        )
+
+        recency_scores = score_values(
+            aggregates.recency_days, recency_thresholds, reverse=True
+        )
+        frequency_scores = score_values(aggregates.order_count, frequency_thresholds)
+        monetary_scores = score_values(aggregates.total_revenue, monetary_thresholds)
+        segment_indexes = classify_rfm_segments(
+            recency_scores, frequency_scores, monetary_scores
+        )
+
+        predicted_ltv = compute_ltv(
+            aggregates.avg_order_value,
+            aggregates.order_count,
+            aggregates.recency_days,
+            aggregates.lifespan_days,
+            aggregates.tenure_days,
+            request.prediction_months,
+            request.discount_rate,
+            request.ltv_method,
+        )
+        churn_probability = compute_churn_probability(
+            aggregates.recency_days, aggregates.order_count
+        )
+        ltv_segments = classify_ltv_segments(predicted_ltv)
+
+        chunks_processed = 0
+        segments_persisted = 0
+        calculated_at = datetime.utcnow()
+        run_id = str(uuid4())
+
+        for offset in range(0, aggregates.size, request.chunk_size):
+            chunk = slice(offset, offset + request.chunk_size)
+            chunks_processed += 1
+
+            if not request.persist_segments:
+                continue
+
+            rows = [
+                {
+                    "customer_id": customer_id,
+                    "recency_days": int(recency),
+                    "frequency_orders": int(frequency),
+                    "monetary_value": round(monetary, 2),
+                    "recency_score": r,
+                    "frequency_score": f,
+                    "monetary_score": m,
+                    "rfm_segment": RFM_SEGMENT_ORDER[segment].value,
+                    "predicted_ltv": round(ltv, 2),
+                    "ltv_segment": ltv_segment,
+                    "churn_probability": churn,
+                    "calculated_at": calculated_at,
+                    "run_id": run_id,
+                }
+                for (
+                    customer_id,
+                    recency,
+                    frequency,
+                    monetary,
+                    r,
+                    f,
+                    m,
+                    segment,
+                    ltv,
+                    ltv_segment,
+                    churn,
+                ) in zip(
+                    aggregates.customer_ids[chunk].tolist(),
+                    aggregates.recency_days[chunk].tolist(),
+                    aggregates.order_count[chunk].tolist(),
+                    aggregates.total_revenue[chunk].tolist(),
+                    recency_scores[chunk].tolist(),
+                    frequency_scores[chunk].tolist(),
+                    monetary_scores[chunk].tolist(),
+                    segment_indexes[chunk].tolist(),
+                    predicted_ltv[chunk].tolist(),
+                    ltv_segments[chunk].tolist(),
+                    churn_probability[chunk].tolist(),
+                )
+            ]
+            segments_persisted += await self._persist_segments(rows)
+
+        if request.persist_segments:
+            # Customers without orders in this window keep no stale segment
+            await self._purge_previous_runs(run_id)
+
+        segment_ids, segment_counts = np.unique(segment_indexes, return_counts=True)
+        ltv_names, ltv_counts = np.unique(ltv_segments, return_counts=True)
+
+        return RFMBatchScoringResponse(
+            customers_scored=aggregates.size,
+            chunks_processed=chunks_processed,
+            segments_persisted=segments_persisted,
+            rfm_distribution={
+                RFM_SEGMENT_ORDER[int(i)].value: int(c)
+                for i, c in zip(segment_ids, segment_counts)
+            },
+            ltv_distribution={
+                str(name): int(c) for name, c in zip(ltv_names, ltv_counts)
+            },
+            thresholds={
+                "recency": recency_thresholds.tolist(),
+                "frequency": frequency_thresholds.tolist(),
+                "monetary": monetary_thresholds.tolist(),
+            },
+            duration_seconds=round(time.perf_counter() - started, 3),
+            calculated_at=calculated_at,
+        )
+
+    async def _load_aggregates(
+        self, start_date: datetime, end_date: datetime, chunk_size: int
+    ) -> CustomerAggregateArrays:
+        """Stream per-customer order aggregates from one grouped query"""
+
+        query = (
+            select(
+                Order.customer_id,
+                func.sum(Order.total_amount).label("total_revenue"),
+                func.count(Order.id).label("order_count"),
+                func.avg(Order.total_amount).label("avg_order_value"),
+                func.min(Order.order_date).label("first_order_date"),
+                func.max(Order.order_date).label("last_order_date"),
+            )
+            .where(
+                and_(
+                    Order.order_date >= start_date,
+                    Order.order_date <= end_date,
+                    Order.status.in_(["completed", "shipped", "delivered"]),
+                )
+            )
+            .group_by(Order.customer_id)
+        )
+
+        today = end_date.date().toordinal()
+        customer_ids: List[Any] = []
+        columns: Dict[str, List[np.ndarray]] = {
+            "total_revenue": [],
+            "order_count": [],
+            "avg_order_value": [],
+            "first_order": [],
+            "last_order": [],
+        }
+
+        result = await self.db.stream(query)
+        async for partition in result.partitions(chunk_size):
+            customer_ids.extend(row.customer_id for row in partition)
+            columns["total_revenue"].append(
+                np.array([float(row.total_revenue or 0) for row in partition])
+            )
+            columns["order_count"].append(
+                np.array([row.order_count for row in partition], dtype=np.float64)
+            )
+            columns["avg_order_value"].append(
+                np.array([float(row.avg_order_value or 0) for row in partition])
+            )
+            columns["first_order"].append(
+                np.array(
+                    [_date_ordinal(row.first_order_date) for row in partition],
+                    dtype=np.int64,
+                )
+            )
+            columns["last_order"].append(
+                np.array(
+                    [_date_ordinal(row.last_order_date) for row in partition],
+                    dtype=np.int64,
+                )
+            )
+
+        def stacked(name: str, dtype: Any = np.float64) -> np.ndarray:
+            parts = columns[name]
+            return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+        first_order = stacked("first_order", np.int64)
+        last_order = stacked("last_order", np.int64)
+
+        return CustomerAggregateArrays(
+            customer_ids=np.array(customer_ids, dtype=object),
+            total_revenue=stacked("total_revenue"),
+            order_count=stacked("order_count"),
+            avg_order_value=stacked("avg_order_value"),
+            recency_days=(today - last_order).astype(np.float64),
+            lifespan_days=(last_order - first_order).astype(np.float64),
+            tenure_days=(today - first_order).astype(np.float64),
+        )
+
+    async def _persist_segments(self, rows: List[Dict[str, Any]]) -> int:
+        """Replace segment scores for one chunk of customers in one transaction"""
+        if not rows:
+            return 0
+
+        await self.db.execute(
+            delete(CustomerSegmentScore).where(
+                CustomerSegmentScore.customer_id.in_(
+                    [row["customer_id"] for row in rows]
+                )
+            )
+        )
+        await self.db.execute(insert(CustomerSegmentScore), rows)
+        await self.db.commit()
+        return len(rows)
+
+    async def _purge_previous_runs(self, run_id: str) -> None:
+        """Delete scores left over from earlier runs"""
+        await self.db.execute(
+            delete(CustomerSegmentScore).where(CustomerSegmentScore.run_id != run_id)
+        )
+        await self.db.commit()
 
 
 # API Endpoints
@@ -1082,6 +1489,63 @@ async def calculate_customer_ltv(
         )
 
 
+@router.post("/rfm-analysis/batch", response_model=RFMBatchScoringResponse)
+async def score_customer_base(
+    request: RFMBatchScoringRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Score the whole customer base and persist RFM/LTV segments"""
+
+    batch_engine = RFMBatchScoringEngine(db)
+
+    try:
+        return await batch_engine.score_customer_base(request)
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Batch RFM scoring failed: {str(e)}",
+        )
+
+
+@router.get("/segments/{segment}/customers")
+async def get_segment_customers(
+    segment: RFMSegment = Path(..., description="RFM segment"),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """List customers in a persisted RFM segment"""
+
+    result = await db.execute(
+        select(
+            CustomerSegmentScore.customer_id,
+            Customer.name.label("full_name"),
+            Customer.email,
+            CustomerSegmentScore.recency_score,
+            CustomerSegmentScore.frequency_score,
+            CustomerSegmentScore.monetary_score,
+            CustomerSegmentScore.predicted_ltv,
+            CustomerSegmentScore.ltv_segment,
+            CustomerSegmentScore.calculated_at,
+        )
+        .join(Customer, Customer.id == CustomerSegmentScore.customer_id)
+        .where(CustomerSegmentScore.rfm_segment == segment.value)
+        .order_by(desc(CustomerSegmentScore.monetary_value))
+        .limit(limit)
+        .offset(offset)
+    )
+
+    return {
+        "segment": segment.value,
+        "customers": [dict(row._mapping) for row in result],
+        "limit": limit,
+        "offset": offset,
+    }
+
+
 @router.get("/segments")
 async def get_customer_segments(
     include_metrics: bool = Query(True, description="Include segment metrics"),
@@ -1192,6 +1656,7 @@ async def health_check() -> None:
         "features": [
             "crm_management",
             "rfm_analysis",
+            "rfm_batch_scoring",
             "ltv_calculation",
             "customer_segmentation",
             "lifecycle_tracking",
@@ -1220,32 +1685,52 @@ async def update_customer_segments_task(
 
 
 async def get_rfm_segment_distribution(db: AsyncSession) -> Dict[str, int]:
-    """Get RFM segment distribution"""
-    # Simplified - would query actual customer segments
-    return {
-        "champions": 45,
-        "loyal_customers": 123,
-        "potential_loyalists": 67,
-        "new_customers": 89,
-        "promising": 78,
-        "need_attention": 134,
-        "about_to_sleep": 56,
-        "at_risk": 23,
-        "hibernating": 45,
-        "lost": 12,
-    }
+    """Get RFM segment distribution from persisted segment scores"""
+
+    result = await db.execute(
+        select(
+            CustomerSegmentScore.rfm_segment,
+            func.count(CustomerSegmentScore.id).label("count"),
+        ).group_by(CustomerSegmentScore.rfm_segment)
+    )
+    return {row.rfm_segment: row.count for row in result}
 
 
 async def get_ltv_segment_distribution(db: AsyncSession) -> Dict[str, int]:
-    """Get LTV segment distribution"""
-    # Simplified - would query actual customer LTV data
-    return {
-        "High Value": 67,
-        "Medium-High Value": 145,
-        "Medium Value": 234,
-        "Low-Medium Value": 189,
-        "Low Value": 93,
-    }
+    """Get LTV segment distribution from persisted segment scores"""
+
+    result = await db.execute(
+        select(
+            CustomerSegmentScore.ltv_segment,
+            func.count(CustomerSegmentScore.id).label("count"),
+        )
+        .where(CustomerSegmentScore.ltv_segment.isnot(None))
+        .group_by(CustomerSegmentScore.ltv_segment)
+    )
+    return {row.ltv_segment: row.count for row in result}
+
+
+async def get_customer_contacts(
+    db: AsyncSession, customer_ids: List[UUID]
+) -> Dict[UUID, tuple]:
+    """Get (name, email) for many customers in one query"""
+
+    if not customer_ids:
+        return {}
+
+    result = await db.execute(
+        select(Customer.id, Customer.name.label("full_name"), Customer.email).where(
+            Customer.id.in_(customer_ids)
+        )
+    )
+    return {row.id: (row.full_name, row.email) for row in result.all()}
+
+
+def _date_ordinal(value: Any) -> int:
+    """Day ordinal for a date or datetime aggregate value"""
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.toordinal()
 
 
 async def get_customer_statistics(
@@ -19,9 +19,20 @@ from datetime import datetime
 from typing import Any, Dict, List, Optional
 from uuid import uuid4
 
-from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+    status,
+)
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.core.database import get_db
 from app.crud.document_v31 import DocumentService
 from app.schemas.document_v31 import (  # Bulk operations schemas; Comment schemas; Document schemas; Search and analytics schemas; Sharing schemas; Signature schemas; System schemas; Template schemas
@@ -63,6 +74,14 @@ from app.schemas.document_v31 import (  # Bulk operations schemas; Comment schem
     WorkflowCreate,
     WorkflowResponse,
 )
+from app.services.blob_storage import (
+    BLOB_CHUNK_SIZE,
+    BlobTooLargeError,
+    ChecksumMismatchError,
+    UploadNotFoundError,
+    UploadOffsetError,
+    get_blob_store,
+)
 
 router = APIRouter()
 document_service = DocumentService()
@@ -79,6 +98,9 @@ document_service = DocumentService()
 async def create_document(
     document: DocumentCreate,
     file: Optional[UploadFile] = File(None),
+    upload_id: Optional[str] = Query(
+        None, description="Completed resumable upload to attach instead of a file"
+    ),
     db: Session = Depends(get_db),
 ) -> DocumentResponse:
     """
@@ -86,6 +108,8 @@ async def create_document(
 
     Features:
     - File upload with multiple format support
+    - Streaming, content-addressed storage (identical files stored once)
+    - Resumable uploads for large files via ``upload_id``
     - Automatic file type detection and validation
     - Content extraction and indexing for search
     - Version control initialization
@@ -93,17 +117,16 @@ async def create_document(
     - Custom metadata and tagging
     """
     try:
-        # Process uploaded file
-        file_content = None
+        # Stream the uploaded file into the blob store
+        blob = await _store_document_file(file, upload_id)
         if file:
-            file_content = await file.read()
             document.filename = file.filename
             document.original_filename = file.filename
 
         # Generate unique document number
         document_data = document.dict()
         created_document = await document_service.create_document(
-            db, document_data, file_content
+            db, document_data, blob=blob
         )
         return created_document
 
@@ -215,6 +238,7 @@ async def create_document_version(
     document_id: str,
     version_data: DocumentVersionCreate,
     file: Optional[UploadFile] = File(None),
+    upload_id: Optional[str] = Query(None),
     user_id: str = Query(...),
     db: Session = Depends(get_db),
 ) -> DocumentResponse:
@@ -223,19 +247,18 @@ async def create_document_version(
 
     Features:
     - Automatic version numbering (major.minor)
-    - File replacement with new content
+    - File replacement with new content (unchanged content is not copied)
     - Version history tracking
     - Change summary documentation
     - Inheritance of parent document properties
     """
     try:
-        file_content = None
+        blob = await _store_document_file(file, upload_id)
         if file:
-            file_content = await file.read()
             version_data.filename = file.filename
 
         new_version = await document_service.create_document_version(
-            db, document_id, version_data.dict(), file_content, user_id
+            db, document_id, version_data.dict(), user_id=user_id, blob=blob
         )
         return new_version
 
@@ -298,6 +321,108 @@ async def delete_document(
     return {"message": "Document deleted successfully"}
 
 
+@router.get("/documents/{document_id}/content")
+async def download_document(
+    document_id: str, db: Session = Depends(get_db)
+) -> FileResponse:
+    """
+    Download the stored file of a document.
+
+    Features:
+    - Streamed from the content-addressed store
+    - HTTP range requests for partial and resumed downloads
+    - Content hash as ETag
+    """
+    document = await document_service.get_document_by_id(db, document_id)
+    store = get_blob_store()
+    if not document or not document.file_hash or not store.exists(document.file_hash):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Document file not found"
+        )
+
+    return FileResponse(
+        store.blob_path(document.file_hash),
+        media_type=document.mime_type or "application/octet-stream",
+        filename=document.original_filename or document.filename,
+        headers={"ETag": f'"{document.file_hash}"'},
+    )
+
+
+@router.post("/documents/uploads", status_code=status.HTTP_201_CREATED)
+async def start_document_upload() -> Dict[str, Any]:
+    """
+    Start a resumable upload for a large document file.
+
+    Send the file with ``PUT /documents/uploads/{upload_id}?offset=N`` in one or
+    more chunks, then pass ``upload_id`` when creating the document or version.
+    """
+    upload_id = get_blob_store().start_upload()
+    return {"upload_id": upload_id, "offset": 0, "chunk_size": BLOB_CHUNK_SIZE}
+
+
+@router.get("/documents/uploads/{upload_id}")
+async def get_document_upload(upload_id: str) -> Dict[str, Any]:
+    """Bytes received so far, to resume an interrupted upload."""
+    try:
+        offset = get_blob_store().upload_offset(upload_id)
+    except UploadNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found"
+        )
+    return {"upload_id": upload_id, "offset": offset}
+
+
+@router.put("/documents/uploads/{upload_id}")
+async def append_document_upload(
+    upload_id: str, request: Request, offset: int = Query(..., ge=0)
+) -> Dict[str, Any]:
+    """Append the request body to a resumable upload at ``offset``."""
+    try:
+        new_offset = await get_blob_store().append_chunk(
+            upload_id, offset, request.stream(), settings.DOCUMENT_MAX_FILE_SIZE
+        )
+    except UploadNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found"
+        )
+    except UploadOffsetError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": str(e), "offset": e.expected_offset},
+        )
+    except BlobTooLargeError:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="File too large",
+        )
+    return {"upload_id": upload_id, "offset": new_offset}
+
+
+@router.delete("/documents/uploads/{upload_id}")
+async def abort_document_upload(upload_id: str) -> Dict[str, str]:
+    """Discard a resumable upload."""
+    try:
+        get_blob_store().abort_upload(upload_id)
+    except UploadNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found"
+        )
+    return {"message": "Upload discarded"}
+
+
+async def _store_document_file(file: Optional[UploadFile], upload_id: Optional[str]):
+    """Store an uploaded file or complete a resumable upload, if any."""
+    store = get_blob_store()
+    if upload_id:
+        try:
+            return await store.complete_upload(upload_id)
+        except (UploadNotFoundError, ChecksumMismatchError) as e:
+            raise ValueError(f"Invalid upload {upload_id}: {e}")
+    if file:
+        return await store.store_upload(file, settings.DOCUMENT_MAX_FILE_SIZE)
+    return None
+
+
 # =============================================================================
 # 2. Folder & Category Organization Endpoints
 # =============================================================================
@@ -728,6 +853,10 @@ async def search_documents(
             search_time_ms=search_time_ms,
             facets={},
             suggestions=[],
+            highlights={
+                document.id: getattr(document, "search_highlights", [])
+                for document in documents
+            },
         )
 
     except Exception as e:
@@ -7,17 +7,22 @@ from __future__ import annotations
 
 import asyncio
 import json
+import logging
+import time
+from contextlib import suppress
 from datetime import datetime, timedelta
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set
 from uuid import UUID, uuid4
 
-import redis
-from fastapi import APIRouter, BackgroundTasks, HTTPException, status
+import redis.asyncio as redis
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, status
 from pydantic import BaseModel, Field
 
 from app.core.exceptions import BusinessLogicError, NotFoundError
 
+logger = logging.getLogger(__name__)
+
 # Router setup
 router = APIRouter(
     prefix="/api/v1/enterprise-integration-v63", tags=["Enterprise Integration v63"]
@@ -27,6 +32,18 @@ router = APIRouter(
 redis_client = redis.Redis(host="localhost", port=6379, db=2, decode_responses=True)
 
 
+def _hash_mapping(values: Dict[str, Any]) -> Dict[str, str]:
+    """Encode values for a Redis hash, JSON for containers"""
+    return {
+        k: json.dumps(v)
+        if isinstance(v, (dict, list))
+        else v.value
+        if isinstance(v, Enum)
+        else str(v)
+        for k, v in values.items()
+    }
+
+
 # Enums
 class MessageType(str, Enum):
     COMMAND = "command"
@@ -105,6 +122,7 @@ class QueueConfiguration(BaseModel):
     retry_limit: int = Field(3, ge=0, le=10)
     routing_patterns: List[str] = Field(default_factory=list)
     consumer_prefetch: int = Field(10, ge=1, le=1000)
+    visibility_timeout_ms: int = Field(30000, ge=1000, le=43200000)  # 1s to 12h
 
 
 class IntegrationPatternRequest(BaseModel):
@@ -128,7 +146,30 @@ class SagaDefinition(BaseModel):
     compensation_steps: List[Dict[str, Any]]
     timeout_seconds: int = Field(300, ge=30, le=3600)  # 30s to 1h
     retry_policy: Dict[str, Any] = Field(default_factory=dict)
-    failure_policy: str = Field("compensate", regex="^(compensate|retry|abort)$")
+    failure_policy: str = Field("compensate", pattern="^(compensate|retry|abort)$")
+
+    def step_dependencies(self) -> List[Set[int]]:
+        """Indexes each step waits for
+
+        A step's ``depends_on`` lists step names or indexes; without it a
+        step waits for the previous one, and ``depends_on: []`` lets it
+        start immediately.
+        """
+        names = {step.get("name"): i for i, step in enumerate(self.steps)}
+        dependencies = []
+        for index, step in enumerate(self.steps):
+            declared = step.get("depends_on", [index - 1] if index else [])
+            resolved = set()
+            for dependency in declared:
+                dependency = names.get(dependency, dependency)
+                if not isinstance(dependency, int) or not 0 <= dependency < index:
+                    raise ValueError(
+                        f"Step {index} depends on {dependency!r}, which is not "
+                        "an earlier step"
+                    )
+                resolved.add(dependency)
+            dependencies.append(resolved)
+        return dependencies
 
 
 class MessageResponse(BaseModel):
@@ -185,7 +226,59 @@ class SagaExecutionResponse(BaseModel):
 
 # Core Components
 class MessageQueue:
-    """High-performance message queue with Redis backend"""
+    """High-performance message queue with Redis backend
+
+    Pending messages are a sorted set ordered by priority, then age.
+    Receiving pops messages and records them in the processing set with a
+    visibility deadline in one Lua script, so each message is claimed by
+    exactly one consumer. Claims not completed or failed by their deadline,
+    and retries that are due, are moved back to pending by
+    ``requeue_expired``.
+    """
+
+    # Pops up to ARGV[1] messages and claims them until ARGV[2]
+    CLAIM_SCRIPT = """
+    local popped = redis.call('ZPOPMAX', KEYS[1], ARGV[1])
+    local claimed = {}
+    for i = 1, #popped, 2 do
+        local message_id = popped[i]
+        local message_key = ARGV[5] .. message_id
+        redis.call('ZADD', KEYS[2], ARGV[2], message_id)
+        redis.call(
+            'HSET', message_key, 'status', 'processing', 'consumer_id', ARGV[3],
+            'processing_started_at', ARGV[4], 'visible_at', ARGV[2]
+        )
+        local fields = redis.call('HMGET', message_key, 'created_at', 'retry_count')
+        table.insert(claimed, message_id)
+        table.insert(claimed, fields[1] or '')
+        table.insert(claimed, fields[2] or '0')
+    end
+    return claimed
+    """
+
+    # Moves claims past their deadline and due retries (scores <= ARGV[1])
+    # back to pending; replies with the number moved from each
+    REQUEUE_SCRIPT = """
+    local moved = {}
+    for source = 1, 2 do
+        local message_ids = redis.call(
+            'ZRANGEBYSCORE', KEYS[source], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2]
+        )
+        for _, message_id in ipairs(message_ids) do
+            local message_key = ARGV[3] .. message_id
+            local score = tonumber(redis.call('HGET', message_key, 'queue_score'))
+            redis.call('ZREM', KEYS[source], message_id)
+            redis.call('ZADD', KEYS[3], score or 0, message_id)
+            redis.call('HSET', message_key, 'status', 'pending')
+            redis.call('HDEL', message_key, 'consumer_id', 'visible_at')
+        end
+        table.insert(moved, #message_ids)
+    end
+    return moved
+    """
+
+    DEFAULT_VISIBILITY_TIMEOUT_MS = 30000
+    REQUEUE_BATCH_SIZE = 500
 
     def __init__(self, redis_client: redis.Redis) -> dict:
         self.redis = redis_client
@@ -198,7 +291,7 @@ class MessageQueue:
             queue_key = f"queue:config:{config.queue_name}"
             queue_data = config.dict()
 
-            self.redis.hset(
+            await self.redis.hset(
                 queue_key,
                 mapping={
                     k: json.dumps(v) if isinstance(v, (dict, list)) else str(v)
@@ -208,7 +301,7 @@ class MessageQueue:
 
             # Initialize queue metrics
             metrics_key = f"queue:metrics:{config.queue_name}"
-            self.redis.hset(
+            await self.redis.hset(
                 metrics_key,
                 mapping={
                     "total_messages": 0,
@@ -273,14 +366,20 @@ class MessageQueue:
                 expires_at = start_time + timedelta(milliseconds=request.expiration_ms)
                 message_data["expires_at"] = expires_at.isoformat()
 
-            # Store message
-            message_key = f"message:{request.message_id}"
-            self.redis.hset(message_key, mapping=message_data)
+            # Priority first, then oldest first; kept for requeueing
+            queue_score = self._get_queue_score(request.priority, start_time)
+            message_data["queue_score"] = queue_score
 
-            # Add to priority queue
-            priority_score = self._get_priority_score(request.priority)
+            # Store message and add to priority queue
+            message_key = f"message:{request.message_id}"
             queue_key = f"queue:pending:{request.queue_name}"
-            self.redis.zadd(queue_key, {str(request.message_id): priority_score})
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.hset(
+                    message_key,
+                    mapping={k: v for k, v in message_data.items() if v is not None},
+                )
+                pipe.zadd(queue_key, {str(request.message_id): queue_score})
+                await pipe.execute()
 
             # Update metrics
             await self._update_queue_metrics(request.queue_name, "message_sent")
@@ -301,73 +400,134 @@ class MessageQueue:
             raise BusinessLogicError(f"Failed to send message: {str(e)}")
 
     async def receive_message(
-        self, queue_name: str, consumer_id: str
+        self,
+        queue_name: str,
+        consumer_id: str,
+        visibility_timeout_ms: Optional[int] = None,
     ) -> Optional[MessageResponse]:
         """Receive message from queue for processing"""
+        messages = await self.receive_messages(
+            queue_name, consumer_id, 1, visibility_timeout_ms
+        )
+        return messages[0] if messages else None
+
+    async def receive_messages(
+        self,
+        queue_name: str,
+        consumer_id: str,
+        max_messages: int = 1,
+        visibility_timeout_ms: Optional[int] = None,
+    ) -> List[MessageResponse]:
+        """Claim up to ``max_messages`` of the highest priority messages
+
+        Claimed messages stay invisible to other consumers until completed,
+        failed or past the visibility timeout.
+        """
         try:
-            # Get highest priority pending message
-            queue_key = f"queue:pending:{queue_name}"
-            message_ids = self.redis.zrevrange(queue_key, 0, 0)
+            if visibility_timeout_ms is None:
+                queue_config = self.queues.get(queue_name)
+                visibility_timeout_ms = (
+                    queue_config.visibility_timeout_ms
+                    if queue_config
+                    else self.DEFAULT_VISIBILITY_TIMEOUT_MS
+                )
 
-            if not message_ids:
-                return None
+            now = datetime.utcnow()
+            visible_at = time.time() + visibility_timeout_ms / 1000
+
+            claimed = await self.redis.eval(
+                self.CLAIM_SCRIPT,
+                2,
+                f"queue:pending:{queue_name}",
+                f"queue:processing:{queue_name}",
+                max_messages,
+                visible_at,
+                consumer_id,
+                now.isoformat(),
+                "message:",
+            )
 
-            message_id = message_ids[0]
+            messages = [
+                MessageResponse(
+                    message_id=UUID(message_id),
+                    status=ProcessingStatus.PROCESSING,
+                    queue_name=queue_name,
+                    processed_at=datetime.fromisoformat(created_at)
+                    if created_at
+                    else now,
+                    retry_count=int(retry_count),
+                )
+                for message_id, created_at, retry_count in zip(
+                    claimed[0::3], claimed[1::3], claimed[2::3]
+                )
+            ]
 
-            # Move to processing
-            self.redis.zrem(queue_key, message_id)
-            processing_key = f"queue:processing:{queue_name}"
-            self.redis.zadd(processing_key, {message_id: datetime.utcnow().timestamp()})
+            if messages:
+                await self._update_queue_metrics(
+                    queue_name, "message_received", len(messages)
+                )
 
-            # Update message status
-            message_key = f"message:{message_id}"
-            message_data = self.redis.hgetall(message_key)
+            return messages
 
-            if not message_data:
-                return None
+        except Exception as e:
+            raise BusinessLogicError(f"Failed to receive message: {str(e)}")
 
-            # Update status and consumer
-            self.redis.hset(
-                message_key,
-                mapping={
-                    "status": ProcessingStatus.PROCESSING,
-                    "consumer_id": consumer_id,
-                    "processing_started_at": datetime.utcnow().isoformat(),
-                },
+    async def requeue_expired(self, queue_name: str) -> Dict[str, int]:
+        """Return expired claims and due retries to the pending queue"""
+        try:
+            expired_claims, due_retries = await self.redis.eval(
+                self.REQUEUE_SCRIPT,
+                3,
+                f"queue:processing:{queue_name}",
+                f"queue:retry:{queue_name}",
+                f"queue:pending:{queue_name}",
+                time.time(),
+                self.REQUEUE_BATCH_SIZE,
+                "message:",
             )
 
-            # Update metrics
-            await self._update_queue_metrics(queue_name, "message_received")
+            if expired_claims:
+                await self._update_queue_metrics(
+                    queue_name, "claim_expired", expired_claims
+                )
+            if due_retries:
+                await self._update_queue_metrics(
+                    queue_name, "retry_requeued", due_retries
+                )
 
-            return MessageResponse(
-                message_id=UUID(message_id),
-                status=ProcessingStatus.PROCESSING,
-                queue_name=queue_name,
-                processed_at=datetime.fromisoformat(message_data["created_at"]),
-                retry_count=int(message_data.get("retry_count", 0)),
-            )
+            return {"expired_claims": expired_claims, "due_retries": due_retries}
 
         except Exception as e:
-            raise BusinessLogicError(f"Failed to receive message: {str(e)}")
+            raise BusinessLogicError(f"Failed to requeue messages: {str(e)}")
+
+    async def run_reaper(self, interval_seconds: float = 5.0) -> None:
+        """Requeue expired claims of all known queues until cancelled"""
+        while True:
+            for queue_name in list(self.queues):
+                try:
+                    await self.requeue_expired(queue_name)
+                except BusinessLogicError as e:
+                    logger.error(f"Reaper failed for queue {queue_name}: {e}")
+            await asyncio.sleep(interval_seconds)
 
     async def complete_message(
         self, message_id: UUID, queue_name: str
     ) -> Dict[str, Any]:
         """Mark message as completed"""
         try:
-            # Remove from processing queue
-            processing_key = f"queue:processing:{queue_name}"
-            self.redis.zrem(processing_key, str(message_id))
-
-            # Update message status
-            message_key = f"message:{message_id}"
-            self.redis.hset(
-                message_key,
-                mapping={
-                    "status": ProcessingStatus.COMPLETED,
-                    "completed_at": datetime.utcnow().isoformat(),
-                },
-            )
+            # Remove from processing queue, or from pending if the claim had
+            # already expired and been requeued
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.zrem(f"queue:processing:{queue_name}", str(message_id))
+                pipe.zrem(f"queue:pending:{queue_name}", str(message_id))
+                pipe.hset(
+                    f"message:{message_id}",
+                    mapping={
+                        "status": ProcessingStatus.COMPLETED,
+                        "completed_at": datetime.utcnow().isoformat(),
+                    },
+                )
+                await pipe.execute()
 
             # Update metrics
             await self._update_queue_metrics(queue_name, "message_completed")
@@ -383,7 +543,7 @@ class MessageQueue:
         """Handle message failure with retry logic"""
         try:
             message_key = f"message:{message_id}"
-            message_data = self.redis.hgetall(message_key)
+            message_data = await self.redis.hgetall(message_key)
 
             if not message_data:
                 raise NotFoundError(f"Message {message_id} not found")
@@ -392,18 +552,17 @@ class MessageQueue:
             queue_config = self.queues.get(queue_name)
             max_retries = queue_config.retry_limit if queue_config else 3
 
-            # Remove from processing
-            processing_key = f"queue:processing:{queue_name}"
-            self.redis.zrem(processing_key, str(message_id))
+            # Remove from processing, or from pending if the claim expired
+            await self.redis.zrem(f"queue:processing:{queue_name}", str(message_id))
+            await self.redis.zrem(f"queue:pending:{queue_name}", str(message_id))
 
             if retry_count < max_retries:
                 # Schedule retry
                 retry_count += 1
-                next_retry = datetime.utcnow() + timedelta(
-                    seconds=min(60 * (2**retry_count), 3600)
-                )
+                retry_delay = min(60 * (2**retry_count), 3600)
+                next_retry = datetime.utcnow() + timedelta(seconds=retry_delay)
 
-                self.redis.hset(
+                await self.redis.hset(
                     message_key,
                     mapping={
                         "status": ProcessingStatus.RETRYING,
@@ -415,7 +574,9 @@ class MessageQueue:
 
                 # Schedule retry
                 retry_key = f"queue:retry:{queue_name}"
-                self.redis.zadd(retry_key, {str(message_id): next_retry.timestamp()})
+                await self.redis.zadd(
+                    retry_key, {str(message_id): time.time() + retry_delay}
+                )
 
                 await self._update_queue_metrics(queue_name, "message_retry")
 
@@ -427,7 +588,7 @@ class MessageQueue:
                 }
             else:
                 # Send to dead letter queue
-                self.redis.hset(
+                await self.redis.hset(
                     message_key,
                     mapping={
                         "status": ProcessingStatus.DEAD_LETTER,
@@ -438,8 +599,13 @@ class MessageQueue:
 
                 if queue_config and queue_config.dead_letter_queue:
                     dlq_key = f"queue:pending:{queue_config.dead_letter_queue}"
-                    self.redis.zadd(
-                        dlq_key, {str(message_id): datetime.utcnow().timestamp()}
+                    await self.redis.zadd(
+                        dlq_key,
+                        {
+                            str(message_id): self._get_queue_score(
+                                MessagePriority.NORMAL, datetime.utcnow()
+                            )
+                        },
                     )
 
                 await self._update_queue_metrics(queue_name, "message_dead_letter")
@@ -457,15 +623,15 @@ class MessageQueue:
         """Get comprehensive queue metrics"""
         try:
             metrics_key = f"queue:metrics:{queue_name}"
-            metrics_data = self.redis.hgetall(metrics_key)
+            metrics_data = await self.redis.hgetall(metrics_key)
 
             if not metrics_data:
                 raise NotFoundError(f"Queue {queue_name} not found")
 
             # Get current queue lengths
-            pending_count = self.redis.zcard(f"queue:pending:{queue_name}")
-            processing_count = self.redis.zcard(f"queue:processing:{queue_name}")
-            self.redis.zcard(f"queue:retry:{queue_name}")
+            pending_count = await self.redis.zcard(f"queue:pending:{queue_name}")
+            processing_count = await self.redis.zcard(f"queue:processing:{queue_name}")
+            await self.redis.zcard(f"queue:retry:{queue_name}")
 
             # Calculate rates
             total_messages = int(metrics_data.get("total_messages", 0))
@@ -507,10 +673,14 @@ class MessageQueue:
         }
         return priority_scores.get(priority, 2.0)
 
+    def _get_queue_score(self, priority: MessagePriority, sent_at: datetime) -> float:
+        """Pending queue score: higher priority first, then earlier messages"""
+        return self._get_priority_score(priority) * 1e13 - sent_at.timestamp() * 1000
+
     async def _load_queue_config(self, queue_name: str) -> None:
         """Load queue configuration from Redis"""
         queue_key = f"queue:config:{queue_name}"
-        config_data = self.redis.hgetall(queue_key)
+        config_data = await self.redis.hgetall(queue_key)
 
         if not config_data:
             raise NotFoundError(f"Queue {queue_name} not found")
@@ -530,25 +700,26 @@ class MessageQueue:
         if dlq_config.queue_name not in self.queues:
             await self.create_queue(dlq_config)
 
-    async def _update_queue_metrics(self, queue_name: str, metric_type: str) -> None:
+    async def _update_queue_metrics(
+        self, queue_name: str, metric_type: str, count: int = 1
+    ) -> None:
         """Update queue metrics"""
         metrics_key = f"queue:metrics:{queue_name}"
-
-        # Increment appropriate counter
-        if metric_type == "message_sent":
-            self.redis.hincrby(metrics_key, "total_messages", 1)
-            self.redis.hincrby(metrics_key, "pending_messages", 1)
-        elif metric_type == "message_received":
-            self.redis.hincrby(metrics_key, "pending_messages", -1)
-            self.redis.hincrby(metrics_key, "processing_messages", 1)
-        elif metric_type == "message_completed":
-            self.redis.hincrby(metrics_key, "processing_messages", -1)
-            self.redis.hincrby(metrics_key, "completed_messages", 1)
-        elif metric_type == "message_retry":
-            self.redis.hincrby(metrics_key, "processing_messages", -1)
-        elif metric_type == "message_dead_letter":
-            self.redis.hincrby(metrics_key, "dead_letter_messages", 1)
-            self.redis.hincrby(metrics_key, "failed_messages", 1)
+        changes = {
+            "message_sent": {"total_messages": 1, "pending_messages": 1},
+            "message_received": {"pending_messages": -1, "processing_messages": 1},
+            "message_completed": {"processing_messages": -1, "completed_messages": 1},
+            "message_retry": {"processing_messages": -1},
+            "message_dead_letter": {"dead_letter_messages": 1, "failed_messages": 1},
+            "claim_expired": {"processing_messages": -1, "pending_messages": 1},
+            "retry_requeued": {"pending_messages": 1},
+        }.get(metric_type, {})
+
+        # Increment appropriate counters in one round trip
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for field, amount in changes.items():
+                pipe.hincrby(metrics_key, field, amount * count)
+            await pipe.execute()
 
 
 class IntegrationPatternEngine:
@@ -568,7 +739,7 @@ class IntegrationPatternEngine:
             pattern_key = f"pattern:config:{request.pattern_id}"
             pattern_data = request.dict()
 
-            redis_client.hset(
+            await redis_client.hset(
                 pattern_key,
                 mapping={
                     k: json.dumps(v) if isinstance(v, (dict, list)) else str(v)
@@ -578,7 +749,7 @@ class IntegrationPatternEngine:
 
             # Initialize pattern metrics
             metrics_key = f"pattern:metrics:{request.pattern_id}"
-            redis_client.hset(
+            await redis_client.hset(
                 metrics_key,
                 mapping={
                     "messages_processed": 0,
@@ -770,16 +941,16 @@ class IntegrationPatternEngine:
             group_key = f"{aggregation_key}:{correlation_id}"
 
             # Add message to aggregation group
-            redis_client.lpush(group_key, json.dumps(message))
-            redis_client.expire(group_key, 300)  # 5 minute timeout
+            await redis_client.lpush(group_key, json.dumps(message))
+            await redis_client.expire(group_key, 300)  # 5 minute timeout
 
             # Check if aggregation is complete
             expected_count = pattern.configuration.get("expected_count", 1)
-            current_count = redis_client.llen(group_key)
+            current_count = await redis_client.llen(group_key)
 
             if current_count >= expected_count:
                 # Retrieve all messages and aggregate
-                raw_messages = redis_client.lrange(group_key, 0, -1)
+                raw_messages = await redis_client.lrange(group_key, 0, -1)
                 messages = [json.loads(msg) for msg in raw_messages]
 
                 # Simple aggregation - combine payloads
@@ -789,7 +960,7 @@ class IntegrationPatternEngine:
                         aggregated_payload.update(msg["payload"])
 
                 # Clean up
-                redis_client.delete(group_key)
+                await redis_client.delete(group_key)
 
                 return {
                     "aggregated": True,
@@ -866,7 +1037,7 @@ class IntegrationPatternEngine:
     async def _load_pattern_config(self, pattern_id: UUID) -> None:
         """Load pattern configuration from Redis"""
         pattern_key = f"pattern:config:{pattern_id}"
-        config_data = redis_client.hgetall(pattern_key)
+        config_data = await redis_client.hgetall(pattern_key)
 
         if not config_data:
             raise NotFoundError(f"Pattern {pattern_id} not found")
@@ -888,16 +1059,31 @@ class IntegrationPatternEngine:
         metrics_key = f"pattern:metrics:{pattern_id}"
 
         if success:
-            redis_client.hincrby(metrics_key, "messages_processed", 1)
-            redis_client.hincrby(metrics_key, "total_latency_ms", processing_time_ms)
+            await redis_client.hincrby(metrics_key, "messages_processed", 1)
+            await redis_client.hincrby(
+                metrics_key, "total_latency_ms", processing_time_ms
+            )
         else:
-            redis_client.hincrby(metrics_key, "error_count", 1)
+            await redis_client.hincrby(metrics_key, "error_count", 1)
 
-        redis_client.hset(metrics_key, "last_execution", datetime.utcnow().isoformat())
+        await redis_client.hset(
+            metrics_key, "last_execution", datetime.utcnow().isoformat()
+        )
 
 
 class SagaOrchestrator:
-    """SAGA pattern implementation for distributed transactions"""
+    """SAGA pattern implementation for distributed transactions
+
+    Steps run as soon as the steps they depend on have completed, so
+    independent steps run concurrently. Progress is checkpointed to Redis
+    after every step and compensation, and executions in flight are listed
+    in ``saga:executions:active`` so ``resume_sagas`` can pick them up after
+    a restart. Steps and compensations interrupted by a crash run again on
+    resume and should be idempotent.
+    """
+
+    ACTIVE_EXECUTIONS_KEY = "saga:executions:active"
+    FINAL_STATUSES = (SagaStatus.COMPLETED, SagaStatus.COMPENSATED, SagaStatus.FAILED)
 
     def __init__(self, message_queue: MessageQueue) -> dict:
         self.message_queue = message_queue
@@ -907,11 +1093,13 @@ class SagaOrchestrator:
     async def define_saga(self, definition: SagaDefinition) -> Dict[str, Any]:
         """Define a new SAGA workflow"""
         try:
+            definition.step_dependencies()
+
             # Store saga definition
             saga_key = f"saga:definition:{definition.saga_id}"
             saga_data = definition.dict()
 
-            redis_client.hset(
+            await redis_client.hset(
                 saga_key,
                 mapping={
                     k: json.dumps(v) if isinstance(v, (dict, list)) else str(v)
@@ -957,20 +1145,18 @@ class SagaOrchestrator:
                 "compensation_steps_executed": [],
             }
 
-            # Store execution state
+            # Store execution state and hold its lease while running
             execution_key = f"saga:execution:{execution_id}"
-            redis_client.hset(
-                execution_key,
-                mapping={
-                    k: json.dumps(v) if isinstance(v, (dict, list)) else str(v)
-                    for k, v in execution_context.items()
-                },
-            )
+            async with redis_client.pipeline(transaction=True) as pipe:
+                pipe.hset(execution_key, mapping=_hash_mapping(execution_context))
+                pipe.sadd(self.ACTIVE_EXECUTIONS_KEY, str(execution_id))
+                pipe.set(f"saga:lease:{execution_id}", "1", ex=saga.timeout_seconds)
+                await pipe.execute()
 
             self.executions[execution_id] = execution_context
 
             # Start execution
-            await self._execute_saga_step(execution_id, 0)
+            await self._run_saga(execution_id)
 
             return SagaExecutionResponse(
                 saga_id=saga_id,
@@ -987,59 +1173,134 @@ class SagaOrchestrator:
         except Exception as e:
             raise BusinessLogicError(f"Failed to execute saga: {str(e)}")
 
-    async def _execute_saga_step(self, execution_id: UUID, step_index: int) -> None:
-        """Execute a single saga step"""
+    async def resume_sagas(self) -> List[str]:
+        """Resume executions left in flight by a stopped worker
+
+        Executions whose lease is still held by a running worker are
+        skipped.
+        """
+        resumed = []
+        for execution_id in await redis_client.smembers(self.ACTIVE_EXECUTIONS_KEY):
+            execution_id = UUID(execution_id)
+            try:
+                await self._load_saga_execution(execution_id)
+                execution = self.executions[execution_id]
+                saga_id = UUID(execution["saga_id"])
+                if saga_id not in self.sagas:
+                    await self._load_saga_definition(saga_id)
+
+                acquired = await redis_client.set(
+                    f"saga:lease:{execution_id}",
+                    "1",
+                    nx=True,
+                    ex=self.sagas[saga_id].timeout_seconds,
+                )
+                if not acquired:
+                    continue
+
+                if execution["status"] in self.FINAL_STATUSES:
+                    # Stopped after recording its outcome
+                    await self._finish_execution(execution_id, {})
+                elif execution["status"] == SagaStatus.COMPENSATING:
+                    await self._start_compensation(
+                        execution_id, None, execution.get("error_details", "")
+                    )
+                else:
+                    await self._run_saga(execution_id)
+                resumed.append(str(execution_id))
+
+            except Exception as e:
+                logger.error(f"Failed to resume saga execution {execution_id}: {e}")
+
+        return resumed
+
+    async def _run_saga(self, execution_id: UUID) -> None:
+        """Run every step whose dependencies have completed until done
+
+        After a step fails no further steps start; steps already running
+        finish so they can be compensated.
+        """
         try:
             execution = self.executions.get(execution_id)
             if not execution:
                 await self._load_saga_execution(execution_id)
                 execution = self.executions[execution_id]
 
-            saga_id = UUID(execution["saga_id"])
-            saga = self.sagas[saga_id]
+            saga = self.sagas[UUID(execution["saga_id"])]
+            dependencies = saga.step_dependencies()
+            started = set(execution["completed_steps"])
+            running: Dict[asyncio.Task, int] = {}
+            failure = None
 
-            if step_index >= len(saga.steps):
-                # All steps completed
+            try:
+                while True:
+                    completed = set(execution["completed_steps"])
+                    if failure is None:
+                        for index, waits_for in enumerate(dependencies):
+                            if index not in started and waits_for <= completed:
+                                started.add(index)
+                                task = asyncio.create_task(
+                                    self._execute_saga_step(execution_id, index)
+                                )
+                                running[task] = index
+
+                    if not running:
+                        break
+
+                    done, _ = await asyncio.wait(
+                        running, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        index = running.pop(task)
+                        if task.exception() and failure is None:
+                            failure = (index, str(task.exception()))
+            finally:
+                for task in running:
+                    task.cancel()
+
+            if failure is not None:
+                await self._start_compensation(execution_id, *failure)
+            elif len(execution["completed_steps"]) == len(saga.steps):
                 await self._complete_saga(execution_id)
-                return
 
-            step = saga.steps[step_index]
-
-            # Update execution status
-            await self._update_execution_status(
-                execution_id,
-                {
-                    "status": SagaStatus.PROCESSING,
-                    "current_step": step_index,
-                    "updated_at": datetime.utcnow().isoformat(),
-                },
-            )
+        except Exception as e:
+            await self._fail_saga(execution_id, str(e))
 
-            # Execute step
-            try:
-                step_result = await self._execute_step_action(
-                    step, execution["execution_context"]
-                )
+    async def _execute_saga_step(self, execution_id: UUID, step_index: int) -> None:
+        """Execute a single saga step and checkpoint its result
 
-                # Step succeeded, move to next
-                execution["completed_steps"].append(step_index)
-                execution["execution_context"].update(
-                    step_result.get("context_updates", {})
-                )
+        Raises the step's error so the caller can start compensation.
+        """
+        execution = self.executions[execution_id]
+        saga = self.sagas[UUID(execution["saga_id"])]
+        step = saga.steps[step_index]
 
-                await self._update_execution_context(
-                    execution_id, execution["execution_context"]
-                )
-                await self._execute_saga_step(execution_id, step_index + 1)
+        # Update execution status
+        await self._update_execution_status(
+            execution_id,
+            {
+                "status": SagaStatus.PROCESSING,
+                "current_step": step_index,
+                "updated_at": datetime.utcnow().isoformat(),
+            },
+        )
 
-            except Exception as step_error:
-                # Step failed, start compensation
-                await self._start_compensation(
-                    execution_id, step_index, str(step_error)
-                )
+        step_result = await self._execute_step_action(
+            step, dict(execution["execution_context"])
+        )
 
-        except Exception as e:
-            await self._fail_saga(execution_id, str(e))
+        # Checkpoint completion and context together
+        execution["completed_steps"].append(step_index)
+        execution["execution_context"].update(step_result.get("context_updates", {}))
+        await self._update_execution_status(
+            execution_id,
+            {
+                "completed_steps": execution["completed_steps"],
+                "execution_context": execution["execution_context"],
+                "updated_at": datetime.utcnow().isoformat(),
+            },
+        )
+        await redis_client.expire(f"saga:lease:{execution_id}", saga.timeout_seconds)
 
     async def _execute_step_action(
         self, step: Dict[str, Any], context: Dict[str, Any]
@@ -1114,9 +1375,14 @@ class SagaOrchestrator:
         }
 
     async def _start_compensation(
-        self, execution_id: UUID, failed_step_index: int, error: str
+        self, execution_id: UUID, failed_step_index: Optional[int], error: str
     ) -> None:
-        """Start saga compensation"""
+        """Start saga compensation
+
+        A completed step is compensated once the compensations of the
+        completed steps depending on it have run, so compensations run in
+        reverse dependency order and independent ones run concurrently.
+        """
         try:
             execution = self.executions[execution_id]
             saga_id = UUID(execution["saga_id"])
@@ -1131,14 +1397,30 @@ class SagaOrchestrator:
                 },
             )
 
-            # Execute compensation steps in reverse order
-            completed_steps = execution.get("completed_steps", [])
-            for step_index in reversed(completed_steps):
-                if step_index < len(saga.compensation_steps):
-                    compensation_step = saga.compensation_steps[step_index]
-                    await self._execute_compensation_step(
-                        execution_id, step_index, compensation_step
+            dependencies = saga.step_dependencies()
+            completed = set(execution.get("completed_steps", []))
+            execution.setdefault("compensation_steps_executed", [])
+            pending = completed - set(execution["compensation_steps_executed"])
+
+            while pending:
+                # Steps no other pending compensation still depends on
+                ready = [
+                    index
+                    for index in pending
+                    if not any(
+                        index in dependencies[other] for other in pending - {index}
+                    )
+                ]
+                await asyncio.gather(
+                    *(
+                        self._execute_compensation_step(
+                            execution_id, index, saga.compensation_steps[index]
+                        )
+                        for index in sorted(ready, reverse=True)
+                        if index < len(saga.compensation_steps)
                     )
+                )
+                pending -= set(ready)
 
             await self._complete_compensation(execution_id)
 
@@ -1154,7 +1436,7 @@ class SagaOrchestrator:
 
             # Execute compensation action
             await self._execute_step_action(
-                compensation_step, execution["execution_context"]
+                compensation_step, dict(execution["execution_context"])
             )
 
             # Track compensation
@@ -1162,17 +1444,26 @@ class SagaOrchestrator:
                 execution["compensation_steps_executed"] = []
             execution["compensation_steps_executed"].append(step_index)
 
-            await self._update_execution_context(
-                execution_id, execution["execution_context"]
+            await self._update_execution_status(
+                execution_id,
+                {
+                    "compensation_steps_executed": execution[
+                        "compensation_steps_executed"
+                    ],
+                    "updated_at": datetime.utcnow().isoformat(),
+                },
             )
 
-        except Exception:
+        except Exception as e:
             # Log compensation failure but continue
-            pass
+            logger.error(
+                f"Compensation of step {step_index} failed for saga execution "
+                f"{execution_id}: {e}"
+            )
 
     async def _complete_saga(self, execution_id: UUID) -> None:
         """Complete saga execution successfully"""
-        await self._update_execution_status(
+        await self._finish_execution(
             execution_id,
             {
                 "status": SagaStatus.COMPLETED,
@@ -1183,7 +1474,7 @@ class SagaOrchestrator:
 
     async def _complete_compensation(self, execution_id: UUID) -> None:
         """Complete saga compensation"""
-        await self._update_execution_status(
+        await self._finish_execution(
             execution_id,
             {
                 "status": SagaStatus.COMPENSATED,
@@ -1194,7 +1485,7 @@ class SagaOrchestrator:
 
     async def _fail_saga(self, execution_id: UUID, error: str) -> None:
         """Mark saga as failed"""
-        await self._update_execution_status(
+        await self._finish_execution(
             execution_id,
             {
                 "status": SagaStatus.FAILED,
@@ -1210,31 +1501,27 @@ class SagaOrchestrator:
         """Update saga execution status"""
         execution_key = f"saga:execution:{execution_id}"
 
-        redis_client.hset(
-            execution_key,
-            mapping={
-                k: json.dumps(v) if isinstance(v, (dict, list)) else str(v)
-                for k, v in updates.items()
-            },
-        )
+        await redis_client.hset(execution_key, mapping=_hash_mapping(updates))
 
         if execution_id in self.executions:
             self.executions[execution_id].update(updates)
 
-    async def _update_execution_context(
-        self, execution_id: UUID, context: Dict[str, Any]
+    async def _finish_execution(
+        self, execution_id: UUID, updates: Dict[str, Any]
     ) -> None:
-        """Update saga execution context"""
-        execution_key = f"saga:execution:{execution_id}"
-        redis_client.hset(execution_key, "execution_context", json.dumps(context))
+        """Record a final status and stop tracking the execution"""
+        if updates:
+            await self._update_execution_status(execution_id, updates)
 
-        if execution_id in self.executions:
-            self.executions[execution_id]["execution_context"] = context
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.srem(self.ACTIVE_EXECUTIONS_KEY, str(execution_id))
+            pipe.delete(f"saga:lease:{execution_id}")
+            await pipe.execute()
 
     async def _load_saga_definition(self, saga_id: UUID) -> None:
         """Load saga definition from Redis"""
         saga_key = f"saga:definition:{saga_id}"
-        saga_data = redis_client.hgetall(saga_key)
+        saga_data = await redis_client.hgetall(saga_key)
 
         if not saga_data:
             raise NotFoundError(f"Saga {saga_id} not found")
@@ -1252,7 +1539,7 @@ class SagaOrchestrator:
     async def _load_saga_execution(self, execution_id: UUID) -> None:
         """Load saga execution from Redis"""
         execution_key = f"saga:execution:{execution_id}"
-        execution_data = redis_client.hgetall(execution_key)
+        execution_data = await redis_client.hgetall(execution_key)
 
         if not execution_data:
             raise NotFoundError(f"Saga execution {execution_id} not found")
@@ -1272,6 +1559,30 @@ class SagaOrchestrator:
 message_queue = MessageQueue(redis_client)
 integration_engine = IntegrationPatternEngine(message_queue)
 saga_orchestrator = SagaOrchestrator(message_queue)
+_queue_reaper: Optional[asyncio.Task] = None
+
+
+@router.on_event("startup")
+async def start_queue_reaper() -> None:
+    """Requeue expired claims while the serving app runs"""
+    global _queue_reaper
+    if _queue_reaper is None or _queue_reaper.done():
+        _queue_reaper = asyncio.create_task(message_queue.run_reaper())
+
+
+@router.on_event("shutdown")
+async def stop_background_tasks() -> None:
+    """Stop the reaper and the pattern processors"""
+    global _queue_reaper
+    tasks = list(integration_engine.active_processors.values())
+    if _queue_reaper is not None:
+        tasks.append(_queue_reaper)
+        _queue_reaper = None
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
+        with suppress(asyncio.CancelledError):
+            await task
 
 
 # API Endpoints
@@ -1301,6 +1612,27 @@ async def receive_message_from_queue(
     return await message_queue.receive_message(queue_name, consumer_id)
 
 
+@router.get(
+    "/message-queue/{queue_name}/receive-batch", response_model=List[MessageResponse]
+)
+async def receive_messages_from_queue(
+    queue_name: str,
+    consumer_id: str = "default_consumer",
+    max_messages: int = Query(10, ge=1, le=1000),
+    visibility_timeout_ms: Optional[int] = Query(None, ge=1000, le=43200000),
+) -> List[MessageResponse]:
+    """Claim a batch of messages from queue"""
+    return await message_queue.receive_messages(
+        queue_name, consumer_id, max_messages, visibility_timeout_ms
+    )
+
+
+@router.post("/message-queue/{queue_name}/requeue-expired")
+async def requeue_expired_messages(queue_name: str) -> Dict[str, int]:
+    """Return expired claims and due retries to the queue"""
+    return await message_queue.requeue_expired(queue_name)
+
+
 @router.post("/message-queue/{queue_name}/complete/{message_id}")
 async def complete_message_processing(
     queue_name: str, message_id: UUID
@@ -1355,11 +1687,17 @@ async def execute_saga_workflow(
     return await saga_orchestrator.execute_saga(saga_id, initial_context)
 
 
+@router.post("/saga/resume", response_model=List[str])
+async def resume_saga_executions() -> List[str]:
+    """Resume saga executions left in flight by a stopped worker"""
+    return await saga_orchestrator.resume_sagas()
+
+
 @router.get("/saga/execution/{execution_id}", response_model=SagaExecutionResponse)
 async def get_saga_execution_status(execution_id: UUID) -> SagaExecutionResponse:
     """Get saga execution status"""
     execution_key = f"saga:execution:{execution_id}"
-    execution_data = redis_client.hgetall(execution_key)
+    execution_data = await redis_client.hgetall(execution_key)
 
     if not execution_data:
         raise HTTPException(status_code=404, detail="Saga execution not found")
@@ -1397,7 +1735,7 @@ async def health_check() -> Dict[str, Any]:
     """Health check endpoint"""
     try:
         # Test Redis connection
-        redis_client.ping()
+        await redis_client.ping()
 
         return {
             "status": "healthy",
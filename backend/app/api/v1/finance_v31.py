@@ -24,6 +24,7 @@ from app.core.dependencies import get_current_user, get_db
 from app.core.exceptions import BusinessRuleError, NotFoundError, ValidationError
 from app.crud.finance_v31 import (
     AccountCRUD,
+    AccountPeriodBalanceCRUD,
     BudgetCRUD,
     CostCenterCRUD,
     FinancialPeriodCRUD,
@@ -524,6 +525,31 @@ def close_financial_period(
         )
 
 
+@router.post("/periods/balances/verify", response_model=Dict[str, Any])
+def verify_period_balances(
+    organization_id: str = Query(..., description="Organization ID"),
+    repair: bool = Query(False, description="Rebuild mismatched period balances"),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+) -> Dict[str, Any]:
+    """Compare stored period balances with the posted journal lines."""
+    try:
+        balance_crud = AccountPeriodBalanceCRUD(db)
+        differences = balance_crud.check_consistency(organization_id, repair=repair)
+
+        return {
+            "organization_id": organization_id,
+            "consistent": not differences,
+            "repaired": repair and bool(differences),
+            "differences": differences,
+        }
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+
 # =============================================================================
 # 6. Financial Reporting
 # =============================================================================
@@ -5,6 +5,7 @@ Day 2 of continuous API implementation
 """
 
 import asyncio
+import random
 from datetime import date, datetime, timedelta
 from decimal import Decimal
 from enum import Enum
@@ -21,7 +22,21 @@ from fastapi import (
     status,
 )
 from pydantic import BaseModel, Field, validator
-from sqlalchemy import and_, desc, func, or_, select, update
+from sqlalchemy import (
+    and_,
+    bindparam,
+    case,
+    desc,
+    func,
+    insert,
+    null,
+    or_,
+    select,
+    text,
+    tuple_,
+    union_all,
+    update,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -123,7 +138,7 @@ class ReservationRequest(BaseModel):
 
 class InventoryAdjustmentRequest(BaseModel):
     product_id: UUID
-    adjustment_type: str = Field(..., regex="^(absolute|relative)$")
+    adjustment_type: str = Field(..., pattern="^(absolute|relative)$")
     quantity: int = Field(..., ne=0)
     reason: str = Field(..., min_length=1, max_length=500)
     cost_impact: Optional[Decimal] = None
@@ -239,7 +254,7 @@ class InventoryAlertResponse(BaseModel):
 class InventoryTransactionManager:
     """Advanced inventory transaction management with ACID compliance"""
 
-    def __init__(self, db: AsyncSession) -> dict:
+    def __init__(self, db: AsyncSession):
         self.db = db
 
     async def execute_transaction(
@@ -295,20 +310,13 @@ class InventoryTransactionManager:
         """Execute multiple transactions as a single atomic operation"""
 
         async with self.db.begin():
-            results = []
-
             try:
-                # Pre-validate all transactions
-                for req in requests:
-                    await self._validate_transaction_request(req)
-
-                # Execute all transactions
-                for req in requests:
-                    result = await self.execute_transaction(req, user_id)
-                    results.append(result)
-
-                return results
+                posting_engine = BulkInventoryPostingEngine(self.db)
+                return await posting_engine.post(requests, user_id)
 
+            except (BusinessLogicError, NotFoundError):
+                await self.db.rollback()
+                raise
             except Exception as e:
                 await self.db.rollback()
                 raise HTTPException(
@@ -597,10 +605,436 @@ class InventoryTransactionManager:
                 )
 
 
+class BulkInventoryPostingEngine:
+    """Set-based inventory posting for many transaction lines at once
+
+    Lines are folded per (product, location) and rows are locked in sorted
+    key order with a single SELECT ... FOR UPDATE, so concurrent postings
+    touching overlapping products cannot deadlock or lose updates. Quantity
+    changes are written as atomic deltas and transaction records are
+    inserted with one executemany.
+    """
+
+    # Transaction types that consume available stock at their source location
+    CONSUMING_TYPES = {
+        TransactionType.OUTBOUND,
+        TransactionType.RESERVATION,
+        TransactionType.TRANSFER,
+    }
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def post(
+        self, requests: List[InventoryTransactionRequest], user_id: UUID
+    ) -> List[InventoryTransactionResponse]:
+        """Validate, lock, apply and record all lines; caller owns the transaction"""
+
+        products = await self._get_products({req.product_id for req in requests})
+        for req in requests:
+            if req.product_id not in products:
+                raise NotFoundError(f"Product {req.product_id} not found")
+            if req.transaction_type == TransactionType.TRANSFER and not (
+                req.from_location and req.to_location
+            ):
+                raise BusinessLogicError(
+                    "Both from_location and to_location required for transfers"
+                )
+
+        keys = sorted(
+            {key for req in requests for key, _ in self._legs(req)},
+            key=lambda key: (str(key[0]), key[1]),
+        )
+        locked = await self._lock_inventory_rows(keys)
+
+        # Replay lines in request order against the locked snapshot
+        balances = {
+            key: dict(locked[key]) if key in locked else self._empty_balance()
+            for key in keys
+        }
+        for req in requests:
+            for key, change in self._legs(req):
+                balance = balances[key]
+                if change.get("absolute") is not None:
+                    delta = change["absolute"] - balance["current_quantity"]
+                    balance["current_quantity"] = change["absolute"]
+                    balance["available_quantity"] += delta
+                    continue
+
+                balance["current_quantity"] += change.get("current", 0)
+                balance["available_quantity"] += change.get("available", 0)
+                balance["reserved_quantity"] += change.get("reserved", 0)
+
+                if (
+                    req.transaction_type in self.CONSUMING_TYPES
+                    and change.get("available", 0) < 0
+                    and balance["available_quantity"] < 0
+                ):
+                    raise BusinessLogicError(
+                        f"Insufficient stock for product {req.product_id} "
+                        f"at {key[1]}. Required: {req.quantity}"
+                    )
+
+        now = datetime.utcnow()
+        await self._apply_balances(keys, locked, balances, now)
+
+        records = [self._transaction_record(req, user_id, now) for req in requests]
+        await self.db.execute(insert(InventoryTransaction), records)
+
+        await self._check_and_create_alerts({req.product_id for req in requests}, now)
+
+        return [
+            self._build_response(record, products[record["product_id"]])
+            for record in records
+        ]
+
+    def _legs(self, request: InventoryTransactionRequest) -> List[tuple]:
+        """Split a transaction into per-(product, location) quantity changes"""
+
+        quantity = request.quantity
+        location = request.from_location or request.to_location or "default"
+        key = (request.product_id, location)
+        transaction_type = request.transaction_type
+
+        if transaction_type == TransactionType.TRANSFER:
+            return [
+                (
+                    (request.product_id, request.from_location),
+                    {"current": -quantity, "available": -quantity},
+                ),
+                (
+                    (request.product_id, request.to_location),
+                    {"current": quantity, "available": quantity},
+                ),
+            ]
+        if transaction_type == TransactionType.INBOUND:
+            return [(key, {"current": quantity, "available": quantity})]
+        if transaction_type == TransactionType.OUTBOUND:
+            return [(key, {"current": -quantity, "available": -quantity})]
+        if transaction_type == TransactionType.ADJUSTMENT:
+            return [(key, {"absolute": quantity})]
+        if transaction_type == TransactionType.RESERVATION:
+            return [(key, {"reserved": quantity, "available": -quantity})]
+        if transaction_type == TransactionType.RELEASE:
+            return [(key, {"reserved": -quantity, "available": quantity})]
+
+        # LOSS / FOUND are recorded without moving stock, as before
+        return [(key, {})]
+
+    @staticmethod
+    def _empty_balance() -> Dict[str, int]:
+        return {
+            "id": None,
+            "current_quantity": 0,
+            "available_quantity": 0,
+            "reserved_quantity": 0,
+        }
+
+    async def _get_products(self, product_ids: set) -> Dict[UUID, Any]:
+        """Fetch name/SKU for all products in one query"""
+        result = await self.db.execute(
+            select(Product.id, Product.name, Product.sku).where(
+                Product.id.in_(list(product_ids))
+            )
+        )
+        return {row.id: row for row in result.all()}
+
+    async def _lock_inventory_rows(
+        self, keys: List[tuple]
+    ) -> Dict[tuple, Dict[str, Any]]:
+        """Lock all touched inventory rows in key order
+
+        Keys without a row yet have nothing to lock, so creation is
+        serialized with transaction-scoped advisory locks on the keys. After
+        acquiring them the missing keys are re-read: a row committed by a
+        concurrent posting in the meantime is locked and updated, and any key
+        still missing can be inserted without creating a duplicate.
+        """
+        if not keys:
+            return {}
+
+        locked = await self._select_for_update(keys)
+        missing = [key for key in keys if key not in locked]
+        if missing:
+            await self.db.execute(
+                text(
+                    "SELECT pg_advisory_xact_lock(hashtextextended(key, 0)) "
+                    "FROM unnest(CAST(:keys AS text[])) AS key ORDER BY key"
+                ),
+                {
+                    "keys": [
+                        f"inventory_item:{product_id}:{location}"
+                        for product_id, location in missing
+                    ]
+                },
+            )
+            locked.update(await self._select_for_update(missing))
+        return locked
+
+    async def _select_for_update(
+        self, keys: List[tuple]
+    ) -> Dict[tuple, Dict[str, Any]]:
+        result = await self.db.execute(
+            select(
+                InventoryItem.id,
+                InventoryItem.product_id,
+                InventoryItem.location,
+                InventoryItem.current_quantity,
+                InventoryItem.available_quantity,
+                InventoryItem.reserved_quantity,
+            )
+            .where(tuple_(InventoryItem.product_id, InventoryItem.location).in_(keys))
+            .order_by(InventoryItem.product_id, InventoryItem.location)
+            .with_for_update()
+        )
+
+        return {
+            (row.product_id, row.location): {
+                "id": row.id,
+                "current_quantity": row.current_quantity or 0,
+                "available_quantity": row.available_quantity or 0,
+                "reserved_quantity": row.reserved_quantity or 0,
+            }
+            for row in result.all()
+        }
+
+    async def _apply_balances(
+        self,
+        keys: List[tuple],
+        locked: Dict[tuple, Dict[str, Any]],
+        balances: Dict[tuple, Dict[str, Any]],
+        now: datetime,
+    ) -> None:
+        """Write deltas for locked rows and insert rows created under key locks"""
+
+        deltas = []
+        new_items = []
+        for key in keys:
+            final = balances[key]
+            if key in locked:
+                before = locked[key]
+                deltas.append(
+                    {
+                        "item_id": before["id"],
+                        "d_current": final["current_quantity"]
+                        - before["current_quantity"],
+                        "d_available": final["available_quantity"]
+                        - before["available_quantity"],
+                        "d_reserved": final["reserved_quantity"]
+                        - before["reserved_quantity"],
+                        "b_updated_at": now,
+                    }
+                )
+            else:
+                new_items.append(
+                    {
+                        "id": uuid4(),
+                        "product_id": key[0],
+                        "location": key[1],
+                        "current_quantity": final["current_quantity"],
+                        "available_quantity": final["available_quantity"],
+                        "reserved_quantity": final["reserved_quantity"],
+                        "in_transit_quantity": 0,
+                        "reorder_point": 0,
+                        "max_stock_level": 1000,
+                        "created_at": now,
+                        "last_updated": now,
+                    }
+                )
+
+        if deltas:
+            table = InventoryItem.__table__
+            await self.db.execute(
+                update(table)
+                .where(table.c.id == bindparam("item_id"))
+                .values(
+                    current_quantity=table.c.current_quantity + bindparam("d_current"),
+                    available_quantity=table.c.available_quantity
+                    + bindparam("d_available"),
+                    reserved_quantity=table.c.reserved_quantity
+                    + bindparam("d_reserved"),
+                    last_updated=bindparam("b_updated_at"),
+                ),
+                deltas,
+            )
+
+        if new_items:
+            await self.db.execute(insert(InventoryItem), new_items)
+
+    def _transaction_record(
+        self, request: InventoryTransactionRequest, user_id: UUID, now: datetime
+    ) -> Dict[str, Any]:
+        return {
+            "id": uuid4(),
+            "product_id": request.product_id,
+            "transaction_type": request.transaction_type.value,
+            "quantity": request.quantity,
+            "from_location": request.from_location,
+            "to_location": request.to_location,
+            "reference_id": request.reference_id,
+            "reason": request.reason,
+            "notes": request.notes,
+            "batch_number": request.batch_number,
+            "expiry_date": request.expiry_date,
+            "cost_per_unit": request.cost_per_unit,
+            "total_cost": request.cost_per_unit * request.quantity
+            if request.cost_per_unit
+            else None,
+            "status": TransactionStatus.COMPLETED.value,
+            "created_by": user_id,
+            "created_at": now,
+            "processed_at": now,
+        }
+
+    async def _check_and_create_alerts(self, product_ids: set, now: datetime) -> None:
+        """Evaluate stock alerts once per touched product"""
+
+        items_result = await self.db.execute(
+            select(
+                InventoryItem.product_id,
+                InventoryItem.current_quantity,
+                InventoryItem.available_quantity,
+                InventoryItem.reorder_point,
+                InventoryItem.max_stock_level,
+            ).where(InventoryItem.product_id.in_(list(product_ids)))
+        )
+        active_result = await self.db.execute(
+            select(InventoryAlert.product_id, InventoryAlert.alert_type).where(
+                and_(
+                    InventoryAlert.product_id.in_(list(product_ids)),
+                    InventoryAlert.is_active,
+                )
+            )
+        )
+        existing = {(row.product_id, row.alert_type) for row in active_result.all()}
+
+        alerts = []
+        for item in items_result.all():
+            candidates = []
+            if item.available_quantity <= item.reorder_point:
+                candidates.append(
+                    (
+                        AlertType.OUT_OF_STOCK
+                        if item.available_quantity == 0
+                        else AlertType.LOW_STOCK,
+                        AlertSeverity.CRITICAL
+                        if item.available_quantity == 0
+                        else AlertSeverity.HIGH,
+                        f"Stock level is {item.available_quantity}, "
+                        f"below reorder point {item.reorder_point}",
+                        item.available_quantity,
+                        item.reorder_point,
+                    )
+                )
+            if item.current_quantity > item.max_stock_level:
+                candidates.append(
+                    (
+                        AlertType.OVERSTOCK,
+                        AlertSeverity.MEDIUM,
+                        f"Stock level is {item.current_quantity}, "
+                        f"above maximum {item.max_stock_level}",
+                        item.current_quantity,
+                        item.max_stock_level,
+                    )
+                )
+
+            for alert_type, severity, message, current, threshold in candidates:
+                if (item.product_id, alert_type.value) in existing:
+                    continue
+                existing.add((item.product_id, alert_type.value))
+
+                alerts.append(
+                    {
+                        "id": uuid4(),
+                        "product_id": item.product_id,
+                        "alert_type": alert_type.value,
+                        "severity": severity.value,
+                        "message": message,
+                        "current_value": Decimal(str(current)),
+                        "threshold_value": Decimal(str(threshold)),
+                        "is_active": True,
+                        "created_at": now,
+                    }
+                )
+
+        if alerts:
+            await self.db.execute(insert(InventoryAlert), alerts)
+
+    def _build_response(
+        self, record: Dict[str, Any], product: Any
+    ) -> InventoryTransactionResponse:
+        return InventoryTransactionResponse(
+            transaction_id=record["id"],
+            product_id=record["product_id"],
+            product_name=product.name,
+            product_sku=product.sku,
+            transaction_type=TransactionType(record["transaction_type"]),
+            status=TransactionStatus(record["status"]),
+            quantity=record["quantity"],
+            from_location=record["from_location"],
+            to_location=record["to_location"],
+            reference_id=record["reference_id"],
+            reason=record["reason"],
+            notes=record["notes"],
+            batch_number=record["batch_number"],
+            expiry_date=record["expiry_date"],
+            cost_per_unit=record["cost_per_unit"],
+            total_cost=record["total_cost"],
+            created_at=record["created_at"],
+            processed_at=record["processed_at"],
+            created_by=str(record["created_by"]),
+            approved_by=None,
+        )
+
+
 class ReservationManager:
-    """Manage inventory reservations and releases"""
+    """Manage inventory reservations and releases
+
+    Reservations are appended to the transaction ledger as PENDING
+    RESERVATION rows rather than written to the inventory row, and
+    compact_reservations folds them into the inventory items periodically.
+    Available stock is the item level minus pending reservations.
+
+    Admission is split into RESERVATION_SHARDS shards per product, each
+    guarded by its own transaction-scoped advisory lock and allowed an equal
+    share of available stock, so reservers on a hot SKU mostly take
+    different locks and commit side by side. A reservation no single shard
+    can hold takes every shard lock and is split across shards.
+    """
+
+    RESERVATION_SHARDS = 8
+    SHARD_LOCATION = "reserved:{shard}"
+
+    # Built once: these run several times per reservation on the hot path
+    _SHARD_LOCK_KEY = func.hashtextextended(bindparam("lock_key"), 0)
+    LOCK_SHARD = select(func.pg_advisory_xact_lock(_SHARD_LOCK_KEY))
+    TRY_LOCK_SHARD = select(func.pg_try_advisory_xact_lock(_SHARD_LOCK_KEY))
+    # Available stock (location NULL) and pending per shard in one statement,
+    # so both come from the same snapshot even while compact_reservations
+    # moves pending quantities into the inventory items
+    SHARD_STOCK = union_all(
+        select(
+            null().label("location"),
+            func.coalesce(func.sum(InventoryItem.available_quantity), 0),
+        ).where(InventoryItem.product_id == bindparam("product_id")),
+        select(
+            InventoryTransaction.to_location, func.sum(InventoryTransaction.quantity)
+        )
+        .where(
+            and_(
+                InventoryTransaction.product_id == bindparam("product_id"),
+                InventoryTransaction.transaction_type
+                == TransactionType.RESERVATION.value,
+                InventoryTransaction.status == TransactionStatus.PENDING.value,
+                InventoryTransaction.to_location.in_(
+                    bindparam("labels", expanding=True)
+                ),
+            )
+        )
+        .group_by(InventoryTransaction.to_location),
+    )
 
-    def __init__(self, db: AsyncSession) -> dict:
+    def __init__(self, db: AsyncSession):
         self.db = db
 
     async def create_reservation(
@@ -608,49 +1042,254 @@ class ReservationManager:
     ) -> ReservationResponse:
         """Create inventory reservation"""
 
+        reservation_id = uuid4()
+        product_id = request.product_id
+        first = random.randrange(self.RESERVATION_SHARDS)
+
         async with self.db.begin():
-            # Check availability
-            available = await self._get_available_stock(request.product_id)
-            if available < request.quantity:
-                raise BusinessLogicError(
-                    f"Insufficient stock for reservation. Available: {available}"
+            await self._lock_shard(product_id, first, wait=True)
+            headroom = await self._shard_headroom(product_id)
+            if headroom[first] >= request.quantity:
+                now = await self._append_reservation(
+                    request, user_id, reservation_id, {first: request.quantity}
                 )
+                return self._build_response(request, reservation_id, now)
+            if sum(max(room, 0) for room in headroom.values()) < request.quantity:
+                await self._reject(product_id)
+
+        # Move on to other shards that had room; they are only tried, never
+        # waited for, so a reserver never holds one shard lock while waiting
+        # on another
+        candidates = [
+            (first + offset) % self.RESERVATION_SHARDS
+            for offset in range(1, self.RESERVATION_SHARDS)
+        ]
+        for shard in candidates:
+            if headroom[shard] < request.quantity:
+                continue
+            async with self.db.begin():
+                if not await self._lock_shard(product_id, shard, wait=False):
+                    continue
+                headroom = await self._shard_headroom(product_id)
+                if headroom[shard] >= request.quantity:
+                    now = await self._append_reservation(
+                        request, user_id, reservation_id, {shard: request.quantity}
+                    )
+                    return self._build_response(request, reservation_id, now)
 
-            # Create reservation transaction
-            transaction_request = InventoryTransactionRequest(
-                product_id=request.product_id,
-                transaction_type=TransactionType.RESERVATION,
-                quantity=request.quantity,
-                reason=f"Reserved for {request.reserved_for}",
-                notes=request.notes,
+        # Larger than any shard's room: lock all shards in order and split
+        async with self.db.begin():
+            for shard in range(self.RESERVATION_SHARDS):
+                await self._lock_shard(product_id, shard, wait=True)
+            headroom = await self._shard_headroom(product_id)
+            if sum(max(room, 0) for room in headroom.values()) < request.quantity:
+                await self._reject(product_id)
+
+            parts: Dict[int, int] = {}
+            remaining = request.quantity
+            for shard, room in headroom.items():
+                if remaining <= 0:
+                    break
+                if room > 0:
+                    parts[shard] = min(room, remaining)
+                    remaining -= parts[shard]
+            now = await self._append_reservation(
+                request, user_id, reservation_id, parts
             )
+            return self._build_response(request, reservation_id, now)
 
-            transaction_manager = InventoryTransactionManager(self.db)
-            await transaction_manager.execute_transaction(transaction_request, user_id)
+    async def _reject(self, product_id: UUID) -> None:
+        available = await self._get_available_stock(product_id)
+        raise BusinessLogicError(
+            f"Insufficient stock for reservation. Available: {available}"
+        )
 
-            # Create reservation record (would be in actual database)
-            reservation_id = uuid4()
+    async def _lock_shard(self, product_id: UUID, shard: int, wait: bool) -> bool:
+        params = {"lock_key": f"inventory_reservation:{product_id}:{shard}"}
+        if wait:
+            await self.db.execute(self.LOCK_SHARD, params)
+            return True
+        result = await self.db.execute(self.TRY_LOCK_SHARD, params)
+        return bool(result.scalar())
 
-            return ReservationResponse(
-                reservation_id=reservation_id,
-                product_id=request.product_id,
-                product_name="Product Name",  # Would fetch from database
-                quantity=request.quantity,
-                reserved_for=request.reserved_for,
-                priority=request.priority,
-                status="active",
-                created_at=datetime.utcnow(),
-                expires_at=request.reservation_expires_at,
-                released_at=None,
-                notes=request.notes,
+    async def _shard_headroom(self, product_id: UUID) -> Dict[int, int]:
+        """Stock each shard may still reserve: its share minus its pending"""
+
+        labels = {
+            self.SHARD_LOCATION.format(shard=shard): shard
+            for shard in range(self.RESERVATION_SHARDS)
+        }
+        result = await self.db.execute(
+            self.SHARD_STOCK, {"product_id": product_id, "labels": list(labels)}
+        )
+        available, pending = 0, {}
+        for location, total in result.all():
+            if location is None:
+                available = int(total or 0)
+            else:
+                pending[labels[location]] = int(total)
+
+        # Shares add up to the available stock, so the shards together never
+        # reserve more than there is
+        share, extra = divmod(available, self.RESERVATION_SHARDS)
+        return {
+            shard: share + (extra if shard == 0 else 0) - pending.get(shard, 0)
+            for shard in labels.values()
+        }
+
+    async def _append_reservation(
+        self,
+        request: ReservationRequest,
+        user_id: UUID,
+        reservation_id: UUID,
+        parts: Dict[int, int],
+    ) -> datetime:
+        """Append one PENDING ledger row per shard; the first carries the id"""
+
+        now = datetime.utcnow()
+        rows = [
+            {
+                "id": reservation_id if index == 0 else uuid4(),
+                "product_id": request.product_id,
+                "transaction_type": TransactionType.RESERVATION.value,
+                "quantity": quantity,
+                "from_location": "default",
+                "to_location": self.SHARD_LOCATION.format(shard=shard),
+                "reference_id": reservation_id,
+                "reason": f"Reserved for {request.reserved_for}",
+                "notes": request.notes,
+                "status": TransactionStatus.PENDING.value,
+                "created_by": user_id,
+                "created_at": now,
+            }
+            for index, (shard, quantity) in enumerate(parts.items())
+        ]
+        await self.db.execute(insert(InventoryTransaction), rows)
+        return now
+
+    @staticmethod
+    def _build_response(
+        request: ReservationRequest, reservation_id: UUID, created_at: datetime
+    ) -> ReservationResponse:
+        return ReservationResponse(
+            reservation_id=reservation_id,
+            product_id=request.product_id,
+            product_name="Product Name",  # Would fetch from database
+            quantity=request.quantity,
+            reserved_for=request.reserved_for,
+            priority=request.priority,
+            status="active",
+            created_at=created_at,
+            expires_at=request.reservation_expires_at,
+            released_at=None,
+            notes=request.notes,
+        )
+
+    async def compact_reservations(self, batch_size: int = 10000) -> Dict[str, int]:
+        """Fold pending reservations into inventory items in one pass"""
+
+        async with self.db.begin():
+            result = await self.db.execute(
+                select(
+                    InventoryTransaction.id,
+                    InventoryTransaction.product_id,
+                    InventoryTransaction.quantity,
+                )
+                .where(
+                    and_(
+                        InventoryTransaction.transaction_type
+                        == TransactionType.RESERVATION.value,
+                        InventoryTransaction.status == TransactionStatus.PENDING.value,
+                    )
+                )
+                .order_by(InventoryTransaction.created_at)
+                .limit(batch_size)
+            )
+            pending = result.all()
+            if not pending:
+                return {"reservations_compacted": 0, "items_updated": 0}
+
+            # Reservations are product level and land on the default location,
+            # as the single-transaction path did. Lock those rows first so only
+            # reservations with a row to fold into are completed; the rest stay
+            # pending and keep counting against availability.
+            table = InventoryItem.__table__
+            locked = await self.db.execute(
+                select(table.c.product_id)
+                .where(
+                    and_(
+                        table.c.product_id.in_({row.product_id for row in pending}),
+                        table.c.location == "default",
+                    )
+                )
+                .order_by(table.c.product_id)
+                .with_for_update()
+            )
+            products = {row.product_id for row in locked.all()}
+            matched = [row for row in pending if row.product_id in products]
+            if not matched:
+                return {"reservations_compacted": 0, "items_updated": 0}
+
+            totals: Dict[UUID, int] = {}
+            for row in matched:
+                totals[row.product_id] = totals.get(row.product_id, 0) + row.quantity
+
+            params = [
+                {"b_product_id": product_id, "b_reserved": quantity}
+                for product_id, quantity in sorted(
+                    totals.items(), key=lambda item: str(item[0])
+                )
+            ]
+            now = datetime.utcnow()
+            await self.db.execute(
+                update(table)
+                .where(
+                    and_(
+                        table.c.product_id == bindparam("b_product_id"),
+                        table.c.location == "default",
+                    )
+                )
+                .values(
+                    reserved_quantity=table.c.reserved_quantity
+                    + bindparam("b_reserved"),
+                    available_quantity=table.c.available_quantity
+                    - bindparam("b_reserved"),
+                    last_updated=now,
+                ),
+                params,
+            )
+            await self.db.execute(
+                update(InventoryTransaction)
+                .where(InventoryTransaction.id.in_([row.id for row in matched]))
+                .values(
+                    status=TransactionStatus.COMPLETED.value,
+                    processed_at=now,
+                )
             )
 
+            return {
+                "reservations_compacted": len(matched),
+                "items_updated": len(params),
+            }
+
     async def _get_available_stock(self, product_id: UUID) -> int:
-        """Get available stock for product"""
-        result = await self.db.execute(
-            select(func.sum(InventoryItem.available_quantity)).where(
-                InventoryItem.product_id == product_id
+        """Get available stock for product net of pending reservations"""
+        pending = (
+            select(func.coalesce(func.sum(InventoryTransaction.quantity), 0))
+            .where(
+                and_(
+                    InventoryTransaction.product_id == product_id,
+                    InventoryTransaction.transaction_type
+                    == TransactionType.RESERVATION.value,
+                    InventoryTransaction.status == TransactionStatus.PENDING.value,
+                )
             )
+            .scalar_subquery()
+        )
+        result = await self.db.execute(
+            select(
+                func.coalesce(func.sum(InventoryItem.available_quantity), 0) - pending
+            ).where(InventoryItem.product_id == product_id)
         )
         return result.scalar() or 0
 
@@ -914,6 +1553,18 @@ async def create_inventory_reservation(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
+@router.post("/reservations/compact", response_model=Dict[str, int])
+async def compact_inventory_reservations(
+    batch_size: int = Query(10000, ge=1, le=100000),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Fold pending reservations into inventory levels"""
+
+    reservation_manager = ReservationManager(db)
+    return await reservation_manager.compact_reservations(batch_size)
+
+
 @router.post("/adjustments", response_model=InventoryTransactionResponse)
 async def create_inventory_adjustment(
     request: InventoryAdjustmentRequest,
@@ -13,13 +13,15 @@ from enum import Enum
 from typing import Any, Dict, List, Optional
 from uuid import UUID, uuid4
 
+import numpy as np
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from pydantic import BaseModel, Field, validator
-from sqlalchemy import text
+from sqlalchemy import bindparam, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
 from app.core.exceptions import BusinessLogicError, NotFoundError
+from app.services.demand_forecasting import backtest_accuracy, fit_demand_forecast
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -143,7 +145,7 @@ class SupplierIntegrationRequest(BaseModel):
 
     supplier_id: UUID
     name: str = Field(..., min_length=1, max_length=200)
-    contact_email: str = Field(..., regex=r"^[\w\.-]+@[\w\.-]+\.\w+$")
+    contact_email: str = Field(..., pattern=r"^[\w\.-]+@[\w\.-]+\.\w+$")
     contact_phone: Optional[str] = Field(None, max_length=20)
     api_endpoint: Optional[str] = Field(None, max_length=500)
     api_key: Optional[str] = Field(None, max_length=100)
@@ -497,6 +499,59 @@ class InventoryTracker:
             logger.error(f"Error creating inventory alert: {str(e)}")
 
 
+# Minimum number of days with sales before a product is forecast
+MIN_DEMAND_DAYS = 7
+
+# Products per IN (...) lookup when enriching batch predictions
+LOOKUP_CHUNK_SIZE = 1000
+
+
+def forecast_model(method: PredictionMethod, days: int) -> PredictionMethod:
+    """Model used for a method; unsupported methods use the moving average"""
+    if method == PredictionMethod.EXPONENTIAL_SMOOTHING:
+        return method
+    if method == PredictionMethod.LINEAR_REGRESSION and days >= 2:
+        return method
+    return PredictionMethod.MOVING_AVERAGE
+
+
+def z_score_for(confidence: float) -> float:
+    return 1.96 if confidence >= 0.95 else 1.65  # 95% or 90% confidence
+
+
+def predict_total_demand(
+    demand: np.ndarray,
+    method: PredictionMethod,
+    prediction_days: int,
+    confidence: float = 0.95,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Predicted demand over the horizon and its confidence margin per row
+
+    Rows of ``demand`` are chronological daily demand. The margin is the
+    z-scaled spread of the fitted model (recent window, or regression
+    residuals).
+    """
+    fitted = fit_demand_forecast(
+        demand,
+        forecast_model(method, demand.shape[1]),
+        prediction_days,
+        z_score=z_score_for(confidence),
+    )
+    total = np.trunc(fitted.demand.sum(axis=1)).astype(int)
+    margin = np.trunc(fitted.upper_bound[:, 0] - fitted.demand[:, 0]).astype(int)
+    return total, margin
+
+
+def prediction_accuracy(
+    demand: np.ndarray, method: PredictionMethod, holdout: int = 7
+) -> np.ndarray:
+    """Accuracy (1 - MAPE) per row, backtested on the last ``holdout`` days"""
+    accuracy = backtest_accuracy(
+        demand, forecast_model(method, demand.shape[1]), holdout
+    )
+    return np.round(accuracy / 100, 4)
+
+
 class PredictionEngine:
     """Inventory prediction and demand forecasting"""
 
@@ -506,244 +561,203 @@ class PredictionEngine:
     async def generate_stock_predictions(
         self, request: StockPredictionRequest
     ) -> List[Dict[str, Any]]:
-        """Generate stock predictions using various methods"""
-        try:
-            predictions = []
-
-            # Get product IDs to predict
-            if request.product_ids:
-                product_ids = request.product_ids
-            else:
-                # Get all active products
-                query = text("SELECT id FROM products WHERE status = 'active'")
-                result = await self.db.execute(query)
-                product_ids = [UUID(row.id) for row in result.fetchall()]
+        """Generate stock predictions for all requested products in one pass
 
-            for product_id in product_ids:
-                prediction = await self._predict_single_product(product_id, request)
-                if prediction:
-                    predictions.append(prediction)
-
-            return predictions
-
-        except Exception as e:
-            logger.error(f"Error generating stock predictions: {str(e)}")
-            raise BusinessLogicError(f"Failed to generate predictions: {str(e)}")
-
-    async def _predict_single_product(
-        self, product_id: UUID, request: StockPredictionRequest
-    ) -> Optional[Dict[str, Any]]:
-        """Generate prediction for a single product"""
+        Daily sales are loaded as a (product x day) matrix with one aggregate
+        query and every model runs as array operations over all products;
+        stock and reorder settings are fetched with batched IN lookups.
+        """
         try:
-            # Get historical data
-            historical_data = await self._get_historical_demand(
-                product_id, request.prediction_days * 2
+            product_ids, demand = await self._load_demand_matrix(
+                request.product_ids, request.prediction_days * 2
             )
 
-            if len(historical_data) < 7:  # Need minimum data points
-                return None
-
-            # Apply prediction method
-            if request.method == PredictionMethod.MOVING_AVERAGE:
-                predicted_demand = self._moving_average_prediction(
-                    historical_data, request.prediction_days
-                )
-            elif request.method == PredictionMethod.EXPONENTIAL_SMOOTHING:
-                predicted_demand = self._exponential_smoothing_prediction(
-                    historical_data, request.prediction_days
-                )
-            elif request.method == PredictionMethod.LINEAR_REGRESSION:
-                predicted_demand = self._linear_regression_prediction(
-                    historical_data, request.prediction_days
-                )
-            else:
-                predicted_demand = self._moving_average_prediction(
-                    historical_data, request.prediction_days
-                )
-
-            # Get current stock
-            current_stock = await self._get_current_stock(product_id)
+            eligible = (demand > 0).sum(axis=1) >= MIN_DEMAND_DAYS
+            product_ids = [pid for pid, keep in zip(product_ids, eligible) if keep]
+            demand = demand[eligible]
+            if not product_ids:
+                return []
+
+            predicted_demand, margins = predict_total_demand(
+                demand,
+                request.method,
+                request.prediction_days,
+                request.confidence_level,
+            )
+            accuracy = prediction_accuracy(demand, request.method)
 
-            # Calculate predicted stock
-            predicted_stock = max(0, current_stock - predicted_demand)
+            stock_levels = await self._get_current_stock_levels(product_ids)
+            reorder_settings = await self._get_reorder_settings(product_ids)
 
-            # Calculate confidence interval
-            confidence_lower, confidence_upper = self._calculate_confidence_interval(
-                historical_data, predicted_demand, request.confidence_level
+            current_stock = np.array(
+                [int(stock_levels.get(pid, 0)) for pid in product_ids]
             )
+            predicted_stock = np.maximum(0, current_stock - predicted_demand)
+            reorder_points = np.array(
+                [
+                    getattr(reorder_settings.get(pid), "reorder_point", None) or 10
+                    for pid in product_ids
+                ]
+            )
+            reorder_needed = predicted_stock <= reorder_points
 
-            # Determine reorder recommendation
-            reorder_needed = predicted_stock <= await self._get_reorder_point(
-                product_id
+            prediction_date = datetime.utcnow() + timedelta(
+                days=request.prediction_days
             )
-            suggested_quantity = 0
-            if reorder_needed:
-                suggested_quantity = await self._calculate_reorder_quantity(
-                    product_id, predicted_demand
+            predictions = []
+            for i, product_id in enumerate(product_ids):
+                suggested_quantity = 0
+                if reorder_needed[i]:
+                    suggested_quantity = self._reorder_quantity(
+                        reorder_settings.get(product_id),
+                        int(predicted_demand[i]),
+                        int(current_stock[i]),
+                    )
+
+                predictions.append(
+                    {
+                        "product_id": product_id,
+                        "current_stock": int(current_stock[i]),
+                        "prediction_date": prediction_date,
+                        "predicted_stock": int(predicted_stock[i]),
+                        "predicted_demand": int(predicted_demand[i]),
+                        "confidence_interval_lower": max(
+                            0, int(predicted_stock[i] - margins[i])
+                        ),
+                        "confidence_interval_upper": int(
+                            predicted_stock[i] + margins[i]
+                        ),
+                        "reorder_recommendation": bool(reorder_needed[i]),
+                        "suggested_reorder_quantity": suggested_quantity,
+                        "method_used": request.method,
+                        "accuracy_score": float(accuracy[i]),
+                    }
                 )
 
-            return {
-                "product_id": product_id,
-                "current_stock": current_stock,
-                "prediction_date": datetime.utcnow()
-                + timedelta(days=request.prediction_days),
-                "predicted_stock": predicted_stock,
-                "predicted_demand": predicted_demand,
-                "confidence_interval_lower": max(0, predicted_stock + confidence_lower),
-                "confidence_interval_upper": predicted_stock + confidence_upper,
-                "reorder_recommendation": reorder_needed,
-                "suggested_reorder_quantity": suggested_quantity,
-                "method_used": request.method,
-                "accuracy_score": 0.85,  # Simplified - would calculate from historical accuracy
-            }
+            return predictions
 
         except Exception as e:
-            logger.error(f"Error predicting for product {product_id}: {str(e)}")
-            return None
-
-    async def _get_historical_demand(self, product_id: UUID, days: int) -> List[int]:
-        """Get historical demand data"""
-        query = text("""
-            SELECT DATE(created_at) as date, SUM(quantity) as daily_demand
-            FROM stock_movements
-            WHERE product_id = :product_id
-            AND movement_type = 'sale'
-            AND created_at >= :start_date
-            GROUP BY DATE(created_at)
-            ORDER BY date DESC
-        """)
-
-        start_date = datetime.utcnow() - timedelta(days=days)
-        result = await self.db.execute(
-            query, {"product_id": str(product_id), "start_date": start_date}
-        )
-
-        return [row.daily_demand for row in result.fetchall()]
-
-    def _moving_average_prediction(
-        self, historical_data: List[int], prediction_days: int
-    ) -> int:
-        """Simple moving average prediction"""
-        if not historical_data:
-            return 0
-
-        # Use last 7 days for moving average
-        recent_data = historical_data[:7]
-        avg_daily_demand = sum(recent_data) / len(recent_data)
-        return int(avg_daily_demand * prediction_days)
-
-    def _exponential_smoothing_prediction(
-        self, historical_data: List[int], prediction_days: int
-    ) -> int:
-        """Exponential smoothing prediction"""
-        if not historical_data:
-            return 0
-
-        alpha = 0.3  # Smoothing parameter
-        smoothed = historical_data[0]
-
-        for value in historical_data[1:]:
-            smoothed = alpha * value + (1 - alpha) * smoothed
-
-        return int(smoothed * prediction_days)
-
-    def _linear_regression_prediction(
-        self, historical_data: List[int], prediction_days: int
-    ) -> int:
-        """Simple linear regression prediction"""
-        if len(historical_data) < 2:
-            return 0
-
-        # Simple linear trend calculation
-        n = len(historical_data)
-        x = list(range(n))
-        y = historical_data
-
-        x_mean = sum(x) / n
-        y_mean = sum(y) / n
-
-        numerator = sum((x[i] - x_mean) * (y[i] - y_mean) for i in range(n))
-        denominator = sum((x[i] - x_mean) ** 2 for i in range(n))
-
-        if denominator == 0:
-            return int(y_mean * prediction_days)
-
-        slope = numerator / denominator
-        intercept = y_mean - slope * x_mean
-
-        # Predict for next period
-        future_x = n + prediction_days / 2  # Approximate middle of prediction period
-        predicted_daily = max(0, slope * future_x + intercept)
+            logger.error(f"Error generating stock predictions: {str(e)}")
+            raise BusinessLogicError(f"Failed to generate predictions: {str(e)}")
 
-        return int(predicted_daily * prediction_days)
+    async def _load_demand_matrix(
+        self, product_ids: Optional[List[UUID]], days: int, chunk_size: int = 10000
+    ) -> tuple[List[UUID], np.ndarray]:
+        """Daily sales per product as a chronological (product x day) matrix
 
-    def _calculate_confidence_interval(
-        self, historical_data: List[int], prediction: int, confidence: float
-    ) -> tuple[int, int]:
-        """Calculate confidence interval for prediction"""
-        if len(historical_data) < 2:
-            return (0, prediction)
+        Columns are the ``days`` complete calendar days before today, with
+        zero for days without sales; today's partial day is excluded.
+        """
+        end_date = datetime.utcnow().date()
+        start_date = end_date - timedelta(days=days)
+        params: Dict[str, Any] = {"start_date": start_date, "end_date": end_date}
 
-        # Simple standard deviation calculation
-        mean = sum(historical_data) / len(historical_data)
-        variance = sum((x - mean) ** 2 for x in historical_data) / len(historical_data)
-        std_dev = variance**0.5
+        if product_ids:
+            query = text("""
+                SELECT product_id, DATE(created_at) as date, SUM(quantity) as daily_demand
+                FROM stock_movements
+                WHERE movement_type = 'sale'
+                AND created_at >= :start_date
+                AND created_at < :end_date
+                AND product_id IN :product_ids
+                GROUP BY product_id, DATE(created_at)
+            """).bindparams(bindparam("product_ids", expanding=True))
+            params["product_ids"] = [str(pid) for pid in product_ids]
+        else:
+            # All active products
+            query = text("""
+                SELECT sm.product_id, DATE(sm.created_at) as date,
+                       SUM(sm.quantity) as daily_demand
+                FROM stock_movements sm
+                JOIN products p ON p.id = sm.product_id AND p.status = 'active'
+                WHERE sm.movement_type = 'sale'
+                AND sm.created_at >= :start_date
+                AND sm.created_at < :end_date
+                GROUP BY sm.product_id, DATE(sm.created_at)
+            """)
 
-        # Simplified confidence interval (would use proper statistical methods in production)
-        z_score = 1.96 if confidence >= 0.95 else 1.65  # 95% or 90% confidence
-        margin = int(z_score * std_dev)
+        index: Dict[UUID, int] = {}
+        rows: List[int] = []
+        offsets: List[int] = []
+        quantities: List[float] = []
+
+        result = await self.db.stream(query, params)
+        async for partition in result.partitions(chunk_size):
+            for row in partition:
+                product_id = UUID(str(row.product_id))
+                rows.append(index.setdefault(product_id, len(index)))
+                offsets.append((row.date - start_date).days)
+                quantities.append(float(row.daily_demand or 0))
+
+        demand = np.zeros((len(index), days))
+        if index:
+            offsets_array = np.asarray(offsets)
+            in_window = (offsets_array >= 0) & (offsets_array < days)
+            np.add.at(
+                demand,
+                (np.asarray(rows)[in_window], offsets_array[in_window]),
+                np.asarray(quantities)[in_window],
+            )
 
-        return (-margin, margin)
+        return list(index), demand
 
-    async def _get_current_stock(self, product_id: UUID) -> int:
-        """Get current stock level"""
+    async def _get_current_stock_levels(
+        self, product_ids: List[UUID]
+    ) -> Dict[UUID, int]:
+        """Current stock for many products with batched lookups"""
         query = text("""
-            SELECT COALESCE(SUM(CASE WHEN movement_type IN ('purchase', 'adjustment', 'return')
-                                    THEN quantity
-                                    ELSE -quantity END), 0) as current_stock
+            SELECT product_id,
+                   COALESCE(SUM(CASE WHEN movement_type IN ('purchase', 'adjustment', 'return')
+                                     THEN quantity
+                                     ELSE -quantity END), 0) as current_stock
             FROM stock_movements
-            WHERE product_id = :product_id
-        """)
+            WHERE product_id IN :product_ids
+            GROUP BY product_id
+        """).bindparams(bindparam("product_ids", expanding=True))
+
+        levels: Dict[UUID, int] = {}
+        for offset in range(0, len(product_ids), LOOKUP_CHUNK_SIZE):
+            chunk = product_ids[offset : offset + LOOKUP_CHUNK_SIZE]
+            result = await self.db.execute(
+                query, {"product_ids": [str(pid) for pid in chunk]}
+            )
+            for row in result.fetchall():
+                levels[UUID(str(row.product_id))] = row.current_stock
 
-        result = await self.db.execute(query, {"product_id": str(product_id)})
-        row = result.fetchone()
-        return row.current_stock if row else 0
+        return levels
 
-    async def _get_reorder_point(self, product_id: UUID) -> int:
-        """Get reorder point for product"""
-        query = text(
-            "SELECT reorder_point FROM inventory_items WHERE product_id = :product_id"
-        )
-        result = await self.db.execute(query, {"product_id": str(product_id)})
-        row = result.fetchone()
-        return row.reorder_point if row else 10
-
-    async def _calculate_reorder_quantity(
-        self, product_id: UUID, predicted_demand: int
-    ) -> int:
-        """Calculate optimal reorder quantity"""
-        # Get max stock level and lead time
+    async def _get_reorder_settings(self, product_ids: List[UUID]) -> Dict[UUID, Any]:
+        """Reorder point, max level, lead time and safety stock per product"""
         query = text("""
-            SELECT max_stock_level, lead_time_days, safety_stock
+            SELECT product_id, reorder_point, max_stock_level, lead_time_days, safety_stock
             FROM inventory_items
-            WHERE product_id = :product_id
-        """)
-        result = await self.db.execute(query, {"product_id": str(product_id)})
-        row = result.fetchone()
+            WHERE product_id IN :product_ids
+        """).bindparams(bindparam("product_ids", expanding=True))
+
+        settings: Dict[UUID, Any] = {}
+        for offset in range(0, len(product_ids), LOOKUP_CHUNK_SIZE):
+            chunk = product_ids[offset : offset + LOOKUP_CHUNK_SIZE]
+            result = await self.db.execute(
+                query, {"product_ids": [str(pid) for pid in chunk]}
+            )
+            for row in result.fetchall():
+                settings[UUID(str(row.product_id))] = row
 
-        if not row:
-            return predicted_demand  # Fallback
+        return settings
 
-        max_level = row.max_stock_level or 100
-        lead_time = row.lead_time_days or 7
-        safety_stock = row.safety_stock or 5
+    def _reorder_quantity(
+        self, settings: Any, predicted_demand: int, current_stock: int
+    ) -> int:
+        """Reorder quantity from lead time demand plus safety stock"""
+        if not settings:
+            return predicted_demand  # Fallback
 
-        # Calculate reorder quantity based on lead time demand + safety stock
-        lead_time_demand = int(
-            predicted_demand * lead_time / 30
-        )  # Approximate monthly to lead time
-        current_stock = await self._get_current_stock(product_id)
+        max_level = settings.max_stock_level or 100
+        lead_time = settings.lead_time_days or 7
+        safety_stock = settings.safety_stock or 5
 
+        # Approximate monthly to lead time
+        lead_time_demand = int(predicted_demand * lead_time / 30)
         return max(0, min(max_level - current_stock, lead_time_demand + safety_stock))
 
 
@@ -6,13 +6,17 @@ Day 9: Advanced Inventory Management Implementation
 
 from __future__ import annotations
 
+import time
 import uuid
-from datetime import datetime, timedelta
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
 import aioredis
+import numpy as np
 from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel, Field
 from sqlalchemy import (
@@ -28,16 +32,33 @@ from sqlalchemy import (
     String,
     Text,
     UniqueConstraint,
+    bindparam,
+    exists,
+    insert,
+    update,
 )
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import relationship, selectinload
+from sqlalchemy.orm import aliased, relationship, selectinload
 from sqlalchemy.sql import and_, func
 
 from app.core.database import get_db
 from app.core.security import get_current_user
 from app.models.base import BaseTable
+from app.services.demand_forecasting import (
+    ForecastArrays,
+    backtest_accuracy,
+    confidence_z_score,
+    fit_demand_forecast,
+)
+from app.services.document_numbers import (
+    GLOBAL_SCOPE,
+    INVENTORY_ADJUSTMENT,
+    INVENTORY_MOVEMENT,
+    document_numbers,
+)
 
 # ============================================================================
 # Enums and Constants
@@ -95,6 +116,13 @@ class ReplenishmentMethod(str, Enum):
     MANUAL = "manual"
 
 
+class LedgerEntryType(str, Enum):
+    """Reservation ledger entry type enumeration"""
+
+    RESERVE = "reserve"
+    RELEASE = "release"
+
+
 class ForecastMethod(str, Enum):
     """Forecast method enumeration"""
 
@@ -150,7 +178,11 @@ class Location(BaseTable):
     parent = relationship("Location", remote_side=[id], back_populates="children")
     children = relationship("Location", back_populates="parent")
     inventories = relationship("InventoryBalance", back_populates="location")
-    movements = relationship("InventoryMovement", back_populates="location")
+    movements = relationship(
+        "InventoryMovement",
+        foreign_keys="InventoryMovement.location_id",
+        back_populates="location",
+    )
 
     __table_args__ = (
         Index("idx_location_code", "code"),
@@ -280,6 +312,53 @@ class InventoryMovement(BaseTable):
     )
 
 
+class InventoryReservationLedger(BaseTable):
+    """Append-only reservation ledger
+
+    Reservations are appended here instead of updating the balance row, so
+    concurrent reservers on the same SKU never contend for one row. Pending
+    entries (compacted_at is NULL) are periodically folded into
+    InventoryBalance.quantity_reserved / quantity_available.
+    """
+
+    __tablename__ = "inventory_reservation_ledger"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    product_id = Column(UUID(as_uuid=True), nullable=False)
+    location_id = Column(
+        UUID(as_uuid=True), ForeignKey("inventory_locations.id"), nullable=False
+    )
+    lot_number = Column(String(100))
+
+    # Signed quantity: positive reserves stock, negative releases it
+    entry_type = Column(String(20), nullable=False)
+    quantity = Column(DECIMAL(15, 4), nullable=False)
+    reverses_id = Column(
+        UUID(as_uuid=True), ForeignKey("inventory_reservation_ledger.id")
+    )
+
+    # Reference information
+    reference_type = Column(String(50))
+    reference_id = Column(String(100))
+    expires_at = Column(DateTime)
+    created_by = Column(UUID(as_uuid=True))
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Compaction
+    compacted_at = Column(DateTime)
+
+    __table_args__ = (
+        Index(
+            "idx_reservation_ledger_pending",
+            "product_id",
+            "location_id",
+            "compacted_at",
+        ),
+        Index("idx_reservation_ledger_reference", "reference_type", "reference_id"),
+        UniqueConstraint("reverses_id", name="uq_reservation_ledger_reverses"),
+    )
+
+
 class StockAdjustment(BaseTable):
     """Stock adjustment model"""
 
@@ -728,7 +807,9 @@ class InventoryBalanceResponse(BaseModel):
 
 class StockAdjustmentCreate(BaseModel):
     location_id: uuid.UUID
-    adjustment_type: str = Field(..., regex="^(cycle_count|physical_count|adjustment)$")
+    adjustment_type: str = Field(
+        ..., pattern="^(cycle_count|physical_count|adjustment)$"
+    )
     reason: Optional[str] = None
     notes: Optional[str] = None
     adjustment_lines: List[Dict[str, Any]]
@@ -782,8 +863,29 @@ class DemandForecastResponse(BaseModel):
     recommendations: List[str]
 
 
+class DemandForecastBatchRequest(BaseModel):
+    product_ids: Optional[List[uuid.UUID]] = None
+    location_id: Optional[uuid.UUID] = None
+    forecast_method: ForecastMethod = ForecastMethod.MOVING_AVERAGE
+    forecast_periods: int = Field(30, ge=1, le=365)
+    historical_periods: int = Field(90, ge=30, le=730)
+    confidence_level: Decimal = Field(Decimal("95.0"), ge=50, le=99)
+    min_history_days: int = Field(10, ge=1, le=365)
+    chunk_size: int = Field(5000, ge=100, le=50000)
+    persist: bool = True
+
+
+class DemandForecastBatchResponse(BaseModel):
+    skus_forecast: int
+    skus_skipped: int
+    forecast_rows_written: int
+    mean_accuracy: Decimal
+    forecast_method: ForecastMethod
+    elapsed_seconds: float
+
+
 class InventoryReportRequest(BaseModel):
-    report_type: str = Field(..., regex="^(valuation|aging|movement|turnover|abc)$")
+    report_type: str = Field(..., pattern="^(valuation|aging|movement|turnover|abc)$")
     location_ids: Optional[List[uuid.UUID]] = None
     product_ids: Optional[List[uuid.UUID]] = None
     date_from: Optional[datetime] = None
@@ -792,17 +894,461 @@ class InventoryReportRequest(BaseModel):
     group_by: Optional[str] = None
 
 
+class ReservationCreate(BaseModel):
+    product_id: uuid.UUID
+    location_id: uuid.UUID
+    quantity: Decimal = Field(..., gt=0)
+    lot_number: Optional[str] = None
+    reference_type: Optional[str] = None
+    reference_id: Optional[str] = None
+    expires_at: Optional[datetime] = None
+
+
+class ReservationLedgerResponse(BaseModel):
+    id: uuid.UUID
+    product_id: uuid.UUID
+    location_id: uuid.UUID
+    lot_number: Optional[str]
+    entry_type: str
+    quantity: Decimal
+    reverses_id: Optional[uuid.UUID]
+    reference_type: Optional[str]
+    reference_id: Optional[str]
+    expires_at: Optional[datetime]
+    created_at: datetime
+    compacted_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+
+# ============================================================================
+# Vectorized Forecasting
+# ============================================================================
+
+# Movement types that represent outbound demand
+DEMAND_MOVEMENT_TYPES = (MovementType.SHIPMENT, MovementType.CONSUMPTION)
+
+
+@dataclass
+class DemandMatrix:
+    """Daily demand per SKU: values[i, d] is demand for product_ids[i] on day d"""
+
+    product_ids: List[uuid.UUID]
+    start_date: date
+    values: np.ndarray
+
+    @property
+    def days(self) -> int:
+        return self.values.shape[1]
+
+    @classmethod
+    def from_history(
+        cls, historical_data: List[Dict[str, Any]], product_id: Optional[uuid.UUID]
+    ) -> "DemandMatrix":
+        """Single-row matrix from the per-product historical_data format"""
+        values = np.array([[float(d["demand"]) for d in historical_data]])
+        start = historical_data[0]["date"] if historical_data else datetime.utcnow()
+        return cls([product_id], start.date(), values)
+
+
 # ============================================================================
 # Service Classes
 # ============================================================================
 
 
+class InventoryReservationLedgerService:
+    """Reservation ledger with a Redis admission gate and periodic compaction
+
+    Availability is the balance row's quantity_available minus pending ledger
+    entries. Admission is decided atomically by a Lua script against a Redis
+    counter seeded from that figure, so reservers never lock the balance row;
+    compaction later folds pending entries into the balance in one pass.
+
+    Gate counters are integers in units of the ledger's 4-decimal scale. A
+    gate expires GATE_TTL_SECONDS after seeding and is re-seeded from the
+    database, and resync_gates re-seeds all live gates, so balance writes
+    made outside this service cannot skew admission for long.
+    """
+
+    GATE_KEY = "inventory:available:{product_id}:{location_id}:{lot_number}"
+    GATE_MISSING = -1
+    GATE_SCALE = Decimal("10000")  # DECIMAL(15, 4) quantities as integers
+    GATE_TTL_SECONDS = 300
+
+    # Decrement the gate only if enough quantity remains; -1 asks to seed it
+    RESERVE_SCRIPT = """
+    local available = redis.call('GET', KEYS[1])
+    if not available then
+        return -1
+    end
+    if tonumber(available) < tonumber(ARGV[1]) then
+        return 0
+    end
+    redis.call('DECRBY', KEYS[1], ARGV[1])
+    return 1
+    """
+
+    # Apply a delta only to a seeded gate; an unseeded gate is read from the DB
+    ADJUST_SCRIPT = """
+    if redis.call('EXISTS', KEYS[1]) == 1 then
+        return redis.call('INCRBY', KEYS[1], ARGV[1])
+    end
+    return false
+    """
+
+    def __init__(self, db: AsyncSession, redis_client: aioredis.Redis):
+        self.db = db
+        self.redis = redis_client
+
+    def _gate_key(
+        self, product_id: uuid.UUID, location_id: uuid.UUID, lot_number: Optional[str]
+    ) -> str:
+        return self.GATE_KEY.format(
+            product_id=product_id, location_id=location_id, lot_number=lot_number or "-"
+        )
+
+    async def get_available_quantity(
+        self,
+        product_id: uuid.UUID,
+        location_id: uuid.UUID,
+        lot_number: Optional[str] = None,
+    ) -> Decimal:
+        """Balance availability minus pending (uncompacted) ledger entries"""
+        pending = (
+            select(func.coalesce(func.sum(InventoryReservationLedger.quantity), 0))
+            .where(
+                and_(
+                    InventoryReservationLedger.product_id == product_id,
+                    InventoryReservationLedger.location_id == location_id,
+                    InventoryReservationLedger.lot_number == lot_number,
+                    InventoryReservationLedger.compacted_at.is_(None),
+                )
+            )
+            .scalar_subquery()
+        )
+        query = select(
+            func.coalesce(func.sum(InventoryBalance.quantity_available), 0) - pending
+        ).where(
+            and_(
+                InventoryBalance.product_id == product_id,
+                InventoryBalance.location_id == location_id,
+                InventoryBalance.lot_number == lot_number,
+            )
+        )
+        result = await self.db.execute(query)
+        return Decimal(str(result.scalar() or 0))
+
+    def _gate_units(self, quantity: Decimal) -> int:
+        return int((Decimal(str(quantity)) * self.GATE_SCALE).to_integral_value())
+
+    async def adjust_gate(
+        self,
+        product_id: uuid.UUID,
+        location_id: uuid.UUID,
+        lot_number: Optional[str],
+        delta: Decimal,
+    ) -> None:
+        """Reflect a committed availability change in the admission gate"""
+        units = self._gate_units(delta)
+        if not units:
+            return
+        await self.redis.eval(
+            self.ADJUST_SCRIPT,
+            1,
+            self._gate_key(product_id, location_id, lot_number),
+            str(units),
+        )
+
+    async def resync_gate(
+        self,
+        product_id: uuid.UUID,
+        location_id: uuid.UUID,
+        lot_number: Optional[str] = None,
+    ) -> None:
+        """Re-seed one gate from balance minus pending entries"""
+        available = await self.get_available_quantity(
+            product_id, location_id, lot_number
+        )
+        await self.redis.set(
+            self._gate_key(product_id, location_id, lot_number),
+            str(self._gate_units(available)),
+            ex=self.GATE_TTL_SECONDS,
+        )
+
+    async def resync_gates(self) -> Dict[str, int]:
+        """Re-seed every live gate; run periodically alongside compaction
+
+        A reservation admitted but not yet committed while its gate is re-read
+        is briefly not counted; the next resync or expiry corrects it.
+        """
+        pattern = self.GATE_KEY.format(product_id="*", location_id="*", lot_number="*")
+        resynced = 0
+        async for key in self.redis.scan_iter(match=pattern):
+            if isinstance(key, bytes):
+                key = key.decode()
+            product_id, location_id, lot_number = key.split(":", 4)[2:]
+            await self.resync_gate(
+                uuid.UUID(product_id),
+                uuid.UUID(location_id),
+                None if lot_number == "-" else lot_number,
+            )
+            resynced += 1
+        return {"gates_resynced": resynced}
+
+    async def _admit(
+        self,
+        product_id: uuid.UUID,
+        location_id: uuid.UUID,
+        lot_number: Optional[str],
+        quantity: Decimal,
+    ) -> bool:
+        key = self._gate_key(product_id, location_id, lot_number)
+        for _ in range(2):
+            admitted = int(
+                await self.redis.eval(
+                    self.RESERVE_SCRIPT, 1, key, str(self._gate_units(quantity))
+                )
+            )
+            if admitted != self.GATE_MISSING:
+                return admitted == 1
+
+            # Unseeded or expired gate: seed it (NX keeps a racing seeder from
+            # overwriting a gate that has already admitted work)
+            available = await self.get_available_quantity(
+                product_id, location_id, lot_number
+            )
+            await self.redis.set(
+                key,
+                str(self._gate_units(available)),
+                nx=True,
+                ex=self.GATE_TTL_SECONDS,
+            )
+
+        return False
+
+    async def reserve(
+        self,
+        reservation: ReservationCreate,
+        created_by: Optional[uuid.UUID] = None,
+    ) -> InventoryReservationLedger:
+        """Append a reservation entry if the gate admits the quantity"""
+        admitted = await self._admit(
+            reservation.product_id,
+            reservation.location_id,
+            reservation.lot_number,
+            reservation.quantity,
+        )
+        if not admitted:
+            raise HTTPException(status_code=400, detail="Insufficient inventory")
+
+        entry = InventoryReservationLedger(
+            **reservation.dict(),
+            entry_type=LedgerEntryType.RESERVE,
+            created_by=created_by,
+            created_at=datetime.utcnow(),
+        )
+
+        try:
+            self.db.add(entry)
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            # Hand the admitted quantity back to the gate
+            await self.adjust_gate(
+                reservation.product_id,
+                reservation.location_id,
+                reservation.lot_number,
+                reservation.quantity,
+            )
+            raise
+
+        return entry
+
+    async def release(
+        self, entry_id: uuid.UUID, created_by: Optional[uuid.UUID] = None
+    ) -> InventoryReservationLedger:
+        """Append a compensating entry for a reservation"""
+        result = await self.db.execute(
+            select(InventoryReservationLedger).where(
+                and_(
+                    InventoryReservationLedger.id == entry_id,
+                    InventoryReservationLedger.entry_type == LedgerEntryType.RESERVE,
+                )
+            )
+        )
+        reservation = result.scalar_one_or_none()
+        if not reservation:
+            raise HTTPException(status_code=404, detail="Reservation not found")
+
+        entry = InventoryReservationLedger(
+            product_id=reservation.product_id,
+            location_id=reservation.location_id,
+            lot_number=reservation.lot_number,
+            entry_type=LedgerEntryType.RELEASE,
+            quantity=-reservation.quantity,
+            reverses_id=reservation.id,
+            reference_type=reservation.reference_type,
+            reference_id=reservation.reference_id,
+            created_by=created_by,
+            created_at=datetime.utcnow(),
+        )
+
+        try:
+            self.db.add(entry)
+            await self.db.commit()
+        except IntegrityError:
+            # uq_reservation_ledger_reverses: released concurrently or twice
+            await self.db.rollback()
+            raise HTTPException(status_code=400, detail="Reservation already released")
+
+        await self.adjust_gate(
+            reservation.product_id,
+            reservation.location_id,
+            reservation.lot_number,
+            reservation.quantity,
+        )
+        return entry
+
+    async def expire_reservations(self, batch_size: int = 1000) -> Dict[str, int]:
+        """Release reservations past expires_at with compensating entries"""
+        now = datetime.utcnow()
+        released = aliased(InventoryReservationLedger)
+        result = await self.db.execute(
+            select(InventoryReservationLedger)
+            .where(
+                and_(
+                    InventoryReservationLedger.entry_type == LedgerEntryType.RESERVE,
+                    InventoryReservationLedger.expires_at <= now,
+                    ~exists().where(
+                        released.reverses_id == InventoryReservationLedger.id
+                    ),
+                )
+            )
+            .order_by(InventoryReservationLedger.expires_at)
+            .limit(batch_size)
+        )
+        expired = result.scalars().all()
+        if not expired:
+            return {"reservations_expired": 0}
+
+        self.db.add_all(
+            [
+                InventoryReservationLedger(
+                    product_id=reservation.product_id,
+                    location_id=reservation.location_id,
+                    lot_number=reservation.lot_number,
+                    entry_type=LedgerEntryType.RELEASE,
+                    quantity=-reservation.quantity,
+                    reverses_id=reservation.id,
+                    reference_type=reservation.reference_type,
+                    reference_id=reservation.reference_id,
+                    created_at=now,
+                )
+                for reservation in expired
+            ]
+        )
+        try:
+            await self.db.commit()
+        except IntegrityError:
+            # One of the batch was released concurrently; retried next run
+            await self.db.rollback()
+            return {"reservations_expired": 0}
+
+        totals: Dict[tuple, Decimal] = defaultdict(Decimal)
+        for reservation in expired:
+            key = (
+                reservation.product_id,
+                reservation.location_id,
+                reservation.lot_number,
+            )
+            totals[key] += Decimal(str(reservation.quantity))
+        for (product_id, location_id, lot_number), quantity in totals.items():
+            await self.adjust_gate(product_id, location_id, lot_number, quantity)
+
+        return {"reservations_expired": len(expired)}
+
+    async def compact(self, batch_size: int = 10000) -> Dict[str, int]:
+        """Fold pending ledger entries into InventoryBalance
+
+        Entries are selected by id and marked by id, so entries committed
+        while compaction runs are left for the next pass. Balance rows are
+        updated in key order with one executemany statement.
+        """
+        result = await self.db.execute(
+            select(
+                InventoryReservationLedger.id,
+                InventoryReservationLedger.product_id,
+                InventoryReservationLedger.location_id,
+                InventoryReservationLedger.lot_number,
+                InventoryReservationLedger.quantity,
+            )
+            .where(InventoryReservationLedger.compacted_at.is_(None))
+            .order_by(InventoryReservationLedger.created_at)
+            .limit(batch_size)
+        )
+        entries = result.all()
+        if not entries:
+            return {"entries_compacted": 0, "balances_updated": 0}
+
+        totals: Dict[tuple, Decimal] = defaultdict(Decimal)
+        for entry in entries:
+            key = (entry.product_id, entry.location_id, entry.lot_number)
+            totals[key] += Decimal(str(entry.quantity))
+
+        params = [
+            {
+                "b_product_id": product_id,
+                "b_location_id": location_id,
+                "b_lot_number": lot_number,
+                "b_reserved": reserved,
+            }
+            for (product_id, location_id, lot_number), reserved in sorted(
+                totals.items(), key=lambda item: tuple(str(part) for part in item[0])
+            )
+            if reserved
+        ]
+
+        balances = InventoryBalance.__table__
+        if params:
+            await self.db.execute(
+                update(balances)
+                .where(
+                    and_(
+                        balances.c.product_id == bindparam("b_product_id"),
+                        balances.c.location_id == bindparam("b_location_id"),
+                        balances.c.lot_number.is_not_distinct_from(
+                            bindparam("b_lot_number")
+                        ),
+                    )
+                )
+                .values(
+                    quantity_reserved=func.coalesce(balances.c.quantity_reserved, 0)
+                    + bindparam("b_reserved"),
+                    quantity_available=func.coalesce(balances.c.quantity_available, 0)
+                    - bindparam("b_reserved"),
+                ),
+                params,
+            )
+
+        await self.db.execute(
+            update(InventoryReservationLedger)
+            .where(InventoryReservationLedger.id.in_([entry.id for entry in entries]))
+            .values(compacted_at=datetime.utcnow())
+        )
+        await self.db.commit()
+
+        return {"entries_compacted": len(entries), "balances_updated": len(params)}
+
+
 class InventoryManagementService:
     """Comprehensive inventory management service"""
 
     def __init__(self, db: AsyncSession, redis_client: aioredis.Redis) -> dict:
         self.db = db
         self.redis = redis_client
+        self.reservations = InventoryReservationLedgerService(db, redis_client)
+        self.forecaster = BatchDemandForecaster(db)
 
     # Location Management
     async def create_location(self, location_data: LocationCreate) -> Location:
@@ -952,6 +1498,7 @@ class InventoryManagementService:
 
         # Calculate new quantities
         old_quantity = balance.quantity_on_hand
+        old_available = balance.quantity_available or Decimal("0")
         new_quantity = old_quantity + quantity_change
 
         if new_quantity < 0 and movement_type in [
@@ -1016,6 +1563,14 @@ class InventoryManagementService:
         await self.db.commit()
         await self.db.refresh(balance)
 
+        # Keep the reservation gate in step with committed stock
+        await self.reservations.adjust_gate(
+            product_id,
+            location_id,
+            lot_number,
+            balance.quantity_available - old_available,
+        )
+
         # Check for alerts
         await self._check_inventory_alerts(balance)
 
@@ -1026,13 +1581,13 @@ class InventoryManagementService:
 
     async def _generate_movement_number(self) -> str:
         """Generate unique movement number"""
-        today = datetime.utcnow().strftime("%Y%m%d")
-        counter_key = f"movement_counter:{today}"
-
-        counter = await self.redis.incr(counter_key)
-        await self.redis.expire(counter_key, 86400)  # Expire after 1 day
-
-        return f"MOV-{today}-{counter:06d}"
+        today = datetime.utcnow()
+        return await document_numbers.next_number_async(
+            INVENTORY_MOVEMENT,
+            GLOBAL_SCOPE,
+            on=today,
+            seed=self._redis_counter_seed(f"movement_counter:{today:%Y%m%d}"),
+        )
 
     # Stock Transfer Management
     async def create_stock_transfer(
@@ -1202,13 +1757,21 @@ class InventoryManagementService:
 
     async def _generate_adjustment_number(self) -> str:
         """Generate unique adjustment number"""
-        today = datetime.utcnow().strftime("%Y%m%d")
-        counter_key = f"adjustment_counter:{today}"
+        today = datetime.utcnow()
+        return await document_numbers.next_number_async(
+            INVENTORY_ADJUSTMENT,
+            GLOBAL_SCOPE,
+            on=today,
+            seed=self._redis_counter_seed(f"adjustment_counter:{today:%Y%m%d}"),
+        )
+
+    def _redis_counter_seed(self, counter_key: str) -> Callable[[], Awaitable[int]]:
+        """Numbers issued today by the Redis counter the sequence replaced"""
 
-        counter = await self.redis.incr(counter_key)
-        await self.redis.expire(counter_key, 86400)
+        async def issued() -> int:
+            return int(await self.redis.get(counter_key) or 0)
 
-        return f"ADJ-{today}-{counter:06d}"
+        return issued
 
     # Alert Management
     async def _check_inventory_alerts(self, balance: InventoryBalance) -> dict:
@@ -1290,59 +1853,41 @@ class InventoryManagementService:
             request.product_id, request.location_id, request.historical_periods
         )
 
-        if len(historical_data) < 10:
+        if sum(1 for d in historical_data if d["demand"] > 0) < 10:
             raise HTTPException(
                 status_code=400, detail="Insufficient historical data for forecasting"
             )
 
-        # Apply forecasting method
-        if request.forecast_method == ForecastMethod.MOVING_AVERAGE:
-            forecasts = await self._moving_average_forecast(
-                historical_data, request.forecast_periods
-            )
-        elif request.forecast_method == ForecastMethod.EXPONENTIAL_SMOOTHING:
-            forecasts = await self._exponential_smoothing_forecast(
-                historical_data, request.forecast_periods
-            )
-        elif request.forecast_method == ForecastMethod.LINEAR_REGRESSION:
-            forecasts = await self._linear_regression_forecast(
-                historical_data, request.forecast_periods
-            )
-        else:
-            forecasts = await self._simple_forecast(
-                historical_data, request.forecast_periods
-            )
+        # Fit the single-SKU matrix with the same code path as batch runs
+        method = ForecastMethod(request.forecast_method)
+        matrix = DemandMatrix.from_history(historical_data, request.product_id)
+        fitted = fit_demand_forecast(
+            matrix.values,
+            method,
+            request.forecast_periods,
+            z_score=confidence_z_score(request.confidence_level),
+        )
+        forecasts = self._forecast_rows(fitted, method)
 
         # Calculate accuracy metrics
-        accuracy = await self._calculate_forecast_accuracy(
-            historical_data, forecasts[: len(historical_data)]
-        )
+        accuracy = backtest_accuracy(matrix.values, method, request.forecast_periods)
 
         # Store forecasts in database
-        for i, forecast in enumerate(forecasts):
-            forecast_date = datetime.utcnow() + timedelta(days=i + 1)
-
-            db_forecast = DemandForecast(
-                product_id=request.product_id,
-                location_id=request.location_id,
-                forecast_date=forecast_date,
-                forecast_period="daily",
-                forecast_method=request.forecast_method,
-                forecasted_demand=forecast["demand"],
-                lower_bound=forecast.get("lower_bound"),
-                upper_bound=forecast.get("upper_bound"),
-                confidence_level=request.confidence_level,
-                model_parameters=forecast.get("model_params", {}),
-                created_by_model=f"inventory_management_v67_{request.forecast_method}",
-            )
-            self.db.add(db_forecast)
-
+        records = self.forecaster.forecast_records(
+            matrix,
+            fitted,
+            accuracy,
+            method,
+            request.confidence_level,
+            request.location_id,
+        )
+        await self.db.execute(insert(DemandForecast), records)
         await self.db.commit()
 
         return DemandForecastResponse(
             forecasts=forecasts,
-            model_accuracy=accuracy,
-            model_parameters={"method": request.forecast_method.value},
+            model_accuracy=Decimal(str(round(float(accuracy[0]), 2))),
+            model_parameters={"method": method.value},
             confidence_intervals={"level": request.confidence_level},
             recommendations=await self._generate_forecast_recommendations(
                 forecasts, historical_data
@@ -1352,172 +1897,58 @@ class InventoryManagementService:
     async def _get_historical_demand(
         self, product_id: uuid.UUID, location_id: Optional[uuid.UUID], periods: int
     ) -> List[Dict[str, Any]]:
-        """Get historical demand data for forecasting"""
-        # This would typically query sales/movement data
-        # For now, return simulated data
-        import random
+        """Get daily historical demand from shipment/consumption movements"""
+        matrix = await self.forecaster.load_demand_matrix(
+            periods, product_ids=[product_id], location_id=location_id
+        )
+        if not matrix.product_ids:
+            return []
 
-        base_demand = 100
         data = []
-
-        for i in range(periods):
-            date = datetime.utcnow() - timedelta(days=periods - i)
-            # Add seasonality and trend
-            seasonal_factor = 1 + 0.2 * math.sin(2 * math.pi * i / 30)  # Monthly cycle
-            trend_factor = 1 + 0.001 * i  # Slight upward trend
-            noise = random.uniform(0.8, 1.2)
-
-            demand = base_demand * seasonal_factor * trend_factor * noise
-
+        for offset, demand in enumerate(matrix.values[0].tolist()):
+            day = matrix.start_date + timedelta(days=offset)
             data.append(
                 {
-                    "date": date,
+                    "date": datetime.combine(day, datetime.min.time()),
                     "demand": round(demand, 2),
-                    "day_of_week": date.weekday(),
-                    "month": date.month,
+                    "day_of_week": day.weekday(),
+                    "month": day.month,
                 }
             )
 
         return data
 
-    async def _moving_average_forecast(
-        self, historical_data: List[Dict[str, Any]], periods: int, window: int = 7
-    ) -> List[Dict[str, Any]]:
-        """Generate forecast using moving average"""
-        forecasts = []
-        recent_demands = [d["demand"] for d in historical_data[-window:]]
-
-        for i in range(periods):
-            avg_demand = sum(recent_demands) / len(recent_demands)
-            std_dev = (
-                sum((x - avg_demand) ** 2 for x in recent_demands) / len(recent_demands)
-            ) ** 0.5
-
-            forecasts.append(
-                {
-                    "period": i + 1,
-                    "demand": round(avg_demand, 2),
-                    "lower_bound": round(avg_demand - 1.96 * std_dev, 2),
-                    "upper_bound": round(avg_demand + 1.96 * std_dev, 2),
-                    "method": "moving_average",
-                    "model_params": {"window": window},
-                }
-            )
-
-            # Update recent demands (simple approach)
-            recent_demands = recent_demands[1:] + [avg_demand]
-
-        return forecasts
-
-    async def _exponential_smoothing_forecast(
-        self, historical_data: List[Dict[str, Any]], periods: int, alpha: float = 0.3
-    ) -> List[Dict[str, Any]]:
-        """Generate forecast using exponential smoothing"""
-        demands = [d["demand"] for d in historical_data]
-        forecasts = []
-
-        # Initialize
-        last_smooth = demands[0]
-
-        # Calculate smoothed values
-        for demand in demands[1:]:
-            last_smooth = alpha * demand + (1 - alpha) * last_smooth
-
-        # Generate forecasts
-        for i in range(periods):
-            forecasts.append(
-                {
-                    "period": i + 1,
-                    "demand": round(last_smooth, 2),
-                    "lower_bound": round(last_smooth * 0.8, 2),
-                    "upper_bound": round(last_smooth * 1.2, 2),
-                    "method": "exponential_smoothing",
-                    "model_params": {"alpha": alpha},
-                }
-            )
-
-        return forecasts
-
-    async def _linear_regression_forecast(
-        self, historical_data: List[Dict[str, Any]], periods: int
-    ) -> List[Dict[str, Any]]:
-        """Generate forecast using linear regression"""
-        demands = [d["demand"] for d in historical_data]
-        n = len(demands)
-
-        # Calculate linear regression coefficients
-        x_vals = list(range(n))
-        x_mean = sum(x_vals) / n
-        y_mean = sum(demands) / n
-
-        numerator = sum((i - x_mean) * (demands[i] - y_mean) for i in range(n))
-        denominator = sum((i - x_mean) ** 2 for i in range(n))
-
-        slope = numerator / denominator if denominator != 0 else 0
-        intercept = y_mean - slope * x_mean
-
-        # Generate forecasts
-        forecasts = []
-        for i in range(periods):
-            x_val = n + i
-            predicted_demand = slope * x_val + intercept
-
-            forecasts.append(
-                {
-                    "period": i + 1,
-                    "demand": round(max(predicted_demand, 0), 2),
-                    "lower_bound": round(max(predicted_demand * 0.85, 0), 2),
-                    "upper_bound": round(predicted_demand * 1.15, 2),
-                    "method": "linear_regression",
-                    "model_params": {"slope": slope, "intercept": intercept},
-                }
-            )
-
-        return forecasts
-
-    async def _simple_forecast(
-        self, historical_data: List[Dict[str, Any]], periods: int
+    def _forecast_rows(
+        self,
+        fitted: ForecastArrays,
+        method: Optional[ForecastMethod],
+        method_name: Optional[str] = None,
+        row: int = 0,
     ) -> List[Dict[str, Any]]:
-        """Simple forecast using average of recent data"""
-        recent_demands = [d["demand"] for d in historical_data[-30:]]  # Last 30 days
-        avg_demand = sum(recent_demands) / len(recent_demands)
-
-        forecasts = []
-        for i in range(periods):
-            forecasts.append(
-                {
-                    "period": i + 1,
-                    "demand": round(avg_demand, 2),
-                    "lower_bound": round(avg_demand * 0.8, 2),
-                    "upper_bound": round(avg_demand * 1.2, 2),
-                    "method": "simple_average",
-                }
+        """Per-period forecast dicts for one SKU of a fitted forecast"""
+        model_params = {
+            name: float(values[row]) for name, values in fitted.parameters.items()
+        }
+        if "window" in model_params:
+            model_params["window"] = int(model_params["window"])
+
+        return [
+            {
+                "period": period + 1,
+                "demand": round(float(demand), 2),
+                "lower_bound": round(float(lower), 2),
+                "upper_bound": round(float(upper), 2),
+                "method": method_name or method.value,
+                "model_params": model_params,
+            }
+            for period, (demand, lower, upper) in enumerate(
+                zip(
+                    fitted.demand[row],
+                    fitted.lower_bound[row],
+                    fitted.upper_bound[row],
+                )
             )
-
-        return forecasts
-
-    async def _calculate_forecast_accuracy(
-        self, historical_data: List[Dict[str, Any]], forecasts: List[Dict[str, Any]]
-    ) -> Decimal:
-        """Calculate forecast accuracy using MAPE"""
-        if not forecasts or len(forecasts) != len(historical_data):
-            return Decimal("0")
-
-        total_ape = 0
-        count = 0
-
-        for i, actual in enumerate(historical_data):
-            if i < len(forecasts) and actual["demand"] > 0:
-                forecast_val = forecasts[i]["demand"]
-                ape = abs((actual["demand"] - forecast_val) / actual["demand"]) * 100
-                total_ape += ape
-                count += 1
-
-        if count == 0:
-            return Decimal("0")
-
-        mape = 100 - (total_ape / count)  # Convert to accuracy percentage
-        return Decimal(str(round(max(mape, 0), 2)))
+        ]
 
     async def _generate_forecast_recommendations(
         self, forecasts: List[Dict[str, Any]], historical_data: List[Dict[str, Any]]
@@ -1555,6 +1986,198 @@ class InventoryManagementService:
         return recommendations
 
 
+class BatchDemandForecaster:
+    """Forecast demand for many SKUs from a single aggregate movement query
+
+    Daily demand is loaded into a (SKU x day) matrix, every model is fitted
+    with array operations across all SKUs, and DemandForecast rows are
+    written with executemany inserts per chunk of SKUs.
+    """
+
+    MODEL_VERSION = "67.1"
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def load_demand_matrix(
+        self,
+        historical_periods: int,
+        product_ids: Optional[List[uuid.UUID]] = None,
+        location_id: Optional[uuid.UUID] = None,
+        chunk_size: int = 5000,
+    ) -> DemandMatrix:
+        """Aggregate outbound movements per SKU and day in one query
+
+        Columns are the ``historical_periods`` complete days before today;
+        today's partial day is excluded.
+        """
+        end_date = datetime.utcnow().date()
+        start_date = end_date - timedelta(days=historical_periods)
+        day = func.date_trunc("day", InventoryMovement.movement_date).label("day")
+
+        query = (
+            select(
+                InventoryMovement.product_id,
+                day,
+                func.sum(func.abs(InventoryMovement.quantity)).label("demand"),
+            )
+            .where(
+                and_(
+                    InventoryMovement.movement_type.in_(
+                        [movement_type.value for movement_type in DEMAND_MOVEMENT_TYPES]
+                    ),
+                    InventoryMovement.status == "completed",
+                    InventoryMovement.movement_date
+                    >= datetime.combine(start_date, datetime.min.time()),
+                    InventoryMovement.movement_date
+                    < datetime.combine(end_date, datetime.min.time()),
+                )
+            )
+            .group_by(InventoryMovement.product_id, day)
+        )
+        if product_ids:
+            query = query.where(InventoryMovement.product_id.in_(product_ids))
+        if location_id:
+            query = query.where(InventoryMovement.location_id == location_id)
+
+        index: Dict[uuid.UUID, int] = {}
+        rows: List[int] = []
+        offsets: List[int] = []
+        demands: List[float] = []
+
+        result = await self.db.stream(query)
+        async for partition in result.partitions(chunk_size):
+            for row in partition:
+                rows.append(index.setdefault(row.product_id, len(index)))
+                offsets.append((row.day.date() - start_date).days)
+                demands.append(float(row.demand or 0))
+
+        values = np.zeros((len(index), historical_periods))
+        if index:
+            np.add.at(
+                values,
+                (np.asarray(rows), np.asarray(offsets)),
+                np.asarray(demands),
+            )
+
+        return DemandMatrix(list(index), start_date, values)
+
+    def forecast_records(
+        self,
+        matrix: DemandMatrix,
+        fitted: ForecastArrays,
+        accuracy: np.ndarray,
+        method: ForecastMethod,
+        confidence_level: Decimal,
+        location_id: Optional[uuid.UUID],
+        rows: Optional[slice] = None,
+    ) -> List[Dict[str, Any]]:
+        """DemandForecast insert parameters for a slice of SKUs"""
+        rows = rows or slice(0, len(matrix.product_ids))
+        periods = fitted.demand.shape[1]
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        forecast_dates = [today + timedelta(days=i + 1) for i in range(periods)]
+        training_period = (
+            f"{matrix.start_date.isoformat()}/"
+            f"{(matrix.start_date + timedelta(days=matrix.days - 1)).isoformat()}"
+        )
+
+        demand = np.round(fitted.demand[rows], 4).tolist()
+        lower = np.round(fitted.lower_bound[rows], 4).tolist()
+        upper = np.round(fitted.upper_bound[rows], 4).tolist()
+        scores = np.round(accuracy[rows], 2).tolist()
+        parameters = {
+            name: values[rows].tolist() for name, values in fitted.parameters.items()
+        }
+
+        records = []
+        for offset, product_id in enumerate(matrix.product_ids[rows]):
+            model_parameters = {
+                name: values[offset] for name, values in parameters.items()
+            }
+            for period in range(periods):
+                records.append(
+                    {
+                        "id": uuid.uuid4(),
+                        "product_id": product_id,
+                        "location_id": location_id,
+                        "forecast_date": forecast_dates[period],
+                        "forecast_period": "daily",
+                        "forecast_method": method.value,
+                        "forecasted_demand": Decimal(str(demand[offset][period])),
+                        "lower_bound": Decimal(str(lower[offset][period])),
+                        "upper_bound": Decimal(str(upper[offset][period])),
+                        "confidence_level": confidence_level,
+                        "forecast_accuracy": Decimal(str(scores[offset])),
+                        "model_parameters": model_parameters,
+                        "created_by_model": f"inventory_management_v67_{method.value}",
+                        "model_version": self.MODEL_VERSION,
+                        "training_data_period": training_period,
+                    }
+                )
+
+        return records
+
+    async def forecast(
+        self, request: DemandForecastBatchRequest
+    ) -> DemandForecastBatchResponse:
+        """Forecast every SKU with movement history and persist in bulk"""
+        started = time.perf_counter()
+
+        matrix = await self.load_demand_matrix(
+            request.historical_periods,
+            product_ids=request.product_ids,
+            location_id=request.location_id,
+            chunk_size=request.chunk_size,
+        )
+
+        # Require a minimum number of days with demand, as single forecasts do
+        eligible = (matrix.values > 0).sum(axis=1) >= request.min_history_days
+        skipped = int((~eligible).sum())
+        matrix = DemandMatrix(
+            [pid for pid, keep in zip(matrix.product_ids, eligible) if keep],
+            matrix.start_date,
+            matrix.values[eligible],
+        )
+
+        fitted = fit_demand_forecast(
+            matrix.values,
+            request.forecast_method,
+            request.forecast_periods,
+            z_score=confidence_z_score(request.confidence_level),
+        )
+        accuracy = backtest_accuracy(
+            matrix.values, request.forecast_method, request.forecast_periods
+        )
+
+        rows_written = 0
+        if request.persist:
+            for chunk_start in range(0, len(matrix.product_ids), request.chunk_size):
+                records = self.forecast_records(
+                    matrix,
+                    fitted,
+                    accuracy,
+                    request.forecast_method,
+                    request.confidence_level,
+                    request.location_id,
+                    slice(chunk_start, chunk_start + request.chunk_size),
+                )
+                await self.db.execute(insert(DemandForecast), records)
+                await self.db.commit()
+                rows_written += len(records)
+
+        return DemandForecastBatchResponse(
+            skus_forecast=len(matrix.product_ids),
+            skus_skipped=skipped,
+            forecast_rows_written=rows_written,
+            mean_accuracy=Decimal(
+                str(round(float(accuracy.mean()), 2) if accuracy.size else 0)
+            ),
+            forecast_method=request.forecast_method,
+            elapsed_seconds=round(time.perf_counter() - started, 3),
+        )
+
+
 # ============================================================================
 # Router Setup
 # ============================================================================
@@ -1695,6 +2318,17 @@ async def generate_demand_forecast(
     return await service.generate_demand_forecast(request)
 
 
+@router.post("/forecasts/batch", response_model=DemandForecastBatchResponse)
+async def generate_batch_demand_forecast(
+    request: DemandForecastBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Forecast demand for all (or the given) SKUs in one vectorized run"""
+    forecaster = BatchDemandForecaster(db)
+    return await forecaster.forecast(request)
+
+
 @router.get("/alerts", response_model=List[Dict[str, Any]])
 async def get_inventory_alerts(
     location_id: Optional[uuid.UUID] = Query(None),
@@ -1735,6 +2369,88 @@ async def get_inventory_alerts(
     ]
 
 
+@router.post("/reservations", response_model=ReservationLedgerResponse)
+async def create_reservation(
+    reservation: ReservationCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Reserve stock by appending to the reservation ledger"""
+    redis_client = await aioredis.from_url("redis://localhost:6379")
+    service = InventoryReservationLedgerService(db, redis_client)
+    return await service.reserve(reservation, getattr(current_user, "id", None))
+
+
+@router.post(
+    "/reservations/{reservation_id}/release", response_model=ReservationLedgerResponse
+)
+async def release_reservation(
+    reservation_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Release a reservation with a compensating ledger entry"""
+    redis_client = await aioredis.from_url("redis://localhost:6379")
+    service = InventoryReservationLedgerService(db, redis_client)
+    return await service.release(reservation_id, getattr(current_user, "id", None))
+
+
+@router.post("/reservations/compact", response_model=Dict[str, int])
+async def compact_reservations(
+    batch_size: int = Query(10000, ge=1, le=100000),
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Fold pending reservation ledger entries into inventory balances"""
+    redis_client = await aioredis.from_url("redis://localhost:6379")
+    service = InventoryReservationLedgerService(db, redis_client)
+    return await service.compact(batch_size)
+
+
+@router.post("/reservations/expire", response_model=Dict[str, int])
+async def expire_reservations(
+    batch_size: int = Query(1000, ge=1, le=100000),
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Release reservations whose expires_at has passed"""
+    redis_client = await aioredis.from_url("redis://localhost:6379")
+    service = InventoryReservationLedgerService(db, redis_client)
+    return await service.expire_reservations(batch_size)
+
+
+@router.post("/reservations/resync-gates", response_model=Dict[str, int])
+async def resync_reservation_gates(
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Re-seed reservation admission gates from balances and pending entries"""
+    redis_client = await aioredis.from_url("redis://localhost:6379")
+    service = InventoryReservationLedgerService(db, redis_client)
+    return await service.resync_gates()
+
+
+@router.get("/availability", response_model=Dict[str, Any])
+async def get_available_quantity(
+    product_id: uuid.UUID,
+    location_id: uuid.UUID,
+    lot_number: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """Get availability net of pending reservations"""
+    redis_client = await aioredis.from_url("redis://localhost:6379")
+    service = InventoryReservationLedgerService(db, redis_client)
+    available = await service.get_available_quantity(
+        product_id, location_id, lot_number
+    )
+    return {
+        "product_id": product_id,
+        "location_id": location_id,
+        "lot_number": lot_number,
+        "quantity_available": available,
+    }
+
+
 @router.get("/health", response_model=Dict[str, Any])
 async def health_check() -> None:
     """Inventory management service health check"""
@@ -1749,8 +2465,10 @@ async def health_check() -> None:
             "stock_transfers",
             "adjustments",
             "demand_forecasting",
+            "batch_demand_forecasting",
             "automated_alerts",
             "cycle_counting",
             "replenishment_rules",
+            "reservation_ledger",
         ],
     }
@@ -4,7 +4,7 @@ from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
-from app.core.exceptions import BusinessLogicError
+from app.core.exceptions import BusinessLogicError, PasswordHashingBusyError
 from app.schemas.base import MessageResponse
 from app.schemas.password_reset import (
     PasswordResetRequest,
@@ -123,3 +123,9 @@ def reset_password(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e),
         )
+    except PasswordHashingBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
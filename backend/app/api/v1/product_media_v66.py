@@ -6,18 +6,19 @@ Day 8: Product Media & File Management Implementation
 
 from __future__ import annotations
 
-import hashlib
+import asyncio
+import contextlib
 import json
+import logging
 import mimetypes
+import shutil
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 from enum import Enum
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterable, Dict, List, Optional
 
-import aiofiles
 import aioredis
-import ffmpeg
 from fastapi import (
     APIRouter,
     BackgroundTasks,
@@ -26,10 +27,10 @@ from fastapi import (
     Form,
     HTTPException,
     Query,
+    Request,
     UploadFile,
 )
 from fastapi.responses import FileResponse
-from PIL import Image, ImageOps
 from pydantic import BaseModel
 from sqlalchemy import (
     JSON,
@@ -48,12 +49,27 @@ from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import relationship, selectinload
-from sqlalchemy.sql import and_, func
+from sqlalchemy.sql import and_, delete, func, or_
 
+from app.core import database
 from app.core.config import get_settings
-from app.core.database import get_db
+from app.core.database import get_db, get_redis
 from app.core.security import get_current_user
 from app.models.base import BaseTable
+from app.services.blob_storage import (
+    BLOB_CHUNK_SIZE,
+    BlobTooLargeError,
+    ChecksumMismatchError,
+    StoredBlob,
+    UploadNotFoundError,
+    UploadOffsetError,
+    get_blob_store,
+)
+from app.services.media_processing import (
+    get_media_worker_pool,
+    render_image_variants,
+    render_video_variants,
+)
 
 # ============================================================================
 # Configuration and Constants
@@ -110,8 +126,18 @@ MEDIA_CONFIG = {
         "medium": {"width": 720, "bitrate": "1000k"},
         "high": {"width": 1080, "bitrate": "2000k"},
     },
+    # Per-job limits for the process-pool workers, in seconds
+    "job_timeouts": {"image": 60, "video": 30 * 60},
+    # Jobs claimed per worker pass and retry backoff between attempts
+    "job_batch_size": 20,
+    "job_retry_delay_seconds": 60,
+    # Background worker polling, and its backoff cap after failed passes
+    "worker_poll_interval_seconds": 5.0,
+    "worker_max_backoff_seconds": 300.0,
 }
 
+logger = logging.getLogger(__name__)
+
 # ============================================================================
 # Database Models
 # ============================================================================
@@ -379,6 +405,8 @@ class MediaStorageService:
         self.db = db
         self.redis = redis_client
         self.settings = get_settings()
+        # Uploads land here first; processing reads from this store
+        self.blob_store = get_blob_store(MEDIA_CONFIG["upload_path"])
 
     async def get_storage_backend(
         self, storage_id: Optional[uuid.UUID] = None
@@ -409,44 +437,39 @@ class MediaStorageService:
         }
 
     async def store_file(
-        self, file_content: bytes, filename: str, storage_backend: Dict[str, Any]
+        self, blob: StoredBlob, storage_backend: Dict[str, Any], content_type: str
     ) -> str:
-        """Store file using specified backend"""
+        """Store a blob from the local media store using specified backend
+
+        Blobs are keyed by their content hash, so storing the same content
+        again overwrites an identical object.
+        """
         storage_type = storage_backend["type"]
         config = storage_backend["config"]
+        source = self.blob_store.blob_path(blob.sha256)
 
         if storage_type == "local":
-            return await self._store_local(file_content, filename, config)
+            return await self._store_local(source, blob.path, config)
         elif storage_type == "s3":
-            return await self._store_s3(file_content, filename, config)
+            return await self._store_s3(source, blob.path, config, content_type)
         elif storage_type == "gcs":
-            return await self._store_gcs(file_content, filename, config)
+            return await self._store_gcs(source, blob.path, config, content_type)
         elif storage_type == "azure":
-            return await self._store_azure(file_content, filename, config)
+            return await self._store_azure(source, blob.path, config, content_type)
         else:
             raise HTTPException(status_code=500, detail="Unsupported storage backend")
 
-    async def _store_local(
-        self, file_content: bytes, filename: str, config: Dict[str, Any]
-    ) -> str:
+    async def _store_local(self, source: Path, key: str, config: Dict[str, Any]) -> str:
         """Store file locally"""
-        base_path = Path(config["base_path"])
-        base_path.mkdir(parents=True, exist_ok=True)
-
-        # Create year/month directory structure
-        now = datetime.utcnow()
-        dir_path = base_path / str(now.year) / f"{now.month:02d}"
-        dir_path.mkdir(parents=True, exist_ok=True)
-
-        file_path = dir_path / filename
-
-        async with aiofiles.open(file_path, "wb") as f:
-            await f.write(file_content)
+        target = Path(config["base_path"]) / key
+        if target != source and not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            await asyncio.to_thread(shutil.copyfile, source, target)
 
-        return str(file_path.relative_to(base_path))
+        return key
 
     async def _store_s3(
-        self, file_content: bytes, filename: str, config: Dict[str, Any]
+        self, source: Path, key: str, config: Dict[str, Any], content_type: str
     ) -> str:
         """Store file in AWS S3"""
         import boto3
@@ -458,21 +481,19 @@ class MediaStorageService:
             region_name=config.get("region", "us-east-1"),
         )
 
-        # Create year/month key structure
-        now = datetime.utcnow()
-        key = f"{now.year}/{now.month:02d}/{filename}"
-
-        s3_client.put_object(
-            Bucket=config["bucket"],
-            Key=key,
-            Body=file_content,
-            ContentType=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        # Multipart upload streamed from disk
+        await asyncio.to_thread(
+            s3_client.upload_file,
+            str(source),
+            config["bucket"],
+            key,
+            ExtraArgs={"ContentType": content_type},
         )
 
         return key
 
     async def _store_gcs(
-        self, file_content: bytes, filename: str, config: Dict[str, Any]
+        self, source: Path, key: str, config: Dict[str, Any], content_type: str
     ) -> str:
         """Store file in Google Cloud Storage"""
         from google.cloud import storage
@@ -480,50 +501,49 @@ class MediaStorageService:
         client = storage.Client.from_service_account_info(config["credentials"])
         bucket = client.bucket(config["bucket"])
 
-        # Create year/month key structure
-        now = datetime.utcnow()
-        blob_name = f"{now.year}/{now.month:02d}/{filename}"
-
-        blob = bucket.blob(blob_name)
-        blob.upload_from_string(
-            file_content,
-            content_type=mimetypes.guess_type(filename)[0]
-            or "application/octet-stream",
+        blob = bucket.blob(key)
+        blob.chunk_size = 8 * BLOB_CHUNK_SIZE  # Resumable upload from disk
+        await asyncio.to_thread(
+            blob.upload_from_filename, str(source), content_type=content_type
         )
 
-        return blob_name
+        return key
 
     async def _store_azure(
-        self, file_content: bytes, filename: str, config: Dict[str, Any]
+        self, source: Path, key: str, config: Dict[str, Any], content_type: str
     ) -> str:
         """Store file in Azure Blob Storage"""
-        from azure.storage.blob import BlobServiceClient
+        from azure.storage.blob import BlobServiceClient, ContentSettings
 
         blob_service = BlobServiceClient(
             account_url=f"https://{config['account_name']}.blob.core.windows.net",
             credential=config["account_key"],
         )
 
-        # Create year/month key structure
-        now = datetime.utcnow()
-        blob_name = f"{now.year}/{now.month:02d}/{filename}"
-
         blob_client = blob_service.get_blob_client(
-            container=config["container"], blob=blob_name
+            container=config["container"], blob=key
         )
 
-        blob_client.upload_blob(
-            file_content,
-            content_type=mimetypes.guess_type(filename)[0]
-            or "application/octet-stream",
-            overwrite=True,
-        )
+        def upload() -> None:
+            with open(source, "rb") as data:
+                blob_client.upload_blob(
+                    data,
+                    content_settings=ContentSettings(content_type=content_type),
+                    overwrite=True,
+                )
+
+        await asyncio.to_thread(upload)
 
-        return blob_name
+        return key
 
 
 class MediaProcessingService:
-    """Media processing service for images and videos"""
+    """Media processing service for images and videos
+
+    Decoding, resampling and transcoding run in the shared process pool
+    (``app.services.media_processing``); this class only records the
+    results in the database.
+    """
 
     def __init__(self, db: AsyncSession, redis_client: aioredis.Redis) -> dict:
         self.db = db
@@ -531,267 +551,244 @@ class MediaProcessingService:
 
     async def process_image(self, media_file: MediaFile) -> Dict[str, Any]:
         """Process image file and create variants"""
-        try:
-            file_path = Path(MEDIA_CONFIG["upload_path"]) / media_file.file_path
-
-            with Image.open(file_path) as img:
-                # Extract metadata
-                metadata = {
-                    "format": img.format,
-                    "mode": img.mode,
-                    "size": img.size,
-                    "has_transparency": img.mode in ("RGBA", "LA")
-                    or "transparency" in img.info,
-                }
-
-                # Extract EXIF data if available
-                if hasattr(img, "_getexif") and img._getexif():
-                    metadata["exif"] = dict(img._getexif().items())
-
-                # Update media file with dimensions and metadata
-                media_file.dimensions = {"width": img.size[0], "height": img.size[1]}
-                media_file.metadata = metadata
-
-                # Create variants
-                variants_created = []
-                for size_name, dimensions in MEDIA_CONFIG["image_sizes"].items():
-                    if size_name == "original":
-                        continue
-
-                    variant = await self._create_image_variant(
-                        media_file, img, size_name, dimensions
-                    )
-                    if variant:
-                        variants_created.append(variant)
-
-                # Update processing status
-                media_file.processing_status = ProcessingStatus.COMPLETED
-                media_file.processed_at = datetime.utcnow()
-
-                await self.db.commit()
-
-                return {
-                    "status": "success",
-                    "variants_created": len(variants_created),
-                    "metadata": metadata,
-                }
-
-        except Exception as e:
-            media_file.processing_status = ProcessingStatus.FAILED
-            media_file.processing_error = str(e)
-            await self.db.commit()
+        return await self._process(media_file)
 
-            return {"status": "error", "error": str(e)}
+    async def process_video(self, media_file: MediaFile) -> Dict[str, Any]:
+        """Process video file and create variants"""
+        return await self._process(media_file)
 
-    async def _create_image_variant(
-        self,
-        original_file: MediaFile,
-        img: Image.Image,
-        variant_name: str,
-        dimensions: tuple,
-    ) -> Optional[MediaVariant]:
-        """Create image variant with specified dimensions"""
-        try:
-            # Calculate new dimensions maintaining aspect ratio
-            resized_img = ImageOps.fit(img, dimensions, Image.Resampling.LANCZOS)
+    async def render(self, media_file: MediaFile) -> Optional[Dict[str, Any]]:
+        """Render variants in a worker process; None if nothing to render"""
+        media_root = MEDIA_CONFIG["upload_path"]
+        source_path = str(Path(media_root) / media_file.file_path)
+        stem = Path(media_file.filename).stem
+        timeouts = MEDIA_CONFIG["job_timeouts"]
 
-            # Generate variant filename
-            original_path = Path(original_file.filename)
-            variant_filename = (
-                f"{original_path.stem}_{variant_name}{original_path.suffix}"
+        if media_file.media_type == MediaType.IMAGE:
+            return await get_media_worker_pool().run(
+                render_image_variants,
+                media_root,
+                source_path,
+                stem,
+                Path(media_file.filename).suffix,
+                MEDIA_CONFIG["image_sizes"],
+                timeout=timeouts["image"],
+            )
+        if media_file.media_type == MediaType.VIDEO:
+            return await get_media_worker_pool().run(
+                render_video_variants,
+                media_root,
+                source_path,
+                stem,
+                MEDIA_CONFIG["video_qualities"],
+                timeout=timeouts["video"],
             )
+        return None
 
-            # Save variant
-            variant_path = (
-                Path(MEDIA_CONFIG["upload_path"]) / "variants" / variant_filename
+    async def apply_result(
+        self, media_file: MediaFile, result: Optional[Dict[str, Any]]
+    ) -> int:
+        """Record rendered metadata and variants; returns the variant count"""
+        now = datetime.utcnow()
+        variants = result["variants"] if result else []
+
+        if result:
+            media_file.dimensions = result["dimensions"]
+            media_file.metadata = result["metadata"]
+            if "duration" in result:
+                media_file.duration = result["duration"]
+
+            # Reprocessing replaces earlier variants (one row per variant name)
+            await self.db.execute(
+                delete(MediaVariant).where(
+                    MediaVariant.original_file_id == media_file.id
+                )
             )
-            variant_path.parent.mkdir(parents=True, exist_ok=True)
-
-            # Optimize for web
-            save_kwargs = {"optimize": True}
-            if resized_img.format == "JPEG":
-                save_kwargs["quality"] = 85
-                save_kwargs["progressive"] = True
-            elif resized_img.format == "PNG":
-                save_kwargs["compress_level"] = 6
-
-            resized_img.save(variant_path, **save_kwargs)
-
-            # Create variant record
-            variant = MediaVariant(
-                original_file_id=original_file.id,
-                variant_name=variant_name,
-                filename=variant_filename,
-                file_path=str(
-                    variant_path.relative_to(Path(MEDIA_CONFIG["upload_path"]))
-                ),
-                file_size=variant_path.stat().st_size,
-                dimensions={
-                    "width": resized_img.size[0],
-                    "height": resized_img.size[1],
-                },
-                format=resized_img.format,
-                processing_status=ProcessingStatus.COMPLETED,
-                processed_at=datetime.utcnow(),
+            self.db.add_all(
+                MediaVariant(
+                    original_file_id=media_file.id,
+                    processing_status=ProcessingStatus.COMPLETED,
+                    processed_at=now,
+                    **variant,
+                )
+                for variant in variants
             )
 
-            self.db.add(variant)
-            return variant
+        media_file.processing_status = ProcessingStatus.COMPLETED
+        media_file.processing_error = None
+        media_file.processed_at = now
+        return len(variants)
 
-        except Exception as e:
-            print(f"Error creating variant {variant_name}: {e}")
-            return None
+    def mark_failed(self, media_file: MediaFile, error: Exception) -> None:
+        media_file.processing_status = ProcessingStatus.FAILED
+        media_file.processing_error = str(error) or type(error).__name__
 
-    async def process_video(self, media_file: MediaFile) -> Dict[str, Any]:
-        """Process video file and create variants"""
+    async def _process(self, media_file: MediaFile) -> Dict[str, Any]:
         try:
-            file_path = Path(MEDIA_CONFIG["upload_path"]) / media_file.file_path
-
-            # Get video metadata using ffprobe
-            probe = ffmpeg.probe(str(file_path))
-            video_info = next(s for s in probe["streams"] if s["codec_type"] == "video")
-
-            metadata = {
-                "duration": float(probe["format"]["duration"]),
-                "bitrate": int(probe["format"]["bit_rate"]),
-                "format_name": probe["format"]["format_name"],
-                "codec": video_info["codec_name"],
-                "width": video_info["width"],
-                "height": video_info["height"],
-                "fps": eval(video_info["r_frame_rate"]),
-            }
-
-            # Update media file
-            media_file.dimensions = {
-                "width": video_info["width"],
-                "height": video_info["height"],
-            }
-            media_file.duration = int(float(probe["format"]["duration"]))
-            media_file.metadata = metadata
-
-            # Create thumbnail
-            await self._create_video_thumbnail(media_file, file_path)
-
-            # Create video variants for different qualities
-            variants_created = []
-            for quality, settings in MEDIA_CONFIG["video_qualities"].items():
-                variant = await self._create_video_variant(
-                    media_file, file_path, quality, settings
-                )
-                if variant:
-                    variants_created.append(variant)
-
-            # Update processing status
-            media_file.processing_status = ProcessingStatus.COMPLETED
-            media_file.processed_at = datetime.utcnow()
-
+            result = await self.render(media_file)
+            variants_created = await self.apply_result(media_file, result)
             await self.db.commit()
 
             return {
                 "status": "success",
-                "variants_created": len(variants_created),
-                "metadata": metadata,
+                "variants_created": variants_created,
+                "metadata": result["metadata"] if result else {},
             }
 
         except Exception as e:
-            media_file.processing_status = ProcessingStatus.FAILED
-            media_file.processing_error = str(e)
+            self.mark_failed(media_file, e)
             await self.db.commit()
 
             return {"status": "error", "error": str(e)}
 
-    async def _create_video_thumbnail(
-        self, media_file: MediaFile, video_path: Path
-    ) -> dict:
-        """Create video thumbnail"""
-        try:
-            thumbnail_filename = f"{Path(media_file.filename).stem}_thumbnail.jpg"
-            thumbnail_path = (
-                Path(MEDIA_CONFIG["upload_path"]) / "thumbnails" / thumbnail_filename
-            )
-            thumbnail_path.parent.mkdir(parents=True, exist_ok=True)
 
-            # Extract frame at 10% of video duration
-            (
-                ffmpeg.input(
-                    str(video_path),
-                    ss=media_file.duration * 0.1 if media_file.duration else 1,
-                )
-                .output(str(thumbnail_path), vframes=1, format="image2", vcodec="mjpeg")
-                .overwrite_output()
-                .run(quiet=True)
-            )
+class MediaProcessingWorker:
+    """Background worker draining queued MediaProcessingJob rows
 
-            # Create thumbnail variant record
-            thumbnail_variant = MediaVariant(
-                original_file_id=media_file.id,
-                variant_name="thumbnail",
-                filename=thumbnail_filename,
-                file_path=str(
-                    thumbnail_path.relative_to(Path(MEDIA_CONFIG["upload_path"]))
-                ),
-                file_size=thumbnail_path.stat().st_size,
-                format="JPEG",
-                processing_status=ProcessingStatus.COMPLETED,
-                processed_at=datetime.utcnow(),
+    Jobs are claimed with ``FOR UPDATE SKIP LOCKED`` so several workers can
+    share the queue. A claimed batch renders concurrently in the process pool
+    and its results are written back in one commit. Failed jobs are retried
+    after a delay until ``max_attempts``; jobs left processing by a worker
+    that died are reclaimed once their timeout has long passed.
+    """
+
+    def __init__(self, db: AsyncSession, redis_client: aioredis.Redis) -> dict:
+        self.db = db
+        self.redis = redis_client
+        self.processing_service = MediaProcessingService(db, redis_client)
+
+    async def run_once(self, batch_size: Optional[int] = None) -> Dict[str, int]:
+        """Claim and process one batch of due jobs"""
+        jobs = await self._claim_jobs(batch_size or MEDIA_CONFIG["job_batch_size"])
+        summary = {"claimed": len(jobs), "completed": 0, "retried": 0, "failed": 0}
+        if not jobs:
+            return summary
+
+        result = await self.db.execute(
+            select(MediaFile).where(
+                MediaFile.id.in_({job.media_file_id for job in jobs})
             )
+        )
+        media_files = {media_file.id: media_file for media_file in result.scalars()}
 
-            self.db.add(thumbnail_variant)
+        async def render(job: MediaProcessingJob) -> Optional[Dict[str, Any]]:
+            media_file = media_files.get(job.media_file_id)
+            if media_file is None:
+                raise LookupError("Media file not found")
+            return await self.processing_service.render(media_file)
 
-        except Exception as e:
-            print(f"Error creating video thumbnail: {e}")
+        # Only the rendering runs concurrently; the session is used serially
+        results = await asyncio.gather(
+            *(render(job) for job in jobs), return_exceptions=True
+        )
+
+        now = datetime.utcnow()
+        for job, outcome in zip(jobs, results):
+            media_file = media_files.get(job.media_file_id)
+
+            if not isinstance(outcome, Exception):
+                try:
+                    variants_created = await self.processing_service.apply_result(
+                        media_file, outcome
+                    )
+                except Exception as e:
+                    outcome = e
+
+            if isinstance(outcome, Exception):
+                job.error_message = str(outcome) or type(outcome).__name__
+                if job.attempts < job.max_attempts and media_file is not None:
+                    job.status = ProcessingStatus.PENDING
+                    job.scheduled_at = now + timedelta(
+                        seconds=MEDIA_CONFIG["job_retry_delay_seconds"] * job.attempts
+                    )
+                    summary["retried"] += 1
+                else:
+                    job.status = ProcessingStatus.FAILED
+                    job.completed_at = now
+                    if media_file is not None:
+                        self.processing_service.mark_failed(media_file, outcome)
+                    summary["failed"] += 1
+                continue
 
-    async def _create_video_variant(
+            job.status = ProcessingStatus.COMPLETED
+            job.completed_at = now
+            job.progress_percentage = 100
+            job.current_step = None
+            job.error_message = None
+            job.result_data = {"variants_created": variants_created}
+            summary["completed"] += 1
+
+        await self.db.commit()
+        return summary
+
+    async def run_forever(
         self,
-        original_file: MediaFile,
-        video_path: Path,
-        quality: str,
-        settings: Dict[str, Any],
-    ) -> Optional[MediaVariant]:
-        """Create video variant with specified quality"""
-        try:
-            variant_filename = f"{Path(original_file.filename).stem}_{quality}.mp4"
-            variant_path = (
-                Path(MEDIA_CONFIG["upload_path"]) / "variants" / variant_filename
-            )
-            variant_path.parent.mkdir(parents=True, exist_ok=True)
-
-            # Transcode video
-            (
-                ffmpeg.input(str(video_path))
-                .output(
-                    str(variant_path),
-                    vcodec="h264",
-                    acodec="aac",
-                    vf=f"scale={settings['width']}:-2",
-                    video_bitrate=settings["bitrate"],
-                    preset="medium",
-                    crf=23,
+        poll_interval: float = MEDIA_CONFIG["worker_poll_interval_seconds"],
+        max_backoff: float = MEDIA_CONFIG["worker_max_backoff_seconds"],
+    ) -> None:
+        """Process jobs until cancelled
+
+        Uploads push to the Redis ``media_processing_queue`` list; it only
+        wakes the worker early, the job rows remain the source of truth.
+        A pass that fails outright (database or Redis down) is rolled back
+        and retried after a delay that doubles up to ``max_backoff``; jobs
+        it had claimed are reclaimed once stale.
+        """
+        failures = 0
+        while True:
+            try:
+                summary = await self.run_once()
+                failures = 0
+                if not summary["claimed"]:
+                    await self.redis.brpop(
+                        "media_processing_queue", timeout=poll_interval
+                    )
+            except Exception:
+                failures += 1
+                logger.exception("Media processing pass failed")
+                with contextlib.suppress(Exception):
+                    await self.db.rollback()
+                await asyncio.sleep(
+                    min(poll_interval * 2 ** (failures - 1), max_backoff)
                 )
-                .overwrite_output()
-                .run(quiet=True)
-            )
 
-            # Create variant record
-            variant = MediaVariant(
-                original_file_id=original_file.id,
-                variant_name=quality,
-                filename=variant_filename,
-                file_path=str(
-                    variant_path.relative_to(Path(MEDIA_CONFIG["upload_path"]))
-                ),
-                file_size=variant_path.stat().st_size,
-                format="MP4",
-                processing_status=ProcessingStatus.COMPLETED,
-                processed_at=datetime.utcnow(),
+    async def _claim_jobs(self, batch_size: int) -> List[MediaProcessingJob]:
+        now = datetime.utcnow()
+        stale_before = now - timedelta(
+            seconds=2 * max(MEDIA_CONFIG["job_timeouts"].values())
+        )
+
+        result = await self.db.execute(
+            select(MediaProcessingJob)
+            .where(
+                or_(
+                    and_(
+                        MediaProcessingJob.status == ProcessingStatus.PENDING,
+                        MediaProcessingJob.scheduled_at <= now,
+                    ),
+                    and_(
+                        MediaProcessingJob.status == ProcessingStatus.PROCESSING,
+                        MediaProcessingJob.started_at <= stale_before,
+                    ),
+                )
             )
+            .order_by(
+                MediaProcessingJob.priority.desc(), MediaProcessingJob.scheduled_at
+            )
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        jobs = list(result.scalars().all())
 
-            self.db.add(variant)
-            return variant
+        for job in jobs:
+            job.status = ProcessingStatus.PROCESSING
+            job.started_at = now
+            job.attempts = (job.attempts or 0) + 1
+            job.current_step = "rendering"
 
-        except Exception as e:
-            print(f"Error creating video variant {quality}: {e}")
-            return None
+        # Release the row locks straight away
+        await self.db.commit()
+        return jobs
 
 
 class MediaManagementService:
@@ -809,26 +806,95 @@ class MediaManagementService:
         user_id: Optional[uuid.UUID] = None,
         access_level: str = "public",
     ) -> MediaUploadResponse:
-        """Upload and process media file"""
+        """Upload and process media file
+
+        The upload is streamed to disk in chunks and hashed on the way, so
+        large videos never sit in worker memory.
+        """
         # Validate file
         await self._validate_upload(file)
 
-        # Read file content
-        file_content = await file.read()
-        file_size = len(file_content)
+        try:
+            blob = await self.storage_service.blob_store.store_upload(
+                file, MEDIA_CONFIG["max_file_size"]
+            )
+        except BlobTooLargeError:
+            raise HTTPException(status_code=413, detail="File too large")
 
-        # Generate unique filename
-        file_extension = Path(file.filename).suffix
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
+        return await self._register_upload(
+            blob, file.filename, file.content_type, user_id, access_level
+        )
 
-        # Calculate file hash and checksum
-        file_hash = hashlib.sha256(file_content).hexdigest()
-        checksum = hashlib.md5(file_content).hexdigest()
+    async def start_upload(self) -> Dict[str, Any]:
+        """Start a resumable upload"""
+        upload_id = self.storage_service.blob_store.start_upload()
+        return {"upload_id": upload_id, "offset": 0, "chunk_size": BLOB_CHUNK_SIZE}
 
+    async def get_upload_offset(self, upload_id: str) -> Dict[str, Any]:
+        """Bytes received so far for a resumable upload"""
+        try:
+            offset = self.storage_service.blob_store.upload_offset(upload_id)
+        except UploadNotFoundError:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        return {"upload_id": upload_id, "offset": offset}
+
+    async def append_upload(
+        self, upload_id: str, offset: int, chunks: AsyncIterable[bytes]
+    ) -> Dict[str, Any]:
+        """Append a chunk to a resumable upload"""
+        try:
+            new_offset = await self.storage_service.blob_store.append_chunk(
+                upload_id, offset, chunks, MEDIA_CONFIG["max_file_size"]
+            )
+        except UploadNotFoundError:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        except UploadOffsetError as e:
+            raise HTTPException(
+                status_code=409,
+                detail={"message": str(e), "offset": e.expected_offset},
+            )
+        except BlobTooLargeError:
+            raise HTTPException(status_code=413, detail="File too large")
+        return {"upload_id": upload_id, "offset": new_offset}
+
+    async def complete_upload(
+        self,
+        upload_id: str,
+        filename: str,
+        content_type: str,
+        user_id: Optional[uuid.UUID] = None,
+        access_level: str = "public",
+        sha256: Optional[str] = None,
+    ) -> MediaUploadResponse:
+        """Finish a resumable upload and register it as a media file"""
+        self._check_upload(filename, content_type)
+
+        try:
+            blob = await self.storage_service.blob_store.complete_upload(
+                upload_id, sha256
+            )
+        except UploadNotFoundError:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        except ChecksumMismatchError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+        return await self._register_upload(
+            blob, filename, content_type, user_id, access_level
+        )
+
+    async def _register_upload(
+        self,
+        blob: StoredBlob,
+        filename: str,
+        content_type: str,
+        user_id: Optional[uuid.UUID],
+        access_level: str,
+    ) -> MediaUploadResponse:
+        """Create the media file record for stored content"""
         # Check for duplicate files
-        existing_query = select(MediaFile).where(MediaFile.file_hash == file_hash)
+        existing_query = select(MediaFile).where(MediaFile.file_hash == blob.sha256)
         existing_result = await self.db.execute(existing_query)
-        existing_file = existing_result.scalar_one_or_none()
+        existing_file = existing_result.scalars().first()
 
         if existing_file:
             return MediaUploadResponse(
@@ -841,29 +907,33 @@ class MediaManagementService:
                 cdn_url=existing_file.cdn_url,
             )
 
+        # Generate unique filename
+        file_extension = Path(filename).suffix
+        unique_filename = f"{uuid.uuid4()}{file_extension}"
+
         # Get storage backend
         storage_backend = await self.storage_service.get_storage_backend()
 
         # Store file
         file_path = await self.storage_service.store_file(
-            file_content, unique_filename, storage_backend
+            blob, storage_backend, content_type
         )
 
         # Determine media type
-        media_type = self._determine_media_type(file.content_type)
+        media_type = self._determine_media_type(content_type)
 
         # Create media file record
         media_file = MediaFile(
-            original_filename=file.filename,
+            original_filename=filename,
             filename=unique_filename,
             file_path=file_path,
-            file_size=file_size,
-            mime_type=file.content_type,
+            file_size=blob.size,
+            mime_type=content_type,
             media_type=media_type,
             access_level=access_level,
             upload_user_id=user_id,
-            file_hash=file_hash,
-            checksum=checksum,
+            file_hash=blob.sha256,
+            checksum=blob.md5,
             processing_status=ProcessingStatus.PENDING,
         )
 
@@ -884,18 +954,23 @@ class MediaManagementService:
         )
 
     async def _validate_upload(self, file: UploadFile) -> dict:
-        """Validate uploaded file"""
-        if not file.filename:
+        """Validate uploaded file
+
+        The declared size is checked up front; the actual size is enforced
+        while the upload is streamed.
+        """
+        self._check_upload(file.filename, file.content_type, file.size)
+
+    def _check_upload(
+        self, filename: str, content_type: str, size: Optional[int] = None
+    ) -> None:
+        if not filename:
             raise HTTPException(status_code=400, detail="No filename provided")
 
         # Check file size
-        file_content = await file.read()
-        if len(file_content) > MEDIA_CONFIG["max_file_size"]:
+        if size is not None and size > MEDIA_CONFIG["max_file_size"]:
             raise HTTPException(status_code=413, detail="File too large")
 
-        # Reset file position
-        await file.seek(0)
-
         # Check content type
         allowed_types = (
             MEDIA_CONFIG["allowed_image_types"]
@@ -903,7 +978,7 @@ class MediaManagementService:
             + MEDIA_CONFIG["allowed_document_types"]
         )
 
-        if file.content_type not in allowed_types:
+        if content_type not in allowed_types:
             raise HTTPException(status_code=415, detail="File type not supported")
 
     def _determine_media_type(self, mime_type: str) -> str:
@@ -1141,6 +1216,66 @@ async def upload_media(
     return await service.upload_file(file, user_id, access_level)
 
 
+@router.post("/uploads", response_model=Dict[str, Any])
+async def start_resumable_upload(
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Start a resumable upload for a large media file"""
+    redis_client = await aioredis.from_url("redis://localhost:6379")
+    service = MediaManagementService(db, redis_client)
+
+    return await service.start_upload()
+
+
+@router.get("/uploads/{upload_id}", response_model=Dict[str, Any])
+async def get_resumable_upload(
+    upload_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Get the offset to resume an interrupted upload from"""
+    redis_client = await aioredis.from_url("redis://localhost:6379")
+    service = MediaManagementService(db, redis_client)
+
+    return await service.get_upload_offset(upload_id)
+
+
+@router.put("/uploads/{upload_id}", response_model=Dict[str, Any])
+async def append_resumable_upload(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Append the request body to a resumable upload at the given offset"""
+    redis_client = await aioredis.from_url("redis://localhost:6379")
+    service = MediaManagementService(db, redis_client)
+
+    return await service.append_upload(upload_id, offset, request.stream())
+
+
+@router.post("/uploads/{upload_id}/complete", response_model=MediaUploadResponse)
+async def complete_resumable_upload(
+    upload_id: str,
+    filename: str = Form(...),
+    content_type: str = Form(...),
+    access_level: str = Form(default="public"),
+    sha256: Optional[str] = Form(default=None),
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Complete a resumable upload and create the media file"""
+    redis_client = await aioredis.from_url("redis://localhost:6379")
+    service = MediaManagementService(db, redis_client)
+
+    user_id = current_user.get("id") if current_user else None
+    return await service.complete_upload(
+        upload_id, filename, content_type, user_id, access_level, sha256
+    )
+
+
 @router.get("/search", response_model=Dict[str, Any])
 async def search_media(
     media_type: Optional[MediaType] = Query(None),
@@ -1197,18 +1332,22 @@ async def associate_product_media(
 
 
 @router.get("/serve/{file_path:path}")
-async def serve_media(file_path: str) -> dict:
-    """Serve media file"""
+async def serve_media(file_path: str, db: AsyncSession = Depends(get_db)) -> dict:
+    """Serve media file (supports HTTP range requests)"""
     full_path = Path(MEDIA_CONFIG["upload_path"]) / file_path
 
     if not full_path.exists():
         raise HTTPException(status_code=404, detail="File not found")
 
-    return FileResponse(
-        full_path,
-        media_type=mimetypes.guess_type(str(full_path))[0]
-        or "application/octet-stream",
-    )
+    media_type = mimetypes.guess_type(str(full_path))[0]
+    if not media_type:
+        # Content-addressed originals are stored without an extension
+        result = await db.execute(
+            select(MediaFile.mime_type).where(MediaFile.file_path == file_path).limit(1)
+        )
+        media_type = result.scalar_one_or_none()
+
+    return FileResponse(full_path, media_type=media_type or "application/octet-stream")
 
 
 @router.post("/process/{media_id}", response_model=Dict[str, Any])
@@ -1232,6 +1371,48 @@ async def process_media(
     }
 
 
+_media_worker: Optional[asyncio.Task] = None
+
+
+@router.on_event("startup")
+async def start_media_worker() -> None:
+    """Drain queued media jobs in the background of the serving app"""
+    global _media_worker
+    if database.AsyncSessionLocal is None:
+        logger.info("No async database; media jobs run through POST /jobs/run")
+        return
+    _media_worker = asyncio.create_task(_run_media_worker())
+
+
+async def _run_media_worker() -> None:
+    async with database.AsyncSessionLocal() as db:
+        await MediaProcessingWorker(db, get_redis()).run_forever()
+
+
+@router.on_event("shutdown")
+async def stop_media_worker() -> None:
+    global _media_worker
+    task, _media_worker = _media_worker, None
+    if task is None:
+        return
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
+
+
+@router.post("/jobs/run", response_model=Dict[str, int])
+async def run_processing_jobs(
+    batch_size: int = Query(default=MEDIA_CONFIG["job_batch_size"], ge=1, le=500),
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Process one batch of queued media jobs in the worker pool"""
+    redis_client = await aioredis.from_url("redis://localhost:6379")
+    worker = MediaProcessingWorker(db, redis_client)
+
+    return await worker.run_once(batch_size)
+
+
 @router.get("/health", response_model=Dict[str, Any])
 async def health_check() -> None:
     """Media service health check"""
@@ -1242,8 +1423,11 @@ async def health_check() -> None:
         "timestamp": datetime.utcnow().isoformat(),
         "features": [
             "file_upload",
+            "resumable_upload",
+            "content_addressed_storage",
             "image_processing",
             "video_processing",
+            "process_pool_workers",
             "variant_generation",
             "cdn_integration",
             "bulk_operations",
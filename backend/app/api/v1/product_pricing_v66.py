@@ -6,11 +6,15 @@ Day 8: Product Pricing & Discount Management Implementation
 
 from __future__ import annotations
 
+import asyncio
+import time
 import uuid
+from bisect import bisect_right
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from decimal import Decimal
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
 
 import aioredis
 from fastapi import APIRouter, Depends, HTTPException
@@ -28,6 +32,7 @@ from sqlalchemy import (
     String,
     Text,
     UniqueConstraint,
+    text,
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -437,6 +442,7 @@ class PromotionalCampaignCreate(BaseModel):
 class PriceCalculationRequest(BaseModel):
     product_id: uuid.UUID
     customer_id: Optional[uuid.UUID] = None
+    customer_group: Optional[str] = Field(None, max_length=100)
     quantity: int = Field(..., ge=1)
     discount_codes: Optional[List[str]] = None
     campaign_id: Optional[uuid.UUID] = None
@@ -460,6 +466,359 @@ class BulkPricingResponse(BaseModel):
     order_level_discounts: List[Dict[str, Any]]
 
 
+# ============================================================================
+# Compiled Pricing Rule Index
+# ============================================================================
+
+
+def _id_set(values: Optional[List[Any]]) -> Optional[FrozenSet[str]]:
+    """Normalize a JSON id list into a frozenset of strings"""
+    if values is None:
+        return None
+    return frozenset(str(value) for value in values)
+
+
+@dataclass(frozen=True)
+class CompiledPricingRule:
+    """Pricing rule with its JSON conditions pre-interpreted for fast matching"""
+
+    id: Any
+    name: str
+    rule_type: str
+    priority: int
+    sequence: int
+    payload: Dict[str, Any]
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    include_products: Optional[FrozenSet[str]] = None
+    exclude_products: FrozenSet[str] = frozenset()
+    include_categories: Optional[FrozenSet[str]] = None
+    exclude_categories: FrozenSet[str] = frozenset()
+    include_customers: Optional[FrozenSet[str]] = None
+    exclude_customers: FrozenSet[str] = frozenset()
+    include_customer_groups: Optional[FrozenSet[str]] = None
+    exclude_customer_groups: FrozenSet[str] = frozenset()
+    min_quantity: int = 1
+    max_quantity: Optional[int] = None
+    days_of_week: Optional[FrozenSet[int]] = None
+    hour_range: Optional[Tuple[int, int]] = None
+
+    @classmethod
+    def compile(cls, rule: PricingRule, sequence: int = 0) -> "CompiledPricingRule":
+        """Interpret rule conditions once so lookups only do set/range checks"""
+        conditions = rule.conditions or {}
+        products = conditions.get("products", {})
+        categories = conditions.get("categories", {})
+        customers = conditions.get("customers", {})
+        customer_groups = conditions.get("customer_groups", {})
+        quantity = conditions.get("quantity", {})
+        time_condition = conditions.get("time", {})
+
+        hour_range = None
+        if "hour_range" in time_condition:
+            hour_range = (
+                int(time_condition["hour_range"]["start"]),
+                int(time_condition["hour_range"]["end"]),
+            )
+
+        days_of_week = None
+        if "day_of_week" in time_condition:
+            days_of_week = frozenset(int(d) for d in time_condition["day_of_week"])
+
+        return cls(
+            id=rule.id,
+            name=rule.name,
+            rule_type=rule.rule_type,
+            priority=rule.priority or 0,
+            sequence=sequence,
+            payload={
+                "id": rule.id,
+                "name": rule.name,
+                "rule_type": rule.rule_type,
+                "conditions": rule.conditions,
+                "actions": rule.actions,
+                "priority": rule.priority,
+            },
+            start_date=rule.start_date,
+            end_date=rule.end_date,
+            include_products=_id_set(products.get("include")),
+            exclude_products=_id_set(products.get("exclude")) or frozenset(),
+            include_categories=_id_set(categories.get("include")),
+            exclude_categories=_id_set(categories.get("exclude")) or frozenset(),
+            include_customers=_id_set(customers.get("include")),
+            exclude_customers=_id_set(customers.get("exclude")) or frozenset(),
+            include_customer_groups=_id_set(customer_groups.get("include")),
+            exclude_customer_groups=_id_set(customer_groups.get("exclude"))
+            or frozenset(),
+            min_quantity=int(quantity.get("min", 1)),
+            max_quantity=int(quantity["max"]) if "max" in quantity else None,
+            days_of_week=days_of_week,
+            hour_range=hour_range,
+        )
+
+    def matches(
+        self,
+        product_id: str,
+        category_id: Optional[str],
+        customer_id: Optional[str],
+        customer_group: Optional[str],
+        quantity: int,
+        now: datetime,
+    ) -> bool:
+        """Check every condition of the rule against a lookup context"""
+        if self.start_date and self.start_date > now:
+            return False
+        if self.end_date and self.end_date <= now:
+            return False
+
+        if (
+            self.include_products is not None
+            and product_id not in self.include_products
+        ):
+            return False
+        if product_id in self.exclude_products:
+            return False
+
+        if self.include_categories is not None and (
+            category_id is None or category_id not in self.include_categories
+        ):
+            return False
+        if category_id is not None and category_id in self.exclude_categories:
+            return False
+
+        if quantity < self.min_quantity:
+            return False
+        if self.max_quantity is not None and quantity > self.max_quantity:
+            return False
+
+        # Customer conditions only apply to identified customers
+        if customer_id is not None:
+            if (
+                self.include_customers is not None
+                and customer_id not in self.include_customers
+            ):
+                return False
+            if customer_id in self.exclude_customers:
+                return False
+
+        if self.include_customer_groups is not None and (
+            customer_group is None or customer_group not in self.include_customer_groups
+        ):
+            return False
+        if (
+            customer_group is not None
+            and customer_group in self.exclude_customer_groups
+        ):
+            return False
+
+        if self.days_of_week is not None and now.weekday() not in self.days_of_week:
+            return False
+        if self.hour_range is not None and not (
+            self.hour_range[0] <= now.hour <= self.hour_range[1]
+        ):
+            return False
+
+        return True
+
+
+class QuantityBreakpoints:
+    """Rules of one index bucket pre-partitioned by quantity breakpoints"""
+
+    def __init__(self, rules: List[CompiledPricingRule]) -> None:
+        bounds = set()
+        for rule in rules:
+            bounds.add(rule.min_quantity)
+            if rule.max_quantity is not None:
+                bounds.add(rule.max_quantity + 1)
+
+        self.breakpoints: List[int] = sorted(bounds)
+        self.bands: List[Tuple[CompiledPricingRule, ...]] = []
+        for start in self.breakpoints:
+            self.bands.append(
+                tuple(
+                    rule
+                    for rule in rules
+                    if rule.min_quantity <= start
+                    and (rule.max_quantity is None or start <= rule.max_quantity)
+                )
+            )
+
+    def rules_for(self, quantity: int) -> Tuple[CompiledPricingRule, ...]:
+        """Return rules whose quantity range contains the given quantity"""
+        position = bisect_right(self.breakpoints, quantity) - 1
+        if position < 0:
+            return ()
+        return self.bands[position]
+
+
+@dataclass
+class PricingRuleIndex:
+    """In-memory index of active pricing rules keyed by their selective dimension"""
+
+    by_product: Dict[str, QuantityBreakpoints] = field(default_factory=dict)
+    by_category: Dict[str, QuantityBreakpoints] = field(default_factory=dict)
+    by_customer_group: Dict[str, QuantityBreakpoints] = field(default_factory=dict)
+    generic: QuantityBreakpoints = field(
+        default_factory=lambda: QuantityBreakpoints([])
+    )
+    rule_count: int = 0
+    built_at: datetime = field(default_factory=datetime.utcnow)
+
+    @classmethod
+    def build(cls, rules: List[PricingRule]) -> "PricingRuleIndex":
+        """Compile rules and place each one in exactly one bucket"""
+        compiled = [
+            CompiledPricingRule.compile(rule, sequence)
+            for sequence, rule in enumerate(
+                sorted(rules, key=lambda r: -(r.priority or 0))
+            )
+        ]
+
+        by_product: Dict[str, List[CompiledPricingRule]] = {}
+        by_category: Dict[str, List[CompiledPricingRule]] = {}
+        by_customer_group: Dict[str, List[CompiledPricingRule]] = {}
+        generic: List[CompiledPricingRule] = []
+
+        for rule in compiled:
+            if rule.include_products is not None:
+                for product_id in rule.include_products:
+                    by_product.setdefault(product_id, []).append(rule)
+            elif rule.include_categories is not None:
+                for category_id in rule.include_categories:
+                    by_category.setdefault(category_id, []).append(rule)
+            elif rule.include_customer_groups is not None:
+                for group in rule.include_customer_groups:
+                    by_customer_group.setdefault(group, []).append(rule)
+            else:
+                generic.append(rule)
+
+        return cls(
+            by_product={k: QuantityBreakpoints(v) for k, v in by_product.items()},
+            by_category={k: QuantityBreakpoints(v) for k, v in by_category.items()},
+            by_customer_group={
+                k: QuantityBreakpoints(v) for k, v in by_customer_group.items()
+            },
+            generic=QuantityBreakpoints(generic),
+            rule_count=len(compiled),
+        )
+
+    def lookup(
+        self,
+        product_id: uuid.UUID,
+        quantity: int,
+        category_id: Optional[Any] = None,
+        customer_id: Optional[uuid.UUID] = None,
+        customer_group: Optional[str] = None,
+        now: Optional[datetime] = None,
+    ) -> List[CompiledPricingRule]:
+        """Return matching rules ordered by priority (highest first)"""
+        now = now or datetime.utcnow()
+        product_key = str(product_id)
+        category_key = str(category_id) if category_id is not None else None
+        customer_key = str(customer_id) if customer_id is not None else None
+
+        candidates: List[CompiledPricingRule] = list(self.generic.rules_for(quantity))
+        bucket = self.by_product.get(product_key)
+        if bucket:
+            candidates.extend(bucket.rules_for(quantity))
+        if category_key is not None:
+            bucket = self.by_category.get(category_key)
+            if bucket:
+                candidates.extend(bucket.rules_for(quantity))
+        if customer_group is not None:
+            bucket = self.by_customer_group.get(customer_group)
+            if bucket:
+                candidates.extend(bucket.rules_for(quantity))
+
+        matched = [
+            rule
+            for rule in candidates
+            if rule.matches(
+                product_key, category_key, customer_key, customer_group, quantity, now
+            )
+        ]
+        matched.sort(key=lambda rule: rule.sequence)
+        return matched
+
+
+class PricingRuleCache:
+    """Process-local pricing rule index invalidated through a Redis version counter"""
+
+    VERSION_KEY = "pricing:rules:version"
+
+    def __init__(
+        self, version_check_interval: float = 1.0, max_age: float = 300.0
+    ) -> None:
+        self.version_check_interval = version_check_interval
+        self.max_age = max_age
+        self._index: Optional[PricingRuleIndex] = None
+        self._version: Optional[int] = None
+        self._built_at = 0.0
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get_index(
+        self, db: AsyncSession, redis_client: aioredis.Redis
+    ) -> PricingRuleIndex:
+        """Return the current index, rebuilding it when the version moved on"""
+        now = time.monotonic()
+        if self._is_fresh(now) and now - self._checked_at < self.version_check_interval:
+            return self._index
+
+        version = await self._read_version(redis_client)
+        if self._is_fresh(now) and version == self._version:
+            self._checked_at = now
+            return self._index
+
+        async with self._lock:
+            # Another coroutine may have rebuilt while we waited
+            if self._is_fresh(time.monotonic()) and version == self._version:
+                return self._index
+
+            rules = await self._load_rules(db)
+            self._index = PricingRuleIndex.build(rules)
+            self._version = version
+            self._built_at = self._checked_at = time.monotonic()
+            return self._index
+
+    async def invalidate(self, redis_client: aioredis.Redis) -> None:
+        """Drop the local index and bump the shared version for other workers"""
+        self._index = None
+        self._version = None
+        try:
+            await redis_client.incr(self.VERSION_KEY)
+        except Exception:
+            # Other workers fall back to max_age expiry when Redis is unavailable
+            pass
+
+    def _is_fresh(self, now: float) -> bool:
+        return self._index is not None and now - self._built_at < self.max_age
+
+    async def _read_version(self, redis_client: aioredis.Redis) -> Optional[int]:
+        try:
+            value = await redis_client.get(self.VERSION_KEY)
+        except Exception:
+            return self._version
+        return int(value) if value is not None else 0
+
+    async def _load_rules(self, db: AsyncSession) -> List[PricingRule]:
+        # Future rules are loaded too; start/end dates are checked per lookup
+        query = select(PricingRule).where(
+            and_(
+                PricingRule.is_active,
+                or_(
+                    PricingRule.end_date.is_(None),
+                    PricingRule.end_date > datetime.utcnow(),
+                ),
+            )
+        )
+        result = await db.execute(query)
+        return list(result.scalars().all())
+
+
+pricing_rule_cache = PricingRuleCache()
+
+
 # ============================================================================
 # Service Classes
 # ============================================================================
@@ -468,9 +827,15 @@ class BulkPricingResponse(BaseModel):
 class PricingEngine:
     """Advanced pricing engine with dynamic pricing capabilities"""
 
-    def __init__(self, db: AsyncSession, redis_client: aioredis.Redis) -> dict:
+    def __init__(
+        self,
+        db: AsyncSession,
+        redis_client: aioredis.Redis,
+        rule_cache: Optional[PricingRuleCache] = None,
+    ) -> dict:
         self.db = db
         self.redis = redis_client
+        self.rule_cache = rule_cache or pricing_rule_cache
 
     async def calculate_product_price(
         self,
@@ -479,12 +844,13 @@ class PricingEngine:
         quantity: int = 1,
         discount_codes: Optional[List[str]] = None,
         campaign_id: Optional[uuid.UUID] = None,
+        customer_group: Optional[str] = None,
     ) -> PriceCalculationResponse:
         """Calculate final product price with all applicable discounts"""
 
         # Get base product price (assuming products table exists)
         base_price_query = text("""
-            SELECT base_price, compare_at_price, cost_price
+            SELECT base_price, compare_at_price, cost_price, category_id
             FROM products
             WHERE id = :product_id
         """)
@@ -521,7 +887,11 @@ class PricingEngine:
 
         # Step 2: Apply pricing rules
         pricing_rules = await self._get_applicable_pricing_rules(
-            product_id, customer_id, quantity
+            product_id,
+            customer_id,
+            quantity,
+            category_id=product_data.category_id,
+            customer_group=customer_group,
         )
         for rule in pricing_rules:
             rule_discount = await self._apply_pricing_rule(
@@ -599,7 +969,9 @@ class PricingEngine:
             total_discount += bulk_discount
 
         # Ensure price doesn't go below cost price (if configured)
-        min_price = await self._get_minimum_price(product_id)
+        min_price = (
+            Decimal(str(product_data.cost_price)) if product_data.cost_price else None
+        )
         if min_price and current_price < min_price:
             adjustment = min_price - current_price
             total_discount -= adjustment
@@ -670,104 +1042,23 @@ class PricingEngine:
         return None
 
     async def _get_applicable_pricing_rules(
-        self, product_id: uuid.UUID, customer_id: Optional[uuid.UUID], quantity: int
-    ) -> List[Dict[str, Any]]:
-        """Get applicable pricing rules"""
-        query = (
-            select(PricingRule)
-            .where(
-                and_(
-                    PricingRule.is_active,
-                    or_(
-                        PricingRule.start_date.is_(None),
-                        PricingRule.start_date <= datetime.utcnow(),
-                    ),
-                    or_(
-                        PricingRule.end_date.is_(None),
-                        PricingRule.end_date > datetime.utcnow(),
-                    ),
-                )
-            )
-            .order_by(PricingRule.priority.desc())
-        )
-
-        result = await self.db.execute(query)
-        rules = result.scalars().all()
-
-        applicable_rules = []
-        for rule in rules:
-            if await self._evaluate_rule_conditions(
-                rule, product_id, customer_id, quantity
-            ):
-                applicable_rules.append(
-                    {
-                        "id": rule.id,
-                        "name": rule.name,
-                        "rule_type": rule.rule_type,
-                        "conditions": rule.conditions,
-                        "actions": rule.actions,
-                        "priority": rule.priority,
-                    }
-                )
-
-        return applicable_rules
-
-    async def _evaluate_rule_conditions(
         self,
-        rule: PricingRule,
         product_id: uuid.UUID,
         customer_id: Optional[uuid.UUID],
         quantity: int,
-    ) -> bool:
-        """Evaluate if pricing rule conditions are met"""
-        if not rule.conditions:
-            return True
-
-        conditions = rule.conditions
-
-        # Check product conditions
-        if "products" in conditions:
-            product_condition = conditions["products"]
-            if "include" in product_condition:
-                if str(product_id) not in product_condition["include"]:
-                    return False
-            if "exclude" in product_condition:
-                if str(product_id) in product_condition["exclude"]:
-                    return False
-
-        # Check quantity conditions
-        if "quantity" in conditions:
-            qty_condition = conditions["quantity"]
-            if "min" in qty_condition and quantity < qty_condition["min"]:
-                return False
-            if "max" in qty_condition and quantity > qty_condition["max"]:
-                return False
-
-        # Check customer conditions
-        if customer_id and "customers" in conditions:
-            customer_condition = conditions["customers"]
-            if "include" in customer_condition:
-                if str(customer_id) not in customer_condition["include"]:
-                    return False
-            if "exclude" in customer_condition:
-                if str(customer_id) in customer_condition["exclude"]:
-                    return False
-
-        # Check time-based conditions
-        if "time" in conditions:
-            time_condition = conditions["time"]
-            current_time = datetime.utcnow()
-
-            if "day_of_week" in time_condition:
-                if current_time.weekday() not in time_condition["day_of_week"]:
-                    return False
-
-            if "hour_range" in time_condition:
-                hour_range = time_condition["hour_range"]
-                if not (hour_range["start"] <= current_time.hour <= hour_range["end"]):
-                    return False
-
-        return True
+        category_id: Optional[Any] = None,
+        customer_group: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Get applicable pricing rules from the compiled in-process index"""
+        index = await self.rule_cache.get_index(self.db, self.redis)
+        rules = index.lookup(
+            product_id,
+            quantity,
+            category_id=category_id,
+            customer_id=customer_id,
+            customer_group=customer_group,
+        )
+        return [dict(rule.payload) for rule in rules]
 
     async def _apply_pricing_rule(
         self, rule: Dict[str, Any], current_price: Decimal, quantity: int
@@ -1052,20 +1343,6 @@ class PricingEngine:
 
         return best_discount
 
-    async def _get_minimum_price(self, product_id: uuid.UUID) -> Optional[Decimal]:
-        """Get minimum allowed price for product"""
-        min_price_query = text("""
-            SELECT cost_price FROM products WHERE id = :product_id
-        """)
-
-        result = await self.db.execute(min_price_query, {"product_id": product_id})
-        product_data = result.fetchone()
-
-        if product_data and product_data.cost_price:
-            return Decimal(str(product_data.cost_price))
-
-        return None
-
     async def calculate_bulk_pricing(
         self, items: List[PriceCalculationRequest]
     ) -> BulkPricingResponse:
@@ -1082,6 +1359,7 @@ class PricingEngine:
                 quantity=item.quantity,
                 discount_codes=item.discount_codes,
                 campaign_id=item.campaign_id,
+                customer_group=item.customer_group,
             )
 
             product_prices.append(price_result)
@@ -1197,6 +1475,7 @@ async def calculate_price(
         quantity=request.quantity,
         discount_codes=request.discount_codes,
         campaign_id=request.campaign_id,
+        customer_group=request.customer_group,
     )
 
 
@@ -1259,6 +1538,9 @@ async def create_pricing_rule(
     await db.commit()
     await db.refresh(rule)
 
+    redis_client = await aioredis.from_url("redis://localhost:6379")
+    await pricing_rule_cache.invalidate(redis_client)
+
     return {"id": rule.id, "name": rule.name, "status": "created"}
 
 
@@ -1277,5 +1559,6 @@ async def health_check() -> None:
             "customer_specific_pricing",
             "bulk_pricing",
             "pricing_rules",
+            "compiled_rule_index",
         ],
     }
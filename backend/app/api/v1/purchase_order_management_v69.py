@@ -10,7 +10,7 @@ import uuid
 from datetime import datetime
 from decimal import Decimal
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
 import aioredis
 from fastapi import APIRouter, Depends, HTTPException, Query
@@ -34,6 +34,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import relationship, selectinload
 
 from app.core.database import Base, get_db
+from app.services.document_numbers import (
+    GLOBAL_SCOPE,
+    GOODS_RECEIPT,
+    PURCHASE_ORDER,
+    PURCHASE_REQUISITION,
+    document_numbers,
+)
 
 
 # Enums
@@ -1071,24 +1078,41 @@ class PurchaseOrderManagementService:
     # Helper Methods
     async def _generate_po_number(self) -> str:
         """Generate unique purchase order number"""
-        today = datetime.utcnow().strftime("%Y%m%d")
-        counter = await self.redis.incr(f"po_counter_{today}")
-        await self.redis.expire(f"po_counter_{today}", 86400)  # 24 hours
-        return f"PO-{today}-{counter:06d}"
+        today = datetime.utcnow()
+        return await document_numbers.next_number_async(
+            PURCHASE_ORDER,
+            GLOBAL_SCOPE,
+            on=today,
+            seed=self._redis_counter_seed(f"po_counter_{today:%Y%m%d}"),
+        )
 
     async def _generate_requisition_number(self) -> str:
         """Generate unique requisition number"""
-        today = datetime.utcnow().strftime("%Y%m%d")
-        counter = await self.redis.incr(f"req_counter_{today}")
-        await self.redis.expire(f"req_counter_{today}", 86400)
-        return f"REQ-{today}-{counter:06d}"
+        today = datetime.utcnow()
+        return await document_numbers.next_number_async(
+            PURCHASE_REQUISITION,
+            GLOBAL_SCOPE,
+            on=today,
+            seed=self._redis_counter_seed(f"req_counter_{today:%Y%m%d}"),
+        )
 
     async def _generate_receipt_number(self) -> str:
         """Generate unique receipt number"""
-        today = datetime.utcnow().strftime("%Y%m%d")
-        counter = await self.redis.incr(f"receipt_counter_{today}")
-        await self.redis.expire(f"receipt_counter_{today}", 86400)
-        return f"GRN-{today}-{counter:06d}"
+        today = datetime.utcnow()
+        return await document_numbers.next_number_async(
+            GOODS_RECEIPT,
+            GLOBAL_SCOPE,
+            on=today,
+            seed=self._redis_counter_seed(f"receipt_counter_{today:%Y%m%d}"),
+        )
+
+    def _redis_counter_seed(self, counter_key: str) -> Callable[[], Awaitable[int]]:
+        """Numbers issued today by the Redis counter the sequence replaced"""
+
+        async def issued() -> int:
+            return int(await self.redis.get(counter_key) or 0)
+
+        return issued
 
     def _calculate_po_totals(
         self, lines: List[PurchaseOrderLineBase]
@@ -5,6 +5,7 @@ Comprehensive reporting system with real-time dashboards, business intelligence,
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 from datetime import datetime, timedelta
@@ -18,8 +19,15 @@ from pydantic import BaseModel, Field, validator
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core import database
 from app.core.database import get_db
 from app.core.exceptions import BusinessLogicError, NotFoundError
+from app.services.dashboard_widgets import (
+    DEFAULT_WIDGET_CONCURRENCY,
+    WidgetCache,
+    resolve_widgets,
+    widget_query,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -292,12 +300,32 @@ class BusinessIntelligenceInsight(BaseModel):
     generated_at: datetime
 
 
+# Widget data shared by every dashboard in this process
+_widget_cache = WidgetCache()
+
+
+def _window_start(days: int) -> datetime:
+    """Midnight ``days`` days ago, so the same window gives the same query."""
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=days)
+
+
 # Core Business Logic Classes
 class DashboardEngine:
     """Real-time dashboard management engine"""
 
-    def __init__(self, db: AsyncSession) -> dict:
+    def __init__(
+        self,
+        db: AsyncSession,
+        session_factory: Optional[Any] = None,
+        widget_concurrency: int = DEFAULT_WIDGET_CONCURRENCY,
+    ) -> dict:
         self.db = db
+        # Data queries run on sessions of their own when a factory is
+        # available; otherwise they take turns on the request's session
+        self.session_factory = session_factory
+        self.widget_concurrency = widget_concurrency
+        self._db_lock = asyncio.Lock()
 
     async def create_dashboard_widget(
         self, request: DashboardWidgetRequest, user_id: UUID
@@ -379,33 +407,41 @@ class DashboardEngine:
                 "last_updated": datetime.utcnow(),
             }
 
-            # Load data for each widget
-            for widget in widgets:
-                widget_request = DashboardWidgetRequest(
-                    widget_id=UUID(widget.id),
-                    title=widget.title,
-                    chart_type=ChartType(widget.chart_type),
-                    data_source=widget.data_source,
-                    metrics=json.loads(widget.metrics),
-                    dimensions=json.loads(widget.dimensions or "[]"),
-                    filters=json.loads(widget.filters or "{}"),
-                    time_range=widget.time_range,
-                    refresh_interval=widget.refresh_interval,
-                    position=json.loads(widget.position or "{}"),
-                )
-
-                widget_data = await self._generate_widget_data(widget_request)
+            # Load widget data concurrently, reusing data still fresh
+            async def load(widget: Any) -> Dict[str, Any]:
+                cache_key = (widget.id, widget.updated_at)
+                widget_data = _widget_cache.get(cache_key)
+                if widget_data is None:
+                    widget_request = DashboardWidgetRequest(
+                        widget_id=UUID(widget.id),
+                        title=widget.title,
+                        chart_type=ChartType(widget.chart_type),
+                        data_source=widget.data_source,
+                        metrics=json.loads(widget.metrics),
+                        dimensions=json.loads(widget.dimensions or "[]"),
+                        filters=json.loads(widget.filters or "{}"),
+                        time_range=widget.time_range,
+                        refresh_interval=widget.refresh_interval,
+                        position=json.loads(widget.position or "{}"),
+                    )
+                    widget_data = await self._generate_widget_data(widget_request)
+                    if "error" not in widget_data:
+                        _widget_cache.put(
+                            cache_key, widget_data, widget.refresh_interval or 0
+                        )
+
+                return {
+                    "widget_id": widget.id,
+                    "title": widget.title,
+                    "chart_type": widget.chart_type,
+                    "data": widget_data,
+                    "position": json.loads(widget.position or "{}"),
+                    "last_updated": widget.updated_at,
+                }
 
-                dashboard_data["widgets"].append(
-                    {
-                        "widget_id": widget.id,
-                        "title": widget.title,
-                        "chart_type": widget.chart_type,
-                        "data": widget_data,
-                        "position": json.loads(widget.position or "{}"),
-                        "last_updated": widget.updated_at,
-                    }
-                )
+            dashboard_data["widgets"] = await resolve_widgets(
+                widgets, load, self.widget_concurrency
+            )
 
             return dashboard_data
 
@@ -434,6 +470,26 @@ class DashboardEngine:
             logger.error(f"Error generating widget data: {str(e)}")
             return {"error": f"Failed to generate data: {str(e)}"}
 
+    async def _fetch_rows(
+        self, query: str, params: Optional[Dict[str, Any]] = None
+    ) -> List[Any]:
+        """Run a widget data query, sharing it with widgets running the same one"""
+        params = params or {}
+        key = (query, tuple(sorted(params.items())))
+        return await widget_query(key, lambda: self._run_query(query, params))
+
+    async def _run_query(self, query: str, params: Dict[str, Any]) -> List[Any]:
+        session_factory = self.session_factory or database.AsyncSessionLocal
+        if session_factory is not None:
+            async with session_factory() as session:
+                result = await session.execute(text(query), params)
+                return result.fetchall()
+
+        # An AsyncSession runs one statement at a time
+        async with self._db_lock:
+            result = await self.db.execute(text(query), params)
+            return result.fetchall()
+
     async def _generate_sales_data(
         self, request: DashboardWidgetRequest
     ) -> Dict[str, Any]:
@@ -451,9 +507,7 @@ class DashboardEngine:
             LIMIT 30
         """
 
-        start_date = datetime.utcnow() - timedelta(days=30)
-        result = await self.db.execute(text(base_query), {"start_date": start_date})
-        rows = result.fetchall()
+        rows = await self._fetch_rows(base_query, {"start_date": _window_start(30)})
 
         data = {
             "labels": [row.date.strftime("%Y-%m-%d") for row in rows],
@@ -497,8 +551,7 @@ class DashboardEngine:
             LIMIT 20
         """
 
-        result = await self.db.execute(text(base_query))
-        rows = result.fetchall()
+        rows = await self._fetch_rows(base_query)
 
         data = {"labels": [row.product_name for row in rows], "datasets": []}
 
@@ -538,9 +591,7 @@ class DashboardEngine:
             LIMIT 30
         """
 
-        start_date = datetime.utcnow() - timedelta(days=30)
-        result = await self.db.execute(text(base_query), {"start_date": start_date})
-        rows = result.fetchall()
+        rows = await self._fetch_rows(base_query, {"start_date": _window_start(30)})
 
         data = {
             "labels": [row.registration_date.strftime("%Y-%m-%d") for row in rows],
@@ -223,6 +223,21 @@ def get_warehouse_utilization(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
 
+@router.post("/utilization/refresh")
+def refresh_warehouse_utilization(
+    warehouse_ids: Optional[List[str]] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """全倉庫の利用率を一括再計算"""
+    warehouse_crud = WarehouseCRUD(db)
+    updated = warehouse_crud.refresh_utilization(warehouse_ids)
+    return {
+        "updated_count": updated,
+        "calculated_at": datetime.utcnow().isoformat(),
+    }
+
+
 @router.get("/by-code/{warehouse_code}", response_model=WarehouseResponse)
 def get_warehouse_by_code(
     warehouse_code: str,
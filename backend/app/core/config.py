@@ -127,6 +127,15 @@ class Settings(BaseSettings):
     LOG_LEVEL: str = "INFO"
     API_V1_PREFIX: str = "/api/v1"
 
+    # Document search backend: auto (by database dialect), postgres or memory
+    DOCUMENT_SEARCH_BACKEND: str = "auto"
+
+    # Root of the content-addressed document file store
+    DOCUMENT_STORAGE_PATH: str = "/app/storage/documents"
+
+    # Largest document file accepted, uploaded whole or in resumable chunks
+    DOCUMENT_MAX_FILE_SIZE: int = 100 * 1024 * 1024
+
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=True)
 
 
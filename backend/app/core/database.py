@@ -1,5 +1,6 @@
 from collections.abc import AsyncGenerator, Generator
 
+import redis.asyncio as aioredis
 from sqlalchemy import create_engine
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
@@ -18,6 +19,9 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 async_engine = None
 AsyncSessionLocal = None
 
+# Shared Redis client, connected on first command
+_redis_client: aioredis.Redis | None = None
+
 
 def get_db() -> Generator[Session]:
     db = SessionLocal()
@@ -52,6 +56,14 @@ async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+def get_redis() -> aioredis.Redis:
+    """Get the shared asynchronous Redis client."""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _redis_client
+
+
 def test_database_connection() -> bool:
     """Test database connectivity for health checks."""
     try:
@@ -87,7 +87,7 @@ def get_current_session(
     from app.services.session_service import SessionService
 
     session_service = SessionService(db)
-    session = session_service.get_session_by_token(token)
+    session = session_service.get_cached_session(token)
 
     if not session or not session.is_active:
         raise HTTPException(
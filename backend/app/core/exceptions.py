@@ -13,6 +13,10 @@ class InvalidTokenError(AuthenticationError):
     """Raised when a token is invalid."""
 
 
+class PasswordHashingBusyError(Exception):
+    """Raised when the password hashing pool is saturated."""
+
+
 class AuthorizationError(Exception):
     """Raised when user lacks required permissions."""
 
@@ -3,14 +3,18 @@ Feature Flag Management System for ITDO ERP
 Provides dynamic feature toggling, A/B testing, and progressive rollouts
 """
 
+import asyncio
 import hashlib
 import json
+import time
+from collections import defaultdict
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from enum import Enum
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
 
-import redis
+import redis.asyncio as redis
 from sqlalchemy import Boolean, Column, DateTime, String, Text
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -90,14 +94,53 @@ class FeatureFlag(Base):
     updated_by = Column(String(255))
 
 
+@lru_cache(maxsize=65536)
+def _rollout_bucket(value: str) -> int:
+    """Stable 0-99 bucket for percentage rollouts"""
+    return int.from_bytes(hashlib.md5(value.encode()).digest(), "big") % 100
+
+
 class FeatureFlagService:
-    """Service for managing and evaluating feature flags"""
+    """Service for managing and evaluating feature flags
+
+    Flags are evaluated in-process against a snapshot of every flag config.
+    Writers store configs in one Redis hash, bump a version counter and
+    publish the version; each process reloads its snapshot when it sees a
+    newer version, and checks the version periodically in case a
+    notification was missed. Evaluation counts are kept in memory and
+    flushed to Redis in the background.
+    """
+
+    FLAGS_KEY = "feature_flags"
+    VERSION_KEY = "feature_flags:version"
+    UPDATES_CHANNEL = "feature_flags:updates"
+    SYNC_INTERVAL = 5.0  # seconds between analytics flushes and version checks
+
+    # Strategy-specific fields filled in from a matching rule when the flag
+    # itself does not set them
+    RULE_FIELDS = ("percentage", "user_ids", "organization_ids", "roles")
+
+    # Constant result or evaluator method per strategy; others use the rules
+    STRATEGY_EVALUATORS = {
+        FeatureFlagStrategy.ALL_ON: True,
+        FeatureFlagStrategy.ALL_OFF: False,
+        FeatureFlagStrategy.PERCENTAGE: "_evaluate_percentage",
+        FeatureFlagStrategy.USER_LIST: "_evaluate_user_list",
+        FeatureFlagStrategy.USER_PERCENTAGE: "_evaluate_user_percentage",
+        FeatureFlagStrategy.ORGANIZATION: "_evaluate_organization",
+        FeatureFlagStrategy.ROLE_BASED: "_evaluate_role_based",
+        FeatureFlagStrategy.GRADUAL_ROLLOUT: "_evaluate_gradual_rollout",
+    }
 
     def __init__(self, redis_client: Optional[redis.Redis] = None) -> dict:
         self.redis = redis_client or get_redis()
         self.settings = get_settings()
-        self.cache_ttl = 300  # 5 minutes default cache
         self.flag_prefix = "feature_flag:"
+        self.version: Optional[int] = None
+        self._flags: Dict[str, Dict[str, Any]] = {}
+        self._evaluations: Dict[tuple, int] = defaultdict(int)
+        self._variants: Dict[tuple, int] = defaultdict(int)
+        self._sync_task: Optional[asyncio.Task] = None
 
     async def get_flag(self, key: str, context: FeatureFlagContext) -> bool:
         """
@@ -111,33 +154,46 @@ class FeatureFlagService:
             bool: Whether the feature is enabled
         """
         try:
-            # Try cache first
-            cached_result = await self._get_cached_evaluation(key, context)
-            if cached_result is not None:
-                return cached_result
-
-            # Get flag configuration
-            flag_config = await self._get_flag_config(key)
-            if not flag_config:
-                # Flag doesn't exist, return default (False)
-                return False
-
-            # Evaluate flag
-            result = await self._evaluate_flag(flag_config, context)
-
-            # Cache result
-            await self._cache_evaluation(key, context, result)
-
-            # Log evaluation for analytics
-            await self._log_evaluation(key, context, result)
-
-            return result
+            if self.version is None:
+                await self.refresh()
+                self._start_sync()
+            return self.evaluate(key, context)
 
         except Exception as e:
             # Fail safe: return False on any error
             print(f"Feature flag evaluation error for {key}: {str(e)}")
             return False
 
+    def evaluate(self, key: str, context: FeatureFlagContext) -> bool:
+        """Evaluate a flag against the local snapshot without I/O"""
+        flag_config = self._flags.get(key)
+        if flag_config is None:
+            # Flag doesn't exist, return default (False)
+            return False
+
+        result = self._evaluate_flag(flag_config, context)
+        self._evaluations[key, result] += 1
+        return result
+
+    async def refresh(self) -> None:
+        """Load the snapshot of all flag configs"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.get(self.VERSION_KEY)
+            pipe.hgetall(self.FLAGS_KEY)
+            version, configs = await pipe.execute()
+
+        self._apply_snapshot(
+            int(version or 0),
+            {_decode(k): json.loads(v) for k, v in configs.items()},
+        )
+
+    async def close(self) -> None:
+        """Stop background sync and flush pending analytics"""
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            self._sync_task = None
+        await self.flush_analytics()
+
     async def set_flag(
         self,
         key: str,
@@ -165,30 +221,16 @@ class FeatureFlagService:
             "updated_at": datetime.now(timezone.utc).isoformat(),
         }
 
-        # Store in Redis
-        await self.redis.setex(
-            f"{self.flag_prefix}{key}", self.cache_ttl, json.dumps(flag_config)
-        )
-
-        # Invalidate evaluation cache
-        await self._invalidate_flag_cache(key)
+        await self._publish_flag(key, flag_config)
 
     async def delete_flag(self, key: str) -> None:
         """Delete a feature flag"""
-        await self.redis.delete(f"{self.flag_prefix}{key}")
-        await self._invalidate_flag_cache(key)
+        await self._publish_flag(key, None)
 
     async def list_flags(self) -> List[Dict[str, Any]]:
         """List all feature flags"""
-        keys = await self.redis.keys(f"{self.flag_prefix}*")
-        flags = []
-
-        for key in keys:
-            flag_data = await self.redis.get(key)
-            if flag_data:
-                flags.append(json.loads(flag_data))
-
-        return flags
+        configs = await self.redis.hgetall(self.FLAGS_KEY)
+        return [json.loads(config) for config in configs.values()]
 
     async def get_flag_status(self, key: str) -> Optional[Dict[str, Any]]:
         """Get detailed status of a feature flag"""
@@ -225,13 +267,13 @@ class FeatureFlagService:
 
         # Use consistent hashing for stable assignment
         hash_input = f"{key}:{context.user_id}"
-        hash_value = int(hashlib.md5(hash_input.encode()).hexdigest(), 16)
+        hash_value = int.from_bytes(hashlib.md5(hash_input.encode()).digest(), "big")
         variant_index = hash_value % len(variants)
 
         selected_variant = variants[variant_index]
 
         # Log variant assignment
-        await self._log_variant_assignment(key, context, selected_variant)
+        self._log_variant_assignment(key, context, selected_variant)
 
         return selected_variant
 
@@ -279,57 +321,141 @@ class FeatureFlagService:
         flag_config["rules"] = rules
         flag_config["updated_at"] = datetime.now(timezone.utc).isoformat()
 
-        await self.redis.setex(
-            f"{self.flag_prefix}{key}", self.cache_ttl, json.dumps(flag_config)
-        )
-
-        await self._invalidate_flag_cache(key)
+        await self._publish_flag(key, flag_config)
 
     # Private helper methods
     async def _get_flag_config(self, key: str) -> Optional[Dict[str, Any]]:
-        """Get flag configuration from cache/storage"""
-        cached_config = await self.redis.get(f"{self.flag_prefix}{key}")
-        if cached_config:
-            return json.loads(cached_config)
+        """Get flag configuration from storage"""
+        flag_config = await self.redis.hget(self.FLAGS_KEY, key)
+        if flag_config:
+            return json.loads(flag_config)
         return None
 
-    async def _evaluate_flag(
+    async def _publish_flag(
+        self, key: str, flag_config: Optional[Dict[str, Any]]
+    ) -> None:
+        """Store or delete a flag config and notify every process"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if flag_config is None:
+                pipe.hdel(self.FLAGS_KEY, key)
+            else:
+                pipe.hset(self.FLAGS_KEY, key, json.dumps(flag_config))
+            pipe.incr(self.VERSION_KEY)
+            _, version = await pipe.execute()
+
+        await self.redis.publish(self.UPDATES_CHANNEL, version)
+
+        # Read our own write without waiting for the notification
+        if self.version is not None and version == self.version + 1:
+            flags = dict(self._flags)
+            if flag_config is None:
+                flags.pop(key, None)
+            else:
+                flags[key] = self._prepare_flag(json.loads(json.dumps(flag_config)))
+            self._flags = flags
+            self.version = version
+
+    def _apply_snapshot(self, version: int, configs: Dict[str, Dict[str, Any]]) -> None:
+        """Replace the local snapshot unless it is older than the current one"""
+        if self.version is not None and version < self.version:
+            return
+        self._flags = {key: self._prepare_flag(c) for key, c in configs.items()}
+        self.version = version
+
+    def _prepare_flag(self, flag_config: Dict[str, Any]) -> Dict[str, Any]:
+        """Precompute lookups so evaluation needs no parsing or list scans"""
+        strategy = flag_config.get("strategy", FeatureFlagStrategy.ALL_OFF)
+        rules = [self._prepare_rule(rule) for rule in flag_config.get("rules", [])]
+
+        for field_name in self.RULE_FIELDS:
+            if flag_config.get(field_name) is None:
+                for rule in rules:
+                    if rule.get("strategy") == strategy and rule.get(field_name):
+                        flag_config[field_name] = rule[field_name]
+                        break
+
+        for field_name in ("user_ids", "organization_ids", "roles"):
+            if flag_config.get(field_name) is not None:
+                flag_config[field_name] = frozenset(flag_config[field_name])
+
+        flag_config["rules"] = rules
+        flag_config["evaluator"] = self.STRATEGY_EVALUATORS.get(
+            strategy, "_evaluate_rules"
+        )
+        return flag_config
+
+    def _prepare_rule(self, rule: Dict[str, Any]) -> Dict[str, Any]:
+        rule = dict(rule)
+        for field_name in ("start_time", "end_time"):
+            if isinstance(rule.get(field_name), str):
+                rule[field_name] = datetime.fromisoformat(rule[field_name])
+        for field_name in ("user_ids", "organization_ids", "roles"):
+            if rule.get(field_name) is not None:
+                rule[field_name] = frozenset(rule[field_name])
+        return rule
+
+    def _start_sync(self) -> None:
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.create_task(self._run_sync())
+
+    async def _run_sync(self) -> None:
+        """Follow version notifications and flush analytics until cancelled"""
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.UPDATES_CHANNEL)
+                # Catch up on anything published before the subscription
+                await self.refresh()
+                next_flush = time.monotonic() + self.SYNC_INTERVAL
+
+                while True:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True,
+                        timeout=max(next_flush - time.monotonic(), 0),
+                    )
+                    if message and int(message["data"]) > (self.version or 0):
+                        await self.refresh()
+
+                    if time.monotonic() >= next_flush:
+                        await self.flush_analytics()
+                        version = await self.redis.get(self.VERSION_KEY)
+                        if int(version or 0) > (self.version or 0):
+                            await self.refresh()
+                        next_flush = time.monotonic() + self.SYNC_INTERVAL
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Feature flag sync error: {str(e)}")
+                await asyncio.sleep(self.SYNC_INTERVAL)
+            finally:
+                await pubsub.aclose()
+
+    def _evaluate_flag(
         self, flag_config: Dict[str, Any], context: FeatureFlagContext
     ) -> bool:
         """Evaluate flag based on configuration and context"""
         if not flag_config.get("enabled", False):
             return False
 
-        strategy = flag_config.get("strategy", FeatureFlagStrategy.ALL_OFF)
-        rules = flag_config.get("rules", [])
-
         # Environment check
-        environments = flag_config.get("environments", {})
+        environments = flag_config.get("environments")
         if context.environment and environments:
             env_config = environments.get(context.environment)
             if env_config is not None and not env_config.get("enabled", True):
                 return False
 
-        # Strategy-based evaluation
-        if strategy == FeatureFlagStrategy.ALL_ON:
-            return True
-        elif strategy == FeatureFlagStrategy.ALL_OFF:
-            return False
-        elif strategy == FeatureFlagStrategy.PERCENTAGE:
-            return self._evaluate_percentage(flag_config, context)
-        elif strategy == FeatureFlagStrategy.USER_LIST:
-            return self._evaluate_user_list(flag_config, context)
-        elif strategy == FeatureFlagStrategy.USER_PERCENTAGE:
-            return self._evaluate_user_percentage(flag_config, context)
-        elif strategy == FeatureFlagStrategy.ORGANIZATION:
-            return self._evaluate_organization(flag_config, context)
-        elif strategy == FeatureFlagStrategy.ROLE_BASED:
-            return self._evaluate_role_based(flag_config, context)
-        elif strategy == FeatureFlagStrategy.GRADUAL_ROLLOUT:
-            return self._evaluate_gradual_rollout(flag_config, context)
-
-        # Evaluate custom rules
-        for rule in rules:
+        # Strategy-based evaluation, resolved when the snapshot was loaded
+        evaluator = flag_config["evaluator"]
+        if isinstance(evaluator, bool):
+            return evaluator
+        return getattr(self, evaluator)(flag_config, context)
+
+    def _evaluate_rules(
+        self, flag_config: Dict[str, Any], context: FeatureFlagContext
+    ) -> bool:
+        """Evaluate custom rules"""
+        for rule in flag_config.get("rules", []):
             if self._evaluate_rule(rule, context):
                 return True
 
@@ -339,7 +465,7 @@ class FeatureFlagService:
         self, flag_config: Dict[str, Any], context: FeatureFlagContext
     ) -> bool:
         """Evaluate percentage-based flag"""
-        percentage = flag_config.get("percentage", 0.0)
+        percentage = flag_config.get("percentage") or 0.0
         if percentage <= 0:
             return False
         if percentage >= 100:
@@ -347,8 +473,7 @@ class FeatureFlagService:
 
         # Use request IP or user ID for consistent hashing
         hash_input = context.request_ip or context.user_id or "anonymous"
-        hash_value = int(hashlib.md5(hash_input.encode()).hexdigest(), 16)
-        return (hash_value % 100) < percentage
+        return _rollout_bucket(hash_input) < percentage
 
     def _evaluate_user_percentage(
         self, flag_config: Dict[str, Any], context: FeatureFlagContext
@@ -357,27 +482,26 @@ class FeatureFlagService:
         if not context.user_id:
             return False
 
-        percentage = flag_config.get("percentage", 0.0)
+        percentage = flag_config.get("percentage") or 0.0
         if percentage <= 0:
             return False
         if percentage >= 100:
             return True
 
-        hash_value = int(hashlib.md5(context.user_id.encode()).hexdigest(), 16)
-        return (hash_value % 100) < percentage
+        return _rollout_bucket(context.user_id) < percentage
 
     def _evaluate_user_list(
         self, flag_config: Dict[str, Any], context: FeatureFlagContext
     ) -> bool:
         """Evaluate user list-based flag"""
-        user_ids = flag_config.get("user_ids", [])
+        user_ids = flag_config.get("user_ids") or ()
         return context.user_id in user_ids if context.user_id else False
 
     def _evaluate_organization(
         self, flag_config: Dict[str, Any], context: FeatureFlagContext
     ) -> bool:
         """Evaluate organization-based flag"""
-        organization_ids = flag_config.get("organization_ids", [])
+        organization_ids = flag_config.get("organization_ids") or ()
         return (
             context.organization_id in organization_ids
             if context.organization_id
@@ -388,9 +512,8 @@ class FeatureFlagService:
         self, flag_config: Dict[str, Any], context: FeatureFlagContext
     ) -> bool:
         """Evaluate role-based flag"""
-        required_roles = flag_config.get("roles", [])
-        user_roles = context.user_roles or []
-        return bool(set(required_roles) & set(user_roles))
+        required_roles = flag_config.get("roles") or ()
+        return any(role in required_roles for role in context.user_roles or ())
 
     def _evaluate_gradual_rollout(
         self, flag_config: Dict[str, Any], context: FeatureFlagContext
@@ -404,14 +527,14 @@ class FeatureFlagService:
             return False
 
         # Time-based evaluation
-        now = datetime.now(timezone.utc)
         start_time = rule.get("start_time")
         end_time = rule.get("end_time")
-
-        if start_time and now < datetime.fromisoformat(start_time):
-            return False
-        if end_time and now > datetime.fromisoformat(end_time):
-            return False
+        if start_time or end_time:
+            now = datetime.now(timezone.utc)
+            if start_time and now < start_time:
+                return False
+            if end_time and now > end_time:
+                return False
 
         strategy = rule.get("strategy")
         if strategy == FeatureFlagStrategy.USER_LIST:
@@ -436,82 +559,53 @@ class FeatureFlagService:
             "metadata": rule.metadata,
         }
 
-    # Caching methods
-    async def _get_cached_evaluation(
-        self, key: str, context: FeatureFlagContext
-    ) -> Optional[bool]:
-        """Get cached evaluation result"""
-        cache_key = self._get_evaluation_cache_key(key, context)
-        cached_result = await self.redis.get(cache_key)
-        return json.loads(cached_result) if cached_result else None
-
-    async def _cache_evaluation(
-        self, key: str, context: FeatureFlagContext, result: bool
-    ) -> None:
-        """Cache evaluation result"""
-        cache_key = self._get_evaluation_cache_key(key, context)
-        await self.redis.setex(cache_key, 60, json.dumps(result))  # 1 minute cache
-
-    def _get_evaluation_cache_key(self, key: str, context: FeatureFlagContext) -> str:
-        """Generate cache key for evaluation"""
-        context_hash = hashlib.md5(
-            f"{context.user_id}:{context.organization_id}:{context.environment}".encode()
-        ).hexdigest()[:8]
-        return f"ff_eval:{key}:{context_hash}"
-
-    async def _invalidate_flag_cache(self, key: str) -> None:
-        """Invalidate all cached evaluations for a flag"""
-        pattern = f"ff_eval:{key}:*"
-        keys = await self.redis.keys(pattern)
-        if keys:
-            await self.redis.delete(*keys)
-
     # Analytics methods
-    async def _log_evaluation(
-        self, key: str, context: FeatureFlagContext, result: bool
-    ) -> None:
-        """Log feature flag evaluation for analytics"""
-        log_entry = {
-            "flag_key": key,
-            "result": result,
-            "user_id": context.user_id,
-            "organization_id": context.organization_id,
-            "environment": context.environment,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-        }
-
-        # Store in analytics queue
-        await self.redis.lpush("ff_analytics", json.dumps(log_entry))
-        await self.redis.ltrim("ff_analytics", 0, 10000)  # Keep last 10k events
-
-    async def _log_variant_assignment(
+    def _log_variant_assignment(
         self, key: str, context: FeatureFlagContext, variant: str
     ) -> None:
-        """Log A/B test variant assignment"""
-        log_entry = {
-            "flag_key": key,
-            "variant": variant,
-            "user_id": context.user_id,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-        }
+        """Count A/B test variant assignment"""
+        self._variants[key, variant] += 1
+
+    async def flush_analytics(self) -> None:
+        """Add locally counted evaluations to the shared counters"""
+        evaluations, self._evaluations = self._evaluations, defaultdict(int)
+        variants, self._variants = self._variants, defaultdict(int)
+        if not evaluations and not variants:
+            return
 
-        await self.redis.lpush("ff_variants", json.dumps(log_entry))
-        await self.redis.ltrim("ff_variants", 0, 10000)
+        now = datetime.now(timezone.utc).isoformat()
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for (key, result), count in evaluations.items():
+                    stats_key = f"ff_stats:{key}"
+                    pipe.hincrby(stats_key, "total_evaluations", count)
+                    if result:
+                        pipe.hincrby(stats_key, "enabled_count", count)
+                    pipe.hset(stats_key, "last_evaluated", now)
+                for (key, variant), count in variants.items():
+                    pipe.hincrby(f"ff_variants:{key}", variant, count)
+                await pipe.execute()
+        except Exception:
+            # Keep the counts for the next flush
+            for counts, pending in (
+                (self._evaluations, evaluations),
+                (self._variants, variants),
+            ):
+                for count_key, count in pending.items():
+                    counts[count_key] += count
+            raise
 
     async def _get_flag_statistics(self, key: str) -> Dict[str, Any]:
         """Get evaluation statistics for a flag"""
-        # This would typically query a more robust analytics store
-        analytics_data = await self.redis.lrange("ff_analytics", 0, -1)
+        stats = await self.redis.hgetall(f"ff_stats:{key}")
 
-        total_evaluations = 0
-        enabled_count = 0
-
-        for entry_json in analytics_data:
-            entry = json.loads(entry_json)
-            if entry["flag_key"] == key:
-                total_evaluations += 1
-                if entry["result"]:
-                    enabled_count += 1
+        # Include counts not flushed yet
+        pending_enabled = self._evaluations.get((key, True), 0)
+        pending_disabled = self._evaluations.get((key, False), 0)
+        total_evaluations = (
+            int(stats.get("total_evaluations", 0)) + pending_enabled + pending_disabled
+        )
+        enabled_count = int(stats.get("enabled_count", 0)) + pending_enabled
 
         return {
             "total_evaluations": total_evaluations,
@@ -522,15 +616,12 @@ class FeatureFlagService:
         }
 
     async def _get_last_evaluation_time(self, key: str) -> Optional[str]:
-        """Get timestamp of last evaluation"""
-        analytics_data = await self.redis.lrange("ff_analytics", 0, 100)
+        """Get time of the last analytics flush that included the flag"""
+        return await self.redis.hget(f"ff_stats:{key}", "last_evaluated")
 
-        for entry_json in analytics_data:
-            entry = json.loads(entry_json)
-            if entry["flag_key"] == key:
-                return entry["timestamp"]
 
-        return None
+def _decode(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else value
 
 
 # Singleton service instance
@@ -1,15 +1,15 @@
 """Enhanced monitoring and observability for ITDO ERP System."""
 
 import asyncio
+import random
 import time
-from collections.abc import Awaitable, Callable, Generator
+from collections.abc import Callable, Generator
 from contextlib import contextmanager
 from datetime import datetime, timedelta
 from functools import wraps
 from typing import Any, TypeVar
 
 import structlog
-from fastapi import Request, Response
 from opentelemetry import trace
 from opentelemetry.exporter.jaeger.thrift import JaegerExporter
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
@@ -18,7 +18,7 @@ from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
 from prometheus_client import Counter, Gauge, Histogram, generate_latest
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 # Configure structured logging
 structlog.configure(
@@ -84,75 +84,84 @@ BUSINESS_METRICS = {
 }
 
 
-class MonitoringMiddleware(BaseHTTPMiddleware):
-    """Middleware for collecting metrics and logging."""
+# Share of successful requests written to the access log; server errors
+# and slow requests are always logged
+ACCESS_LOG_SAMPLE_RATE = 0.01
+SLOW_REQUEST_SECONDS = 1.0
 
-    async def dispatch(
-        self, request: Request, call_next: Callable[[Request], Awaitable[Response]]
-    ) -> Response:
-        """Process request and collect metrics."""
-        start_time = time.time()
+# Endpoint label for requests that matched no route, so scans of unknown
+# paths do not create new series
+UNMATCHED_ROUTE = "unmatched"
 
-        # Extract request info
-        method = request.method
-        path = request.url.path
-        client_ip = request.client.host if request.client else "unknown"
 
-        # Increment active connections
-        ACTIVE_CONNECTIONS.inc()
+def _route_template(scope: Scope) -> str:
+    """Path template of the matched route, e.g. ``/orders/{order_id}``."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
 
-        # Add request context
-        structlog.contextvars.clear_contextvars()
-        structlog.contextvars.bind_contextvars(
-            request_id=id(request),
-            method=method,
-            path=path,
-            client_ip=client_ip,
-            user_agent=request.headers.get("user-agent", "unknown"),
-        )
 
-        try:
-            # Process request
-            response = await call_next(request)
+def _header(scope: Scope, name: bytes) -> str:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return "unknown"
 
-            # Calculate metrics
-            duration = time.time() - start_time
-            status_code = response.status_code
 
-            # Update metrics
-            REQUEST_COUNT.labels(
-                method=method, endpoint=path, status_code=status_code
-            ).inc()
+class MonitoringMiddleware:
+    """ASGI middleware for collecting metrics and logging.
 
-            REQUEST_DURATION.labels(method=method, endpoint=path).observe(duration)
+    Metrics are labelled by the matched route template rather than the raw
+    path. Response sizes are counted from the body messages as they are
+    sent, so streaming responses are measured without buffering them.
+    """
 
-            # Log response size if available
-            if hasattr(response, "body"):
-                body_size = len(response.body) if response.body else 0
-                API_RESPONSE_SIZE.labels(endpoint=path).observe(body_size)
+    def __init__(
+        self,
+        app: ASGIApp,
+        access_log_sample_rate: float = ACCESS_LOG_SAMPLE_RATE,
+        slow_request_seconds: float = SLOW_REQUEST_SECONDS,
+    ) -> None:
+        self.app = app
+        self.access_log_sample_rate = access_log_sample_rate
+        self.slow_request_seconds = slow_request_seconds
 
-            # Log request completion
-            logger.info(
-                "Request completed",
-                status_code=status_code,
-                duration=duration,
-                response_size=getattr(response, "content_length", 0),
-            )
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Process request and collect metrics."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500
+        response_size = 0
+
+        async def send_with_metrics(message: Message) -> None:
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        # Increment active connections
+        ACTIVE_CONNECTIONS.inc()
 
-            return response
+        try:
+            await self.app(scope, receive, send_with_metrics)
 
         except Exception as e:
             # Handle errors
-            duration = time.time() - start_time
             error_type = type(e).__name__
-
-            ERROR_COUNT.labels(error_type=error_type, endpoint=path).inc()
+            ERROR_COUNT.labels(
+                error_type=error_type, endpoint=_route_template(scope)
+            ).inc()
 
             logger.error(
                 "Request failed",
+                **self._request_fields(scope),
                 error_type=error_type,
                 error_message=str(e),
-                duration=duration,
+                duration=time.perf_counter() - start_time,
                 exc_info=True,
             )
 
@@ -162,6 +171,41 @@ class MonitoringMiddleware(BaseHTTPMiddleware):
             # Decrement active connections
             ACTIVE_CONNECTIONS.dec()
 
+            duration = time.perf_counter() - start_time
+            method = scope["method"]
+            endpoint = _route_template(scope)
+
+            # Update metrics
+            REQUEST_COUNT.labels(
+                method=method, endpoint=endpoint, status_code=status_code
+            ).inc()
+            REQUEST_DURATION.labels(method=method, endpoint=endpoint).observe(duration)
+            API_RESPONSE_SIZE.labels(endpoint=endpoint).observe(response_size)
+
+        if (
+            status_code >= 500
+            or duration >= self.slow_request_seconds
+            or random.random() < self.access_log_sample_rate
+        ):
+            logger.info(
+                "Request completed",
+                **self._request_fields(scope),
+                status_code=status_code,
+                duration=duration,
+                response_size=response_size,
+            )
+
+    @staticmethod
+    def _request_fields(scope: Scope) -> dict[str, Any]:
+        client = scope.get("client")
+        return {
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": _route_template(scope),
+            "client_ip": client[0] if client else "unknown",
+            "user_agent": _header(scope, b"user-agent"),
+        }
+
 
 def setup_tracing(service_name: str = "itdo-erp-backend") -> None:
     """Setup OpenTelemetry tracing."""
@@ -1,17 +1,109 @@
 """Security utilities for authentication and authorization."""
 
+import asyncio
+import os
 import secrets
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import UTC, datetime, timedelta
-from typing import Any
+from typing import Any, TypeVar
 
 from jose import ExpiredSignatureError, JWTError, jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
-from app.core.exceptions import ExpiredTokenError, InvalidTokenError
-
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.core.exceptions import (
+    ExpiredTokenError,
+    InvalidTokenError,
+    PasswordHashingBusyError,
+)
+
+T = TypeVar("T")
+
+# Password hashing context. Hashes below the configured cost are flagged by
+# verify_and_update and rehashed on the next successful login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+)
+
+# bcrypt releases the GIL, so one thread per core keeps every core busy
+# without holding the event loop or the request threadpool
+HASHING_WORKERS = os.cpu_count() or 1
+# Hash jobs allowed to wait for a worker before new ones are refused
+HASHING_QUEUE_SIZE = HASHING_WORKERS * 8
+
+
+class PasswordHashingPool:
+    """Bounded executor for password hashing with admission control."""
+
+    def __init__(
+        self,
+        max_workers: int = HASHING_WORKERS,
+        max_queued: int = HASHING_QUEUE_SIZE,
+    ) -> None:
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        """Jobs running or waiting for a worker."""
+        return self._in_flight
+
+    def submit(self, fn: Callable[..., T], *args: Any) -> Future[T]:
+        """
+        Queue a hashing job.
+
+        Raises:
+            PasswordHashingBusyError: If all workers are busy and the queue is full
+        """
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queued:
+                raise PasswordHashingBusyError(
+                    "Too many concurrent password operations, retry shortly"
+                )
+            self._in_flight += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="password-hashing",
+                )
+            executor = self._executor
+
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run a hashing job without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def call(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run a hashing job from a sync endpoint's worker thread and wait."""
+        return self.submit(fn, *args).result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _release(self, future: Future | None = None) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+
+password_hashing_pool = PasswordHashingPool()
 
 
 def hash_password(password: str) -> str:
@@ -24,6 +116,49 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """
+    Verify a password and rehash it if the hash uses outdated parameters.
+
+    Returns:
+        Whether the password matched, and the replacement hash if one is due
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def hash_password_pooled(password: str) -> str:
+    """Hash a password on the hashing pool, blocking the calling thread."""
+    return password_hashing_pool.call(hash_password, password)
+
+
+def verify_password_pooled(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the hashing pool, blocking the calling thread."""
+    return password_hashing_pool.call(verify_password, plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password on the hashing pool."""
+    return await password_hashing_pool.run(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the hashing pool."""
+    return await password_hashing_pool.run(
+        verify_password, plain_password, hashed_password
+    )
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """Verify a password and compute any due rehash on the hashing pool."""
+    return await password_hashing_pool.run(
+        verify_and_update_password, plain_password, hashed_password
+    )
+
+
 def create_access_token(
     data: dict[str, Any], expires_delta: timedelta | None = None
 ) -> str:
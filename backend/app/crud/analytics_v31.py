@@ -14,15 +14,19 @@ Comprehensive CRUD operations for analytics system including:
 - Compliance Analytics & Risk Management
 """
 
+import asyncio
+import json
 import uuid
 from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import Any, Dict, List, Optional
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
 
 import numpy as np
 from sqlalchemy import desc, text
 from sqlalchemy.orm import Session
 
+from app.core.database import SessionLocal
 from app.models.analytics_extended import (
     AggregationType,
     AlertPriority,
@@ -40,11 +44,34 @@ from app.models.analytics_extended import (
     PeriodType,
     ReportStatus,
 )
+from app.services.dashboard_widgets import (
+    DEFAULT_WIDGET_CONCURRENCY,
+    WidgetCache,
+    dashboard_views,
+    resolve_widgets,
+    widget_query,
+)
+from app.services.metric_timeseries import (
+    DAILY,
+    HOURLY,
+    MetricTimeSeries,
+    trend_periods,
+)
 
 
 class AnalyticsService:
     """Service class for analytics system operations."""
 
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        widget_concurrency: int = DEFAULT_WIDGET_CONCURRENCY,
+    ) -> None:
+        # Widget queries run in worker threads, each on its own session
+        self.session_factory = session_factory
+        self.widget_concurrency = widget_concurrency
+        self.widget_cache = WidgetCache()
+
     # =============================================================================
     # Data Source Management
     # =============================================================================
@@ -416,7 +443,43 @@ class AnalyticsService:
         period_type: PeriodType = PeriodType.DAY,
         period_count: int = 30,
     ) -> List[Dict[str, Any]]:
-        """Get metric trend data for specified periods."""
+        """Get metric trend data for specified periods.
+
+        Hourly and daily trends are read from the rollups of the metric's
+        ``period_type`` data points, one entry per bucket with the bucket
+        average as value.
+        """
+
+        resolution = {PeriodType.HOUR: HOURLY, PeriodType.DAY: DAILY}.get(period_type)
+        if resolution is not None:
+            metric = (
+                db.query(AnalyticsMetric)
+                .filter(AnalyticsMetric.id == metric_id)
+                .first()
+            )
+            if not metric:
+                return []
+            start, end = trend_periods(resolution, period_count, datetime.utcnow())
+            series = MetricTimeSeries(db).get_series(
+                metric, start, end, step=resolution.step, period_type=period_type
+            )
+            return [
+                {
+                    "timestamp": point["bucket_start"],
+                    "period_start": point["bucket_start"],
+                    "period_end": point["bucket_end"],
+                    "value": point["avg"],
+                    "raw_value": None,
+                    "quality_score": None,
+                    "is_anomaly": False,
+                    "count": point["count"],
+                    "min": point["min"],
+                    "max": point["max"],
+                    "median": point["median"],
+                    "std_deviation": point["std_deviation"],
+                }
+                for point in series["points"]
+            ]
 
         data_points = (
             db.query(AnalyticsDataPoint)
@@ -451,6 +514,29 @@ class AnalyticsService:
 
         return trends
 
+    async def get_metric_series(
+        self,
+        db: Session,
+        metric_id: str,
+        start: datetime,
+        end: datetime,
+        step: Optional[timedelta] = None,
+    ) -> Dict[str, Any]:
+        """Get aggregated metric values for a range at the coarsest stored
+        resolution that still gives ``step`` detail."""
+
+        metric = (
+            db.query(AnalyticsMetric).filter(AnalyticsMetric.id == metric_id).first()
+        )
+
+        if not metric:
+            return {"status": "error", "message": "Metric not found"}
+
+        return {
+            "status": "success",
+            **MetricTimeSeries(db).get_series(metric, start, end, step=step),
+        }
+
     # =============================================================================
     # Dashboard Management
     # =============================================================================
@@ -526,7 +612,12 @@ class AnalyticsService:
         period_end: Optional[datetime] = None,
         filters: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
-        """Get dashboard data with all widget information."""
+        """Get dashboard data with all widget information.
+
+        Widgets are resolved concurrently with at most ``widget_concurrency``
+        of their queries running at a time, and each widget's data is cached
+        for its ``refresh_interval`` (the dashboard's when the widget has none).
+        """
 
         dashboard = (
             db.query(AnalyticsDashboard)
@@ -537,19 +628,32 @@ class AnalyticsService:
         if not dashboard:
             return {"status": "error", "message": "Dashboard not found"}
 
-        # Update view count
-        dashboard.view_count += 1
-        dashboard.last_viewed_at = datetime.utcnow()
-        db.commit()
+        # View count is written in the background
+        dashboard_views.record(dashboard.id)
 
-        # Get widget data
-        widget_data = {}
-        for widget in dashboard.widgets:
-            widget_id = widget.get("id")
-            if widget_id:
-                widget_data[widget_id] = await self._get_widget_data(
+        request_key = json.dumps(
+            [period_start, period_end, filters], sort_keys=True, default=str
+        )
+
+        async def resolve(widget: Dict[str, Any]) -> Dict[str, Any]:
+            cache_key = (
+                dashboard.id,
+                dashboard.updated_at,
+                json.dumps(widget, sort_keys=True, default=str),
+                request_key,
+            )
+            data = self.widget_cache.get(cache_key)
+            if data is None:
+                data = await self._get_widget_data(
                     db, widget, period_start, period_end, filters
                 )
+                ttl = widget.get("refresh_interval") or dashboard.refresh_interval
+                self.widget_cache.put(cache_key, data, ttl or 0)
+            return data
+
+        widgets = [widget for widget in dashboard.widgets or [] if widget.get("id")]
+        resolved = await resolve_widgets(widgets, resolve, self.widget_concurrency)
+        widget_data = {widget["id"]: data for widget, data in zip(widgets, resolved)}
 
         return {
             "status": "success",
@@ -618,24 +722,41 @@ class AnalyticsService:
         if not metric_id:
             return {"type": "metric", "data": {}, "status": "missing_metric_id"}
 
-        metric = (
-            db.query(AnalyticsMetric).filter(AnalyticsMetric.id == metric_id).first()
+        # Widgets showing the same metric share one lookup, run off the
+        # event loop on its own session so other widgets proceed meanwhile
+        snapshot = await widget_query(
+            ("metric", metric_id),
+            partial(asyncio.to_thread, self._read_metric_snapshot, metric_id),
         )
 
-        if not metric:
+        if not snapshot:
             return {"type": "metric", "data": {}, "status": "metric_not_found"}
 
-        # Get latest value
-        latest_point = (
-            db.query(AnalyticsDataPoint)
-            .filter(AnalyticsDataPoint.metric_id == metric_id)
-            .order_by(desc(AnalyticsDataPoint.timestamp))
-            .first()
-        )
+        return {"type": "metric", "data": dict(snapshot), "status": "success"}
 
-        return {
-            "type": "metric",
-            "data": {
+    def _read_metric_snapshot(self, metric_id: str) -> Optional[Dict[str, Any]]:
+        """Load a metric and its latest value as plain data."""
+
+        db = self.session_factory()
+        try:
+            metric = (
+                db.query(AnalyticsMetric)
+                .filter(AnalyticsMetric.id == metric_id)
+                .first()
+            )
+
+            if not metric:
+                return None
+
+            # Get latest value
+            latest_point = (
+                db.query(AnalyticsDataPoint)
+                .filter(AnalyticsDataPoint.metric_id == metric_id)
+                .order_by(desc(AnalyticsDataPoint.timestamp))
+                .first()
+            )
+
+            return {
                 "metric": {
                     "id": metric.id,
                     "name": metric.name,
@@ -657,9 +778,9 @@ class AnalyticsService:
                 "last_updated": latest_point.timestamp.isoformat()
                 if latest_point
                 else None,
-            },
-            "status": "success",
-        }
+            }
+        finally:
+            db.close()
 
     # =============================================================================
     # Report Management
@@ -21,7 +21,7 @@ import uuid
 from datetime import date, datetime, timedelta
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy import and_, desc, func, or_
+from sqlalchemy import desc, func, or_
 from sqlalchemy.orm import Session, joinedload
 
 from app.models.document_extended import (
@@ -42,6 +42,12 @@ from app.models.document_extended import (
     ShareType,
     SignatureStatus,
 )
+from app.services.blob_storage import StoredBlob, get_blob_store
+from app.services.document_search import (
+    SEARCH_FIELDS,
+    get_document_search_backend,
+    query_terms,
+)
 
 
 class DocumentService:
@@ -52,21 +58,36 @@ class DocumentService:
     # =============================================================================
 
     async def create_document(
-        self, db: Session, document_data: dict, file_content: bytes = None
+        self,
+        db: Session,
+        document_data: dict,
+        file_content: bytes = None,
+        blob: Optional[StoredBlob] = None,
     ) -> DocumentExtended:
-        """Create a new document with comprehensive metadata and file handling."""
+        """Create a new document with comprehensive metadata and file handling.
+
+        Uploads are stored by the API layer and passed in as ``blob``;
+        ``file_content`` covers content generated in memory. Either way the
+        file lands in the content-addressed store, so identical files share
+        one copy.
+        """
 
         # Generate unique document number
         document_number = f"DOC-{uuid.uuid4().hex[:8].upper()}"
 
-        # File processing
-        file_hash = None
-        file_size = 0
-        mime_type = None
+        if file_content and blob is None:
+            blob = await get_blob_store().store_bytes(file_content)
 
-        if file_content:
-            file_hash = hashlib.sha256(file_content).hexdigest()
-            file_size = len(file_content)
+        # File processing
+        file_hash = document_data.get("file_hash")
+        file_size = document_data.get("file_size_bytes") or 0
+        mime_type = document_data.get("mime_type")
+        storage_path = document_data.get("storage_path")
+
+        if blob:
+            file_hash = blob.sha256
+            file_size = blob.size
+            storage_path = blob.path
             mime_type, _ = mimetypes.guess_type(document_data.get("filename", ""))
 
         # Create document record
@@ -85,7 +106,7 @@ class DocumentService:
             mime_type=mime_type,
             file_size_bytes=file_size,
             file_hash=file_hash,
-            storage_path=document_data.get("storage_path"),
+            storage_path=storage_path,
             storage_bucket=document_data.get("storage_bucket"),
             storage_provider=document_data.get("storage_provider", "local"),
             organization_id=document_data["organization_id"],
@@ -95,6 +116,8 @@ class DocumentService:
             tags=document_data.get("tags", []),
             metadata=document_data.get("metadata", {}),
             custom_properties=document_data.get("custom_properties", {}),
+            extracted_text=document_data.get("extracted_text"),
+            ocr_text=document_data.get("ocr_text"),
             is_confidential=document_data.get("is_confidential", False),
             security_classification=document_data.get("security_classification"),
             requires_approval=document_data.get("requires_approval", False),
@@ -105,6 +128,9 @@ class DocumentService:
         db.commit()
         db.refresh(document)
 
+        # Keep the full-text index current (covers new versions as well)
+        self._sync_search_index(db, document)
+
         # Log activity
         await self._log_document_activity(
             db,
@@ -180,15 +206,6 @@ class DocumentService:
         if category:
             query = query.filter(DocumentExtended.category == category)
 
-        if search_text:
-            search_filter = or_(
-                DocumentExtended.title.ilike(f"%{search_text}%"),
-                DocumentExtended.description.ilike(f"%{search_text}%"),
-                DocumentExtended.filename.ilike(f"%{search_text}%"),
-                DocumentExtended.extracted_text.ilike(f"%{search_text}%"),
-            )
-            query = query.filter(search_filter)
-
         if tags:
             for tag in tags:
                 query = query.filter(DocumentExtended.tags.contains([tag]))
@@ -199,6 +216,11 @@ class DocumentService:
         if created_before:
             query = query.filter(DocumentExtended.created_at <= created_before)
 
+        if search_text:
+            return self._full_text_search(
+                db, query, organization_id, search_text, skip, limit
+            )
+
         return (
             query.order_by(desc(DocumentExtended.updated_at))
             .offset(skip)
@@ -235,6 +257,8 @@ class DocumentService:
             "is_confidential",
             "security_classification",
             "status",
+            "extracted_text",
+            "ocr_text",
         ]
 
         for field in updatable_fields:
@@ -247,6 +271,10 @@ class DocumentService:
         db.commit()
         db.refresh(document)
 
+        # Searchable text or visibility (e.g. restored from deleted) changed
+        if new_values.keys() & (SEARCH_FIELDS.keys() | {"status"}):
+            self._sync_search_index(db, document)
+
         # Log activity
         await self._log_document_activity(
             db,
@@ -266,8 +294,13 @@ class DocumentService:
         new_version_data: dict,
         file_content: bytes = None,
         user_id: str = None,
+        blob: Optional[StoredBlob] = None,
     ) -> DocumentExtended:
-        """Create a new version of an existing document."""
+        """Create a new version of an existing document.
+
+        A version created without a new file keeps pointing at the previous
+        version's stored content instead of copying it.
+        """
 
         original_doc = await self.get_document_by_id(db, original_document_id)
         if not original_doc:
@@ -304,8 +337,17 @@ class DocumentService:
             "category": original_doc.category,
             "subcategory": original_doc.subcategory,
         }
+        if not file_content and blob is None:
+            version_data.update(
+                file_hash=original_doc.file_hash,
+                file_size_bytes=original_doc.file_size_bytes,
+                mime_type=original_doc.mime_type,
+                storage_path=original_doc.storage_path,
+                storage_bucket=original_doc.storage_bucket,
+                storage_provider=original_doc.storage_provider,
+            )
 
-        new_document = await self.create_document(db, version_data, file_content)
+        new_document = await self.create_document(db, version_data, file_content, blob)
 
         # Log versioning activity
         await self._log_document_activity(
@@ -338,6 +380,7 @@ class DocumentService:
         document.archived_at = datetime.utcnow()
 
         db.commit()
+        self._sync_search_index(db, document)
 
         # Log activity
         await self._log_document_activity(
@@ -1081,31 +1124,16 @@ class DocumentService:
         skip: int = 0,
         limit: int = 50,
     ) -> List[DocumentExtended]:
-        """Advanced document search with full-text search and filtering."""
+        """Advanced document search with full-text search and filtering.
+
+        Matching documents carry ``search_score`` and ``search_highlights``.
+        """
 
         query = db.query(DocumentExtended).filter(
             DocumentExtended.organization_id == organization_id,
             DocumentExtended.status != DocumentStatus.DELETED,
         )
 
-        # Full-text search
-        if search_query:
-            search_terms = search_query.split()
-            search_conditions = []
-
-            for term in search_terms:
-                term_condition = or_(
-                    DocumentExtended.title.ilike(f"%{term}%"),
-                    DocumentExtended.description.ilike(f"%{term}%"),
-                    DocumentExtended.filename.ilike(f"%{term}%"),
-                    DocumentExtended.extracted_text.ilike(f"%{term}%"),
-                    DocumentExtended.ocr_text.ilike(f"%{term}%"),
-                )
-                search_conditions.append(term_condition)
-
-            # All terms must match (AND operation)
-            query = query.filter(and_(*search_conditions))
-
         # Apply filters
         if filters:
             if filters.get("document_type"):
@@ -1133,7 +1161,13 @@ class DocumentService:
                 for tag in filters["tags"]:
                     query = query.filter(DocumentExtended.tags.contains([tag]))
 
-        # Order by relevance (view count, last modified, etc.)
+        # Full-text search through the configured index, ranked by relevance
+        if search_query and search_query.strip():
+            return self._full_text_search(
+                db, query, organization_id, search_query, skip, limit
+            )
+
+        # Order by popularity (view count, last modified, etc.)
         query = query.order_by(
             desc(DocumentExtended.view_count),
             desc(DocumentExtended.last_modified_at),
@@ -1142,6 +1176,48 @@ class DocumentService:
 
         return query.offset(skip).limit(limit).all()
 
+    def _full_text_search(
+        self,
+        db: Session,
+        query,
+        organization_id: str,
+        search_text: str,
+        skip: int,
+        limit: int,
+    ) -> List[DocumentExtended]:
+        """Run a text query through the configured search backend."""
+
+        terms = query_terms(search_text)
+        if terms:
+            return get_document_search_backend(db).search(
+                db, query, organization_id, terms, skip, limit
+            )
+
+        # Punctuation-only queries have no index terms; match them literally
+        # against the short name columns only
+        pattern = f"%{search_text.strip()}%"
+        return (
+            query.filter(
+                or_(
+                    DocumentExtended.title.ilike(pattern),
+                    DocumentExtended.filename.ilike(pattern),
+                )
+            )
+            .order_by(desc(DocumentExtended.updated_at))
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+    def _sync_search_index(self, db: Session, document: DocumentExtended) -> None:
+        """Reflect a committed document write in the search index."""
+
+        backend = get_document_search_backend(db)
+        if document.status == DocumentStatus.DELETED:
+            backend.remove_document(db, document.id)
+        else:
+            backend.index_document(db, document)
+
     async def get_document_analytics(
         self, db: Session, organization_id: str, period_start: date, period_end: date
     ) -> DocumentAnalytics:
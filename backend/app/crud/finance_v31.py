@@ -11,16 +11,20 @@ Comprehensive CRUD operations for financial management including:
 - Audit logging
 """
 
-from datetime import datetime
+from collections import defaultdict
+from datetime import UTC, datetime
 from decimal import Decimal
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from sqlalchemy import and_, desc, func, or_
+from sqlalchemy import and_, desc, func, or_, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
 from app.crud.base import CRUDBase
 from app.models.finance_extended import (
     Account,
+    AccountPeriodBalance,
     AccountType,
     Budget,
     BudgetLine,
@@ -52,6 +56,7 @@ from app.schemas.finance_v31 import (
     TaxConfigurationCreate,
     TaxConfigurationUpdate,
 )
+from app.services.document_numbers import JOURNAL_ENTRY, document_numbers
 
 
 class AccountCRUD(CRUDBase[Account, AccountCreate, AccountUpdate]):
@@ -74,7 +79,7 @@ class AccountCRUD(CRUDBase[Account, AccountCreate, AccountUpdate]):
         account_path = obj_in.account_code
 
         if obj_in.parent_account_id:
-            parent = self.get(obj_in.parent_account_id)
+            parent = self.get(self.db, obj_in.parent_account_id)
             if parent:
                 account_level = parent.account_level + 1
                 account_path = f"{parent.account_path}/{obj_in.account_code}"
@@ -139,7 +144,7 @@ class AccountCRUD(CRUDBase[Account, AccountCreate, AccountUpdate]):
         self, account_id: str, amount: Decimal, transaction_type: TransactionType
     ):
         """Update account balance based on transaction."""
-        account = self.get(account_id)
+        account = self.get(self.db, account_id)
         if not account:
             return None
 
@@ -266,9 +271,11 @@ class JournalEntryCRUD(CRUDBase[JournalEntry, JournalEntryCreate, JournalEntryUp
 
     def post_journal_entry(self, journal_entry_id: str, posted_by: str) -> JournalEntry:
         """Post journal entry and update account balances."""
-        entry = self.get(journal_entry_id)
+        entry = self.get(self.db, journal_entry_id)
         if not entry or entry.is_posted:
             raise ValueError("Entry not found or already posted")
+        if entry.period and entry.period.status == FinancialPeriodStatus.CLOSED:
+            raise ValueError("Cannot post to a closed period")
 
         # Update account balances
         account_crud = AccountCRUD(self.db)
@@ -287,6 +294,8 @@ class JournalEntryCRUD(CRUDBase[JournalEntry, JournalEntryCreate, JournalEntryUp
         entry.posting_date = datetime.utcnow()
         entry.updated_by = posted_by
 
+        AccountPeriodBalanceCRUD(self.db).apply_entry(entry)
+
         self.db.commit()
         return entry
 
@@ -294,9 +303,14 @@ class JournalEntryCRUD(CRUDBase[JournalEntry, JournalEntryCreate, JournalEntryUp
         self, journal_entry_id: str, reason: str, reversed_by: str
     ) -> JournalEntry:
         """Create reversing journal entry."""
-        original_entry = self.get(journal_entry_id)
+        original_entry = self.get(self.db, journal_entry_id)
         if not original_entry or not original_entry.is_posted:
             raise ValueError("Original entry not found or not posted")
+        if (
+            original_entry.period
+            and original_entry.period.status == FinancialPeriodStatus.CLOSED
+        ):
+            raise ValueError("Cannot reverse an entry in a closed period")
 
         # Create reversing entry
         reversal_data = {
@@ -372,42 +386,26 @@ class JournalEntryCRUD(CRUDBase[JournalEntry, JournalEntryCreate, JournalEntryUp
         self, organization_id: str, as_of_date: datetime
     ) -> List[Dict[str, Any]]:
         """Generate trial balance report."""
-        # Get all accounts with balances
-        query = (
+        accounts = (
             self.db.query(
                 Account.id,
                 Account.account_code,
                 Account.account_name,
                 Account.account_type,
-                Account.current_balance,
-                func.sum(JournalEntryLine.debit_amount).label("total_debits"),
-                func.sum(JournalEntryLine.credit_amount).label("total_credits"),
             )
-            .outerjoin(JournalEntryLine)
-            .outerjoin(JournalEntry)
             .filter(Account.organization_id == organization_id)
             .filter(Account.is_active)
-            .filter(
-                or_(
-                    JournalEntry.transaction_date.is_(None),
-                    JournalEntry.transaction_date <= as_of_date,
-                )
-            )
-            .filter(
-                or_(
-                    JournalEntry.is_posted.is_(None),
-                    JournalEntry.is_posted,
-                )
-            )
-            .group_by(Account.id)
             .order_by(Account.account_code)
+            .all()
+        )
+        totals = AccountPeriodBalanceCRUD(self.db).get_account_totals(
+            organization_id, as_of_date
         )
 
         results = []
-        for row in query.all():
+        for row in accounts:
             # Calculate ending balance
-            debits = row.total_debits or 0
-            credits = row.total_credits or 0
+            debits, credits = totals.get(row.id, (0, 0))
 
             # Determine balance based on account normal balance
             if row.account_type in [AccountType.ASSET, AccountType.EXPENSE]:
@@ -438,11 +436,18 @@ class JournalEntryCRUD(CRUDBase[JournalEntry, JournalEntryCreate, JournalEntryUp
 
     def _generate_entry_number(self, organization_id: str) -> str:
         """Generate next journal entry number."""
-        # Get current year and month
-        now = datetime.utcnow()
-        prefix = f"JE{now.year:04d}{now.month:02d}"
+        now = datetime.now(UTC)
+        return document_numbers.next_number(
+            JOURNAL_ENTRY,
+            organization_id,
+            on=now,
+            db=self.db,
+            seed=lambda: self._highest_entry_number(organization_id, now),
+        )
 
-        # Get highest entry number for this period
+    def _highest_entry_number(self, organization_id: str, now: datetime) -> int:
+        """Highest number issued this month before the sequence existed."""
+        prefix = f"JE{JOURNAL_ENTRY.period_key(now)}"
         highest = (
             self.db.query(JournalEntry.entry_number)
             .filter(
@@ -454,15 +459,231 @@ class JournalEntryCRUD(CRUDBase[JournalEntry, JournalEntryCreate, JournalEntryUp
             .order_by(desc(JournalEntry.entry_number))
             .first()
         )
-
         if highest:
             try:
-                next_num = int(highest[0][-4:]) + 1
-                return f"{prefix}{next_num:04d}"
+                return int(highest[0][-4:])
             except ValueError:
                 pass
+        return 0
 
-        return f"{prefix}0001"
+
+class AccountPeriodBalanceCRUD:
+    """Per-account, per-period posted totals behind the financial reports.
+
+    Rows are incremented as entries are posted and rebuilt from the journal
+    lines and frozen when their period closes. Reports read closed periods
+    from the rows and aggregate journal lines only for everything else.
+    Closed periods are assumed to contain only entries dated within them.
+    """
+
+    def __init__(self, db: Session) -> dict:
+        self.db = db
+
+    def apply_entry(self, entry: JournalEntry) -> None:
+        """Add a posted entry's lines to its period's totals."""
+        if not entry.period_id:
+            return
+
+        totals: Dict[str, List[Decimal]] = defaultdict(lambda: [Decimal(0)] * 2)
+        for line in entry.lines:
+            totals[line.account_id][0] += line.debit_amount or 0
+            totals[line.account_id][1] += line.credit_amount or 0
+
+        rows = [
+            {
+                "organization_id": entry.organization_id,
+                "account_id": account_id,
+                "period_id": entry.period_id,
+                "debit_total": debits,
+                "credit_total": credits,
+            }
+            for account_id, (debits, credits) in sorted(totals.items())
+        ]
+        if not rows:
+            return
+
+        # One upsert, so concurrent postings to a new (account, period) pair
+        # add up instead of racing to insert the row
+        dialect = self.db.get_bind().dialect.name
+        insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+        statement = insert(AccountPeriodBalance)
+        self.db.execute(
+            statement.on_conflict_do_update(
+                index_elements=["account_id", "period_id"],
+                set_={
+                    "debit_total": AccountPeriodBalance.debit_total
+                    + statement.excluded.debit_total,
+                    "credit_total": AccountPeriodBalance.credit_total
+                    + statement.excluded.credit_total,
+                },
+            ),
+            rows,
+        )
+
+    def rebuild_period(self, period: FinancialPeriod, freeze: bool = False) -> None:
+        """Recompute a period's totals from its posted journal lines."""
+        self.db.query(AccountPeriodBalance).filter(
+            AccountPeriodBalance.period_id == period.id
+        ).delete(synchronize_session=False)
+
+        for (account_id, _), (debits, credits) in self._sum_posted_lines(
+            period.organization_id, period.id
+        ).items():
+            self.db.add(
+                AccountPeriodBalance(
+                    organization_id=period.organization_id,
+                    account_id=account_id,
+                    period_id=period.id,
+                    debit_total=debits,
+                    credit_total=credits,
+                    is_frozen=freeze,
+                )
+            )
+        self.db.flush()
+
+    def check_consistency(
+        self, organization_id: str, repair: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Diff stored totals against the journal lines, optionally rebuilding."""
+        stored = {
+            (row.account_id, row.period_id): (row.debit_total, row.credit_total)
+            for row in self.db.query(
+                AccountPeriodBalance.account_id,
+                AccountPeriodBalance.period_id,
+                AccountPeriodBalance.debit_total,
+                AccountPeriodBalance.credit_total,
+            ).filter(AccountPeriodBalance.organization_id == organization_id)
+        }
+        actual = self._sum_posted_lines(organization_id)
+
+        differences = []
+        for key in sorted(stored.keys() | actual.keys()):
+            stored_debits, stored_credits = stored.get(key, (0, 0))
+            actual_debits, actual_credits = actual.get(key, (0, 0))
+            if (stored_debits, stored_credits) != (actual_debits, actual_credits):
+                differences.append(
+                    {
+                        "account_id": key[0],
+                        "period_id": key[1],
+                        "stored_debits": float(stored_debits),
+                        "stored_credits": float(stored_credits),
+                        "actual_debits": float(actual_debits),
+                        "actual_credits": float(actual_credits),
+                    }
+                )
+
+        if repair and differences:
+            period_ids = {difference["period_id"] for difference in differences}
+            periods = (
+                self.db.query(FinancialPeriod)
+                .filter(FinancialPeriod.id.in_(period_ids))
+                .all()
+            )
+            for period in periods:
+                self.rebuild_period(
+                    period, freeze=period.status == FinancialPeriodStatus.CLOSED
+                )
+            self.db.commit()
+
+        return differences
+
+    def get_account_totals(
+        self,
+        organization_id: str,
+        as_of_date: datetime,
+        from_date: Optional[datetime] = None,
+    ) -> Dict[str, Tuple[Decimal, Decimal]]:
+        """Posted (debits, credits) per account within the date range."""
+        closed_periods = select(FinancialPeriod.id).where(
+            FinancialPeriod.organization_id == organization_id,
+            FinancialPeriod.status == FinancialPeriodStatus.CLOSED,
+            FinancialPeriod.end_date <= as_of_date,
+        )
+        if from_date:
+            closed_periods = closed_periods.where(
+                FinancialPeriod.start_date >= from_date
+            )
+
+        # Closed periods without frozen rows fall back to their journal lines
+        frozen_periods = (
+            select(AccountPeriodBalance.period_id)
+            .where(
+                AccountPeriodBalance.period_id.in_(closed_periods),
+                AccountPeriodBalance.is_frozen,
+            )
+            .distinct()
+        )
+
+        summarized = (
+            self.db.query(
+                AccountPeriodBalance.account_id,
+                func.sum(AccountPeriodBalance.debit_total),
+                func.sum(AccountPeriodBalance.credit_total),
+            )
+            .filter(
+                AccountPeriodBalance.period_id.in_(frozen_periods),
+                AccountPeriodBalance.is_frozen,
+            )
+            .group_by(AccountPeriodBalance.account_id)
+        )
+
+        live = (
+            self.db.query(
+                JournalEntryLine.account_id,
+                func.sum(JournalEntryLine.debit_amount),
+                func.sum(JournalEntryLine.credit_amount),
+            )
+            .join(JournalEntry)
+            .filter(
+                JournalEntry.organization_id == organization_id,
+                JournalEntry.is_posted,
+                JournalEntry.transaction_date <= as_of_date,
+                or_(
+                    JournalEntry.period_id.is_(None),
+                    JournalEntry.period_id.not_in(frozen_periods),
+                ),
+            )
+        )
+        if from_date:
+            live = live.filter(JournalEntry.transaction_date >= from_date)
+        live = live.group_by(JournalEntryLine.account_id)
+
+        totals: Dict[str, Tuple[Decimal, Decimal]] = {}
+        for account_id, debits, credits in [*summarized, *live]:
+            previous_debits, previous_credits = totals.get(account_id, (0, 0))
+            totals[account_id] = (
+                previous_debits + (debits or 0),
+                previous_credits + (credits or 0),
+            )
+        return totals
+
+    def _sum_posted_lines(
+        self, organization_id: str, period_id: Optional[str] = None
+    ) -> Dict[Tuple[str, str], Tuple[Decimal, Decimal]]:
+        """Posted (debits, credits) per (account, period) from journal lines."""
+        query = (
+            self.db.query(
+                JournalEntryLine.account_id,
+                JournalEntry.period_id,
+                func.sum(JournalEntryLine.debit_amount),
+                func.sum(JournalEntryLine.credit_amount),
+            )
+            .join(JournalEntry)
+            .filter(
+                JournalEntry.organization_id == organization_id,
+                JournalEntry.is_posted,
+                JournalEntry.period_id.is_not(None),
+            )
+        )
+        if period_id:
+            query = query.filter(JournalEntry.period_id == period_id)
+
+        return {
+            (account_id, line_period_id): (debits or 0, credits or 0)
+            for account_id, line_period_id, debits, credits in query.group_by(
+                JournalEntryLine.account_id, JournalEntry.period_id
+            )
+        }
 
 
 class BudgetCRUD(CRUDBase[Budget, BudgetCreate, BudgetUpdate]):
@@ -522,7 +743,7 @@ class BudgetCRUD(CRUDBase[Budget, BudgetCreate, BudgetUpdate]):
         self, budget_id: str, approved_by: str, notes: str = ""
     ) -> Budget:
         """Approve budget and activate it."""
-        budget = self.get(budget_id)
+        budget = self.get(self.db, budget_id)
         if not budget or budget.status != BudgetStatus.DRAFT:
             raise ValueError("Budget not found or not in draft status")
 
@@ -538,7 +759,7 @@ class BudgetCRUD(CRUDBase[Budget, BudgetCreate, BudgetUpdate]):
         self, budget_id: str, as_of_date: Optional[datetime] = None
     ) -> Dict[str, Any]:
         """Generate budget vs actual variance analysis."""
-        budget = self.get(budget_id)
+        budget = self.get(self.db, budget_id)
         if not budget:
             raise ValueError("Budget not found")
 
@@ -638,7 +859,7 @@ class CostCenterCRUD(CRUDBase[CostCenter, CostCenterCreate, CostCenterUpdate]):
         # Set level based on parent
         cost_center_level = 0
         if obj_in.parent_cost_center_id:
-            parent = self.get(obj_in.parent_cost_center_id)
+            parent = self.get(self.db, obj_in.parent_cost_center_id)
             if parent:
                 cost_center_level = parent.cost_center_level + 1
 
@@ -658,7 +879,7 @@ class CostCenterCRUD(CRUDBase[CostCenter, CostCenterCreate, CostCenterUpdate]):
         self, cost_center_id: str, start_date: datetime, end_date: datetime
     ) -> Dict[str, Any]:
         """Get cost center performance metrics."""
-        cost_center = self.get(cost_center_id)
+        cost_center = self.get(self.db, cost_center_id)
         if not cost_center:
             raise ValueError("Cost center not found")
 
@@ -739,7 +960,7 @@ class FinancialPeriodCRUD(
 
     def close_period(self, period_id: str, closed_by: str) -> FinancialPeriod:
         """Close financial period and prevent further transactions."""
-        period = self.get(period_id)
+        period = self.get(self.db, period_id)
         if not period or period.status == FinancialPeriodStatus.CLOSED:
             raise ValueError("Period not found or already closed")
 
@@ -749,7 +970,7 @@ class FinancialPeriodCRUD(
             .filter(
                 and_(
                     JournalEntry.period_id == period_id,
-                    not JournalEntry.is_posted,
+                    JournalEntry.is_posted.is_not(True),
                 )
             )
             .count()
@@ -760,6 +981,9 @@ class FinancialPeriodCRUD(
                 f"Cannot close period with {unposted_entries} unposted entries"
             )
 
+        # Freeze the period's account totals so reports stop reading its lines
+        AccountPeriodBalanceCRUD(self.db).rebuild_period(period, freeze=True)
+
         period.status = FinancialPeriodStatus.CLOSED
         period.closed_date = datetime.utcnow()
         period.closed_by = closed_by
@@ -782,20 +1006,14 @@ class FinancialReportCRUD(
         self, organization_id: str, as_of_date: datetime
     ) -> Dict[str, Any]:
         """Generate balance sheet report."""
-        # Get assets
-        assets = self._get_account_balances(
-            organization_id, AccountType.ASSET, as_of_date
-        )
-
-        # Get liabilities
-        liabilities = self._get_account_balances(
-            organization_id, AccountType.LIABILITY, as_of_date
-        )
-
-        # Get equity
-        equity = self._get_account_balances(
-            organization_id, AccountType.EQUITY, as_of_date
+        balances = self._get_account_balances(
+            organization_id,
+            [AccountType.ASSET, AccountType.LIABILITY, AccountType.EQUITY],
+            as_of_date,
         )
+        assets = balances[AccountType.ASSET]
+        liabilities = balances[AccountType.LIABILITY]
+        equity = balances[AccountType.EQUITY]
 
         total_assets = sum(account["balance"] for account in assets)
         total_liabilities = sum(account["balance"] for account in liabilities)
@@ -825,15 +1043,14 @@ class FinancialReportCRUD(
         self, organization_id: str, start_date: datetime, end_date: datetime
     ) -> Dict[str, Any]:
         """Generate income statement report."""
-        # Get revenue
-        revenue = self._get_account_balances(
-            organization_id, AccountType.REVENUE, end_date, start_date
-        )
-
-        # Get expenses
-        expenses = self._get_account_balances(
-            organization_id, AccountType.EXPENSE, end_date, start_date
+        balances = self._get_account_balances(
+            organization_id,
+            [AccountType.REVENUE, AccountType.EXPENSE],
+            end_date,
+            start_date,
         )
+        revenue = balances[AccountType.REVENUE]
+        expenses = balances[AccountType.EXPENSE]
 
         total_revenue = sum(account["balance"] for account in revenue)
         total_expenses = sum(account["balance"] for account in expenses)
@@ -862,67 +1079,45 @@ class FinancialReportCRUD(
     def _get_account_balances(
         self,
         organization_id: str,
-        account_type: AccountType,
+        account_types: List[AccountType],
         as_of_date: datetime,
         from_date: Optional[datetime] = None,
-    ) -> List[Dict[str, Any]]:
-        """Get account balances for specific account type."""
-        query = (
+    ) -> Dict[AccountType, List[Dict[str, Any]]]:
+        """Get account balances grouped by account type."""
+        accounts = (
             self.db.query(
                 Account.id,
                 Account.account_code,
                 Account.account_name,
-                func.sum(JournalEntryLine.debit_amount).label("total_debits"),
-                func.sum(JournalEntryLine.credit_amount).label("total_credits"),
+                Account.account_type,
             )
-            .outerjoin(JournalEntryLine)
-            .outerjoin(JournalEntry)
             .filter(
                 and_(
                     Account.organization_id == organization_id,
-                    Account.account_type == account_type,
+                    Account.account_type.in_(account_types),
                     Account.is_active,
                 )
             )
-            .filter(
-                or_(
-                    JournalEntry.transaction_date.is_(None),
-                    JournalEntry.transaction_date <= as_of_date,
-                )
-            )
-        )
-
-        if from_date:
-            query = query.filter(
-                or_(
-                    JournalEntry.transaction_date.is_(None),
-                    JournalEntry.transaction_date >= from_date,
-                )
-            )
-
-        query = (
-            query.filter(
-                or_(
-                    JournalEntry.is_posted.is_(None),
-                    JournalEntry.is_posted,
-                )
-            )
-            .group_by(Account.id)
             .order_by(Account.account_code)
+            .all()
+        )
+        totals = AccountPeriodBalanceCRUD(self.db).get_account_totals(
+            organization_id, as_of_date, from_date
         )
 
-        results = []
-        for row in query.all():
-            debits = row.total_debits or 0
-            credits = row.total_credits or 0
+        results: Dict[AccountType, List[Dict[str, Any]]] = {
+            account_type: [] for account_type in account_types
+        }
+        for row in accounts:
+            debits, credits = totals.get(row.id, (0, 0))
 
             # Calculate balance based on account type
-            if account_type in [AccountType.ASSET, AccountType.EXPENSE]:
+            if row.account_type in [AccountType.ASSET, AccountType.EXPENSE]:
                 balance = debits - credits
             else:
                 balance = credits - debits
 
-            results.append(
+            results[row.account_type].append(
                 {
                     "account_id": row.id,
                     "account_code": row.account_code,
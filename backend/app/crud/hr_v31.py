@@ -14,11 +14,13 @@ Comprehensive CRUD operations for human resources management including:
 - HR Analytics
 """
 
+import uuid
 from datetime import date, datetime, timedelta
-from decimal import Decimal
-from typing import Any, Dict, List, Optional
+from decimal import ROUND_HALF_UP, Decimal
+from operator import add, mul, sub
+from typing import Any, Dict, Iterable, List, Optional
 
-from sqlalchemy import and_, desc, func, or_
+from sqlalchemy import and_, case, desc, false, func, insert, or_
 from sqlalchemy.orm import Session
 
 from app.crud.base import CRUDBase
@@ -26,6 +28,7 @@ from app.models.hr_extended import (
     Employee,
     EmployeeStatus,
     EmploymentType,
+    HeadcountSnapshot,
     HRAnalytics,
     LeaveRequest,
     LeaveStatus,
@@ -48,6 +51,156 @@ from app.schemas.hr_v31 import (
     TrainingRecordCreate,
     TrainingRecordUpdate,
 )
+from app.services.document_numbers import EMPLOYEE, document_numbers
+
+# Simplified payroll rules shared by single and batch payroll runs
+STANDARD_HOURS_PER_DAY = 8
+ANNUAL_WORK_HOURS = 2080
+OVERTIME_MULTIPLIER = Decimal("1.5")
+HEALTH_INSURANCE_RATE = Decimal("0.08")  # Example: 8% for health insurance
+RETIREMENT_CONTRIBUTION_RATE = Decimal("0.05")  # Example: 5% 401k contribution
+FEDERAL_TAX_RATE = Decimal("0.22")  # Example: 22% federal rate
+SOCIAL_SECURITY_RATE = Decimal("0.062")  # 6.2% social security
+MEDICARE_RATE = Decimal("0.0145")  # 1.45% medicare
+PAY_DATE_OFFSET = timedelta(days=3)
+
+CENT = Decimal("0.01")
+RATE_UNIT = Decimal("0.0001")
+
+PAYROLL_INSERT_BATCH_SIZE = 1000
+
+_NO_PAYROLL = {
+    "gross_pay": Decimal("0"),
+    "net_pay": Decimal("0"),
+    "tax_withheld": Decimal("0"),
+    "period_records": 0,
+}
+
+
+def _standard_hours(
+    employment_type: EmploymentType, pay_period_start: date, pay_period_end: date
+) -> Decimal:
+    """Default regular hours for a pay period."""
+    if employment_type != EmploymentType.FULL_TIME:
+        return Decimal("0")
+    days_in_period = (pay_period_end - pay_period_start).days + 1
+    return Decimal(days_in_period * STANDARD_HOURS_PER_DAY)
+
+
+def _regular_rate(
+    hourly_rate: Optional[Decimal], base_salary: Optional[Decimal]
+) -> Decimal:
+    """Hourly rate, derived from the annual salary when not set."""
+    if hourly_rate:
+        rate = Decimal(hourly_rate)
+    elif base_salary:
+        rate = Decimal(base_salary) / ANNUAL_WORK_HOURS
+    else:
+        raise ValueError("Employee has no hourly rate or base salary")
+    return rate.quantize(RATE_UNIT, rounding=ROUND_HALF_UP)
+
+
+def _cents(values: Iterable[Decimal]) -> List[Decimal]:
+    return [value.quantize(CENT, rounding=ROUND_HALF_UP) for value in values]
+
+
+def _compute_payroll_amounts(
+    regular_hours: List[Decimal],
+    overtime_hours: List[Decimal],
+    regular_rates: List[Decimal],
+) -> Dict[str, List[Decimal]]:
+    """Pay, deductions and taxes for many employees, one column at a time.
+
+    Every amount is rounded to cents as it is computed, so the stored
+    components always add up to gross and net pay exactly.
+    """
+    overtime_rates = [
+        (rate * OVERTIME_MULTIPLIER).quantize(RATE_UNIT, rounding=ROUND_HALF_UP)
+        for rate in regular_rates
+    ]
+    regular_pay = _cents(map(mul, regular_hours, regular_rates))
+    overtime_pay = _cents(map(mul, overtime_hours, overtime_rates))
+    gross_pay = list(map(add, regular_pay, overtime_pay))
+
+    # Taxable income is gross pay less pre-tax deductions
+    health_insurance = _cents(pay * HEALTH_INSURANCE_RATE for pay in gross_pay)
+    retirement = _cents(pay * RETIREMENT_CONTRIBUTION_RATE for pay in gross_pay)
+    taxable_income = list(map(sub, map(sub, gross_pay, health_insurance), retirement))
+
+    federal_tax = _cents(income * FEDERAL_TAX_RATE for income in taxable_income)
+    social_security = _cents(income * SOCIAL_SECURITY_RATE for income in taxable_income)
+    medicare_tax = _cents(income * MEDICARE_RATE for income in taxable_income)
+    total_taxes = list(map(add, map(add, federal_tax, social_security), medicare_tax))
+
+    return {
+        "regular_hours": regular_hours,
+        "regular_rate": regular_rates,
+        "regular_pay": regular_pay,
+        "overtime_hours": overtime_hours,
+        "overtime_rate": overtime_rates,
+        "overtime_pay": overtime_pay,
+        "gross_pay": gross_pay,
+        "health_insurance_employee": health_insurance,
+        "retirement_contribution_employee": retirement,
+        "taxable_income": taxable_income,
+        "federal_income_tax": federal_tax,
+        "social_security_tax": social_security,
+        "medicare_tax": medicare_tax,
+        "total_taxes": total_taxes,
+        "net_pay": list(map(sub, taxable_income, total_taxes)),
+    }
+
+
+def _payroll_row(
+    employee_id: str,
+    organization_id: str,
+    pay_period_start: date,
+    pay_period_end: date,
+    amounts: Dict[str, Decimal],
+    ytd_totals: Dict[str, Decimal],
+) -> Dict[str, Any]:
+    """Column values of a payroll record from computed amounts."""
+    row = {
+        column: value for column, value in amounts.items() if column != "total_taxes"
+    }
+    return {
+        **row,
+        "employee_id": employee_id,
+        "organization_id": organization_id,
+        "pay_period_start": pay_period_start,
+        "pay_period_end": pay_period_end,
+        "pay_date": pay_period_end + PAY_DATE_OFFSET,
+        "ytd_gross_pay": ytd_totals["gross_pay"] + amounts["gross_pay"],
+        "ytd_tax_withheld": ytd_totals["tax_withheld"] + amounts["total_taxes"],
+        "ytd_net_pay": ytd_totals["net_pay"] + amounts["net_pay"],
+    }
+
+
+# Workforce counts shared by HR metrics and daily headcount snapshots
+_NO_WORKFORCE = {
+    "headcount": 0,
+    "active_employees": 0,
+    "full_time_employees": 0,
+    "part_time_employees": 0,
+    "contract_employees": 0,
+    "new_hires": 0,
+    "terminations": 0,
+    "voluntary_terminations": 0,
+}
+
+_EMPLOYMENT_TYPE_COLUMNS = {
+    "full_time_employees": EmploymentType.FULL_TIME,
+    "part_time_employees": EmploymentType.PART_TIME,
+    "contract_employees": EmploymentType.CONTRACT,
+}
+
+
+def _percentage(part: float, whole: float) -> float:
+    return part / whole * 100 if whole > 0 else 0
+
+
+def _rounded(value: Any) -> Decimal:
+    return Decimal(str(round(value, 2)))
 
 
 class EmployeeCRUD(CRUDBase[Employee, EmployeeCreate, EmployeeUpdate]):
@@ -219,7 +372,14 @@ class EmployeeCRUD(CRUDBase[Employee, EmployeeCreate, EmployeeUpdate]):
 
     def _generate_employee_number(self, organization_id: str) -> str:
         """Generate next employee number for organization."""
-        # Get highest existing employee number
+        return document_numbers.next_number(
+            EMPLOYEE,
+            organization_id,
+            seed=lambda: self._highest_employee_number(organization_id),
+        )
+
+    def _highest_employee_number(self, organization_id: str) -> int:
+        """Highest number issued before the sequence existed."""
         highest = (
             self.db.query(Employee.employee_number)
             .filter(Employee.organization_id == organization_id)
@@ -230,12 +390,11 @@ class EmployeeCRUD(CRUDBase[Employee, EmployeeCreate, EmployeeUpdate]):
 
         if highest:
             try:
-                next_num = int(highest[0][3:]) + 1
-                return f"EMP{next_num:06d}"
+                return int(highest[0][3:])
             except ValueError:
                 pass
 
-        return "EMP000001"
+        return 0
 
 
 class PayrollCRUD(CRUDBase[PayrollRecord, PayrollRecordCreate, PayrollRecordUpdate]):
@@ -258,75 +417,31 @@ class PayrollCRUD(CRUDBase[PayrollRecord, PayrollRecordCreate, PayrollRecordUpda
         if not employee:
             raise ValueError("Employee not found")
 
-        # Calculate pay date (typically end of pay period + processing days)
-        pay_date = pay_period_end + timedelta(days=3)
-
         # Use provided hours or default based on employment type
         if regular_hours is None:
-            days_in_period = (pay_period_end - pay_period_start).days + 1
-            if employee.employment_type == EmploymentType.FULL_TIME:
-                regular_hours = Decimal(str(days_in_period * 8))  # 8 hours per day
-            else:
-                regular_hours = Decimal("0")
-
+            regular_hours = _standard_hours(
+                employee.employment_type, pay_period_start, pay_period_end
+            )
         if overtime_hours is None:
             overtime_hours = Decimal("0")
 
-        # Calculate rates
-        regular_rate = employee.hourly_rate or (
-            employee.base_salary / 2080 if employee.base_salary else Decimal("0")
+        regular_rate = _regular_rate(employee.hourly_rate, employee.base_salary)
+        amounts = _compute_payroll_amounts(
+            [regular_hours], [overtime_hours], [regular_rate]
         )
-        overtime_rate = regular_rate * Decimal("1.5")
-
-        # Calculate gross pay
-        regular_pay = regular_hours * regular_rate
-        overtime_pay = overtime_hours * overtime_rate
-        gross_pay = regular_pay + overtime_pay
-
-        # Calculate taxable income (gross pay - pre-tax deductions)
-        health_insurance = gross_pay * Decimal(
-            "0.08"
-        )  # Example: 8% for health insurance
-        retirement_contribution = gross_pay * Decimal(
-            "0.05"
-        )  # Example: 5% 401k contribution
-        taxable_income = gross_pay - health_insurance - retirement_contribution
-
-        # Calculate tax withholdings (simplified calculation)
-        federal_tax = taxable_income * Decimal("0.22")  # Example: 22% federal rate
-        social_security = taxable_income * Decimal("0.062")  # 6.2% social security
-        medicare_tax = taxable_income * Decimal("0.0145")  # 1.45% medicare
-        total_taxes = federal_tax + social_security + medicare_tax
-
-        # Calculate net pay
-        net_pay = gross_pay - health_insurance - retirement_contribution - total_taxes
 
         # Get year-to-date totals
         ytd_totals = self._calculate_ytd_totals(employee_id, pay_period_end.year)
 
         payroll_record = PayrollRecord(
-            employee_id=employee_id,
-            organization_id=employee.organization_id,
-            pay_period_start=pay_period_start,
-            pay_period_end=pay_period_end,
-            pay_date=pay_date,
-            regular_hours=regular_hours,
-            regular_rate=regular_rate,
-            regular_pay=regular_pay,
-            overtime_hours=overtime_hours,
-            overtime_rate=overtime_rate,
-            overtime_pay=overtime_pay,
-            gross_pay=gross_pay,
-            health_insurance_employee=health_insurance,
-            retirement_contribution_employee=retirement_contribution,
-            taxable_income=taxable_income,
-            federal_income_tax=federal_tax,
-            social_security_tax=social_security,
-            medicare_tax=medicare_tax,
-            net_pay=net_pay,
-            ytd_gross_pay=ytd_totals["gross_pay"] + gross_pay,
-            ytd_tax_withheld=ytd_totals["tax_withheld"] + total_taxes,
-            ytd_net_pay=ytd_totals["net_pay"] + net_pay,
+            **_payroll_row(
+                employee_id,
+                employee.organization_id,
+                pay_period_start,
+                pay_period_end,
+                {column: values[0] for column, values in amounts.items()},
+                ytd_totals,
+            )
         )
 
         self.db.add(payroll_record)
@@ -341,34 +456,109 @@ class PayrollCRUD(CRUDBase[PayrollRecord, PayrollRecordCreate, PayrollRecordUpda
         pay_period_start: date,
         pay_period_end: date,
         processed_by: str,
-    ) -> List[PayrollRecord]:
-        """Process payroll for all active employees in organization."""
-        active_employees = (
-            self.db.query(Employee)
+        dry_run: bool = False,
+    ) -> Dict[str, Any]:
+        """Process payroll for all active employees in organization.
+
+        Employees and their year-to-date totals are loaded with one query
+        each, pay is computed for everyone in a single in-memory pass, and the
+        records are inserted in one transaction. Employees that cannot be paid
+        are reported in ``errors`` without failing the run. With ``dry_run``
+        the computed records are returned and nothing is written.
+        """
+        employees = (
+            self.db.query(
+                Employee.id,
+                Employee.employee_number,
+                Employee.employment_type,
+                Employee.hourly_rate,
+                Employee.base_salary,
+            )
             .filter(Employee.organization_id == organization_id)
             .filter(Employee.employee_status == EmployeeStatus.ACTIVE)
+            .order_by(Employee.employee_number)
             .all()
         )
+        ytd_totals = self._ytd_totals_by_employee(
+            PayrollRecord.organization_id == organization_id,
+            pay_period_end.year,
+            pay_period=(pay_period_start, pay_period_end),
+        )
 
-        payroll_records = []
-        for employee in active_employees:
+        payable = []
+        regular_hours = []
+        regular_rates = []
+        errors = []
+        for employee in employees:
             try:
-                payroll_record = self.calculate_payroll(
-                    employee.id, pay_period_start, pay_period_end
+                if ytd_totals.get(employee.id, _NO_PAYROLL)["period_records"]:
+                    raise ValueError("Payroll already recorded for this pay period")
+                regular_rates.append(
+                    _regular_rate(employee.hourly_rate, employee.base_salary)
                 )
-                payroll_record.processed_by = processed_by
-                payroll_record.processed_date = datetime.utcnow()
-                payroll_record.is_processed = True
-                payroll_records.append(payroll_record)
-            except Exception as e:
-                # Log error but continue processing other employees
-                print(
-                    f"Error processing payroll for employee {employee.employee_number}: {str(e)}"
+            except (ValueError, ArithmeticError) as e:
+                errors.append(
+                    {
+                        "employee_id": employee.id,
+                        "employee_number": employee.employee_number,
+                        "error": str(e),
+                    }
                 )
                 continue
+            payable.append(employee)
+            regular_hours.append(
+                _standard_hours(
+                    employee.employment_type, pay_period_start, pay_period_end
+                )
+            )
 
-        self.db.commit()
-        return payroll_records
+        amounts = _compute_payroll_amounts(
+            regular_hours, [Decimal("0")] * len(payable), regular_rates
+        )
+        processed_date = datetime.utcnow()
+        records = [
+            {
+                "id": str(uuid.uuid4()),
+                **_payroll_row(
+                    employee.id,
+                    organization_id,
+                    pay_period_start,
+                    pay_period_end,
+                    {column: values[i] for column, values in amounts.items()},
+                    ytd_totals.get(employee.id, _NO_PAYROLL),
+                ),
+                "is_processed": True,
+                "processed_by": processed_by,
+                "processed_date": processed_date,
+            }
+            for i, employee in enumerate(payable)
+        ]
+
+        if not dry_run and records:
+            try:
+                for start in range(0, len(records), PAYROLL_INSERT_BATCH_SIZE):
+                    self.db.execute(
+                        insert(PayrollRecord),
+                        records[start : start + PAYROLL_INSERT_BATCH_SIZE],
+                    )
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
+
+        return {
+            "organization_id": organization_id,
+            "pay_period_start": pay_period_start,
+            "pay_period_end": pay_period_end,
+            "dry_run": dry_run,
+            "processed_count": len(records),
+            "error_count": len(errors),
+            "total_gross_pay": sum(amounts["gross_pay"], Decimal("0")),
+            "total_net_pay": sum(amounts["net_pay"], Decimal("0")),
+            "total_taxes_withheld": sum(amounts["total_taxes"], Decimal("0")),
+            "records": records,
+            "errors": errors,
+        }
 
     def get_payroll_summary(
         self, organization_id: str, year: int, month: Optional[int] = None
@@ -412,22 +602,56 @@ class PayrollCRUD(CRUDBase[PayrollRecord, PayrollRecordCreate, PayrollRecordUpda
 
     def _calculate_ytd_totals(self, employee_id: str, year: int) -> Dict[str, Decimal]:
         """Calculate year-to-date totals for employee."""
-        ytd_records = (
-            self.db.query(PayrollRecord)
-            .filter(PayrollRecord.employee_id == employee_id)
-            .filter(func.extract("year", PayrollRecord.pay_period_end) == year)
+        return self._ytd_totals_by_employee(
+            PayrollRecord.employee_id == employee_id, year
+        ).get(employee_id, _NO_PAYROLL)
+
+    def _ytd_totals_by_employee(
+        self,
+        criterion: Any,
+        year: int,
+        pay_period: Optional[tuple] = None,
+    ) -> Dict[str, Dict[str, Decimal]]:
+        """Year-to-date totals per employee in one grouped query.
+
+        ``period_records`` counts records already on file for ``pay_period``.
+        """
+        taxes = (
+            func.coalesce(PayrollRecord.federal_income_tax, 0)
+            + func.coalesce(PayrollRecord.social_security_tax, 0)
+            + func.coalesce(PayrollRecord.medicare_tax, 0)
+        )
+        in_pay_period = (
+            and_(
+                PayrollRecord.pay_period_start == pay_period[0],
+                PayrollRecord.pay_period_end == pay_period[1],
+            )
+            if pay_period
+            else false()
+        )
+        rows = (
+            self.db.query(
+                PayrollRecord.employee_id,
+                func.sum(PayrollRecord.gross_pay),
+                func.sum(PayrollRecord.net_pay),
+                func.sum(taxes),
+                func.sum(case((in_pay_period, 1), else_=0)),
+            )
+            .filter(criterion)
+            .filter(PayrollRecord.pay_period_end >= date(year, 1, 1))
+            .filter(PayrollRecord.pay_period_end < date(year + 1, 1, 1))
+            .group_by(PayrollRecord.employee_id)
             .all()
         )
 
         return {
-            "gross_pay": sum(record.gross_pay for record in ytd_records),
-            "net_pay": sum(record.net_pay for record in ytd_records),
-            "tax_withheld": sum(
-                (record.federal_income_tax or 0)
-                + (record.social_security_tax or 0)
-                + (record.medicare_tax or 0)
-                for record in ytd_records
-            ),
+            employee_id: {
+                "gross_pay": Decimal(gross_pay or 0),
+                "net_pay": Decimal(net_pay or 0),
+                "tax_withheld": Decimal(tax_withheld or 0),
+                "period_records": period_records or 0,
+            }
+            for employee_id, gross_pay, net_pay, tax_withheld, period_records in rows
         }
 
 
@@ -1077,142 +1301,209 @@ class HRAnalyticsCRUD(CRUDBase[HRAnalytics, None, None]):
         calculated_by: str,
     ) -> HRAnalytics:
         """Calculate comprehensive HR metrics for specified period."""
+        return self.calculate_hr_metrics_batch(
+            [organization_id], period_start, period_end, calculated_by
+        )[0]
 
-        # Get employee counts
-        total_employees = (
-            self.db.query(Employee)
-            .filter(Employee.organization_id == organization_id)
-            .filter(Employee.hire_date <= period_end)
-            .filter(
-                or_(
-                    Employee.termination_date.is_(None),
-                    Employee.termination_date > period_start,
-                )
-            )
-            .count()
-        )
-
-        active_employees = (
-            self.db.query(Employee)
-            .filter(Employee.organization_id == organization_id)
-            .filter(Employee.employee_status == EmployeeStatus.ACTIVE)
-            .filter(Employee.hire_date <= period_end)
-            .count()
+    def calculate_hr_metrics_batch(
+        self,
+        organization_ids: List[str],
+        period_start: date,
+        period_end: date,
+        calculated_by: str,
+    ) -> List[HRAnalytics]:
+        """Calculate HR metrics for several organizations, e.g. a group.
+
+        Employees, reviews, trainings and payroll records are each scanned
+        once for all organizations; every metric is a filtered aggregate of
+        that scan, grouped by organization.
+        """
+        organization_ids = list(dict.fromkeys(organization_ids))
+        workforce = self._workforce_counts(organization_ids, period_start, period_end)
+        reviews = self._completion_counts(
+            PerformanceReview,
+            PerformanceReview.review_period_end,
+            PerformanceReview.status == "completed",
+            organization_ids,
+            period_start,
+            period_end,
         )
-
-        # Calculate hiring metrics
-        new_hires = (
-            self.db.query(Employee)
-            .filter(Employee.organization_id == organization_id)
-            .filter(Employee.hire_date >= period_start)
-            .filter(Employee.hire_date <= period_end)
-            .count()
+        trainings = self._completion_counts(
+            TrainingRecord,
+            TrainingRecord.start_date,
+            TrainingRecord.status == TrainingStatus.COMPLETED,
+            organization_ids,
+            period_start,
+            period_end,
         )
+        payroll = {
+            row.organization_id: row
+            for row in self.db.query(
+                PayrollRecord.organization_id,
+                func.count().label("records"),
+                func.sum(PayrollRecord.gross_pay).label("gross_pay"),
+            )
+            .filter(PayrollRecord.organization_id.in_(organization_ids))
+            .filter(PayrollRecord.pay_period_end >= period_start)
+            .filter(PayrollRecord.pay_period_end <= period_end)
+            .group_by(PayrollRecord.organization_id)
+        }
 
-        # Calculate turnover metrics
-        terminations = (
-            self.db.query(Employee)
-            .filter(Employee.organization_id == organization_id)
-            .filter(Employee.termination_date >= period_start)
-            .filter(Employee.termination_date <= period_end)
-            .count()
-        )
+        calculated_date = datetime.utcnow()
+        results = []
+        for organization_id in organization_ids:
+            counts = workforce.get(organization_id, _NO_WORKFORCE)
+            review_total, reviews_completed = reviews.get(organization_id, (0, 0))
+            training_total, trainings_completed = trainings.get(organization_id, (0, 0))
+            payroll_row = payroll.get(organization_id)
+            total_payroll_cost = (payroll_row and payroll_row.gross_pay) or Decimal("0")
+            average_salary = (
+                total_payroll_cost / payroll_row.records if payroll_row else 0
+            )
 
-        voluntary_terminations = (
-            self.db.query(Employee)
-            .filter(Employee.organization_id == organization_id)
-            .filter(Employee.termination_date >= period_start)
-            .filter(Employee.termination_date <= period_end)
-            .filter(Employee.termination_reason.like("%voluntary%"))
-            .count()
-        )
+            turnover_rate = _percentage(
+                counts["terminations"], counts["active_employees"]
+            )
+            results.append(
+                HRAnalytics(
+                    organization_id=organization_id,
+                    period_start=period_start,
+                    period_end=period_end,
+                    total_employees=counts["headcount"],
+                    active_employees=counts["active_employees"],
+                    full_time_employees=counts["full_time_employees"],
+                    part_time_employees=counts["part_time_employees"],
+                    contract_employees=counts["contract_employees"],
+                    new_hires=counts["new_hires"],
+                    total_terminations=counts["terminations"],
+                    voluntary_terminations=counts["voluntary_terminations"],
+                    turnover_rate=_rounded(turnover_rate),
+                    voluntary_turnover_rate=_rounded(
+                        _percentage(
+                            counts["voluntary_terminations"],
+                            counts["active_employees"],
+                        )
+                    ),
+                    retention_rate=_rounded(100 - turnover_rate),
+                    performance_review_completion_rate=_rounded(
+                        _percentage(reviews_completed, review_total)
+                    ),
+                    training_completion_rate=_rounded(
+                        _percentage(trainings_completed, training_total)
+                    ),
+                    average_salary=_rounded(average_salary),
+                    payroll_cost_total=Decimal(str(total_payroll_cost)),
+                    calculated_date=calculated_date,
+                    calculated_by=calculated_by,
+                )
+            )
 
-        # Calculate rates
-        turnover_rate = (
-            (terminations / active_employees * 100) if active_employees > 0 else 0
-        )
-        voluntary_turnover_rate = (
-            (voluntary_terminations / active_employees * 100)
-            if active_employees > 0
-            else 0
-        )
-        retention_rate = 100 - turnover_rate
+        self.db.add_all(results)
+        self.db.commit()
 
-        # Get performance metrics
-        performance_reviews = (
-            self.db.query(PerformanceReview)
-            .filter(PerformanceReview.organization_id == organization_id)
-            .filter(PerformanceReview.review_period_end >= period_start)
-            .filter(PerformanceReview.review_period_end <= period_end)
-            .all()
-        )
+        return results
 
-        completed_reviews = [r for r in performance_reviews if r.status == "completed"]
-        review_completion_rate = (
-            (len(completed_reviews) / len(performance_reviews) * 100)
-            if performance_reviews
-            else 0
-        )
+    def capture_headcount_snapshots(
+        self, organization_ids: List[str], snapshot_date: date = None
+    ) -> List[HeadcountSnapshot]:
+        """Record the day's headcount for each organization.
 
-        # Get training metrics
-        training_records = (
-            self.db.query(TrainingRecord)
-            .filter(TrainingRecord.organization_id == organization_id)
-            .filter(TrainingRecord.start_date >= period_start)
-            .filter(TrainingRecord.start_date <= period_end)
-            .all()
-        )
+        Run daily by ``HeadcountSnapshotJob``; running it again for the same
+        day refreshes that day's snapshots.
+        """
+        if not snapshot_date:
+            snapshot_date = date.today()
+        organization_ids = list(dict.fromkeys(organization_ids))
 
-        completed_trainings = [
-            t for t in training_records if t.status == TrainingStatus.COMPLETED
-        ]
-        training_completion_rate = (
-            (len(completed_trainings) / len(training_records) * 100)
-            if training_records
-            else 0
+        workforce = self._workforce_counts(
+            organization_ids, snapshot_date, snapshot_date
         )
+        existing = {
+            snapshot.organization_id: snapshot
+            for snapshot in self.db.query(HeadcountSnapshot)
+            .filter(HeadcountSnapshot.organization_id.in_(organization_ids))
+            .filter(HeadcountSnapshot.snapshot_date == snapshot_date)
+        }
 
-        # Get payroll metrics
-        payroll_records = (
-            self.db.query(PayrollRecord)
-            .filter(PayrollRecord.organization_id == organization_id)
-            .filter(PayrollRecord.pay_period_end >= period_start)
-            .filter(PayrollRecord.pay_period_end <= period_end)
-            .all()
-        )
+        captured_at = datetime.utcnow()
+        snapshots = []
+        for organization_id in organization_ids:
+            snapshot = existing.get(organization_id)
+            if snapshot is None:
+                snapshot = HeadcountSnapshot(
+                    organization_id=organization_id, snapshot_date=snapshot_date
+                )
+                self.db.add(snapshot)
+            for column, value in workforce.get(organization_id, _NO_WORKFORCE).items():
+                setattr(snapshot, column, value)
+            snapshot.captured_at = captured_at
+            snapshots.append(snapshot)
 
-        total_payroll_cost = sum(record.gross_pay for record in payroll_records)
-        average_salary = (
-            total_payroll_cost / len(payroll_records) if payroll_records else 0
-        )
+        self.db.commit()
+        return snapshots
 
-        analytics = HRAnalytics(
-            organization_id=organization_id,
-            period_start=period_start,
-            period_end=period_end,
-            total_employees=total_employees,
-            active_employees=active_employees,
-            new_hires=new_hires,
-            total_terminations=terminations,
-            voluntary_terminations=voluntary_terminations,
-            turnover_rate=Decimal(str(round(turnover_rate, 2))),
-            voluntary_turnover_rate=Decimal(str(round(voluntary_turnover_rate, 2))),
-            retention_rate=Decimal(str(round(retention_rate, 2))),
-            performance_review_completion_rate=Decimal(
-                str(round(review_completion_rate, 2))
-            ),
-            training_completion_rate=Decimal(str(round(training_completion_rate, 2))),
-            average_salary=Decimal(str(round(average_salary, 2))),
-            payroll_cost_total=Decimal(str(total_payroll_cost)),
-            calculated_date=datetime.utcnow(),
-            calculated_by=calculated_by,
-        )
+    def get_headcount_trend(
+        self, organization_id: str, start_date: date, end_date: date
+    ) -> Dict[str, Any]:
+        """Headcount trend for a period, read from daily snapshots."""
+        return self.get_headcount_trends([organization_id], start_date, end_date)[
+            organization_id
+        ]
 
-        self.db.add(analytics)
-        self.db.commit()
-        self.db.refresh(analytics)
+    def get_headcount_trends(
+        self, organization_ids: List[str], start_date: date, end_date: date
+    ) -> Dict[str, Dict[str, Any]]:
+        """Headcount trends for several organizations from daily snapshots.
 
-        return analytics
+        Today's snapshot is captured first if the period includes today and it
+        is missing; earlier days without a snapshot are reported as missing
+        rather than reconstructed.
+        """
+        organization_ids = list(dict.fromkeys(organization_ids))
+        today = date.today()
+        snapshots = self._snapshots(organization_ids, start_date, end_date)
+        if start_date <= today <= end_date:
+            uncaptured = [
+                organization_id
+                for organization_id in organization_ids
+                if not snapshots[organization_id]
+                or snapshots[organization_id][-1].snapshot_date != today
+            ]
+            if uncaptured:
+                for snapshot in self.capture_headcount_snapshots(uncaptured, today):
+                    snapshots[snapshot.organization_id].append(snapshot)
+
+        period_days = (end_date - start_date).days + 1
+        trends = {}
+        for organization_id in organization_ids:
+            history = snapshots[organization_id]
+            headcounts = [snapshot.headcount for snapshot in history]
+            average_headcount = sum(headcounts) / len(headcounts) if history else 0
+            terminations = sum(snapshot.terminations for snapshot in history)
+            trends[organization_id] = {
+                "organization_id": organization_id,
+                "start_date": start_date,
+                "end_date": end_date,
+                "days_captured": len(history),
+                "days_missing": period_days - len(history),
+                "starting_headcount": headcounts[0] if history else None,
+                "ending_headcount": headcounts[-1] if history else None,
+                "average_headcount": round(average_headcount, 2),
+                "new_hires": sum(snapshot.new_hires for snapshot in history),
+                "terminations": terminations,
+                "turnover_rate": round(_percentage(terminations, average_headcount), 2),
+                "history": [
+                    {
+                        "date": snapshot.snapshot_date,
+                        "headcount": snapshot.headcount,
+                        "active_employees": snapshot.active_employees,
+                        "new_hires": snapshot.new_hires,
+                        "terminations": snapshot.terminations,
+                    }
+                    for snapshot in history
+                ],
+            }
+        return trends
 
     def get_hr_dashboard_metrics(
         self, organization_id: str, as_of_date: date = None
@@ -1233,29 +1524,22 @@ class HRAnalyticsCRUD(CRUDBase[HRAnalytics, None, None]):
         if not latest_analytics:
             return {"message": "No HR analytics data available"}
 
-        # Get current employee counts
-        current_active = (
-            self.db.query(Employee)
+        # Current active employees, pending leave requests and upcoming
+        # performance reviews in one round trip
+        current_active, pending_leave, upcoming_reviews = self.db.query(
+            self.db.query(func.count(Employee.id))
             .filter(Employee.organization_id == organization_id)
             .filter(Employee.employee_status == EmployeeStatus.ACTIVE)
-            .count()
-        )
-
-        # Get pending leave requests
-        pending_leave = (
-            self.db.query(LeaveRequest)
+            .scalar_subquery(),
+            self.db.query(func.count(LeaveRequest.id))
             .filter(LeaveRequest.organization_id == organization_id)
             .filter(LeaveRequest.status == LeaveStatus.PENDING)
-            .count()
-        )
-
-        # Get upcoming performance reviews
-        upcoming_reviews = (
-            self.db.query(PerformanceReview)
+            .scalar_subquery(),
+            self.db.query(func.count(PerformanceReview.id))
             .filter(PerformanceReview.organization_id == organization_id)
             .filter(PerformanceReview.status == "draft")
-            .count()
-        )
+            .scalar_subquery(),
+        ).one()
 
         return {
             "organization_id": organization_id,
@@ -1275,3 +1559,103 @@ class HRAnalyticsCRUD(CRUDBase[HRAnalytics, None, None]):
             "upcoming_performance_reviews": upcoming_reviews,
             "last_analytics_update": latest_analytics.calculated_date,
         }
+
+    def _workforce_counts(
+        self, organization_ids: List[str], period_start: date, period_end: date
+    ) -> Dict[str, Dict[str, int]]:
+        """Employee counts per organization from one scan of employees.
+
+        ``headcount`` counts employees employed at some point in the period;
+        for a single day that is the headcount on that day.
+        """
+        employed = and_(
+            Employee.hire_date <= period_end,
+            or_(
+                Employee.termination_date.is_(None),
+                Employee.termination_date > period_start,
+            ),
+        )
+        terminated = and_(
+            Employee.termination_date >= period_start,
+            Employee.termination_date <= period_end,
+        )
+        rows = (
+            self.db.query(
+                Employee.organization_id,
+                func.count().filter(employed).label("headcount"),
+                func.count()
+                .filter(
+                    and_(
+                        Employee.employee_status == EmployeeStatus.ACTIVE,
+                        Employee.hire_date <= period_end,
+                    )
+                )
+                .label("active_employees"),
+                *(
+                    func.count()
+                    .filter(and_(employed, Employee.employment_type == employment_type))
+                    .label(column)
+                    for column, employment_type in _EMPLOYMENT_TYPE_COLUMNS.items()
+                ),
+                func.count()
+                .filter(
+                    and_(
+                        Employee.hire_date >= period_start,
+                        Employee.hire_date <= period_end,
+                    )
+                )
+                .label("new_hires"),
+                func.count().filter(terminated).label("terminations"),
+                func.count()
+                .filter(
+                    and_(terminated, Employee.termination_reason.like("%voluntary%"))
+                )
+                .label("voluntary_terminations"),
+            )
+            .filter(Employee.organization_id.in_(organization_ids))
+            .group_by(Employee.organization_id)
+            .all()
+        )
+        return {
+            row.organization_id: {
+                column: row._mapping[column] for column in _NO_WORKFORCE
+            }
+            for row in rows
+        }
+
+    def _completion_counts(
+        self,
+        model: Any,
+        period_column: Any,
+        completed: Any,
+        organization_ids: List[str],
+        period_start: date,
+        period_end: date,
+    ) -> Dict[str, tuple]:
+        """(total, completed) records per organization within the period."""
+        rows = (
+            self.db.query(
+                model.organization_id,
+                func.count(),
+                func.count().filter(completed),
+            )
+            .filter(model.organization_id.in_(organization_ids))
+            .filter(period_column >= period_start)
+            .filter(period_column <= period_end)
+            .group_by(model.organization_id)
+        )
+        return {organization_id: (total, done) for organization_id, total, done in rows}
+
+    def _snapshots(
+        self, organization_ids: List[str], start_date: date, end_date: date
+    ) -> Dict[str, List[HeadcountSnapshot]]:
+        snapshots = {organization_id: [] for organization_id in organization_ids}
+        for snapshot in (
+            self.db.query(HeadcountSnapshot)
+            .filter(HeadcountSnapshot.organization_id.in_(organization_ids))
+            .filter(HeadcountSnapshot.snapshot_date >= start_date)
+            .filter(HeadcountSnapshot.snapshot_date <= end_date)
+            .order_by(HeadcountSnapshot.snapshot_date)
+        ):
+            snapshots[snapshot.organization_id].append(snapshot)
+        return snapshots
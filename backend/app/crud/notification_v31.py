@@ -14,11 +14,14 @@ Comprehensive CRUD operations for notification system including:
 - Integration & Webhook Support
 """
 
+import asyncio
+import re
 import uuid
 from datetime import date, datetime, timedelta
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy import desc, func
+from sqlalchemy import desc, func, insert
 from sqlalchemy.orm import Session, joinedload
 
 from app.models.notification_extended import (
@@ -40,10 +43,116 @@ from app.models.notification_extended import (
     SubscriptionStatus,
 )
 
+# Maximum in-flight deliveries per channel while processing a queue batch
+DEFAULT_CHANNEL_CONCURRENCY = {
+    NotificationChannel.EMAIL: 20,
+    NotificationChannel.SMS: 10,
+    NotificationChannel.PUSH: 50,
+    NotificationChannel.IN_APP: 100,
+}
+
+
+# How long a claimed queue item may stay "processing" before another worker
+# assumes its claimant died and reclaims it
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+# Recipients inserted per transaction when fanning out rule notifications
+FANOUT_CHUNK_SIZE = 1000
+
+# Compiled notification templates kept per service instance
+TEMPLATE_CACHE_SIZE = 512
+
+# Template variables that differ per recipient during fan-out
+RECIPIENT_VARIABLES = {"recipient_user_id", "recipient_email"}
+
+TEMPLATE_PLACEHOLDER = re.compile(r"\{\{([^{}]+)\}\}")
+
+
+class CompiledTemplate:
+    """Template text split once into literal and placeholder segments."""
+
+    __slots__ = ("literals", "names")
+
+    def __init__(self, template_text: str):
+        parts = TEMPLATE_PLACEHOLDER.split(template_text or "")
+        self.literals = parts[0::2]
+        self.names = parts[1::2]
+
+    @property
+    def variables(self) -> set:
+        return set(self.names)
+
+    def render(self, variables: Dict[str, Any]) -> str:
+        """Substitute variables; unknown placeholders are kept as-is."""
+        result = [self.literals[0]]
+        for name, literal in zip(self.names, self.literals[1:]):
+            if name in variables:
+                result.append(str(variables[name]))
+            else:
+                result.append(f"{{{{{name}}}}}")
+            result.append(literal)
+        return "".join(result)
+
+
+@lru_cache(maxsize=1024)
+def compile_template(template_text: str) -> CompiledTemplate:
+    """Compile template text, reusing the result for identical text."""
+    return CompiledTemplate(template_text)
+
+
+class FanoutContent:
+    """Notification content rendered once for every recipient of a rule.
+
+    Only fields whose template references a recipient variable are
+    rendered again per recipient.
+    """
+
+    def __init__(
+        self,
+        templates: Dict[str, Optional[CompiledTemplate]],
+        variables: Dict[str, Any],
+    ):
+        self.variables = variables
+        self.shared: Dict[str, Optional[str]] = {}
+        self.personalized: Dict[str, CompiledTemplate] = {}
+        for field, template in templates.items():
+            if template is None:
+                self.shared[field] = None
+            elif template.variables & RECIPIENT_VARIABLES:
+                self.personalized[field] = template
+            else:
+                self.shared[field] = template.render(variables)
+
+    def render(self, recipient: Dict[str, Any]) -> Dict[str, Optional[str]]:
+        if not self.personalized:
+            return self.shared
+
+        variables = {
+            **self.variables,
+            "recipient_user_id": recipient.get("user_id"),
+            "recipient_email": recipient.get("email"),
+        }
+        return {
+            **self.shared,
+            **{
+                field: template.render(variables)
+                for field, template in self.personalized.items()
+            },
+        }
+
 
 class NotificationService:
     """Service class for notification system operations."""
 
+    def __init__(
+        self, channel_concurrency: Optional[Dict[NotificationChannel, int]] = None
+    ):
+        self.channel_concurrency = {
+            **DEFAULT_CHANNEL_CONCURRENCY,
+            **(channel_concurrency or {}),
+        }
+        self._template_cache: Dict[str, tuple] = {}
+
     # =============================================================================
     # Notification Management
     # =============================================================================
@@ -325,17 +434,12 @@ class NotificationService:
             raise ValueError("Template not found")
 
         # Process template variables
-        processed_title = self._process_template_variables(
-            template.title_template or template.name, variables
-        )
-        processed_message = self._process_template_variables(
-            template.message_template, variables
-        )
+        compiled = self._get_compiled_template(template)
+        processed_title = compiled["title"].render(variables)
+        processed_message = compiled["message"].render(variables)
         processed_html = None
-        if template.html_template:
-            processed_html = self._process_template_variables(
-                template.html_template, variables
-            )
+        if compiled["html"]:
+            processed_html = compiled["html"].render(variables)
 
         # Create notification with processed content
         notification_data.update(
@@ -367,12 +471,33 @@ class NotificationService:
         if not template_text:
             return ""
 
-        result = template_text
-        for key, value in variables.items():
-            placeholder = f"{{{{{key}}}}}"
-            result = result.replace(placeholder, str(value))
+        return compile_template(template_text).render(variables)
+
+    def _get_compiled_template(
+        self, template: NotificationTemplate
+    ) -> Dict[str, Optional[CompiledTemplate]]:
+        """Get compiled title/message/html parts, cached by template version."""
+
+        version = template.updated_at or template.created_at
+        cached = self._template_cache.get(template.id)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        compiled = {
+            "title": compile_template(template.title_template or template.name),
+            "message": compile_template(template.message_template),
+            "html": compile_template(template.html_template)
+            if template.html_template
+            else None,
+        }
 
-        return result
+        # Evict the oldest entry once the cache is full
+        self._template_cache.pop(template.id, None)
+        if len(self._template_cache) >= TEMPLATE_CACHE_SIZE:
+            self._template_cache.pop(next(iter(self._template_cache)))
+        self._template_cache[template.id] = (version, compiled)
+
+        return compiled
 
     # =============================================================================
     # Delivery Management
@@ -707,41 +832,81 @@ class NotificationService:
     async def _generate_notifications_from_rule(
         self, db: Session, rule: NotificationRule, event: NotificationEvent
     ) -> List[NotificationExtended]:
-        """Generate notifications based on rule configuration."""
+        """Generate notifications based on rule configuration.
+
+        Content shared by all recipients is rendered once and notifications
+        are inserted with queue entries in chunks of ``FANOUT_CHUNK_SIZE``,
+        one transaction per chunk.
+        """
 
         notifications = []
 
         # Determine recipients based on rule
         recipients = await self._determine_rule_recipients(db, rule, event)
 
-        for recipient in recipients:
-            # Create notification data
-            notification_data = {
-                "organization_id": rule.organization_id,
-                "title": f"Event: {event.event_name}",
-                "message": f"Event {event.event_name} occurred",
-                "notification_type": rule.notification_type or NotificationType.INFO,
-                "priority": rule.priority_override or NotificationPriority.NORMAL,
-                "channels": rule.channels,
-                "recipient_user_id": recipient.get("user_id"),
-                "recipient_email": recipient.get("email"),
-                "template_id": rule.template_id,
-                "template_variables": self._build_template_variables(rule, event),
-                "source_system": event.source_system,
-                "source_event": event.event_name,
-                "source_entity_type": event.entity_type,
-                "source_entity_id": event.entity_id,
-                "context_data": event.event_data,
-            }
-
+        template_variables = self._build_template_variables(rule, event)
+        content = self._fanout_content(db, rule, event, template_variables)
+        send_at = None
+        if rule.delay_seconds:
             # Apply delay if configured
-            if rule.delay_seconds:
-                notification_data["send_at"] = datetime.utcnow() + timedelta(
-                    seconds=rule.delay_seconds
+            send_at = datetime.utcnow() + timedelta(seconds=rule.delay_seconds)
+
+        for offset in range(0, len(recipients), FANOUT_CHUNK_SIZE):
+            chunk = recipients[offset : offset + FANOUT_CHUNK_SIZE]
+            now = datetime.utcnow()
+
+            notification_rows = []
+            queue_rows = []
+            for recipient in chunk:
+                notification_id = str(uuid.uuid4())
+                notification_rows.append(
+                    {
+                        "id": notification_id,
+                        "notification_number": f"NOTIF-{uuid.uuid4().hex[:8].upper()}",
+                        "organization_id": rule.organization_id,
+                        **content.render(recipient),
+                        "notification_type": rule.notification_type
+                        or NotificationType.INFO,
+                        "priority": rule.priority_override
+                        or NotificationPriority.NORMAL,
+                        "status": NotificationStatus.PENDING,
+                        "channels": rule.channels,
+                        "primary_channel": NotificationChannel.IN_APP,
+                        "recipient_user_id": recipient.get("user_id"),
+                        "recipient_email": recipient.get("email"),
+                        "send_at": send_at,
+                        "template_id": rule.template_id,
+                        "template_variables": template_variables,
+                        "source_system": event.source_system,
+                        "source_event": event.event_name,
+                        "source_entity_type": event.entity_type,
+                        "source_entity_id": event.entity_id,
+                        "context_data": event.event_data,
+                        "created_at": now,
+                    }
                 )
+                queue_rows.append(
+                    {
+                        "id": str(uuid.uuid4()),
+                        "notification_id": notification_id,
+                        "organization_id": rule.organization_id,
+                        "queue_name": "default",
+                        "priority": 100,
+                        "status": "pending",
+                        "attempts": 0,
+                        "max_attempts": 3,
+                        "scheduled_at": send_at or now,
+                        "process_after": send_at or now,
+                    }
+                )
+
+            db.execute(insert(NotificationExtended.__table__), notification_rows)
+            db.execute(insert(NotificationQueue.__table__), queue_rows)
+            db.commit()
 
-            notification = await self.create_notification(db, notification_data)
-            notifications.append(notification)
+            notifications.extend(
+                NotificationExtended(**row) for row in notification_rows
+            )
 
         # Update rule execution statistics
         rule.execution_count += 1
@@ -753,6 +918,42 @@ class NotificationService:
 
         return notifications
 
+    def _fanout_content(
+        self,
+        db: Session,
+        rule: NotificationRule,
+        event: NotificationEvent,
+        variables: Dict[str, Any],
+    ) -> FanoutContent:
+        """Render rule content once, leaving only per-recipient parts."""
+
+        template = None
+        if rule.template_id:
+            template = (
+                db.query(NotificationTemplate)
+                .filter(NotificationTemplate.id == rule.template_id)
+                .first()
+            )
+
+        if not template:
+            return FanoutContent(
+                {
+                    "title": compile_template(f"Event: {event.event_name}"),
+                    "message": compile_template(f"Event {event.event_name} occurred"),
+                },
+                variables,
+            )
+
+        compiled = self._get_compiled_template(template)
+        return FanoutContent(
+            {
+                "title": compiled["title"],
+                "message": compiled["message"],
+                "content_html": compiled["html"],
+            },
+            variables,
+        )
+
     async def _determine_rule_recipients(
         self, db: Session, rule: NotificationRule, event: NotificationEvent
     ) -> List[Dict[str, Any]]:
@@ -950,63 +1151,132 @@ class NotificationService:
     async def process_notification_queue(
         self, db: Session, queue_name: str = "default", batch_size: int = 100
     ) -> List[NotificationExtended]:
-        """Process queued notifications for delivery."""
-
-        # Get pending queue items
-        queue_items = (
-            db.query(NotificationQueue)
-            .filter(
-                NotificationQueue.queue_name == queue_name,
-                NotificationQueue.status == "pending",
-                NotificationQueue.process_after <= datetime.utcnow(),
-            )
-            .order_by(NotificationQueue.priority.desc(), NotificationQueue.created_at)
-            .limit(batch_size)
+        """Process queued notifications for delivery.
+
+        Safe to run from several workers: each batch is claimed with
+        ``FOR UPDATE SKIP LOCKED``, delivered concurrently within per-channel
+        limits and written back in a single commit. Only notifications whose
+        queue item completed are marked sent; failed items are re-queued with
+        backoff until ``max_attempts`` is reached.
+        """
+
+        queue_items = self._claim_queue_items(db, queue_name, batch_size)
+        if not queue_items:
+            return []
+
+        started_at = datetime.utcnow()
+
+        # Load all claimed notifications at once
+        notification_ids = {item.notification_id for item in queue_items}
+        notifications = {
+            notification.id: notification
+            for notification in db.query(NotificationExtended)
+            .filter(NotificationExtended.id.in_(notification_ids))
             .all()
-        )
-
-        processed_notifications = []
+        }
 
+        deliveries: List[NotificationDelivery] = []
+        failures: Dict[str, str] = {}
         for item in queue_items:
+            notification = notifications.get(item.notification_id)
+            if not notification:
+                continue
             try:
-                # Mark as processing
-                item.status = "processing"
-                db.commit()
+                deliveries.extend(self._build_deliveries(notification))
+            except Exception as e:
+                failures[item.id] = str(e)
 
-                # Process notification
-                notification = await self.get_notification_by_id(
-                    db, item.notification_id
-                )
-                if notification:
-                    await self._deliver_notification(db, notification)
-                    processed_notifications.append(notification)
+        db.add_all(deliveries)
+        await self._send_deliveries(db, deliveries)
 
-                # Mark as completed
-                item.status = "completed"
-                item.processed_at = datetime.utcnow()
+        # Batched status updates
+        processed_notifications = []
+        now = datetime.utcnow()
+        for item in queue_items:
+            item.processing_time_ms = int((now - started_at).total_seconds() * 1000)
 
-            except Exception as e:
+            if item.id in failures:
                 # Mark as failed
                 item.status = "failed"
-                item.error_message = str(e)
-                item.attempts += 1
+                item.error_message = failures[item.id]
+                item.attempts = (item.attempts or 0) + 1
 
                 # Retry if not exceeded max attempts
                 if item.attempts < item.max_attempts:
                     item.status = "pending"
-                    item.process_after = datetime.utcnow() + timedelta(
-                        minutes=5 * item.attempts
-                    )
+                    item.process_after = now + timedelta(minutes=5 * item.attempts)
+                continue
 
-            db.commit()
+            # Mark as completed
+            item.status = "completed"
+            item.processed_at = now
+            notification = notifications.get(item.notification_id)
+            if notification:
+                notification.status = NotificationStatus.SENT
+                notification.sent_at = now
+                processed_notifications.append(notification)
+
+        db.commit()
 
         return processed_notifications
 
-    async def _deliver_notification(
-        self, db: Session, notification: NotificationExtended
-    ):
-        """Deliver notification through configured channels."""
+    def _claim_queue_items(
+        self, db: Session, queue_name: str, batch_size: int
+    ) -> List[NotificationQueue]:
+        """Claim a batch of pending queue items for this worker.
+
+        Rows locked by another worker are skipped rather than waited on, and
+        the claim is committed straight away so the locks are short-lived.
+        While an item is processing, ``process_after`` holds its claim
+        deadline; items still processing past it belong to a worker that died
+        and are reclaimed, counting as a failed attempt.
+        """
+
+        now = datetime.utcnow()
+        queue_items = (
+            db.query(NotificationQueue)
+            .filter(
+                NotificationQueue.queue_name == queue_name,
+                NotificationQueue.status.in_(["pending", "processing"]),
+                NotificationQueue.process_after <= now,
+            )
+            .order_by(NotificationQueue.priority.desc(), NotificationQueue.created_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+
+        claimed = []
+        for item in queue_items:
+            if item.status == "processing":
+                item.attempts = (item.attempts or 0) + 1
+                item.error_message = "Processing timed out"
+                if item.attempts >= item.max_attempts:
+                    item.status = "failed"
+                    continue
+            claimed.append(item)
+
+        if not claimed:
+            db.commit()
+            return []
+
+        # Mark as processing
+        batch_id = f"BATCH-{uuid.uuid4().hex[:12].upper()}"
+        for item in claimed:
+            item.status = "processing"
+            item.batch_id = batch_id
+            item.batch_size = len(claimed)
+            item.process_after = now + CLAIM_TIMEOUT
+        db.commit()
+
+        return claimed
 
+    def _build_deliveries(
+        self, notification: NotificationExtended
+    ) -> List[NotificationDelivery]:
+        """Build one delivery record per reachable channel."""
+
+        deliveries = []
         for channel_name in notification.channels:
             channel = NotificationChannel(channel_name)
 
@@ -1017,29 +1287,101 @@ class NotificationService:
             if not recipient_address:
                 continue
 
-            # Create delivery record
-            delivery = await self.create_delivery_record(
-                db, notification.id, channel, recipient_address
+            deliveries.append(
+                NotificationDelivery(
+                    id=str(uuid.uuid4()),
+                    notification_id=notification.id,
+                    organization_id=notification.organization_id,
+                    channel=channel,
+                    recipient_address=recipient_address,
+                    recipient_type="user",
+                    subject=notification.title,
+                    content=notification.message,
+                    formatted_content=notification.content_html or notification.message,
+                    scheduled_at=notification.send_at or datetime.utcnow(),
+                    status=DeliveryStatus.PENDING,
+                    retry_count=0,
+                    notif_metadata={},
+                )
             )
 
-            # Process delivery based on channel
+        return deliveries
+
+    async def _send_deliveries(
+        self, db: Session, deliveries: List[NotificationDelivery]
+    ) -> None:
+        """Send deliveries concurrently, bounded per channel.
+
+        Statuses are recorded on the delivery objects only; the caller
+        persists them.
+        """
+
+        limits = {
+            channel: asyncio.Semaphore(limit)
+            for channel, limit in self.channel_concurrency.items()
+        }
+        senders = {
+            NotificationChannel.EMAIL: self._deliver_email,
+            NotificationChannel.SMS: self._deliver_sms,
+            NotificationChannel.PUSH: self._deliver_push,
+            NotificationChannel.IN_APP: self._deliver_in_app,
+        }
+
+        async def send(delivery: NotificationDelivery) -> None:
+            sender = senders.get(delivery.channel)
+            limit = limits.setdefault(delivery.channel, asyncio.Semaphore(1))
             try:
-                if channel == NotificationChannel.EMAIL:
-                    await self._deliver_email(db, delivery)
-                elif channel == NotificationChannel.SMS:
-                    await self._deliver_sms(db, delivery)
-                elif channel == NotificationChannel.PUSH:
-                    await self._deliver_push(db, delivery)
-                elif channel == NotificationChannel.IN_APP:
-                    await self._deliver_in_app(db, delivery)
-
-                await self.update_delivery_status(db, delivery.id, DeliveryStatus.SENT)
-
+                async with limit:
+                    provider_data = await sender(db, delivery) if sender else None
+                status = DeliveryStatus.SENT
+                if delivery.channel == NotificationChannel.IN_APP:
+                    status = DeliveryStatus.DELIVERED
+                self._apply_delivery_status(delivery, status, provider_data)
             except Exception as e:
-                await self.update_delivery_status(
-                    db, delivery.id, DeliveryStatus.FAILED, {"error_message": str(e)}
+                self._apply_delivery_status(
+                    delivery, DeliveryStatus.FAILED, {"error_message": str(e)}
                 )
 
+        await asyncio.gather(*(send(delivery) for delivery in deliveries))
+
+    def _apply_delivery_status(
+        self,
+        delivery: NotificationDelivery,
+        status: DeliveryStatus,
+        provider_data: Optional[dict] = None,
+    ) -> None:
+        """Record a delivery outcome on the delivery object."""
+
+        now = datetime.utcnow()
+        delivery.status = status
+        delivery.updated_at = now
+
+        if status == DeliveryStatus.SENT:
+            delivery.sent_at = now
+        elif status == DeliveryStatus.DELIVERED:
+            delivery.sent_at = now
+            delivery.delivered_at = now
+        elif status == DeliveryStatus.FAILED:
+            delivery.failed_at = now
+            delivery.retry_count = (delivery.retry_count or 0) + 1
+
+        if provider_data:
+            delivery.provider_message_id = provider_data.get("message_id")
+            delivery.delivery_response = provider_data.get("response")
+            delivery.error_code = provider_data.get("error_code")
+            delivery.error_message = provider_data.get("error_message")
+            delivery.tracking_id = provider_data.get("tracking_id")
+            delivery.delivery_cost = provider_data.get("cost")
+
+    async def _deliver_notification(
+        self, db: Session, notification: NotificationExtended
+    ):
+        """Deliver notification through configured channels."""
+
+        deliveries = self._build_deliveries(notification)
+        db.add_all(deliveries)
+        await self._send_deliveries(db, deliveries)
+
         # Update notification status
         notification.status = NotificationStatus.SENT
         notification.sent_at = datetime.utcnow()
@@ -1080,8 +1422,9 @@ class NotificationService:
         self, db: Session, delivery: NotificationDelivery
     ) -> dict:
         """Deliver in-app notification."""
-        # In-app notifications are already created in database
-        await self.update_delivery_status(db, delivery.id, DeliveryStatus.DELIVERED)
+        # In-app notifications are already created in database; the
+        # delivery is marked delivered by the caller
+        pass
 
     # =============================================================================
     # Helper Methods
@@ -3,7 +3,7 @@ from datetime import datetime, timedelta
 from decimal import Decimal
 from typing import Any, Dict, List, Optional, Tuple
 
-from sqlalchemy import and_, asc, desc, or_
+from sqlalchemy import and_, asc, desc, func, or_, update
 from sqlalchemy.orm import Session, joinedload
 
 from app.models.warehouse_extended import (
@@ -24,6 +24,7 @@ from app.schemas.warehouse_v30 import (
     WarehouseZoneCreate,
     WarehouseZoneUpdate,
 )
+from app.services.document_numbers import CYCLE_COUNT, document_numbers
 
 
 class NotFoundError(Exception):
@@ -38,6 +39,25 @@ class InvalidOperationError(Exception):
     pass
 
 
+UTILIZATION_PRECISION = Decimal("0.01")
+# 利用率一括更新の1文あたりの行数
+UTILIZATION_UPDATE_BATCH_SIZE = 1000
+
+
+def _location_counts() -> Tuple[Any, Any]:
+    """総ロケーション数と占有ロケーション数の集計式"""
+    return (
+        func.count().label("total"),
+        func.count().filter(WarehouseLocation.is_occupied.is_(True)).label("occupied"),
+    )
+
+
+def _utilization(total_locations: int, occupied_locations: int) -> Decimal:
+    if not total_locations:
+        return Decimal("0")
+    return Decimal(occupied_locations) / Decimal(total_locations) * Decimal("100")
+
+
 class WarehouseCRUD:
     def __init__(self, db: Session) -> dict:
         self.db = db
@@ -305,30 +325,18 @@ class WarehouseCRUD:
         if not warehouse:
             raise NotFoundError(f"Warehouse {warehouse_id} not found")
 
-        # 総ロケーション数と占有ロケーション数を取得
-        total_locations = (
-            self.db.query(WarehouseLocation)
+        # 総ロケーション数と占有ロケーション数を1回の集計で取得
+        total_locations, occupied_locations = (
+            self.db.query(*_location_counts())
+            .select_from(WarehouseLocation)
             .filter(WarehouseLocation.warehouse_id == warehouse_id)
-            .count()
-        )
-
-        occupied_locations = (
-            self.db.query(WarehouseLocation)
-            .filter(
-                and_(
-                    WarehouseLocation.warehouse_id == warehouse_id,
-                    WarehouseLocation.is_occupied,
-                )
-            )
-            .count()
+            .one()
         )
 
         if total_locations == 0:
             return Decimal("0")
 
-        utilization = (
-            Decimal(occupied_locations) / Decimal(total_locations) * Decimal("100")
-        )
+        utilization = _utilization(total_locations, occupied_locations)
 
         # 利用率を更新
         warehouse.current_utilization = utilization
@@ -336,53 +344,100 @@ class WarehouseCRUD:
 
         return utilization
 
+    def refresh_utilization(self, warehouse_ids: Optional[List[str]] = None) -> int:
+        """全倉庫（または指定倉庫）の利用率をロケーション集計1回で再計算
+
+        ロケーションのない倉庫は0%とし、値が変わった倉庫だけを更新する。
+        更新した倉庫数を返す。
+        """
+        total, occupied = _location_counts()
+        location_counts = (
+            self.db.query(WarehouseLocation.warehouse_id, total, occupied)
+            .group_by(WarehouseLocation.warehouse_id)
+            .subquery()
+        )
+        query = self.db.query(
+            Warehouse.id,
+            Warehouse.current_utilization,
+            location_counts.c.total,
+            location_counts.c.occupied,
+        ).outerjoin(location_counts, location_counts.c.warehouse_id == Warehouse.id)
+        if warehouse_ids is not None:
+            query = query.filter(Warehouse.id.in_(warehouse_ids))
+
+        now = datetime.utcnow()
+        changes = []
+        for warehouse_id, current, total_locations, occupied_locations in query:
+            utilization = _utilization(
+                total_locations or 0, occupied_locations or 0
+            ).quantize(UTILIZATION_PRECISION)
+            if current is None or Decimal(current) != utilization:
+                changes.append(
+                    {
+                        "id": warehouse_id,
+                        "current_utilization": utilization,
+                        "updated_at": now,
+                    }
+                )
+
+        for start in range(0, len(changes), UTILIZATION_UPDATE_BATCH_SIZE):
+            self.db.execute(
+                update(Warehouse),
+                changes[start : start + UTILIZATION_UPDATE_BATCH_SIZE],
+            )
+        self.db.commit()
+
+        return len(changes)
+
     def get_analytics(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """倉庫分析データを取得"""
-        base_query = self.db.query(Warehouse)
-
+        criteria = []
         if filters:
             if filters.get("date_from"):
-                base_query = base_query.filter(
-                    Warehouse.created_at >= filters["date_from"]
-                )
+                criteria.append(Warehouse.created_at >= filters["date_from"])
             if filters.get("date_to"):
-                base_query = base_query.filter(
-                    Warehouse.created_at <= filters["date_to"]
-                )
-
-        warehouses = base_query.all()
-
-        total_warehouses = len(warehouses)
-        active_warehouses = len([w for w in warehouses if w.status == "active"])
+                criteria.append(Warehouse.created_at <= filters["date_to"])
+
+        def warehouses(*columns):
+            return self.db.query(*columns).filter(*criteria)
+
+        utilization = func.coalesce(Warehouse.current_utilization, 0)
+        receiving = func.coalesce(Warehouse.receiving_capacity, 0)
+        shipping = func.coalesce(Warehouse.shipping_capacity, 0)
+
+        # 件数・合計・平均を1回の集計で取得
+        summary = warehouses(
+            func.count(Warehouse.id).label("total"),
+            func.count(Warehouse.id)
+            .filter(Warehouse.status == "active")
+            .label("active"),
+            func.coalesce(func.sum(Warehouse.storage_area), 0).label("storage_area"),
+            func.coalesce(func.sum(Warehouse.current_utilization), 0).label(
+                "total_utilization"
+            ),
+            func.coalesce(func.avg(Warehouse.current_utilization), 0).label(
+                "avg_utilization"
+            ),
+            func.coalesce(func.sum(receiving), 0).label("receiving_capacity"),
+            func.coalesce(func.sum(shipping), 0).label("shipping_capacity"),
+        ).one()
+
+        total_warehouses = summary.total
+        active_warehouses = summary.active
         inactive_warehouses = total_warehouses - active_warehouses
+        avg_utilization = summary.avg_utilization
 
-        # 総保管面積
-        total_storage_area = sum(w.storage_area or 0 for w in warehouses)
-
-        # 利用率計算
-        utilizations = [
-            w.current_utilization
-            for w in warehouses
-            if w.current_utilization is not None
-        ]
-        avg_utilization = (
-            sum(utilizations) / len(utilizations) if utilizations else Decimal("0")
+        # タイプ別・自動化レベル別分布
+        warehouses_by_type = dict(
+            warehouses(Warehouse.warehouse_type, func.count(Warehouse.id))
+            .group_by(Warehouse.warehouse_type)
+            .all()
+        )
+        warehouses_by_automation = dict(
+            warehouses(Warehouse.automation_level, func.count(Warehouse.id))
+            .group_by(Warehouse.automation_level)
+            .all()
         )
-        total_utilization = sum(utilizations) if utilizations else Decimal("0")
-
-        # タイプ別分布
-        warehouses_by_type = {}
-        for warehouse in warehouses:
-            wh_type = warehouse.warehouse_type
-            warehouses_by_type[wh_type] = warehouses_by_type.get(wh_type, 0) + 1
-
-        # 自動化レベル別分布
-        warehouses_by_automation = {}
-        for warehouse in warehouses:
-            automation = warehouse.automation_level
-            warehouses_by_automation[automation] = (
-                warehouses_by_automation.get(automation, 0) + 1
-            )
 
         # トップ倉庫（利用率別）
         top_warehouses_by_utilization = [
@@ -395,9 +450,15 @@ class WarehouseCRUD:
                 else 0,
                 "total_area": float(w.total_area) if w.total_area else 0,
             }
-            for w in sorted(
-                warehouses, key=lambda x: x.current_utilization or 0, reverse=True
-            )[:10]
+            for w in warehouses(
+                Warehouse.id,
+                Warehouse.warehouse_name,
+                Warehouse.warehouse_code,
+                Warehouse.current_utilization,
+                Warehouse.total_area,
+            )
+            .order_by(desc(utilization), Warehouse.warehouse_code)
+            .limit(10)
         ]
 
         # スループット上位倉庫（仮の計算）
@@ -410,16 +471,38 @@ class WarehouseCRUD:
                 "shipping_capacity": w.shipping_capacity,
                 "total_capacity": w.receiving_capacity + w.shipping_capacity,
             }
-            for w in sorted(
-                warehouses,
-                key=lambda x: x.receiving_capacity + x.shipping_capacity,
-                reverse=True,
-            )[:10]
+            for w in warehouses(
+                Warehouse.id,
+                Warehouse.warehouse_name,
+                Warehouse.warehouse_code,
+                receiving.label("receiving_capacity"),
+                shipping.label("shipping_capacity"),
+            )
+            .order_by(desc(receiving + shipping), Warehouse.warehouse_code)
+            .limit(10)
         ]
 
-        # 要注意倉庫
+        # 要注意倉庫（該当する倉庫だけを取得）
         warehouses_needing_attention = []
-        for w in warehouses:
+        for w in warehouses(
+            Warehouse.id,
+            Warehouse.warehouse_name,
+            Warehouse.status,
+            Warehouse.current_utilization,
+            Warehouse.warehouse_manager_id,
+        ).filter(
+            or_(
+                Warehouse.status.is_(None),
+                Warehouse.status != "active",
+                Warehouse.current_utilization > 95,
+                and_(
+                    Warehouse.current_utilization > 0,
+                    Warehouse.current_utilization < 20,
+                ),
+                Warehouse.warehouse_manager_id.is_(None),
+                Warehouse.warehouse_manager_id == "",
+            )
+        ):
             issues = []
             if w.status != "active":
                 issues.append("inactive")
@@ -430,29 +513,26 @@ class WarehouseCRUD:
             if not w.warehouse_manager_id:
                 issues.append("no_manager")
 
-            if issues:
-                warehouses_needing_attention.append(
-                    {
-                        "id": w.id,
-                        "name": w.warehouse_name,
-                        "issues": issues,
-                        "utilization": float(w.current_utilization)
-                        if w.current_utilization
-                        else 0,
-                    }
-                )
+            warehouses_needing_attention.append(
+                {
+                    "id": w.id,
+                    "name": w.warehouse_name,
+                    "issues": issues,
+                    "utilization": float(w.current_utilization)
+                    if w.current_utilization
+                    else 0,
+                }
+            )
 
         # 容量分析
         capacity_analysis = {
-            "total_receiving_capacity": sum(w.receiving_capacity for w in warehouses),
-            "total_shipping_capacity": sum(w.shipping_capacity for w in warehouses),
-            "avg_receiving_capacity": sum(w.receiving_capacity for w in warehouses)
-            / len(warehouses)
-            if warehouses
+            "total_receiving_capacity": summary.receiving_capacity,
+            "total_shipping_capacity": summary.shipping_capacity,
+            "avg_receiving_capacity": summary.receiving_capacity / total_warehouses
+            if total_warehouses
             else 0,
-            "avg_shipping_capacity": sum(w.shipping_capacity for w in warehouses)
-            / len(warehouses)
-            if warehouses
+            "avg_shipping_capacity": summary.shipping_capacity / total_warehouses
+            if total_warehouses
             else 0,
         }
 
@@ -474,8 +554,8 @@ class WarehouseCRUD:
             "total_warehouses": total_warehouses,
             "active_warehouses": active_warehouses,
             "inactive_warehouses": inactive_warehouses,
-            "total_storage_area": float(total_storage_area),
-            "total_utilization": float(total_utilization),
+            "total_storage_area": float(summary.storage_area),
+            "total_utilization": float(summary.total_utilization),
             "avg_utilization": float(avg_utilization),
             "warehouses_by_type": warehouses_by_type,
             "warehouses_by_automation_level": warehouses_by_automation,
@@ -1128,12 +1208,21 @@ class CycleCountCRUD:
         return count
 
     def _generate_count_number(self, warehouse_id: str) -> str:
-        """カウント番号生成"""
+        """カウント番号生成（倉庫・月ごとの採番）"""
         today = datetime.now()
-        prefix = f"CC-{today.year}{today.month:02d}"
+        return document_numbers.next_number(
+            CYCLE_COUNT,
+            warehouse_id,
+            on=today,
+            seed=lambda: self._highest_count_number(warehouse_id, today),
+        )
+
+    def _highest_count_number(self, warehouse_id: str, today: datetime) -> int:
+        """採番テーブル導入前に発行済みの当月最大番号"""
+        prefix = f"CC-{CYCLE_COUNT.period_key(today)}"
 
         last_count = (
-            self.db.query(CycleCount)
+            self.db.query(CycleCount.count_number)
             .filter(
                 and_(
                     CycleCount.warehouse_id == warehouse_id,
@@ -1144,13 +1233,7 @@ class CycleCountCRUD:
             .first()
         )
 
-        if last_count:
-            last_number = int(last_count.count_number.split("-")[-1])
-            new_number = last_number + 1
-        else:
-            new_number = 1
-
-        return f"{prefix}-{new_number:04d}"
+        return int(last_count[0].split("-")[-1]) if last_count else 0
 
     def _generate_count_lines(self, cycle_count: CycleCount) -> dict:
         """カウントライン生成"""
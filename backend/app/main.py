@@ -11,6 +11,11 @@ from app.core.monitoring import (
     MonitoringMiddleware,
     setup_health_checks,
 )
+from app.core.security import password_hashing_pool
+from app.services.dashboard_widgets import dashboard_views
+from app.services.headcount_snapshots import headcount_snapshots
+from app.services.metric_timeseries import metric_rollups
+from app.services.session_cache import activity_tracker
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -42,8 +47,20 @@ app.include_router(api_router, prefix=settings.API_V1_STR)
 
 @app.on_event("startup")
 async def startup_event() -> None:
-    """Initialize health checks and monitoring on startup."""
+    """Initialize health checks and monitoring and start background jobs."""
     setup_health_checks(app, SessionLocal, None)
+    metric_rollups.start()
+    headcount_snapshots.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event() -> None:
+    """Write activity and views still held in memory and stop worker threads."""
+    activity_tracker.stop()
+    dashboard_views.stop()
+    metric_rollups.stop()
+    headcount_snapshots.stop()
+    password_hashing_pool.shutdown()
 
 
 @app.get("/")
@@ -21,6 +21,7 @@ from app.models.analytics_extended import (
     AnalyticsPrediction,
     AnalyticsReport,
     AnalyticsReportExecution,
+    AnalyticsRollup,
 )
 from app.models.audit import AuditLog
 from app.models.cross_tenant_permissions import (
@@ -43,6 +44,7 @@ from app.models.document_extended import (
     DocumentTemplate,
     DocumentWorkflow,
 )
+from app.models.document_sequence import DocumentSequence
 
 # Phase 4-7 Models
 from app.models.expense import Expense, ExpenseApprovalFlow
@@ -51,6 +53,7 @@ from app.models.expense_category import ExpenseCategory
 # CC02 v31.0 Phase 2 - Finance Management Models
 from app.models.finance_extended import (
     Account,
+    AccountPeriodBalance,
     BudgetLine,
     CostCenter,
     FinanceAuditLog,
@@ -66,6 +69,7 @@ from app.models.finance_extended import Budget as FinanceBudget
 from app.models.hr_extended import (
     Employee,
     EmployeeBenefit,
+    HeadcountSnapshot,
     HRAnalytics,
     JobPosting,
     LeaveRequest,
@@ -214,6 +218,7 @@ __all__ = [
     "InheritanceConflictResolution",
     "InheritanceAuditLog",
     "PasswordHistory",
+    "DocumentSequence",
     "UserSession",
     "MFADevice",
     "MFABackupCode",
@@ -256,6 +261,7 @@ __all__ = [
     "DataSource",
     # CC02 v31.0 Phase 2 - Finance Management Models
     "Account",
+    "AccountPeriodBalance",
     "FinanceBudget",
     "BudgetLine",
     "CostCenter",
@@ -269,6 +275,7 @@ __all__ = [
     "Employee",
     "EmployeeBenefit",
     "HRAnalytics",
+    "HeadcountSnapshot",
     "JobPosting",
     "LeaveRequest",
     "OnboardingRecord",
@@ -325,6 +332,7 @@ __all__ = [
     "AnalyticsDataSource",
     "AnalyticsMetric",
     "AnalyticsDataPoint",
+    "AnalyticsRollup",
     "AnalyticsDashboard",
     "AnalyticsReport",
     "AnalyticsReportExecution",
@@ -23,11 +23,14 @@ from sqlalchemy import (
     Column,
     Date,
     DateTime,
+    Float,
     ForeignKey,
+    Index,
     Integer,
     Numeric,
     String,
     Text,
+    UniqueConstraint,
 )
 from sqlalchemy import Enum as SQLEnum
 from sqlalchemy.orm import relationship
@@ -248,6 +251,10 @@ class AnalyticsMetric(Base):
     last_calculated_at = Column(DateTime)
     next_calculation_at = Column(DateTime)
 
+    # Time-series storage
+    retention_policy = Column(JSON, default={})  # Days kept per resolution
+    rollup_watermark = Column(DateTime)  # Data points before this are rolled up
+
     # Current values
     current_value = Column(Numeric(15, 4))
     previous_value = Column(Numeric(15, 4))
@@ -294,6 +301,9 @@ class AnalyticsDataPoint(Base):
     """Analytics Data Point - Time-series data points for metrics."""
 
     __tablename__ = "analytics_data_points"
+    __table_args__ = (
+        Index("ix_analytics_data_points_metric_timestamp", "metric_id", "timestamp"),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     organization_id = Column(String, ForeignKey("organizations.id"), nullable=False)
@@ -341,6 +351,48 @@ class AnalyticsDataPoint(Base):
     metric = relationship("AnalyticsMetric", back_populates="data_points")
 
 
+class AnalyticsRollup(Base):
+    """Analytics Rollup - Mergeable aggregates of a metric's data points of
+    one period type per time bucket, at 5-minute, hourly and daily
+    resolution."""
+
+    __tablename__ = "analytics_rollups"
+    __table_args__ = (
+        UniqueConstraint(
+            "metric_id",
+            "period_type",
+            "resolution",
+            "bucket_start",
+            name="uq_analytics_rollup_bucket",
+        ),
+        Index("ix_analytics_rollups_resolution_bucket", "resolution", "bucket_start"),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    organization_id = Column(String, ForeignKey("organizations.id"), nullable=False)
+    metric_id = Column(String, ForeignKey("analytics_metrics.id"), nullable=False)
+
+    # Bucket identification
+    period_type = Column(SQLEnum(PeriodType), nullable=False)
+    resolution = Column(String(8), nullable=False)  # 5m, 1h, 1d
+    bucket_start = Column(DateTime, nullable=False)
+
+    # Aggregates
+    count = Column(Integer, nullable=False, default=0)
+    sum_value = Column(Numeric(20, 4), nullable=False, default=0)
+    sum_squares = Column(Float, nullable=False, default=0)
+    min_value = Column(Numeric(15, 4))
+    max_value = Column(Numeric(15, 4))
+    quantile_sketch = Column(JSON, default={})
+
+    # Timestamps
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationships
+    organization = relationship("Organization")
+    metric = relationship("AnalyticsMetric")
+
+
 class AnalyticsDashboard(Base):
     """Analytics Dashboard - Configurable dashboard for metric visualization."""
 
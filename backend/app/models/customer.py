@@ -6,10 +6,19 @@ Customer model for CRM functionality.
 from datetime import datetime
 from typing import List, Optional
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import (
+    Boolean,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    Numeric,
+    String,
+    Text,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from app.models.base import SoftDeletableModel
+from app.models.base import BaseModel, SoftDeletableModel
 
 
 class Customer(SoftDeletableModel):
@@ -313,3 +322,42 @@ class CustomerActivity(SoftDeletableModel):
     def __repr__(self) -> str:
         """Developer representation."""
         return f"<CustomerActivity(id={self.id}, type='{self.activity_type}', subject='{self.subject}', date={self.activity_date})>"
+
+
+class CustomerSegmentScore(BaseModel):
+    """顧客セグメントスコア - Persisted RFM/LTV scores for fast segment lookup."""
+
+    __tablename__ = "customer_segment_scores"
+
+    customer_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("customers.id"), nullable=False, unique=True, index=True
+    )
+
+    # RFM指標
+    recency_days: Mapped[int] = mapped_column(Integer, nullable=False)
+    frequency_orders: Mapped[int] = mapped_column(Integer, nullable=False)
+    monetary_value: Mapped[float] = mapped_column(Numeric(15, 2), nullable=False)
+    recency_score: Mapped[int] = mapped_column(Integer, nullable=False)
+    frequency_score: Mapped[int] = mapped_column(Integer, nullable=False)
+    monetary_score: Mapped[int] = mapped_column(Integer, nullable=False)
+    rfm_segment: Mapped[str] = mapped_column(
+        String(50), nullable=False, index=True, comment="RFMセグメント"
+    )
+
+    # LTV指標
+    predicted_ltv: Mapped[float | None] = mapped_column(Numeric(15, 2), nullable=True)
+    ltv_segment: Mapped[str | None] = mapped_column(
+        String(50), nullable=True, index=True, comment="LTVセグメント"
+    )
+    churn_probability: Mapped[float | None] = mapped_column(Float, nullable=True)
+
+    calculated_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, comment="算出日時"
+    )
+    run_id: Mapped[str] = mapped_column(
+        String(36), nullable=False, index=True, comment="スコアリング実行ID"
+    )
+
+    def __repr__(self) -> str:
+        """Developer representation."""
+        return f"<CustomerSegmentScore(customer_id={self.customer_id}, rfm='{self.rfm_segment}', ltv='{self.ltv_segment}')>"
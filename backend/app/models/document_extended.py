@@ -18,19 +18,23 @@ import uuid
 from enum import Enum
 
 from sqlalchemy import (
+    DDL,
     JSON,
     Boolean,
     Column,
     Date,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     LargeBinary,
     Numeric,
     String,
     Text,
+    event,
 )
 from sqlalchemy import Enum as SQLEnum
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -109,6 +113,13 @@ class DocumentExtended(Base):
     """Extended Document Management - Comprehensive document storage and management."""
 
     __tablename__ = "documents_extended"
+    __table_args__ = (
+        Index(
+            "ix_documents_extended_search_vector",
+            "search_vector",
+            postgresql_using="gin",
+        ),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     organization_id = Column(String, ForeignKey("organizations.id"), nullable=False)
@@ -161,6 +172,7 @@ class DocumentExtended(Base):
     content_preview = Column(Text)  # First few lines for preview
     extracted_text = Column(Text)  # For search indexing
     ocr_text = Column(Text)  # OCR extracted text for images/PDFs
+    search_vector = Column(TSVECTOR().with_variant(Text(), "sqlite"))
     doc_metadata = Column(JSON, default={})
     custom_properties = Column(JSON, default={})
 
@@ -228,6 +240,35 @@ class DocumentExtended(Base):
     activities = relationship("DocumentActivity", back_populates="document")
 
 
+# Keeps search_vector current in the same statement as every row write,
+# including writers that bypass DocumentService
+DOCUMENT_SEARCH_VECTOR_TRIGGER = DDL("""
+CREATE OR REPLACE FUNCTION documents_extended_search_vector_update()
+RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(NEW.filename, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(NEW.extracted_text, '')), 'C') ||
+        setweight(to_tsvector('simple', coalesce(NEW.ocr_text, '')), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER documents_extended_search_vector_trigger
+BEFORE INSERT OR UPDATE OF title, description, filename, extracted_text, ocr_text
+ON documents_extended
+FOR EACH ROW EXECUTE FUNCTION documents_extended_search_vector_update();
+""")
+
+event.listen(
+    DocumentExtended.__table__,
+    "after_create",
+    DOCUMENT_SEARCH_VECTOR_TRIGGER.execute_if(dialect="postgresql"),
+)
+
+
 class DocumentFolder(Base):
     """Document Folder Management - Hierarchical folder structure for document organization."""
 
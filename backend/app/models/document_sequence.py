@@ -0,0 +1,31 @@
+"""Document number sequence model."""
+
+from sqlalchemy import BigInteger, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import BaseModel
+
+
+class DocumentSequence(BaseModel):
+    """Next free number of a document series within a scope and period.
+
+    ``scope`` is the organization the series is numbered within, or a narrower
+    owner such as a warehouse; ``period`` is the date bucket the numbers
+    restart in (``""`` for series that never restart).
+    """
+
+    __tablename__ = "document_sequences"
+    __table_args__ = (
+        UniqueConstraint("scope", "series", "period", name="uq_document_sequence"),
+    )
+
+    scope: Mapped[str] = mapped_column(String(64), nullable=False)
+    series: Mapped[str] = mapped_column(String(32), nullable=False)
+    period: Mapped[str] = mapped_column(String(16), nullable=False, default="")
+    next_value: Mapped[int] = mapped_column(BigInteger, nullable=False, default=1)
+
+    def __repr__(self) -> str:
+        return (
+            f"<DocumentSequence(scope={self.scope}, series={self.series}, "
+            f"period={self.period}, next_value={self.next_value})>"
+        )
@@ -25,6 +25,7 @@ from sqlalchemy import (
     Numeric,
     String,
     Text,
+    UniqueConstraint,
 )
 from sqlalchemy import Enum as SQLEnum
 from sqlalchemy.orm import relationship
@@ -276,6 +277,45 @@ class FinancialPeriod(Base):
     creator = relationship("User", foreign_keys=[created_by])
     journal_entries = relationship("JournalEntry", back_populates="period")
     budgets = relationship("Budget", back_populates="period")
+    account_balances = relationship("AccountPeriodBalance", back_populates="period")
+
+
+class AccountPeriodBalance(Base):
+    """Posted debit and credit totals per account and financial period.
+
+    Maintained as journal entries are posted and rebuilt from the lines and
+    frozen when the period closes, so reports read closed periods from here
+    instead of re-aggregating their journal lines.
+    """
+
+    __tablename__ = "finance_account_period_balances"
+    __table_args__ = (
+        UniqueConstraint("account_id", "period_id", name="uq_account_period_balance"),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    organization_id = Column(
+        String, ForeignKey("organizations.id"), nullable=False, index=True
+    )
+    account_id = Column(String, ForeignKey("finance_accounts.id"), nullable=False)
+    period_id = Column(
+        String, ForeignKey("finance_periods.id"), nullable=False, index=True
+    )
+
+    # Posted totals
+    debit_total = Column(Numeric(15, 2), nullable=False, default=0)
+    credit_total = Column(Numeric(15, 2), nullable=False, default=0)
+
+    # Set when the period closes; no further postings change the row
+    is_frozen = Column(Boolean, nullable=False, default=False)
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # Relationships
+    account = relationship("Account")
+    period = relationship("FinancialPeriod", back_populates="account_balances")
 
 
 class Budget(Base):
@@ -28,6 +28,7 @@ from sqlalchemy import (
     Numeric,
     String,
     Text,
+    UniqueConstraint,
 )
 from sqlalchemy import Enum as SQLEnum
 from sqlalchemy.orm import relationship
@@ -223,11 +224,23 @@ class Employee(Base):
 
     # HR-related relationships
     payroll_records = relationship("PayrollRecord", back_populates="employee")
-    leave_requests = relationship("LeaveRequest", back_populates="employee")
-    performance_reviews = relationship("PerformanceReview", back_populates="employee")
+    leave_requests = relationship(
+        "LeaveRequest",
+        back_populates="employee",
+        foreign_keys="LeaveRequest.employee_id",
+    )
+    performance_reviews = relationship(
+        "PerformanceReview",
+        back_populates="employee",
+        foreign_keys="PerformanceReview.employee_id",
+    )
     training_records = relationship("TrainingRecord", back_populates="employee")
     benefits = relationship("EmployeeBenefit", back_populates="employee")
-    onboarding_records = relationship("OnboardingRecord", back_populates="employee")
+    onboarding_records = relationship(
+        "OnboardingRecord",
+        back_populates="employee",
+        foreign_keys="OnboardingRecord.employee_id",
+    )
 
 
 class Position(Base):
@@ -435,7 +448,9 @@ class LeaveRequest(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relationships
-    employee = relationship("Employee", back_populates="leave_requests")
+    employee = relationship(
+        "Employee", back_populates="leave_requests", foreign_keys=[employee_id]
+    )
     organization = relationship("Organization")
     approver = relationship("Employee", foreign_keys=[approved_by])
 
@@ -526,7 +541,9 @@ class PerformanceReview(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relationships
-    employee = relationship("Employee", back_populates="performance_reviews")
+    employee = relationship(
+        "Employee", back_populates="performance_reviews", foreign_keys=[employee_id]
+    )
     organization = relationship("Organization")
     reviewer = relationship("Employee", foreign_keys=[reviewer_id])
     second_reviewer = relationship("Employee", foreign_keys=[second_reviewer_id])
@@ -795,7 +812,9 @@ class OnboardingRecord(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relationships
-    employee = relationship("Employee", back_populates="onboarding_records")
+    employee = relationship(
+        "Employee", back_populates="onboarding_records", foreign_keys=[employee_id]
+    )
     organization = relationship("Organization")
     buddy = relationship("Employee", foreign_keys=[assigned_buddy_id])
     mentor = relationship("Employee", foreign_keys=[assigned_mentor_id])
@@ -892,3 +911,35 @@ class HRAnalytics(Base):
     # Relationships
     organization = relationship("Organization")
     calculator = relationship("User", foreign_keys=[calculated_by])
+
+
+class HeadcountSnapshot(Base):
+    """Daily headcount snapshot - workforce counts per organization and day."""
+
+    __tablename__ = "hr_headcount_snapshots"
+    __table_args__ = (
+        UniqueConstraint(
+            "organization_id", "snapshot_date", name="uq_headcount_snapshot_date"
+        ),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    organization_id = Column(String, ForeignKey("organizations.id"), nullable=False)
+    snapshot_date = Column(Date, nullable=False, index=True)
+
+    # Employed on the snapshot date (hired, not yet terminated)
+    headcount = Column(Integer, nullable=False, default=0)
+    active_employees = Column(Integer, nullable=False, default=0)
+    full_time_employees = Column(Integer, nullable=False, default=0)
+    part_time_employees = Column(Integer, nullable=False, default=0)
+    contract_employees = Column(Integer, nullable=False, default=0)
+
+    # Movements on the snapshot date
+    new_hires = Column(Integer, nullable=False, default=0)
+    terminations = Column(Integer, nullable=False, default=0)
+    voluntary_terminations = Column(Integer, nullable=False, default=0)
+
+    captured_at = Column(DateTime, nullable=False)
+
+    # Relationships
+    organization = relationship("Organization")
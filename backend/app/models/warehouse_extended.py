@@ -8,6 +8,7 @@ from sqlalchemy import (
     Decimal,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
@@ -162,7 +163,11 @@ class Warehouse(Base):
     locations = relationship(
         "WarehouseLocation", back_populates="warehouse", cascade="all, delete-orphan"
     )
-    movements = relationship("InventoryMovement", back_populates="warehouse")
+    movements = relationship(
+        "InventoryMovement",
+        foreign_keys="InventoryMovement.warehouse_id",
+        back_populates="warehouse",
+    )
     cycle_counts = relationship(
         "CycleCount", back_populates="warehouse", cascade="all, delete-orphan"
     )
@@ -245,6 +250,12 @@ class WarehouseZone(Base):
 
 class WarehouseLocation(Base):
     __tablename__ = "warehouse_locations"
+    __table_args__ = (
+        # 倉庫別利用率の集計をインデックスだけで行う
+        Index(
+            "ix_warehouse_locations_warehouse_occupied", "warehouse_id", "is_occupied"
+        ),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     warehouse_id = Column(String, ForeignKey("warehouses.id"), nullable=False)
@@ -335,7 +346,11 @@ class WarehouseLocation(Base):
     primary_product = relationship("Product")
     creator = relationship("User")
     inventory_items = relationship("InventoryItem", back_populates="location")
-    movements = relationship("InventoryMovement", back_populates="location")
+    movements = relationship(
+        "InventoryMovement",
+        foreign_keys="InventoryMovement.location_id",
+        back_populates="location",
+    )
 
 
 class InventoryMovement(Base):
@@ -445,7 +460,9 @@ class InventoryMovement(Base):
     created_by = Column(String, ForeignKey("users.id"))
 
     # リレーション
-    warehouse = relationship("Warehouse", back_populates="movements")
+    warehouse = relationship(
+        "Warehouse", foreign_keys=[warehouse_id], back_populates="movements"
+    )
     location = relationship(
         "WarehouseLocation", foreign_keys=[location_id], back_populates="movements"
     )
@@ -701,6 +701,7 @@ class AdvancedSearchResponse(BaseModel):
     search_time_ms: int
     facets: Dict[str, List[Dict[str, Any]]] = {}
     suggestions: List[str] = []
+    highlights: Dict[str, List[str]] = {}
 
 
 # =============================================================================
@@ -8,7 +8,8 @@ from sqlalchemy.orm import Session
 
 from app.core.exceptions import BusinessLogicError
 from app.core.security import (
-    verify_password,
+    verify_and_update_password,
+    verify_and_update_password_async,
     verify_token,
 )
 from app.models.session import UserSession
@@ -46,6 +47,36 @@ class AuthService:
         Raises:
             BusinessLogicError: If authentication fails
         """
+        user = self._get_login_user(email)
+        verified, new_hash = verify_and_update_password(password, user.hashed_password)
+        return self._complete_authentication(
+            user, verified, new_hash, ip_address, user_agent
+        )
+
+    async def authenticate_user_async(
+        self,
+        email: str,
+        password: str,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None,
+    ) -> User:
+        """
+        Authenticate user with the password check run on the hashing pool.
+
+        Raises:
+            BusinessLogicError: If authentication fails
+            PasswordHashingBusyError: If the hashing pool is saturated
+        """
+        user = self._get_login_user(email)
+        verified, new_hash = await verify_and_update_password_async(
+            password, user.hashed_password
+        )
+        return self._complete_authentication(
+            user, verified, new_hash, ip_address, user_agent
+        )
+
+    def _get_login_user(self, email: str) -> User:
+        """Get the user for a login attempt, before the password is checked."""
         # Get user by email
         user = self.db.query(User).filter(User.email == email).first()
 
@@ -63,13 +94,28 @@ class AuthService:
         if not user.is_active:
             raise BusinessLogicError("アカウントが無効化されています")
 
-        # Verify password
-        if not verify_password(password, user.hashed_password):
+        return user
+
+    def _complete_authentication(
+        self,
+        user: User,
+        verified: bool,
+        new_hash: Optional[str],
+        ip_address: Optional[str],
+        user_agent: Optional[str],
+    ) -> User:
+        """Record the outcome of a password check."""
+        if not verified:
             # Record failed login attempt
             user.record_failed_login(self.db)
             self.db.commit()
             raise BusinessLogicError("メールアドレスまたはパスワードが正しくありません")
 
+        # Upgrade hashes made with outdated parameters
+        if new_hash:
+            user.hashed_password = new_hash
+            self.db.commit()
+
         # Check if password needs to be changed
         if user.password_must_change:
             raise BusinessLogicError("パスワードの変更が必要です")
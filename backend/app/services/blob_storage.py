@@ -0,0 +1,280 @@
+"""Content-addressed blob storage for uploaded files.
+
+Uploads are streamed to a spool file in ``BLOB_CHUNK_SIZE`` pieces and hashed
+as they are written, so memory use does not grow with the file size. The
+finished spool file is moved to a path derived from its SHA-256 digest:
+identical content (re-uploads, or document versions whose file did not
+change) is stored once.
+
+Resumable uploads append chunks to a spool file named by an upload id; the
+client can ask for the current offset after a dropped connection and carry
+on from there. Completing the upload hashes the spool file and stores it like
+any other blob. Requests on the same upload are serialised by a per-upload
+lock, and spool files untouched for ``UPLOAD_MAX_AGE_SECONDS`` are expired
+when new uploads start.
+
+Layout under the store root::
+
+    blobs/ab/cd/abcd...   finished blobs, named by SHA-256
+    uploads/<upload_id>   spool files of uploads in progress
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterable, BinaryIO, Dict, List, Optional
+
+from app.core.config import settings
+
+# Bytes read from an upload or spool file per step
+BLOB_CHUNK_SIZE = 1024 * 1024
+
+UPLOAD_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+# Spool files of abandoned uploads are removed after this long without writes
+UPLOAD_MAX_AGE_SECONDS = 24 * 60 * 60
+
+
+class BlobTooLargeError(ValueError):
+    """Upload exceeded the size limit; nothing was stored."""
+
+
+class UploadNotFoundError(LookupError):
+    """Unknown, malformed or already completed upload id."""
+
+
+class UploadOffsetError(ValueError):
+    """Chunk offset does not match the bytes received so far."""
+
+    def __init__(self, expected_offset: int):
+        super().__init__(f"Upload is at offset {expected_offset}")
+        self.expected_offset = expected_offset
+
+
+class ChecksumMismatchError(ValueError):
+    """Completed upload does not match the digest the client declared."""
+
+
+@dataclass(frozen=True)
+class StoredBlob:
+    """A blob written to the store."""
+
+    sha256: str
+    md5: str
+    size: int
+    path: str  # relative to the store root
+    created: bool  # False when identical content was already stored
+
+
+def _write_hashed(spool: BinaryIO, hashers: List[Any], chunk: bytes) -> None:
+    spool.write(chunk)
+    for hasher in hashers:
+        hasher.update(chunk)
+
+
+def _hash_file(path: Path) -> List[Any]:
+    hashers = [hashlib.sha256(), hashlib.md5()]
+    with open(path, "rb") as spool:
+        while chunk := spool.read(BLOB_CHUNK_SIZE):
+            for hasher in hashers:
+                hasher.update(chunk)
+    return hashers
+
+
+class ContentAddressedStore:
+    """Local blob store keyed by SHA-256 digest."""
+
+    def __init__(self, root: os.PathLike):
+        self.root = Path(root)
+        self.uploads_dir = self.root / "uploads"
+        self._upload_locks: Dict[str, asyncio.Lock] = {}
+
+    def relative_path(self, sha256: str) -> str:
+        return f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.root / self.relative_path(sha256)
+
+    def exists(self, sha256: str) -> bool:
+        return self.blob_path(sha256).is_file()
+
+    async def store_stream(
+        self, chunks: AsyncIterable[bytes], max_size: Optional[int] = None
+    ) -> StoredBlob:
+        """Spool ``chunks`` to disk while hashing them, then store the blob."""
+        self.uploads_dir.mkdir(parents=True, exist_ok=True)
+        spool_path = self.uploads_dir / uuid.uuid4().hex
+        hashers = [hashlib.sha256(), hashlib.md5()]
+        size = 0
+
+        try:
+            with open(spool_path, "wb") as spool:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if max_size is not None and size > max_size:
+                        raise BlobTooLargeError(f"Upload exceeds {max_size} bytes")
+                    # Writing and hashing off the event loop
+                    await asyncio.to_thread(_write_hashed, spool, hashers, chunk)
+        except BaseException:
+            spool_path.unlink(missing_ok=True)
+            raise
+
+        return self._commit(spool_path, hashers, size)
+
+    async def store_upload(
+        self, upload: object, max_size: Optional[int] = None
+    ) -> StoredBlob:
+        """Store a file-like upload (``UploadFile``) read chunk by chunk."""
+        return await self.store_stream(read_chunks(upload), max_size)
+
+    async def store_bytes(self, content: bytes) -> StoredBlob:
+        """Store content that is already in memory (e.g. generated files)."""
+
+        async def single_chunk():
+            yield content
+
+        return await self.store_stream(single_chunk())
+
+    def start_upload(self) -> str:
+        """Open a resumable upload and return its id."""
+        self.uploads_dir.mkdir(parents=True, exist_ok=True)
+        self.expire_stale_uploads()
+        upload_id = uuid.uuid4().hex
+        self._spool_path(upload_id).touch()
+        return upload_id
+
+    def upload_offset(self, upload_id: str) -> int:
+        """Bytes received so far for a resumable upload."""
+        return self._spool_path(upload_id, must_exist=True).stat().st_size
+
+    async def append_chunk(
+        self,
+        upload_id: str,
+        offset: int,
+        chunks: AsyncIterable[bytes],
+        max_size: Optional[int] = None,
+    ) -> int:
+        """Append a chunk at ``offset`` and return the new offset.
+
+        A chunk whose offset does not match the bytes already received is
+        rejected, so retried or reordered chunks cannot corrupt the file. A
+        concurrent request on the same upload waits for this one and is then
+        rejected on its offset.
+        """
+        async with self._upload_lock(upload_id):
+            spool_path = self._spool_path(upload_id, must_exist=True)
+            current = spool_path.stat().st_size
+            if offset != current:
+                raise UploadOffsetError(current)
+
+            with open(spool_path, "ab") as spool:
+                try:
+                    async for chunk in chunks:
+                        current += len(chunk)
+                        if max_size is not None and current > max_size:
+                            raise BlobTooLargeError(f"Upload exceeds {max_size} bytes")
+                        await asyncio.to_thread(spool.write, chunk)
+                except BaseException:
+                    # Drop the partial chunk; the client resumes from ``offset``
+                    spool.truncate(offset)
+                    raise
+
+            return current
+
+    async def complete_upload(
+        self, upload_id: str, sha256: Optional[str] = None
+    ) -> StoredBlob:
+        """Hash a resumable upload and store it as a blob."""
+        async with self._upload_lock(upload_id):
+            spool_path = self._spool_path(upload_id, must_exist=True)
+            hashers = await asyncio.to_thread(_hash_file, spool_path)
+
+            if sha256 and hashers[0].hexdigest() != sha256.lower():
+                raise ChecksumMismatchError("Uploaded content does not match sha256")
+
+            blob = self._commit(spool_path, hashers, spool_path.stat().st_size)
+        self._upload_locks.pop(upload_id, None)
+        return blob
+
+    def abort_upload(self, upload_id: str) -> None:
+        self._spool_path(upload_id, must_exist=True).unlink(missing_ok=True)
+        self._upload_locks.pop(upload_id, None)
+
+    def expire_stale_uploads(self, max_age: float = UPLOAD_MAX_AGE_SECONDS) -> int:
+        """Delete spool files not written to for ``max_age`` seconds.
+
+        Uploads with a request in progress are left alone. Returns the number
+        of spool files removed.
+        """
+        if not self.uploads_dir.is_dir():
+            return 0
+        cutoff = time.time() - max_age
+        expired = 0
+        for spool_path in self.uploads_dir.iterdir():
+            lock = self._upload_locks.get(spool_path.name)
+            if lock is not None and lock.locked():
+                continue
+            try:
+                if spool_path.stat().st_mtime >= cutoff:
+                    continue
+                spool_path.unlink()
+            except FileNotFoundError:
+                continue
+            self._upload_locks.pop(spool_path.name, None)
+            expired += 1
+        return expired
+
+    def _upload_lock(self, upload_id: str) -> asyncio.Lock:
+        # Per process, like the store itself; only open uploads get a lock
+        self._spool_path(upload_id, must_exist=True)
+        return self._upload_locks.setdefault(upload_id, asyncio.Lock())
+
+    def _spool_path(self, upload_id: str, must_exist: bool = False) -> Path:
+        if not UPLOAD_ID_PATTERN.match(upload_id or ""):
+            raise UploadNotFoundError(upload_id)
+        path = self.uploads_dir / upload_id
+        if must_exist and not path.is_file():
+            raise UploadNotFoundError(upload_id)
+        return path
+
+    def _commit(self, spool_path: Path, hashers: List[Any], size: int) -> StoredBlob:
+        sha256, md5 = (hasher.hexdigest() for hasher in hashers)
+        target = self.blob_path(sha256)
+
+        created = not target.is_file()
+        if created:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            # Atomic within the store; concurrent identical uploads are harmless
+            os.replace(spool_path, target)
+        else:
+            spool_path.unlink(missing_ok=True)
+
+        return StoredBlob(
+            sha256=sha256,
+            md5=md5,
+            size=size,
+            path=self.relative_path(sha256),
+            created=created,
+        )
+
+
+async def read_chunks(upload: object, chunk_size: int = BLOB_CHUNK_SIZE):
+    """Iterate an ``UploadFile`` (or any object with async ``read``)."""
+    while chunk := await upload.read(chunk_size):
+        yield chunk
+
+
+_stores: Dict[str, ContentAddressedStore] = {}
+
+
+def get_blob_store(root: Optional[os.PathLike] = None) -> ContentAddressedStore:
+    """Shared store for ``root`` (document storage by default)."""
+    root = str(root or settings.DOCUMENT_STORAGE_PATH)
+    if root not in _stores:
+        _stores[root] = ContentAddressedStore(root)
+    return _stores[root]
@@ -0,0 +1,237 @@
+"""Concurrent dashboard widget resolution.
+
+Dashboards resolve their widgets through :func:`resolve_widgets`, which starts
+every widget at once instead of one after another, so a dashboard takes about
+as long as its slowest widget rather than the sum of all of them. Widgets run
+their data queries through :func:`widget_query`: a dashboard has at most
+``concurrency`` queries running at a time, and widgets issuing the same query
+share one execution through :class:`SingleFlight`. Resolved widget data is
+kept in a :class:`WidgetCache` for the widget's ``refresh_interval``.
+
+Dashboard views are not committed while the dashboard renders.
+:class:`DashboardViewCounter` adds them up in memory and writes them as one
+batched UPDATE every ``VIEW_FLUSH_INTERVAL_SECONDS``.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime
+from functools import partial
+from typing import Any, Awaitable, Callable, Hashable, Iterable, Optional, TypeVar
+
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.models.analytics_extended import AnalyticsDashboard
+
+logger = logging.getLogger(__name__)
+
+# Widget queries of one dashboard running at the same time
+DEFAULT_WIDGET_CONCURRENCY = 8
+WIDGET_CACHE_MAX_ENTRIES = 5_000
+VIEW_FLUSH_INTERVAL_SECONDS = 5.0
+
+T = TypeVar("T")
+W = TypeVar("W")
+
+
+_query_slots: ContextVar[Optional[asyncio.Semaphore]] = ContextVar(
+    "dashboard_query_slots", default=None
+)
+
+
+async def resolve_widgets(
+    widgets: Iterable[W],
+    resolve: Callable[[W], Awaitable[T]],
+    concurrency: int = DEFAULT_WIDGET_CONCURRENCY,
+) -> list[T]:
+    """Resolve widgets concurrently, returning results in widget order.
+
+    All widgets start right away so that identical queries join the same
+    flight; ``concurrency`` bounds the queries they run through
+    :func:`widget_query`. If a widget fails, the widgets still running are
+    cancelled and the error is raised, as it was when widgets were resolved
+    one by one.
+    """
+    token = _query_slots.set(asyncio.Semaphore(concurrency))
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(resolve(widget)) for widget in widgets]
+    except ExceptionGroup as errors:
+        raise errors.exceptions[0]
+    finally:
+        _query_slots.reset(token)
+    return [task.result() for task in tasks]
+
+
+async def widget_query(key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+    """Run a widget data query, shared with widgets running the same one.
+
+    ``key`` identifies the query and its parameters. The result is shared,
+    so callers must not modify it.
+    """
+
+    async def run() -> T:
+        slots = _query_slots.get()
+        if slots is None:
+            return await call()
+        async with slots:
+            return await call()
+
+    return await _queries.do(key, run)
+
+
+class SingleFlight:
+    """Runs one call per key at a time and shares its result with every
+    caller that asks for the same key while it is in flight.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(partial(self._forget, key))
+        # A cancelled caller must not cancel the call the others wait for
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+
+_queries = SingleFlight()
+
+
+class WidgetCache:
+    """Per-process LRU of widget data, each entry with its own lifetime."""
+
+    def __init__(
+        self,
+        max_entries: int = WIDGET_CACHE_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self.clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class DashboardViewCounter:
+    """Counts dashboard views in memory and writes them in batches."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        flush_interval: float = VIEW_FLUSH_INTERVAL_SECONDS,
+    ) -> None:
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        # dashboard id -> (views since the last flush, latest view)
+        self._pending: dict[str, tuple[int, datetime]] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    def record(self, dashboard_id: str) -> None:
+        """Count one view now; the row is updated on the next flush."""
+        now = datetime.utcnow()
+        with self._lock:
+            views, _ = self._pending.get(dashboard_id, (0, now))
+            self._pending[dashboard_id] = (views + 1, now)
+        if self._flusher is None:
+            self._start()
+
+    def flush(self, db: Optional[Session] = None) -> int:
+        """Write pending views in one statement; returns dashboards updated."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        table = AnalyticsDashboard.__table__
+        statement = (
+            update(table)
+            .where(table.c.id == bindparam("dashboard_id"))
+            .values(
+                view_count=func.coalesce(table.c.view_count, 0) + bindparam("views"),
+                last_viewed_at=bindparam("viewed_at"),
+            )
+        )
+        rows = [
+            {"dashboard_id": dashboard_id, "views": views, "viewed_at": viewed_at}
+            for dashboard_id, (views, viewed_at) in pending.items()
+        ]
+        own_session = db is None
+        db = db or self.session_factory()
+        try:
+            db.execute(statement, rows)
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.warning("Dashboard view flush failed: %s", e)
+            # Put the views back so the next flush writes them
+            with self._lock:
+                for dashboard_id, (views, viewed_at) in pending.items():
+                    newer, latest = self._pending.get(dashboard_id, (0, viewed_at))
+                    self._pending[dashboard_id] = (views + newer, latest)
+            return 0
+        finally:
+            if own_session:
+                db.close()
+        return len(rows)
+
+    def stop(self) -> None:
+        """Stop the background flusher and write what is pending."""
+        self._stopped.set()
+        self.flush()
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(
+                target=self._run, name="dashboard-view-flusher", daemon=True
+            )
+        self._flusher.start()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+
+
+dashboard_views = DashboardViewCounter()
@@ -0,0 +1,128 @@
+"""Vectorized demand forecasting.
+
+Forecast models expressed as NumPy array operations over a chronological
+(SKUs x days) demand matrix, so every SKU is fitted in a handful of passes.
+Shared by the inventory prediction (v60) and inventory management (v67) APIs.
+
+Methods are the string values of their ForecastMethod/PredictionMethod enums:
+"moving_average", "exponential_smoothing" and "linear_regression". Any other
+method (and ``None``) uses the recent 30-day average.
+"""
+
+from dataclasses import dataclass
+from decimal import Decimal
+from statistics import NormalDist
+from typing import Dict, Optional
+
+import numpy as np
+
+MOVING_AVERAGE = "moving_average"
+EXPONENTIAL_SMOOTHING = "exponential_smoothing"
+LINEAR_REGRESSION = "linear_regression"
+
+
+@dataclass
+class ForecastArrays:
+    """Forecast for every SKU of a demand matrix, shaped (skus, periods)"""
+
+    demand: np.ndarray
+    lower_bound: np.ndarray
+    upper_bound: np.ndarray
+    parameters: Dict[str, np.ndarray]
+
+
+def confidence_z_score(confidence_level: Decimal) -> float:
+    """Two-sided z score for a confidence level given in percent"""
+    return NormalDist().inv_cdf(0.5 + float(confidence_level) / 200)
+
+
+def smoothing_weights(days: int, alpha: float) -> np.ndarray:
+    """Weights w such that values @ w equals the final exponentially smoothed level
+
+    Equivalent to s_0 = x_0, s_t = alpha * x_t + (1 - alpha) * s_{t-1}.
+    """
+    exponents = np.arange(days - 1, -1, -1, dtype=float)
+    weights = alpha * np.power(1 - alpha, exponents)
+    weights[0] = np.power(1 - alpha, days - 1)
+    return weights
+
+
+def fit_demand_forecast(
+    values: np.ndarray,
+    method: Optional[str],
+    periods: int,
+    z_score: float = 1.96,
+    window: int = 7,
+    alpha: float = 0.3,
+) -> ForecastArrays:
+    """Fit the requested model for all SKUs at once"""
+    skus, days = values.shape
+    horizon = np.ones((1, periods))
+
+    if method == MOVING_AVERAGE:
+        recent = values[:, -window:]
+        level = recent.mean(axis=1)
+        spread = recent.std(axis=1)
+        demand = level[:, None] * horizon
+        parameters = {"window": np.full(skus, window)}
+    elif method == EXPONENTIAL_SMOOTHING:
+        level = values @ smoothing_weights(days, alpha)
+        spread = values[:, -window:].std(axis=1)
+        demand = level[:, None] * horizon
+        parameters = {"alpha": np.full(skus, alpha)}
+    elif method == LINEAR_REGRESSION:
+        x = np.arange(days, dtype=float)
+        x_centered = x - x.mean()
+        y_mean = values.mean(axis=1)
+        slope = (values - y_mean[:, None]) @ x_centered / (x_centered @ x_centered)
+        intercept = y_mean - slope * x.mean()
+        residuals = values - (intercept[:, None] + slope[:, None] * x)
+        spread = residuals.std(axis=1)
+        future_x = np.arange(days, days + periods, dtype=float)
+        demand = intercept[:, None] + slope[:, None] * future_x
+        parameters = {"slope": slope, "intercept": intercept}
+    else:
+        recent = values[:, -30:]
+        level = recent.mean(axis=1)
+        spread = recent.std(axis=1)
+        demand = level[:, None] * horizon
+        parameters = {}
+
+    demand = np.maximum(demand, 0)
+    margin = (z_score * spread)[:, None]
+    return ForecastArrays(
+        demand=demand,
+        lower_bound=np.maximum(demand - margin, 0),
+        upper_bound=demand + margin,
+        parameters=parameters,
+    )
+
+
+def backtest_accuracy(
+    values: np.ndarray,
+    method: Optional[str],
+    holdout: int,
+    **model_options,
+) -> np.ndarray:
+    """Accuracy (100 - MAPE) per SKU from a hold-out backtest
+
+    The model is fitted on all but the last ``holdout`` days and scored
+    against them; days with zero actual demand are excluded from MAPE.
+    """
+    holdout = max(1, min(holdout, values.shape[1] // 4))
+    fitted = fit_demand_forecast(
+        values[:, :-holdout], method, holdout, **model_options
+    ).demand
+    actual = values[:, -holdout:]
+
+    observed = actual > 0
+    errors = np.zeros_like(actual)
+    np.divide(np.abs(actual - fitted), actual, out=errors, where=observed)
+    counts = observed.sum(axis=1)
+    mape = np.divide(
+        errors.sum(axis=1) * 100,
+        counts,
+        out=np.full(values.shape[0], 100.0),
+        where=counts > 0,
+    )
+    return np.clip(100 - mape, 0, 100)
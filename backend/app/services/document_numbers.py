@@ -0,0 +1,309 @@
+"""Document number allocation.
+
+Journal entries, employees, cycle counts, inventory movements and purchasing
+documents draw their numbers from one ``document_sequences`` table holding
+the next free value per (scope, series, period). A number is taken with a
+single ``UPDATE ... RETURNING`` on that row, so concurrent writers queue on
+one row lock instead of scanning the document table for its highest number.
+
+Series use one of two gap policies:
+
+``GapPolicy.BLOCK``
+    Each process reserves ``block_size`` numbers at a time in a short
+    transaction of its own and hands them out from memory, so most numbers
+    cost no database round trip. Numbers stay unique but are only increasing
+    within a process, and the unused rest of a block is skipped when the
+    process exits or the period rolls over.
+
+``GapPolicy.GAPLESS``
+    The number is taken in the caller's transaction. The sequence row stays
+    locked until the caller commits, and a rollback gives the number back,
+    so issued numbers have no gaps. Writers of the same series and period
+    are serialized; other series are unaffected.
+
+The first allocation for a scope, series and period creates its row. A
+``seed`` callable returning the highest number already issued, typically by
+the generator the series replaced, lets numbering continue from existing
+documents instead of restarting at 1.
+"""
+
+import asyncio
+import functools
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from enum import Enum
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import and_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.models.document_sequence import DocumentSequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOCK_SIZE = 20
+
+# Scope of series that are not numbered per organization
+GLOBAL_SCOPE = "*"
+
+
+class GapPolicy(str, Enum):
+    """How a series trades gaps for throughput."""
+
+    BLOCK = "block"
+    GAPLESS = "gapless"
+
+
+@dataclass(frozen=True)
+class DocumentSeries:
+    """Numbering rules of one kind of document."""
+
+    name: str
+    template: str
+    period_format: Optional[str] = None
+    gap_policy: GapPolicy = GapPolicy.BLOCK
+    block_size: int = DEFAULT_BLOCK_SIZE
+
+    def period_key(self, on: Optional[datetime] = None) -> str:
+        if self.period_format is None:
+            return ""
+        return (on or datetime.now(UTC)).strftime(self.period_format)
+
+    def format(self, period: str, number: int) -> str:
+        return self.template.format(period=period, number=number)
+
+
+JOURNAL_ENTRY = DocumentSeries(
+    "journal_entry",
+    "JE{period}{number:04d}",
+    period_format="%Y%m",
+    gap_policy=GapPolicy.GAPLESS,
+)
+EMPLOYEE = DocumentSeries("employee", "EMP{number:06d}")
+CYCLE_COUNT = DocumentSeries("cycle_count", "CC-{period}-{number:04d}", "%Y%m")
+INVENTORY_MOVEMENT = DocumentSeries(
+    "inventory_movement", "MOV-{period}-{number:06d}", "%Y%m%d"
+)
+INVENTORY_ADJUSTMENT = DocumentSeries(
+    "inventory_adjustment", "ADJ-{period}-{number:06d}", "%Y%m%d"
+)
+PURCHASE_ORDER = DocumentSeries("purchase_order", "PO-{period}-{number:06d}", "%Y%m%d")
+PURCHASE_REQUISITION = DocumentSeries(
+    "purchase_requisition", "REQ-{period}-{number:06d}", "%Y%m%d"
+)
+GOODS_RECEIPT = DocumentSeries("goods_receipt", "GRN-{period}-{number:06d}", "%Y%m%d")
+
+
+class DocumentNumberAllocator:
+    """Allocates document numbers, caching reserved blocks per process."""
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal) -> None:
+        self.session_factory = session_factory
+        # (series, scope, period) -> [next number, end of block)
+        self._blocks: dict[tuple[str, str, str], list[int]] = {}
+        self._key_locks: dict[tuple[str, str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def allocate(
+        self,
+        series: DocumentSeries,
+        scope: str,
+        *,
+        on: Optional[datetime] = None,
+        db: Optional[Session] = None,
+        seed: Optional[Callable[[], int]] = None,
+    ) -> int:
+        """Next number of a series; gapless series need the caller's ``db``."""
+        period = series.period_key(on)
+        if series.gap_policy == GapPolicy.GAPLESS:
+            if db is None:
+                raise ValueError(
+                    f"Gapless series {series.name} is allocated in the caller's "
+                    "transaction"
+                )
+            return self._reserve(db, series, scope, period, 1, seed)
+        return self._allocate_from_block(series, scope, period, seed)
+
+    def next_number(
+        self,
+        series: DocumentSeries,
+        scope: str,
+        *,
+        on: Optional[datetime] = None,
+        db: Optional[Session] = None,
+        seed: Optional[Callable[[], int]] = None,
+    ) -> str:
+        """Next formatted document number of a series."""
+        on = on or datetime.now(UTC)
+        number = self.allocate(series, scope, on=on, db=db, seed=seed)
+        return series.format(series.period_key(on), number)
+
+    async def next_number_async(
+        self,
+        series: DocumentSeries,
+        scope: str,
+        *,
+        on: Optional[datetime] = None,
+        seed: Optional[Callable[[], Awaitable[int]]] = None,
+    ) -> str:
+        """Next formatted number of a block series without blocking the loop.
+
+        Numbers left in the process's block are handed out directly; reserving
+        a new block runs in a worker thread. ``seed`` is awaited only when the
+        sequence row does not exist yet.
+        """
+        if series.gap_policy == GapPolicy.GAPLESS:
+            raise ValueError(f"Gapless series {series.name} needs a sync session")
+
+        on = on or datetime.now(UTC)
+        period = series.period_key(on)
+        number = self._take_cached((series.name, scope, period))
+        if number is None:
+            sync_seed = None
+            if seed is not None and not await asyncio.to_thread(
+                self._sequence_exists, series, scope, period
+            ):
+                sync_seed = functools.partial(int, await seed())
+            number = await asyncio.to_thread(
+                self._allocate_from_block, series, scope, period, sync_seed
+            )
+        return series.format(period, number)
+
+    def _allocate_from_block(
+        self,
+        series: DocumentSeries,
+        scope: str,
+        period: str,
+        seed: Optional[Callable[[], int]],
+    ) -> int:
+        key = (series.name, scope, period)
+        with self._key_lock(key):
+            block = self._blocks.get(key)
+            if block is None or block[0] >= block[1]:
+                start = self._reserve_block(series, scope, period, seed)
+                block = [start, start + series.block_size]
+                with self._lock:
+                    self._drop_stale_blocks(key)
+                    self._blocks[key] = block
+            number = block[0]
+            block[0] += 1
+            return number
+
+    def _take_cached(self, key: tuple[str, str, str]) -> Optional[int]:
+        """A number from the current block, or None if that needs a round trip."""
+        lock = self._key_lock(key)
+        # Another thread holding the lock is reserving a block; don't wait on it
+        if not lock.acquire(blocking=False):
+            return None
+        try:
+            block = self._blocks.get(key)
+            if block is None or block[0] >= block[1]:
+                return None
+            number = block[0]
+            block[0] += 1
+            return number
+        finally:
+            lock.release()
+
+    def _reserve_block(
+        self,
+        series: DocumentSeries,
+        scope: str,
+        period: str,
+        seed: Optional[Callable[[], int]],
+    ) -> int:
+        db = self.session_factory()
+        try:
+            start = self._reserve(db, series, scope, period, series.block_size, seed)
+            db.commit()
+            return start
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _reserve(
+        self,
+        db: Session,
+        series: DocumentSeries,
+        scope: str,
+        period: str,
+        count: int,
+        seed: Optional[Callable[[], int]],
+    ) -> int:
+        """Advance the sequence by ``count`` in ``db``; returns the first number."""
+        advance = (
+            update(DocumentSequence)
+            .where(self._sequence_filter(series, scope, period))
+            .values(next_value=DocumentSequence.next_value + count)
+            .returning(DocumentSequence.next_value)
+        )
+        end = db.execute(advance).scalar_one_or_none()
+        if end is not None:
+            return end - count
+
+        start = (seed() if seed is not None else 0) + 1
+        try:
+            with db.begin_nested():
+                db.add(
+                    DocumentSequence(
+                        scope=scope,
+                        series=series.name,
+                        period=period,
+                        next_value=start + count,
+                    )
+                )
+            return start
+        except IntegrityError:
+            # Another writer created the row first; advance it instead
+            logger.debug(
+                "Sequence %s/%s/%s created concurrently", scope, series.name, period
+            )
+            return db.execute(advance).scalar_one() - count
+
+    def _sequence_exists(self, series: DocumentSeries, scope: str, period: str) -> bool:
+        db = self.session_factory()
+        try:
+            return (
+                db.execute(
+                    select(DocumentSequence.id).where(
+                        self._sequence_filter(series, scope, period)
+                    )
+                ).first()
+                is not None
+            )
+        finally:
+            db.close()
+
+    @staticmethod
+    def _sequence_filter(series: DocumentSeries, scope: str, period: str):
+        return and_(
+            DocumentSequence.scope == scope,
+            DocumentSequence.series == series.name,
+            DocumentSequence.period == period,
+        )
+
+    def _key_lock(self, key: tuple[str, str, str]) -> threading.Lock:
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def _drop_stale_blocks(self, key: tuple[str, str, str]) -> None:
+        """Forget blocks of earlier periods once a series rolls over."""
+        name, scope, period = key
+        for stale in [
+            k for k in self._blocks if k[0] == name and k[1] == scope and k[2] != period
+        ]:
+            del self._blocks[stale]
+            if not self._key_locks[stale].locked():
+                del self._key_locks[stale]
+
+
+document_numbers = DocumentNumberAllocator()
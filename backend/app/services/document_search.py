@@ -0,0 +1,525 @@
+"""Document full-text search service.
+
+Two interchangeable backends for DocumentService.search_documents:
+- PostgresDocumentSearch: weighted ``tsvector`` column backed by a GIN index
+- InMemoryDocumentSearch: in-process inverted index with BM25 ranking, used
+  for SQLite and development databases
+
+The backend is chosen with ``settings.DOCUMENT_SEARCH_BACKEND``
+("auto", "postgres" or "memory").
+
+The memory backend is meant for single-process development servers. Writes
+made by other processes (or outside DocumentService) are picked up by a
+freshness check before every search rather than immediately.
+"""
+
+import heapq
+import html
+import math
+import re
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import desc, func, literal, literal_column, select
+from sqlalchemy.orm import Query, Session
+
+from app.core.config import settings
+from app.models.document_extended import DocumentExtended, DocumentStatus
+
+# Searchable columns with their tsvector weight class and BM25 field weight
+SEARCH_FIELDS: Dict[str, Tuple[str, float]] = {
+    "title": ("A", 3.0),
+    "description": ("B", 2.0),
+    "filename": ("B", 2.0),
+    "extracted_text": ("C", 1.0),
+    "ocr_text": ("D", 1.0),
+}
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# ts_headline match delimiters; swapped for <mark> tags after escaping
+HEADLINE_START = "\x02"
+HEADLINE_STOP = "\x03"
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lowercase word tokens."""
+    if not text:
+        return []
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def query_terms(search_query: Optional[str]) -> List[str]:
+    """Unique query terms in the order they were typed."""
+    return list(dict.fromkeys(tokenize(search_query)))
+
+
+def highlight(
+    text: Optional[str],
+    terms: List[str],
+    max_fragments: int = 2,
+    fragment_chars: int = 160,
+) -> List[str]:
+    """Snippets of ``text`` around prefix matches, wrapped in <mark> tags.
+
+    The text is HTML-escaped; the <mark> tags are the only markup.
+    """
+    if not text or not terms:
+        return []
+
+    pattern = re.compile(
+        r"\b(" + "|".join(re.escape(term) for term in terms) + r")\w*",
+        re.IGNORECASE,
+    )
+
+    fragments = []
+    last_end = -1
+    for match in pattern.finditer(text):
+        if match.start() < last_end:
+            continue
+
+        start = max(0, match.start() - fragment_chars // 2)
+        end = min(len(text), start + fragment_chars)
+        fragment = mark_matches(pattern, text[start:end])
+        fragments.append(
+            ("..." if start else "") + fragment + ("..." if end < len(text) else "")
+        )
+        last_end = end
+
+        if len(fragments) >= max_fragments:
+            break
+
+    return fragments
+
+
+def mark_matches(pattern: re.Pattern, text: str) -> str:
+    """HTML-escape ``text`` and wrap ``pattern`` matches in <mark> tags."""
+    parts = []
+    position = 0
+    for match in pattern.finditer(text):
+        parts.append(html.escape(text[position : match.start()]))
+        parts.append(f"<mark>{html.escape(match.group(0))}</mark>")
+        position = match.end()
+    parts.append(html.escape(text[position:]))
+    return "".join(parts)
+
+
+def mark_headline(headline: str) -> str:
+    """HTML-escape a ts_headline result and turn its delimiters into <mark>."""
+    return (
+        html.escape(headline)
+        .replace(HEADLINE_START, "<mark>")
+        .replace(HEADLINE_STOP, "</mark>")
+    )
+
+
+class DocumentSearchBackend(ABC):
+    """Interface shared by the search backends."""
+
+    name = "base"
+
+    @abstractmethod
+    def index_document(self, db: Session, document: DocumentExtended) -> None:
+        """Bring the search index up to date for a created or changed document."""
+
+    @abstractmethod
+    def remove_document(self, db: Session, document_id: str) -> None:
+        """Drop a document from the search index."""
+
+    @abstractmethod
+    def search(
+        self,
+        db: Session,
+        query: Query,
+        organization_id: str,
+        terms: List[str],
+        skip: int = 0,
+        limit: int = 50,
+    ) -> List[DocumentExtended]:
+        """Rank documents from ``query`` matching every term (prefix match).
+
+        Each returned document carries ``search_score`` and
+        ``search_highlights`` attributes; highlights are HTML-escaped text
+        with <mark> tags around matches.
+        """
+
+
+class PostgresDocumentSearch(DocumentSearchBackend):
+    """Full-text search on the GIN-indexed ``search_vector`` column."""
+
+    name = "postgres"
+    # Language-neutral parsing; matches the search_vector trigger
+    text_search_config = literal_column("'simple'::regconfig")
+
+    def index_document(self, db: Session, document: DocumentExtended) -> None:
+        # search_vector is maintained by the documents_extended trigger in
+        # the same statement as the row write
+        pass
+
+    def remove_document(self, db: Session, document_id: str) -> None:
+        # Deleted documents are excluded by status; the vector stays for restores
+        pass
+
+    def search(
+        self,
+        db: Session,
+        query: Query,
+        organization_id: str,
+        terms: List[str],
+        skip: int = 0,
+        limit: int = 50,
+    ) -> List[DocumentExtended]:
+        # Terms are \w+ tokens, so they are safe to join into tsquery syntax
+        ts_query = func.to_tsquery(
+            self.text_search_config, " & ".join(f"{term}:*" for term in terms)
+        )
+        rank = func.ts_rank_cd(DocumentExtended.search_vector, ts_query)
+
+        rows = (
+            query.filter(DocumentExtended.search_vector.op("@@")(ts_query))
+            .add_columns(rank.label("search_rank"))
+            .order_by(
+                desc("search_rank"),
+                desc(DocumentExtended.view_count),
+                desc(DocumentExtended.last_modified_at),
+            )
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+        documents = []
+        for document, score in rows:
+            document.search_score = float(score)
+            documents.append(document)
+
+        if documents:
+            # Headlines are only computed for the returned page
+            options = "MaxFragments=2, MaxWords=30, MinWords=10"
+            headlines = db.execute(
+                select(
+                    DocumentExtended.id,
+                    func.ts_headline(
+                        self.text_search_config,
+                        func.coalesce(
+                            DocumentExtended.extracted_text,
+                            DocumentExtended.ocr_text,
+                            DocumentExtended.description,
+                            DocumentExtended.title,
+                        ),
+                        ts_query,
+                        literal(
+                            f'StartSel="{HEADLINE_START}", '
+                            f'StopSel="{HEADLINE_STOP}", {options}'
+                        ),
+                    ),
+                ).where(DocumentExtended.id.in_([d.id for d in documents]))
+            ).all()
+            by_id = dict(headlines)
+            for document in documents:
+                headline = by_id.get(document.id)
+                document.search_highlights = (
+                    [mark_headline(headline)] if headline else []
+                )
+
+        return documents
+
+
+class InMemoryDocumentSearch(DocumentSearchBackend):
+    """In-process inverted index with BM25 ranking and prefix matching.
+
+    The index is built from the database on the first search and kept up to
+    date by DocumentService on create, update, version and delete. Before
+    each search a single aggregate query compares the live document count and
+    latest change stamp with the index: newer rows are re-read and a count
+    mismatch (e.g. hard deletes) triggers a full rebuild.
+    """
+
+    name = "memory"
+
+    k1 = 1.2
+    b = 0.75
+    prefix_weight = 0.7  # Score factor for prefix (non-exact) matches
+    max_prefix_expansions = 64
+    load_batch_size = 5000
+
+    def __init__(self):
+        self.loaded = False
+        self._watermark: Optional[Any] = None
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._document_terms: Dict[str, Tuple[str, ...]] = {}
+        self._document_lengths: Dict[str, float] = {}
+        self._organizations: Dict[str, str] = {}
+        self._total_length = 0.0
+        self._vocabulary: List[str] = []
+        self._vocabulary_dirty = False
+
+    @property
+    def document_count(self) -> int:
+        return len(self._document_lengths)
+
+    def add(
+        self, document_id: str, organization_id: str, fields: Dict[str, Optional[str]]
+    ) -> None:
+        """Index (or re-index) one document's searchable fields."""
+        if document_id in self._document_terms:
+            self.remove(document_id)
+
+        frequencies: Dict[str, float] = defaultdict(float)
+        for field, (_, weight) in SEARCH_FIELDS.items():
+            for token in tokenize(fields.get(field)):
+                frequencies[token] += weight
+
+        for term, frequency in frequencies.items():
+            postings = self._postings[term]
+            if not postings:
+                self._vocabulary_dirty = True
+            postings[document_id] = frequency
+
+        length = sum(frequencies.values())
+        self._document_terms[document_id] = tuple(frequencies)
+        self._document_lengths[document_id] = length
+        self._organizations[document_id] = organization_id
+        self._total_length += length
+
+    def remove(self, document_id: str) -> None:
+        terms = self._document_terms.pop(document_id, None)
+        if terms is None:
+            return
+
+        for term in terms:
+            postings = self._postings[term]
+            postings.pop(document_id, None)
+            if not postings:
+                del self._postings[term]
+                self._vocabulary_dirty = True
+
+        self._total_length -= self._document_lengths.pop(document_id)
+        self._organizations.pop(document_id, None)
+
+    def expand(self, term: str) -> List[Tuple[str, float]]:
+        """Indexed terms starting with ``term`` and their match weight."""
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+
+        expansions = []
+        position = bisect_left(self._vocabulary, term)
+        while (
+            position < len(self._vocabulary)
+            and self._vocabulary[position].startswith(term)
+            and len(expansions) < self.max_prefix_expansions
+        ):
+            candidate = self._vocabulary[position]
+            expansions.append((candidate, 1.0 if candidate == term else 0.0))
+            position += 1
+
+        if len(expansions) == self.max_prefix_expansions:
+            # Keep the most common completions of very short prefixes
+            expansions.sort(key=lambda item: -len(self._postings[item[0]]))
+
+        return [
+            (candidate, weight or self.prefix_weight)
+            for candidate, weight in expansions
+        ]
+
+    def score(
+        self, terms: List[str], organization_id: Optional[str] = None
+    ) -> Dict[str, float]:
+        """BM25 scores of documents containing every term (AND semantics)."""
+        if not terms or not self._document_lengths:
+            return {}
+
+        document_count = len(self._document_lengths)
+        average_length = self._total_length / document_count or 1.0
+
+        # Start from the most selective term to keep candidate sets small
+        expanded = [self.expand(term) for term in terms]
+        expanded.sort(
+            key=lambda expansions: sum(len(self._postings[t]) for t, _ in expansions)
+        )
+
+        scores: Optional[Dict[str, float]] = None
+        for expansions in expanded:
+            term_scores: Dict[str, float] = {}
+            for term, weight in expansions:
+                postings = self._postings[term]
+                idf = math.log(
+                    1 + (document_count - len(postings) + 0.5) / (len(postings) + 0.5)
+                )
+                for document_id, frequency in postings.items():
+                    if scores is not None and document_id not in scores:
+                        continue
+                    if (
+                        organization_id
+                        and self._organizations.get(document_id) != organization_id
+                    ):
+                        continue
+                    length_norm = self.k1 * (
+                        1
+                        - self.b
+                        + self.b * self._document_lengths[document_id] / average_length
+                    )
+                    value = (
+                        weight
+                        * idf
+                        * frequency
+                        * (self.k1 + 1)
+                        / (frequency + length_norm)
+                    )
+                    # Best matching completion counts for each query term
+                    if value > term_scores.get(document_id, 0.0):
+                        term_scores[document_id] = value
+
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {
+                    document_id: scores[document_id] + value
+                    for document_id, value in term_scores.items()
+                }
+            if not scores:
+                break
+
+        return scores or {}
+
+    def clear(self) -> None:
+        self.loaded = False
+        self._watermark = None
+        self._postings = defaultdict(dict)
+        self._document_terms = {}
+        self._document_lengths = {}
+        self._organizations = {}
+        self._total_length = 0.0
+        self._vocabulary = []
+        self._vocabulary_dirty = False
+
+    def refresh(self, db: Session) -> None:
+        """Build the index on first use and catch up with outside writes."""
+        changed_at = func.coalesce(
+            DocumentExtended.updated_at, DocumentExtended.created_at
+        )
+        live_count, latest_change = db.execute(
+            select(
+                func.count().filter(DocumentExtended.status != DocumentStatus.DELETED),
+                func.max(changed_at),
+            )
+        ).one()
+
+        if not self.loaded:
+            self._load(db, DocumentExtended.status != DocumentStatus.DELETED)
+        elif latest_change is not None and (
+            self._watermark is None or latest_change > self._watermark
+        ):
+            condition = changed_at >= self._watermark if self._watermark else None
+            self._load(db, condition)
+
+        if live_count != self.document_count:
+            # Rows removed or written without a change stamp; start over
+            self.clear()
+            self._load(db, DocumentExtended.status != DocumentStatus.DELETED)
+
+        self._watermark = latest_change
+        self.loaded = True
+
+    def _load(self, db: Session, condition: Optional[Any]) -> None:
+        columns = [getattr(DocumentExtended, field) for field in SEARCH_FIELDS]
+        statement = select(
+            DocumentExtended.id,
+            DocumentExtended.organization_id,
+            DocumentExtended.status,
+            *columns,
+        ).execution_options(yield_per=self.load_batch_size)
+        if condition is not None:
+            statement = statement.where(condition)
+
+        for row in db.execute(statement):
+            if row[2] == DocumentStatus.DELETED:
+                self.remove(row[0])
+            else:
+                self.add(row[0], row[1], dict(zip(SEARCH_FIELDS, row[3:])))
+
+    def index_document(self, db: Session, document: DocumentExtended) -> None:
+        if not self.loaded:
+            # Picked up by the initial load on first search
+            return
+        if document.status == DocumentStatus.DELETED:
+            self.remove(document.id)
+            return
+        self.add(
+            document.id,
+            document.organization_id,
+            {field: getattr(document, field) for field in SEARCH_FIELDS},
+        )
+
+    def remove_document(self, db: Session, document_id: str) -> None:
+        self.remove(document_id)
+
+    def search(
+        self,
+        db: Session,
+        query: Query,
+        organization_id: str,
+        terms: List[str],
+        skip: int = 0,
+        limit: int = 50,
+    ) -> List[DocumentExtended]:
+        self.refresh(db)
+
+        scores = self.score(terms, organization_id)
+        if not scores:
+            return []
+
+        # Rank only as deep as needed; widen if filters reject candidates
+        needed = skip + limit
+        window = max(needed * 2, 200)
+        while True:
+            ranked = heapq.nlargest(window, scores.items(), key=lambda item: item[1])
+            ranked_ids = [document_id for document_id, _ in ranked]
+            documents = {
+                document.id: document
+                for document in query.filter(DocumentExtended.id.in_(ranked_ids)).all()
+            }
+            if len(documents) >= needed or window >= len(scores):
+                break
+            window *= 4
+
+        page = [
+            documents[document_id]
+            for document_id in ranked_ids
+            if document_id in documents
+        ][skip:needed]
+
+        for document in page:
+            document.search_score = round(scores[document.id], 4)
+            document.search_highlights = [
+                fragment
+                for field in SEARCH_FIELDS
+                for fragment in highlight(getattr(document, field), terms)
+            ][:3]
+
+        return page
+
+
+SEARCH_BACKENDS = {
+    PostgresDocumentSearch.name: PostgresDocumentSearch,
+    InMemoryDocumentSearch.name: InMemoryDocumentSearch,
+}
+
+_backends: Dict[str, DocumentSearchBackend] = {}
+
+
+def get_document_search_backend(db: Session) -> DocumentSearchBackend:
+    """Search backend for the configured (or detected) database."""
+    name = settings.DOCUMENT_SEARCH_BACKEND
+    if name == "auto":
+        dialect = db.get_bind().dialect.name
+        name = "postgres" if dialect == "postgresql" else "memory"
+
+    if name not in SEARCH_BACKENDS:
+        raise ValueError(f"Unknown document search backend: {name}")
+
+    if name not in _backends:
+        _backends[name] = SEARCH_BACKENDS[name]()
+    return _backends[name]
@@ -0,0 +1,119 @@
+"""Daily capture of headcount snapshots.
+
+Headcount trends are read from ``HeadcountSnapshot`` rows, one per
+organization and day. Reading a trend captures today's snapshot when it is
+missing, but days on which nobody reads a trend would otherwise be left out
+of the history. :class:`HeadcountSnapshotJob` runs on a background thread and
+captures them for every organization with employees.
+
+Each run captures today's snapshot where it is missing and recaptures
+yesterday's where it was taken before the day ended, so hires and
+terminations entered late in the day are counted. Capturing is idempotent, so
+runs in several processes only repeat work.
+"""
+
+import logging
+import threading
+from datetime import date, datetime, time, timedelta
+from typing import Callable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.crud.hr_v31 import HRAnalyticsCRUD
+from app.models.hr_extended import Employee, HeadcountSnapshot
+
+logger = logging.getLogger(__name__)
+
+# How often the job checks for days to capture
+SNAPSHOT_CHECK_INTERVAL_SECONDS = 60 * 60.0
+
+
+class HeadcountSnapshotJob:
+    """Captures the daily headcount snapshots of every organization."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        interval: float = SNAPSHOT_CHECK_INTERVAL_SECONDS,
+        clock: Callable[[], date] = date.today,
+    ) -> None:
+        self.session_factory = session_factory
+        self.interval = interval
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    def run_once(self, db: Optional[Session] = None) -> int:
+        """Capture missing or partial snapshots; returns the number captured."""
+        own_session = db is None
+        db = db or self.session_factory()
+        captured = 0
+        try:
+            today = self.clock()
+            organization_ids = [
+                organization_id
+                for (organization_id,) in db.query(Employee.organization_id).distinct()
+            ]
+            crud = HRAnalyticsCRUD(db)
+            yesterday = today - timedelta(days=1)
+            # Yesterday's snapshot is final once taken after midnight
+            for day, final_after in (
+                (yesterday, datetime.combine(today, time.min)),
+                (today, None),
+            ):
+                pending = self._pending(db, organization_ids, day, final_after)
+                if pending:
+                    captured += len(crud.capture_headcount_snapshots(pending, day))
+        finally:
+            if own_session:
+                db.close()
+        return captured
+
+    def start(self) -> None:
+        with self._lock:
+            if self._worker is not None:
+                return
+            self._stopped.clear()
+            self._worker = threading.Thread(
+                target=self._run, name="headcount-snapshots", daemon=True
+            )
+        self._worker.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        with self._lock:
+            self._worker = None
+
+    def _run(self) -> None:
+        # Capture on start-up too, so a restart does not skip a day
+        while True:
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Headcount snapshot run failed")
+            if self._stopped.wait(self.interval):
+                return
+
+    @staticmethod
+    def _pending(
+        db: Session,
+        organization_ids: List[str],
+        day: date,
+        final_after: Optional[datetime],
+    ) -> List[str]:
+        query = db.query(HeadcountSnapshot.organization_id).filter(
+            HeadcountSnapshot.snapshot_date == day
+        )
+        if final_after is not None:
+            query = query.filter(HeadcountSnapshot.captured_at >= final_after)
+        done = {organization_id for (organization_id,) in query}
+        return [
+            organization_id
+            for organization_id in organization_ids
+            if organization_id not in done
+        ]
+
+
+headcount_snapshots = HeadcountSnapshotJob()
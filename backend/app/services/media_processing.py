@@ -0,0 +1,286 @@
+"""Media processing workers.
+
+Image resampling and encoding are CPU-bound and video work waits on ffmpeg
+subprocesses, so both run in a process pool instead of on the event loop.
+The render functions are module-level and take and return plain data so
+they can be shipped to worker processes; the caller records the results.
+
+Images are decoded once. JPEG sources are decoded at reduced scale with
+``Image.draft`` when even the largest variant is much smaller than the
+original, and each variant is resampled from a progressively downsampled
+intermediate (``Image.reduce``) instead of from the full-size original.
+
+A job that exceeds its timeout cannot be interrupted inside a pool worker,
+so the pool's processes are terminated and the pool is recreated; other
+jobs running at that moment fail with ``BrokenProcessPool`` and are retried
+by the caller.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fractions import Fraction
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+# Intermediates stay at least this many times larger than the next variant,
+# so the final LANCZOS pass still has enough source pixels
+REDUCE_HEADROOM = 2
+
+# Worker processes are replaced after this many jobs to cap memory growth
+MAX_JOBS_PER_WORKER = 200
+
+JPEG_SAVE_OPTIONS = {"optimize": True, "quality": 85, "progressive": True}
+PNG_SAVE_OPTIONS = {"optimize": True, "compress_level": 6}
+
+
+class MediaJobTimeoutError(TimeoutError):
+    """A media job ran past its timeout and its worker was terminated."""
+
+
+def _json_safe(value: Any) -> Any:
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def _reduced(image: Image.Image, target: Tuple[int, int]) -> Image.Image:
+    """Downsample by an integer factor while keeping headroom over ``target``."""
+    factor = int(min(image.width / target[0], image.height / target[1]))
+    factor //= REDUCE_HEADROOM
+    return image.reduce(factor) if factor >= 2 else image
+
+
+def render_image_variants(
+    media_root: str,
+    source_path: str,
+    stem: str,
+    suffix: str,
+    sizes: Dict[str, Optional[Tuple[int, int]]],
+) -> Dict[str, Any]:
+    """Decode an image once and write all fixed-size variants.
+
+    Variants are written to ``<media_root>/variants/<stem>_<name><suffix>``.
+    Returns the source metadata and one entry per variant written.
+    """
+    root = Path(media_root)
+    variant_dir = root / "variants"
+    variant_dir.mkdir(parents=True, exist_ok=True)
+    targets = sorted(
+        ((name, tuple(size)) for name, size in sizes.items() if size),
+        key=lambda item: item[1][0] * item[1][1],
+        reverse=True,
+    )
+
+    with Image.open(source_path) as img:
+        source_format = img.format
+        width, height = img.size
+        metadata = {
+            "format": source_format,
+            "mode": img.mode,
+            "size": [width, height],
+            "has_transparency": img.mode in ("RGBA", "LA")
+            or "transparency" in img.info,
+        }
+
+        exif = img.getexif()
+        if exif:
+            metadata["exif"] = {str(tag): _json_safe(v) for tag, v in exif.items()}
+
+        if targets and source_format == "JPEG":
+            # Let the decoder downscale by up to 8x while covering every variant
+            img.draft(
+                img.mode,
+                (
+                    max(size[0] for _, size in targets) * REDUCE_HEADROOM,
+                    max(size[1] for _, size in targets) * REDUCE_HEADROOM,
+                ),
+            )
+        img.load()
+
+        if source_format == "JPEG":
+            save_options = JPEG_SAVE_OPTIONS
+        elif source_format == "PNG":
+            save_options = PNG_SAVE_OPTIONS
+        else:
+            save_options = {"optimize": True}
+
+        variants: List[Dict[str, Any]] = []
+        intermediate = img
+        for name, target in targets:
+            intermediate = _reduced(intermediate, target)
+            variant = ImageOps.fit(intermediate, target, Image.Resampling.LANCZOS)
+
+            filename = f"{stem}_{name}{suffix}"
+            variant_path = variant_dir / filename
+            variant.save(variant_path, format=source_format, **save_options)
+
+            variants.append(
+                {
+                    "variant_name": name,
+                    "filename": filename,
+                    "file_path": str(variant_path.relative_to(root)),
+                    "file_size": variant_path.stat().st_size,
+                    "dimensions": {"width": variant.width, "height": variant.height},
+                    "format": source_format,
+                }
+            )
+
+    return {
+        "dimensions": {"width": width, "height": height},
+        "metadata": metadata,
+        "variants": variants,
+    }
+
+
+def render_video_variants(
+    media_root: str,
+    source_path: str,
+    stem: str,
+    qualities: Dict[str, Dict[str, Any]],
+) -> Dict[str, Any]:
+    """Probe a video, write its thumbnail and transcode quality variants."""
+    import ffmpeg
+
+    root = Path(media_root)
+    probe = ffmpeg.probe(source_path)
+    video_info = next(s for s in probe["streams"] if s["codec_type"] == "video")
+    duration = float(probe["format"]["duration"])
+
+    metadata = {
+        "duration": duration,
+        "bitrate": int(probe["format"]["bit_rate"]),
+        "format_name": probe["format"]["format_name"],
+        "codec": video_info["codec_name"],
+        "width": video_info["width"],
+        "height": video_info["height"],
+        "fps": float(Fraction(video_info["r_frame_rate"])),
+    }
+
+    variants: List[Dict[str, Any]] = []
+
+    # Frame at 10% of the duration
+    thumbnail_path = root / "thumbnails" / f"{stem}_thumbnail.jpg"
+    thumbnail_path.parent.mkdir(parents=True, exist_ok=True)
+    (
+        ffmpeg.input(source_path, ss=duration * 0.1 if duration else 1)
+        .output(str(thumbnail_path), vframes=1, format="image2", vcodec="mjpeg")
+        .overwrite_output()
+        .run(quiet=True)
+    )
+    variants.append(
+        {
+            "variant_name": "thumbnail",
+            "filename": thumbnail_path.name,
+            "file_path": str(thumbnail_path.relative_to(root)),
+            "file_size": thumbnail_path.stat().st_size,
+            "format": "JPEG",
+        }
+    )
+
+    for quality, settings in qualities.items():
+        variant_path = root / "variants" / f"{stem}_{quality}.mp4"
+        variant_path.parent.mkdir(parents=True, exist_ok=True)
+        (
+            ffmpeg.input(source_path)
+            .output(
+                str(variant_path),
+                vcodec="h264",
+                acodec="aac",
+                vf=f"scale={settings['width']}:-2",
+                video_bitrate=settings["bitrate"],
+                preset="medium",
+                crf=23,
+            )
+            .overwrite_output()
+            .run(quiet=True)
+        )
+        variants.append(
+            {
+                "variant_name": quality,
+                "filename": variant_path.name,
+                "file_path": str(variant_path.relative_to(root)),
+                "file_size": variant_path.stat().st_size,
+                "format": "MP4",
+            }
+        )
+
+    return {
+        "dimensions": {"width": video_info["width"], "height": video_info["height"]},
+        "duration": int(duration),
+        "metadata": metadata,
+        "variants": variants,
+    }
+
+
+class MediaWorkerPool:
+    """Process pool running media jobs with per-job timeouts."""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                # Fresh interpreters rather than forks of the threaded server
+                mp_context=multiprocessing.get_context("spawn"),
+                max_tasks_per_child=MAX_JOBS_PER_WORKER,
+            )
+        return self._executor
+
+    async def run(self, func: Callable[..., Any], *args: Any, timeout: float) -> Any:
+        """Run ``func(*args)`` in a worker, failing after ``timeout`` seconds.
+
+        Jobs wait for a free worker before their timeout starts, so a long
+        queue does not time out jobs that never got to run.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+
+        async with self._slots:
+            executor = self._get_executor()
+            try:
+                future = asyncio.get_running_loop().run_in_executor(
+                    executor, func, *args
+                )
+                return await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                self._terminate(executor)
+                raise MediaJobTimeoutError(f"Media job exceeded {timeout:g}s")
+            except BrokenProcessPool:
+                # A worker died; start a fresh pool for the next job
+                self._discard(executor)
+                raise
+
+    def _terminate(self, executor: ProcessPoolExecutor) -> None:
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+        self._discard(executor)
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        if self._executor is executor:
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+_pool: Optional[MediaWorkerPool] = None
+
+
+def get_media_worker_pool() -> MediaWorkerPool:
+    """Process-wide media worker pool, created on first use."""
+    global _pool
+    if _pool is None:
+        _pool = MediaWorkerPool()
+    return _pool
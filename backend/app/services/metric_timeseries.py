@@ -0,0 +1,622 @@
+"""Time-series storage for analytics metric data points.
+
+Every metric calculation stores one ``AnalyticsDataPoint``. Reading those back
+for long ranges scans every point, so points are also folded into
+``AnalyticsRollup`` buckets at 5-minute, hourly and daily resolution.
+
+A bucket holds count, sum, sum of squares, minimum, maximum and a
+:class:`QuantileSketch` for the median. All of them merge, so 5-minute buckets
+build the hourly and daily ones, and buckets can be combined without going
+back to the data points.
+
+Buckets are kept per data point ``period_type``, so hourly and daily series
+of one metric are never mixed.
+
+Each metric keeps a rollup watermark. :meth:`MetricTimeSeries.roll_up` folds
+the points between the watermark and the last 5-minute boundary and then moves
+the watermark, so every point is rolled up exactly once. Roll-ups run from
+:class:`MetricRollupJob` on a background thread, a bounded number of days per
+metric and run, not from metric calculation. Range queries read the coarsest
+resolution that still gives the requested detail and aggregate points newer
+than the watermark on the fly.
+
+Retention is set per metric in ``AnalyticsMetric.retention_policy`` as days
+per resolution (``None`` keeps forever), falling back to
+``DEFAULT_RETENTION_DAYS``. Data points are only deleted once rolled up.
+"""
+
+import logging
+import math
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.models.analytics_extended import (
+    AnalyticsDataPoint,
+    AnalyticsMetric,
+    AnalyticsRollup,
+    PeriodType,
+)
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+
+
+@dataclass(frozen=True)
+class Resolution:
+    """Bucket width of a stored series; ``raw`` has no buckets."""
+
+    name: str
+    step: timedelta
+
+    def bucket_start(self, moment: datetime) -> datetime:
+        if not self.step:
+            return moment
+        return moment - (moment - EPOCH) % self.step
+
+
+RAW = Resolution("raw", timedelta(0))
+FIVE_MINUTES = Resolution("5m", timedelta(minutes=5))
+HOURLY = Resolution("1h", timedelta(hours=1))
+DAILY = Resolution("1d", timedelta(days=1))
+# Finest first; each bucket fits exactly in one bucket of the next
+ROLLUP_RESOLUTIONS = (FIVE_MINUTES, HOURLY, DAILY)
+
+DEFAULT_RETENTION_DAYS: Dict[str, Optional[int]] = {
+    RAW.name: 2,
+    FIVE_MINUTES.name: 30,
+    HOURLY.name: 400,
+    DAILY.name: None,
+}
+# Roll-ups stop this long before now so points still being committed are not
+# left behind the watermark
+ROLLUP_DELAY = timedelta(minutes=1)
+# Buckets returned by a range query that does not ask for a step
+DEFAULT_MAX_POINTS = 500
+# Background roll-up cadence, and days of points folded per metric and run so
+# a long backlog (such as the first roll-up) is caught up over several runs
+ROLLUP_INTERVAL_SECONDS = 300.0
+MAX_ROLLUP_DAYS = 7
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with bounded relative error.
+
+    A value ``x`` is counted in bin ``k`` with ``gamma**(k-1) < |x| <=
+    gamma**k``. Quantiles are read back within ``RELATIVE_ACCURACY`` of the
+    true value, and merging two sketches adds their bin counts.
+    """
+
+    RELATIVE_ACCURACY = 0.01
+    GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+
+    def __init__(
+        self,
+        positive: Optional[Dict[int, int]] = None,
+        negative: Optional[Dict[int, int]] = None,
+        zeros: int = 0,
+    ) -> None:
+        self.positive = dict(positive or {})
+        self.negative = dict(negative or {})
+        self.zeros = zeros
+
+    @property
+    def count(self) -> int:
+        return self.zeros + sum(self.positive.values()) + sum(self.negative.values())
+
+    def add(self, value: float) -> None:
+        if value == 0:
+            self.zeros += 1
+            return
+        bins = self.positive if value > 0 else self.negative
+        key = math.ceil(math.log(abs(value), self.GAMMA))
+        bins[key] = bins.get(key, 0) + 1
+
+    def merge(self, other: "QuantileSketch") -> None:
+        for bins, other_bins in (
+            (self.positive, other.positive),
+            (self.negative, other.negative),
+        ):
+            for key, count in other_bins.items():
+                bins[key] = bins.get(key, 0) + count
+        self.zeros += other.zeros
+
+    def quantile(self, q: float) -> Optional[float]:
+        total = self.count
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        # Most negative values first
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._bin_value(key)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._bin_value(key)
+        return self._bin_value(max(self.positive))
+
+    def _bin_value(self, key: int) -> float:
+        return 2 * self.GAMMA**key / (self.GAMMA + 1)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "positive": {str(key): count for key, count in self.positive.items()},
+            "negative": {str(key): count for key, count in self.negative.items()},
+            "zeros": self.zeros,
+        }
+
+    @classmethod
+    def from_json(cls, data: Optional[Dict[str, Any]]) -> "QuantileSketch":
+        data = data or {}
+        return cls(
+            {int(key): count for key, count in data.get("positive", {}).items()},
+            {int(key): count for key, count in data.get("negative", {}).items()},
+            data.get("zeros", 0),
+        )
+
+
+@dataclass
+class Aggregate:
+    """Mergeable summary of metric values."""
+
+    count: int = 0
+    total: Decimal = Decimal("0")
+    sum_squares: float = 0.0
+    minimum: Optional[Decimal] = None
+    maximum: Optional[Decimal] = None
+    sketch: QuantileSketch = field(default_factory=QuantileSketch)
+
+    def add(self, value: Decimal) -> None:
+        self.count += 1
+        self.total += value
+        self.sum_squares += float(value) ** 2
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+        self.sketch.add(float(value))
+
+    def merge(self, other: "Aggregate") -> None:
+        if not other.count:
+            return
+        self.count += other.count
+        self.total += other.total
+        self.sum_squares += other.sum_squares
+        self.minimum = (
+            other.minimum if self.minimum is None else min(self.minimum, other.minimum)
+        )
+        self.maximum = (
+            other.maximum if self.maximum is None else max(self.maximum, other.maximum)
+        )
+        self.sketch.merge(other.sketch)
+
+    @property
+    def mean(self) -> Optional[Decimal]:
+        return self.total / self.count if self.count else None
+
+    @property
+    def std_deviation(self) -> Optional[float]:
+        if not self.count:
+            return None
+        mean = float(self.total) / self.count
+        # Rounding can take the variance of equal values slightly below zero
+        return math.sqrt(max(self.sum_squares / self.count - mean**2, 0.0))
+
+    @property
+    def median(self) -> Optional[float]:
+        return self.sketch.quantile(0.5)
+
+    @classmethod
+    def from_rollup(cls, rollup: AnalyticsRollup) -> "Aggregate":
+        return cls(
+            count=rollup.count,
+            total=Decimal(rollup.sum_value),
+            sum_squares=rollup.sum_squares,
+            minimum=rollup.min_value,
+            maximum=rollup.max_value,
+            sketch=QuantileSketch.from_json(rollup.quantile_sketch),
+        )
+
+    def store(self, rollup: AnalyticsRollup) -> None:
+        rollup.count = self.count
+        rollup.sum_value = self.total
+        rollup.sum_squares = self.sum_squares
+        rollup.min_value = self.minimum
+        rollup.max_value = self.maximum
+        rollup.quantile_sketch = self.sketch.to_json()
+        rollup.updated_at = datetime.utcnow()
+
+
+def _optional_float(value: Optional[Any]) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _series_point(
+    bucket_start: datetime, resolution: Resolution, aggregate: Aggregate
+) -> Dict[str, Any]:
+    return {
+        "bucket_start": bucket_start.isoformat(),
+        "bucket_end": (bucket_start + resolution.step).isoformat(),
+        "count": aggregate.count,
+        "sum": float(aggregate.total),
+        "avg": _optional_float(aggregate.mean),
+        "min": _optional_float(aggregate.minimum),
+        "max": _optional_float(aggregate.maximum),
+        "median": aggregate.median,
+        "std_deviation": aggregate.std_deviation,
+    }
+
+
+class MetricTimeSeries:
+    """Rolls up, expires and queries the stored series of analytics metrics."""
+
+    def __init__(
+        self, db: Session, clock: Callable[[], datetime] = datetime.utcnow
+    ) -> None:
+        self.db = db
+        self.clock = clock
+
+    def retention(self, metric: AnalyticsMetric) -> Dict[str, Optional[int]]:
+        """Days kept per resolution for a metric."""
+        return {**DEFAULT_RETENTION_DAYS, **(metric.retention_policy or {})}
+
+    def roll_up(
+        self,
+        metric: AnalyticsMetric,
+        until: Optional[datetime] = None,
+        max_days: Optional[int] = None,
+    ) -> int:
+        """Fold data points before ``until`` into rollups and commit.
+
+        ``until`` defaults to ``ROLLUP_DELAY`` before now and is rounded down
+        to a 5-minute boundary, so only complete 5-minute buckets are written.
+        With ``max_days`` at most that many days of points are folded and the
+        watermark stops at the last folded day. Retention is applied whenever
+        a day has been completed. Returns the number of points folded.
+        """
+        until = FIVE_MINUTES.bucket_start(until or self.clock() - ROLLUP_DELAY)
+        if metric.rollup_watermark is not None and metric.rollup_watermark >= until:
+            return 0
+
+        # Concurrent roll-ups of one metric wait here and then see the new
+        # watermark
+        self.db.refresh(metric, with_for_update=True)
+        watermark = metric.rollup_watermark
+        if watermark is not None and watermark >= until:
+            self.db.commit()
+            return 0
+
+        folded = 0
+        days = 0
+        start = watermark
+        # One day of points at a time
+        while max_days is None or days < max_days:
+            first = self._points_query(
+                metric.id, start, until, func.min(AnalyticsDataPoint.timestamp)
+            ).scalar()
+            if first is None:
+                start = until
+                break
+            day_end = min(DAILY.bucket_start(first) + DAILY.step, until)
+            buckets: Dict[Tuple[PeriodType, datetime], Aggregate] = {}
+            for timestamp, period_type, value in self._points_query(
+                metric.id,
+                first,
+                day_end,
+                AnalyticsDataPoint.timestamp,
+                AnalyticsDataPoint.period_type,
+                AnalyticsDataPoint.value,
+            ):
+                bucket = (period_type, FIVE_MINUTES.bucket_start(timestamp))
+                buckets.setdefault(bucket, Aggregate()).add(value)
+                folded += 1
+            self._merge_rollups(metric, buckets)
+            start = day_end
+            days += 1
+
+        metric.rollup_watermark = start
+        if watermark is None or DAILY.bucket_start(watermark) < DAILY.bucket_start(
+            start
+        ):
+            self._expire(metric, start)
+        self.db.commit()
+
+        return folded
+
+    def enforce_retention(
+        self, metric: AnalyticsMetric, now: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        """Delete data points and rollups older than the metric's retention."""
+        deleted = self._expire(metric, now or self.clock())
+        self.db.commit()
+        return deleted
+
+    def get_series(
+        self,
+        metric: AnalyticsMetric,
+        start: datetime,
+        end: datetime,
+        step: Optional[timedelta] = None,
+        max_points: int = DEFAULT_MAX_POINTS,
+        period_type: Optional[PeriodType] = None,
+    ) -> Dict[str, Any]:
+        """Aggregated values of a metric between ``start`` and ``end``.
+
+        Reads the coarsest stored resolution no wider than ``step`` (by
+        default the range split into ``max_points``) that still covers
+        ``start``. With ``period_type`` only data points of that period type
+        are included.
+        """
+        now = self.clock()
+        step = step or (end - start) / max_points
+        resolution = self.pick_resolution(metric, start, step, now)
+
+        buckets: Dict[datetime, Aggregate] = {}
+        tail_start = start
+        if resolution is not RAW:
+            rollups = self.db.query(AnalyticsRollup).filter(
+                AnalyticsRollup.metric_id == metric.id,
+                AnalyticsRollup.resolution == resolution.name,
+                AnalyticsRollup.bucket_start >= resolution.bucket_start(start),
+                AnalyticsRollup.bucket_start < end,
+            )
+            if period_type is not None:
+                rollups = rollups.filter(AnalyticsRollup.period_type == period_type)
+            for rollup in rollups.order_by(AnalyticsRollup.bucket_start):
+                buckets.setdefault(rollup.bucket_start, Aggregate()).merge(
+                    Aggregate.from_rollup(rollup)
+                )
+            if metric.rollup_watermark is not None:
+                tail_start = max(start, metric.rollup_watermark)
+
+        # Points not rolled up yet
+        points = self._points_query(
+            metric.id,
+            tail_start,
+            end,
+            AnalyticsDataPoint.timestamp,
+            AnalyticsDataPoint.value,
+        )
+        if period_type is not None:
+            points = points.filter(AnalyticsDataPoint.period_type == period_type)
+        for timestamp, value in points:
+            bucket = resolution.bucket_start(timestamp)
+            buckets.setdefault(bucket, Aggregate()).add(value)
+
+        return {
+            "metric_id": metric.id,
+            "resolution": resolution.name,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "points": [
+                _series_point(bucket_start, resolution, buckets[bucket_start])
+                for bucket_start in sorted(buckets)
+            ],
+        }
+
+    def pick_resolution(
+        self,
+        metric: AnalyticsMetric,
+        start: datetime,
+        step: timedelta,
+        now: datetime,
+    ) -> Resolution:
+        """Coarsest resolution no wider than ``step`` still retained at
+        ``start``, or the finest retained one if all are wider."""
+        retention = self.retention(metric)
+        retained = [
+            resolution
+            for resolution in (RAW, *ROLLUP_RESOLUTIONS)
+            if retention.get(resolution.name) is None
+            or start >= now - timedelta(days=retention[resolution.name])
+        ] or [DAILY]
+        fitting = [resolution for resolution in retained if resolution.step <= step]
+        return fitting[-1] if fitting else retained[0]
+
+    def _points_query(
+        self,
+        metric_id: str,
+        start: Optional[datetime],
+        end: datetime,
+        *columns: Any,
+    ) -> Any:
+        query = self.db.query(*columns).filter(
+            AnalyticsDataPoint.metric_id == metric_id,
+            AnalyticsDataPoint.timestamp < end,
+        )
+        if start is not None:
+            query = query.filter(AnalyticsDataPoint.timestamp >= start)
+        if len(columns) > 1:
+            query = query.order_by(AnalyticsDataPoint.timestamp)
+        return query
+
+    def _merge_rollups(
+        self,
+        metric: AnalyticsMetric,
+        five_minute: Dict[Tuple[PeriodType, datetime], Aggregate],
+    ) -> None:
+        """Merge 5-minute aggregates into the rollups of every resolution."""
+        by_period_type: Dict[PeriodType, Dict[datetime, Aggregate]] = defaultdict(dict)
+        for (period_type, bucket_start), aggregate in five_minute.items():
+            by_period_type[period_type][bucket_start] = aggregate
+
+        for period_type, buckets in by_period_type.items():
+            for resolution, aggregates in zip(
+                ROLLUP_RESOLUTIONS, self._coarsen(buckets)
+            ):
+                existing = {
+                    rollup.bucket_start: rollup
+                    for rollup in self.db.query(AnalyticsRollup).filter(
+                        AnalyticsRollup.metric_id == metric.id,
+                        AnalyticsRollup.period_type == period_type,
+                        AnalyticsRollup.resolution == resolution.name,
+                        AnalyticsRollup.bucket_start.in_(list(aggregates)),
+                    )
+                }
+                for bucket_start, aggregate in aggregates.items():
+                    rollup = existing.get(bucket_start)
+                    if rollup is None:
+                        rollup = AnalyticsRollup(
+                            organization_id=metric.organization_id,
+                            metric_id=metric.id,
+                            period_type=period_type,
+                            resolution=resolution.name,
+                            bucket_start=bucket_start,
+                        )
+                        self.db.add(rollup)
+                    else:
+                        merged = Aggregate.from_rollup(rollup)
+                        merged.merge(aggregate)
+                        aggregate = merged
+                    aggregate.store(rollup)
+
+    @staticmethod
+    def _coarsen(
+        five_minute: Dict[datetime, Aggregate],
+    ) -> Iterable[Dict[datetime, Aggregate]]:
+        aggregates = five_minute
+        yield aggregates
+        for resolution in ROLLUP_RESOLUTIONS[1:]:
+            coarser: Dict[datetime, Aggregate] = {}
+            for bucket_start, aggregate in aggregates.items():
+                coarser.setdefault(
+                    resolution.bucket_start(bucket_start), Aggregate()
+                ).merge(aggregate)
+            aggregates = coarser
+            yield aggregates
+
+    def _expire(self, metric: AnalyticsMetric, now: datetime) -> Dict[str, int]:
+        retention = self.retention(metric)
+        deleted: Dict[str, int] = {}
+
+        raw_days = retention.get(RAW.name)
+        if raw_days is not None and metric.rollup_watermark is not None:
+            # Never drop points that are not rolled up yet
+            cutoff = min(now - timedelta(days=raw_days), metric.rollup_watermark)
+            deleted[RAW.name] = (
+                self.db.query(AnalyticsDataPoint)
+                .filter(
+                    AnalyticsDataPoint.metric_id == metric.id,
+                    AnalyticsDataPoint.timestamp < cutoff,
+                )
+                .delete(synchronize_session=False)
+            )
+
+        for resolution in ROLLUP_RESOLUTIONS:
+            days = retention.get(resolution.name)
+            if days is None:
+                continue
+            # Only buckets that ended before the cutoff
+            last_start = now - timedelta(days=days) - resolution.step
+            deleted[resolution.name] = (
+                self.db.query(AnalyticsRollup)
+                .filter(
+                    AnalyticsRollup.metric_id == metric.id,
+                    AnalyticsRollup.resolution == resolution.name,
+                    AnalyticsRollup.bucket_start <= last_start,
+                )
+                .delete(synchronize_session=False)
+            )
+
+        return deleted
+
+
+class MetricRollupJob:
+    """Rolls up the new data points of every active metric periodically.
+
+    Each run folds at most ``max_days`` days per metric, so catching up a
+    long backlog is spread over several runs instead of one long
+    transaction. Concurrent runs in other processes serialize on the
+    metric row lock taken by :meth:`MetricTimeSeries.roll_up`.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        interval: float = ROLLUP_INTERVAL_SECONDS,
+        max_days: int = MAX_ROLLUP_DAYS,
+        clock: Callable[[], datetime] = datetime.utcnow,
+    ) -> None:
+        self.session_factory = session_factory
+        self.interval = interval
+        self.max_days = max_days
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    def run_once(self, db: Optional[Session] = None) -> int:
+        """Roll up every metric behind the last 5-minute boundary once."""
+        own_session = db is None
+        db = db or self.session_factory()
+        folded = 0
+        try:
+            until = FIVE_MINUTES.bucket_start(self.clock() - ROLLUP_DELAY)
+            metrics = (
+                db.query(AnalyticsMetric)
+                .filter(
+                    AnalyticsMetric.is_active.is_not(False),
+                    or_(
+                        AnalyticsMetric.rollup_watermark.is_(None),
+                        AnalyticsMetric.rollup_watermark < until,
+                    ),
+                )
+                .all()
+            )
+            series = MetricTimeSeries(db, clock=self.clock)
+            for metric in metrics:
+                try:
+                    folded += series.roll_up(metric, until, max_days=self.max_days)
+                except SQLAlchemyError as e:
+                    db.rollback()
+                    logger.warning("Roll-up of metric %s failed: %s", metric.id, e)
+        finally:
+            if own_session:
+                db.close()
+        return folded
+
+    def start(self) -> None:
+        with self._lock:
+            if self._worker is not None:
+                return
+            self._stopped.clear()
+            self._worker = threading.Thread(
+                target=self._run, name="metric-rollup", daemon=True
+            )
+        self._worker.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        with self._lock:
+            self._worker = None
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Metric roll-up run failed")
+
+
+metric_rollups = MetricRollupJob()
+
+
+def trend_periods(
+    resolution: Resolution, period_count: int, now: datetime
+) -> Tuple[datetime, datetime]:
+    """Range covering the last ``period_count`` buckets up to ``now``."""
+    start = resolution.bucket_start(now) - resolution.step * (period_count - 1)
+    return start, now
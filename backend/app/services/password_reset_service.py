@@ -7,7 +7,7 @@ from typing import Optional
 from sqlalchemy.orm import Session
 
 from app.core.exceptions import BusinessLogicError
-from app.core.security import hash_password, verify_password
+from app.core.security import hash_password_pooled, verify_password_pooled
 from app.models.password_history import PasswordHistory
 from app.models.password_reset import PasswordResetToken
 from app.models.user import User
@@ -165,6 +165,7 @@ class PasswordResetService:
 
         Raises:
             BusinessLogicError: If reset fails
+            PasswordHashingBusyError: If the hashing pool is saturated
         """
         # Verify token
         reset_token = self.verify_reset_token(token, verification_code)
@@ -185,7 +186,7 @@ class PasswordResetService:
         self._add_to_password_history(user, user.hashed_password)
 
         # Update password
-        user.hashed_password = hash_password(new_password)
+        user.hashed_password = hash_password_pooled(new_password)
         user.password_changed_at = datetime.now(UTC)
         user.password_must_change = False
         user.failed_login_attempts = 0
@@ -244,7 +245,7 @@ class PasswordResetService:
             )
 
         # Check not same as current
-        if verify_password(password, user.hashed_password):
+        if verify_password_pooled(password, user.hashed_password):
             raise BusinessLogicError(
                 "新しいパスワードは現在のパスワードと異なる必要があります"
             )
@@ -261,7 +262,7 @@ class PasswordResetService:
         )
 
         for history in recent_passwords:
-            if verify_password(password, history.password_hash):
+            if verify_password_pooled(password, history.password_hash):
                 return True
 
         return False
@@ -0,0 +1,315 @@
+"""Session validation cache and write-behind activity tracking.
+
+Every authenticated request resolves its bearer token to a ``UserSession``.
+Validated sessions are cached in a per-process LRU and in Redis, keyed by
+the SHA-256 of the token so raw tokens never appear in key names, and a
+cache hit is re-attached to the request's database session with
+``Session.merge(load=False)`` instead of being queried again.
+
+Any committed change to a ``UserSession`` row (revocation, refresh, extension)
+drops the cached entries for its old and new tokens and publishes the token
+hashes on a Redis channel, so other processes evict their local copies.
+If that broadcast is missed, local entries still expire after
+``LOCAL_TTL_SECONDS``.
+
+``last_activity_at`` is not written per request. The latest timestamp for
+each session is kept in memory and flushed as one batched UPDATE every
+``FLUSH_INTERVAL_SECONDS``, so a busy session costs one write per interval.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import UTC, datetime
+from typing import Any, Callable, Optional
+
+import redis
+from sqlalchemy import DateTime, event, inspect, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.session import UserSession
+
+logger = logging.getLogger(__name__)
+
+# Local entries can outlive a missed revocation broadcast by at most this long
+LOCAL_TTL_SECONDS = 30
+SHARED_TTL_SECONDS = 300
+LOCAL_MAX_ENTRIES = 10_000
+
+FLUSH_INTERVAL_SECONDS = 5.0
+
+SESSION_KEY_PREFIX = "session:valid:"
+REVOCATIONS_CHANNEL = "session:revocations"
+
+# Tokens stay out of Redis; the session token is known from the request and
+# the refresh token is loaded on first access if an endpoint needs it
+_SECRET_COLUMNS = {"session_token", "refresh_token"}
+_SNAPSHOT_COLUMNS = {
+    column.key: isinstance(column.type, DateTime)
+    for column in UserSession.__table__.columns
+    if column.key not in _SECRET_COLUMNS
+}
+
+_PENDING_INVALIDATIONS = "session_cache_invalidations"
+
+
+def hash_token(token: str) -> str:
+    """Cache key for a session token."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _snapshot(session: UserSession) -> dict[str, Any]:
+    """Column values of a session as JSON-serializable data."""
+    data = {}
+    for key, is_datetime in _SNAPSHOT_COLUMNS.items():
+        value = getattr(session, key)
+        data[key] = value.isoformat() if is_datetime and value else value
+    return data
+
+
+def _restore(snapshot: dict[str, Any]) -> dict[str, Any]:
+    data = {}
+    for key, is_datetime in _SNAPSHOT_COLUMNS.items():
+        value = snapshot.get(key)
+        data[key] = datetime.fromisoformat(value) if is_datetime and value else value
+    return data
+
+
+class SessionValidationCache:
+    """Two-level cache of validated sessions with revocation broadcast."""
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        local_ttl: float = LOCAL_TTL_SECONDS,
+        shared_ttl: int = SHARED_TTL_SECONDS,
+        max_entries: int = LOCAL_MAX_ENTRIES,
+    ) -> None:
+        self._redis = redis_client
+        self.local_ttl = local_ttl
+        self.shared_ttl = shared_ttl
+        self.max_entries = max_entries
+        self._local: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._listener: Optional[threading.Thread] = None
+
+    @property
+    def redis(self) -> redis.Redis:
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(
+                settings.REDIS_URL, decode_responses=True
+            )
+        return self._redis
+
+    def get(self, token_hash: str) -> Optional[dict[str, Any]]:
+        """Cached snapshot for a token hash, from memory first, then Redis."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._local.get(token_hash)
+            if entry is not None:
+                if entry[0] > now:
+                    self._local.move_to_end(token_hash)
+                    return entry[1]
+                del self._local[token_hash]
+
+        self._ensure_listener()
+        try:
+            raw = self.redis.get(SESSION_KEY_PREFIX + token_hash)
+        except redis.RedisError as e:
+            logger.warning("Session cache lookup failed: %s", e)
+            return None
+        if raw is None:
+            return None
+
+        snapshot = json.loads(raw)
+        self._store_local(token_hash, snapshot, now)
+        return snapshot
+
+    def put(self, token_hash: str, session: UserSession) -> None:
+        """Cache a validated session until it expires or the TTL runs out."""
+        expires_at = session.expires_at
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=UTC)
+        remaining = int((expires_at - datetime.now(UTC)).total_seconds())
+        if remaining <= 0:
+            return
+
+        snapshot = _snapshot(session)
+        self._store_local(token_hash, snapshot, time.monotonic())
+        try:
+            self.redis.set(
+                SESSION_KEY_PREFIX + token_hash,
+                json.dumps(snapshot),
+                ex=min(self.shared_ttl, remaining),
+            )
+        except redis.RedisError as e:
+            logger.warning("Session cache write failed: %s", e)
+
+    def attach(self, db: Session, token: str, snapshot: dict[str, Any]) -> UserSession:
+        """Rebuild a cached session as a persistent instance without a SELECT."""
+        session = UserSession(session_token=token, **_restore(snapshot))
+        make_transient_to_detached(session)
+        return db.merge(session, load=False)
+
+    def invalidate(self, token_hashes: set[str]) -> None:
+        """Drop entries here and in Redis, and tell other processes to."""
+        self.evict_local(token_hashes)
+        try:
+            pipe = self.redis.pipeline()
+            pipe.delete(*(SESSION_KEY_PREFIX + h for h in token_hashes))
+            pipe.publish(REVOCATIONS_CHANNEL, json.dumps(sorted(token_hashes)))
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning("Session cache invalidation failed: %s", e)
+
+    def evict_local(self, token_hashes: set[str]) -> None:
+        with self._lock:
+            for token_hash in token_hashes:
+                self._local.pop(token_hash, None)
+
+    def close(self) -> None:
+        """Stop listening for revocations."""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def _store_local(
+        self, token_hash: str, snapshot: dict[str, Any], now: float
+    ) -> None:
+        with self._lock:
+            self._local[token_hash] = (now + self.local_ttl, snapshot)
+            self._local.move_to_end(token_hash)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def _ensure_listener(self) -> None:
+        """Subscribe to revocations before serving entries from Redis."""
+        if self._listener is not None and self._listener.is_alive():
+            return
+        try:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{REVOCATIONS_CHANNEL: self._on_revocation})
+            self._listener = pubsub.run_in_thread(
+                sleep_time=1.0,
+                daemon=True,
+                exception_handler=self._on_listener_error,
+            )
+        except redis.RedisError as e:
+            logger.warning("Session revocation listener unavailable: %s", e)
+
+    def _on_revocation(self, message: dict[str, Any]) -> None:
+        self.evict_local(set(json.loads(message["data"])))
+
+    @staticmethod
+    def _on_listener_error(e: Exception, pubsub: Any, thread: Any) -> None:
+        # Keep listening; the pubsub connection reconnects on the next read
+        logger.warning("Session revocation listener error: %s", e)
+        time.sleep(1.0)
+
+
+class ActivityTracker:
+    """Coalesces ``last_activity_at`` updates and writes them in batches."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+    ) -> None:
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self._pending: dict[int, datetime] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    def touch(self, session: UserSession) -> None:
+        """Record activity now; the row is updated on the next flush."""
+        now = datetime.now(UTC)
+        set_committed_value(session, "last_activity_at", now)
+        with self._lock:
+            self._pending[session.id] = now
+        if self._flusher is None:
+            self._start()
+
+    def flush(self, db: Optional[Session] = None) -> int:
+        """Write pending timestamps in one statement; returns rows written."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        rows = [
+            {"id": session_id, "last_activity_at": last_activity_at}
+            for session_id, last_activity_at in pending.items()
+        ]
+        own_session = db is None
+        db = db or self.session_factory()
+        try:
+            db.execute(update(UserSession), rows)
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.warning("Session activity flush failed: %s", e)
+            # Retry on the next flush unless newer activity arrived meanwhile
+            with self._lock:
+                for session_id, last_activity_at in pending.items():
+                    self._pending.setdefault(session_id, last_activity_at)
+            return 0
+        finally:
+            if own_session:
+                db.close()
+        return len(rows)
+
+    def stop(self) -> None:
+        """Stop the background flusher and write what is pending."""
+        self._stopped.set()
+        self.flush()
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(
+                target=self._run, name="session-activity-flusher", daemon=True
+            )
+        self._flusher.start()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+
+
+session_cache = SessionValidationCache()
+activity_tracker = ActivityTracker()
+
+
+@event.listens_for(UserSession, "after_update")
+@event.listens_for(UserSession, "after_delete")
+def _collect_changed_session(mapper: Any, connection: Any, target: UserSession) -> None:
+    """Remember the tokens of a changed session until its transaction commits."""
+    history = inspect(target).attrs.session_token.history
+    tokens = {target.session_token, *history.deleted}
+    db = inspect(target).session
+    if db is not None:
+        db.info.setdefault(_PENDING_INVALIDATIONS, set()).update(
+            hash_token(token) for token in tokens if token
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_sessions(db: Session) -> None:
+    token_hashes = db.info.pop(_PENDING_INVALIDATIONS, None)
+    if token_hashes:
+        session_cache.invalidate(token_hashes)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_changed_sessions(db: Session, previous_transaction: Any) -> None:
+    db.info.pop(_PENDING_INVALIDATIONS, None)
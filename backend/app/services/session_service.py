@@ -11,14 +11,28 @@ from sqlalchemy.orm import Session
 from app.core.exceptions import BusinessLogicError
 from app.models.session import SessionActivity, SessionConfiguration, UserSession
 from app.models.user import User
+from app.services.session_cache import (
+    ActivityTracker,
+    SessionValidationCache,
+    activity_tracker,
+    hash_token,
+    session_cache,
+)
 
 
 class SessionService:
     """Service for session management operations."""
 
-    def __init__(self, db: Session) -> dict:
+    def __init__(
+        self,
+        db: Session,
+        cache: Optional[SessionValidationCache] = None,
+        tracker: Optional[ActivityTracker] = None,
+    ) -> dict:
         """Initialize session service."""
         self.db = db
+        self.cache = cache or session_cache
+        self.tracker = tracker or activity_tracker
 
     def create_session(
         self,
@@ -104,6 +118,23 @@ class SessionService:
             .first()
         )
 
+    def get_cached_session(self, token: str) -> Optional[UserSession]:
+        """
+        Get an active session by token, served from the validation cache.
+
+        Cache hits are attached to this service's database session without
+        querying it. Entries are dropped when the session row changes.
+        """
+        token_hash = hash_token(token)
+        snapshot = self.cache.get(token_hash)
+        if snapshot is not None:
+            return self.cache.attach(self.db, token, snapshot)
+
+        session = self.get_session_by_token(token)
+        if session:
+            self.cache.put(token_hash, session)
+        return session
+
     def refresh_session(
         self,
         refresh_token: str,
@@ -181,7 +212,7 @@ class SessionService:
 
         Args:
             session: Session to validate
-            update_activity: Whether to update last activity
+            update_activity: Whether to record activity (written in batches)
 
         Returns:
             True if valid, False otherwise
@@ -194,7 +225,7 @@ class SessionService:
             return False
 
         if update_activity:
-            session.update_activity(self.db)
+            self.tracker.touch(session)
 
         return True
 
@@ -0,0 +1,98 @@
+"""
+Throughput benchmark for the gateway rate limiter and circuit breaker
+Lua scripts are evaluated by an in-process Redis stand-in
+"""
+
+import asyncio
+import time
+
+import fakeredis
+import pytest
+
+from app.api.v1.api_gateway_v62 import (
+    RateLimitAlgorithm,
+    RateLimiter,
+    SharedCircuitBreaker,
+)
+
+CLIENTS = 20
+REQUESTS_PER_CLIENT = 100
+LIMIT = 60
+
+
+async def run_clients(limiter, algorithm):
+    async def client(i):
+        results = []
+        for _ in range(REQUESTS_PER_CLIENT):
+            results.append(
+                await limiter.is_allowed(
+                    f"client-{i}", limit=LIMIT, window=60, algorithm=algorithm
+                )
+            )
+        return results
+
+    return await asyncio.gather(*(client(i) for i in range(CLIENTS)))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("algorithm", list(RateLimitAlgorithm))
+async def test_rate_limiter_throughput(algorithm):
+    """Each client gets exactly its limit; refusals skip the round trip"""
+    redis_client = fakeredis.FakeAsyncRedis()
+    limiter = RateLimiter(redis_client)
+    evaluated = 0
+    original_eval = redis_client.eval
+
+    async def counting_eval(*args):
+        nonlocal evaluated
+        evaluated += 1
+        return await original_eval(*args)
+
+    redis_client.eval = counting_eval
+
+    start_time = time.perf_counter()
+    results = await run_clients(limiter, algorithm)
+    elapsed = time.perf_counter() - start_time
+
+    for client_results in results:
+        assert sum(allowed for allowed, _ in client_results) == LIMIT
+
+    # One script per admitted request plus the first refusal per client
+    assert evaluated == CLIENTS * (LIMIT + 1)
+
+    total = CLIENTS * REQUESTS_PER_CLIENT
+    print(
+        f"{algorithm.value}: {total / elapsed:.0f} checks/s, "
+        f"{evaluated} round trips for {total} checks"
+    )
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_throughput():
+    """Requests to an open circuit are refused without Redis"""
+    redis_client = fakeredis.FakeAsyncRedis()
+    breaker = SharedCircuitBreaker(redis_client, failure_threshold=5)
+    peer = SharedCircuitBreaker(redis_client, failure_threshold=5)
+
+    for _ in range(5):
+        await peer.record_failure("inventory-service", "/api/v1/inventory")
+
+    start_time = time.perf_counter()
+    refused = [
+        not await breaker.can_execute("inventory-service", "/api/v1/inventory")
+        for _ in range(1000)
+    ]
+    elapsed = time.perf_counter() - start_time
+
+    # The first check learns the shared state, the rest are local
+    assert all(refused)
+
+    start_time = time.perf_counter()
+    for _ in range(100):
+        await breaker.record_success("inventory-service", "/api/v1/orders")
+    record_elapsed = time.perf_counter() - start_time
+
+    print(
+        f"Open circuit: {1000 / elapsed:.0f} checks/s, "
+        f"recording: {100 / record_elapsed:.0f} outcomes/s"
+    )
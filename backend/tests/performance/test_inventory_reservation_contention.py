@@ -0,0 +1,244 @@
+"""
+Contention benchmark for hot-SKU reservations
+Compares row-locked balance updates with the append-only reservation ledgers
+"""
+
+import asyncio
+import time
+import uuid
+from collections import defaultdict
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1.inventory_advanced_v57 import (
+    ReservationManager,
+    ReservationRequest,
+)
+from app.api.v1.inventory_management_v67 import (
+    InventoryReservationLedgerService,
+    ReservationCreate,
+)
+from app.core.exceptions import BusinessLogicError
+
+RESERVERS = 500
+STOCK = 300
+COMMIT_LATENCY = 0.004  # Simulated database round trip per commit
+
+
+class InMemoryGateRedis:
+    """Single-process stand-in for the ledger's Redis gate scripts"""
+
+    def __init__(self):
+        self.values = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = int(value)
+        return True
+
+    async def eval(self, script, numkeys, key, argument):
+        await asyncio.sleep(0)
+        units = int(argument)
+        if script == InventoryReservationLedgerService.RESERVE_SCRIPT:
+            if key not in self.values:
+                return InventoryReservationLedgerService.GATE_MISSING
+            if self.values[key] < units:
+                return 0
+            self.values[key] -= units
+            return 1
+        if key in self.values:
+            self.values[key] += units
+            return self.values[key]
+        return None
+
+
+def ledger_session():
+    """Session whose commits take COMMIT_LATENCY without holding any lock"""
+
+    async def commit():
+        await asyncio.sleep(COMMIT_LATENCY)
+
+    seed_result = Mock()
+    seed_result.scalar.return_value = Decimal(STOCK)
+
+    session = AsyncMock()
+    session.add = Mock()
+    session.commit = AsyncMock(side_effect=commit)
+    session.execute = AsyncMock(return_value=seed_result)
+    return session
+
+
+class AdvisoryLockSession:
+    """Session over an in-memory stock level and reservation ledger
+
+    Advisory locks are held until the end of the transaction, and a
+    transaction that appended ledger rows commits with COMMIT_LATENCY while
+    still holding them, as PostgreSQL does.
+    """
+
+    def __init__(self, ledger):
+        self.ledger = ledger
+        self.held = []
+        self.staged = []
+
+    def begin(self):
+        return self
+
+    async def __aenter__(self):
+        self.held, self.staged = [], []
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        try:
+            if exc_type is None and self.staged:
+                await asyncio.sleep(COMMIT_LATENCY)
+                for row in self.staged:
+                    self.ledger["pending"][row["to_location"]] += row["quantity"]
+        finally:
+            for lock in self.held:
+                lock.release()
+        return False
+
+    async def execute(self, statement, params=None):
+        if statement in (
+            ReservationManager.LOCK_SHARD,
+            ReservationManager.TRY_LOCK_SHARD,
+        ):
+            lock = self.ledger["locks"][params["lock_key"]]
+            if statement is ReservationManager.TRY_LOCK_SHARD and lock.locked():
+                return SimpleNamespace(scalar=lambda: False)
+            await lock.acquire()
+            self.held.append(lock)
+            return SimpleNamespace(scalar=lambda: True)
+        if statement is ReservationManager.SHARD_STOCK:
+            pending = self.ledger["pending"]
+            rows = [(None, STOCK)]
+            rows.extend((label, pending[label]) for label in params["labels"])
+            return SimpleNamespace(all=lambda: rows)
+        if statement.is_insert:
+            self.staged.extend(params)
+            return None
+        # Stock net of pending reservations, read for the rejection message
+        remaining = STOCK - sum(self.ledger["pending"].values())
+        return SimpleNamespace(scalar=lambda: remaining)
+
+
+async def reserve_with_row_lock(row_lock, balance):
+    """Previous behaviour: every reserver updates the one balance row"""
+    async with row_lock:
+        if balance["available"] < 1:
+            return False
+        balance["available"] -= 1
+        balance["reserved"] += 1
+        await asyncio.sleep(COMMIT_LATENCY)
+        return True
+
+
+async def row_lock_baseline():
+    row_lock = asyncio.Lock()
+    balance = {"available": STOCK, "reserved": 0}
+    start_time = time.perf_counter()
+    results = await asyncio.gather(
+        *[reserve_with_row_lock(row_lock, balance) for _ in range(RESERVERS)]
+    )
+    return sum(results), time.perf_counter() - start_time
+
+
+@pytest.mark.asyncio
+async def test_hot_sku_reservation_contention():
+    """500 concurrent reservers on one SKU with 300 units in stock"""
+    product_id = uuid.uuid4()
+    location_id = uuid.uuid4()
+
+    locked_admitted, row_lock_time = await row_lock_baseline()
+
+    # Ledger with Redis admission gate
+    session = ledger_session()
+    redis_client = InMemoryGateRedis()
+
+    async def reserve(index):
+        service = InventoryReservationLedgerService(session, redis_client)
+        try:
+            await service.reserve(
+                ReservationCreate(
+                    product_id=product_id,
+                    location_id=location_id,
+                    quantity=Decimal("1"),
+                    reference_id=f"ORDER-{index:05d}",
+                )
+            )
+            return True
+        except HTTPException:
+            return False
+
+    start_time = time.perf_counter()
+    ledger_results = await asyncio.gather(*[reserve(i) for i in range(RESERVERS)])
+    ledger_time = time.perf_counter() - start_time
+
+    # Both approaches admit exactly the available stock
+    assert locked_admitted == STOCK
+    assert sum(ledger_results) == STOCK
+    assert session.add.call_count == STOCK
+    assert next(iter(redis_client.values.values())) == 0
+
+    # The balance row is read once to seed the gate and never written
+    assert session.execute.await_count == 1
+
+    # Commits overlap instead of queueing behind the row lock
+    assert ledger_time < row_lock_time / 2
+
+    print(
+        f"Hot SKU reservations ({RESERVERS} reservers): "
+        f"row lock {RESERVERS / row_lock_time:.0f}/s, "
+        f"ledger {RESERVERS / ledger_time:.0f}/s"
+    )
+
+
+@pytest.mark.asyncio
+async def test_hot_sku_sharded_reservation_contention():
+    """500 concurrent reservers on one SKU through sharded admission locks"""
+    product_id = uuid.uuid4()
+    user_id = uuid.uuid4()
+
+    locked_admitted, row_lock_time = await row_lock_baseline()
+
+    ledger = {"pending": defaultdict(int), "locks": defaultdict(asyncio.Lock)}
+
+    async def reserve(index):
+        manager = ReservationManager(AdvisoryLockSession(ledger))
+        try:
+            await manager.create_reservation(
+                ReservationRequest(
+                    product_id=product_id,
+                    quantity=1,
+                    reserved_for=f"ORDER-{index:05d}",
+                ),
+                user_id,
+            )
+            return True
+        except BusinessLogicError:
+            return False
+
+    start_time = time.perf_counter()
+    sharded_results = await asyncio.gather(*[reserve(i) for i in range(RESERVERS)])
+    sharded_time = time.perf_counter() - start_time
+
+    # Shard shares add up to the stock, so nothing is oversold
+    assert locked_admitted == STOCK
+    assert sum(sharded_results) == STOCK
+    assert sum(ledger["pending"].values()) == STOCK
+    assert len(ledger["pending"]) == ReservationManager.RESERVATION_SHARDS
+
+    # Reservers on different shards commit side by side
+    assert sharded_time < row_lock_time / 2
+
+    print(
+        f"Hot SKU sharded reservations ({RESERVERS} reservers): "
+        f"row lock {RESERVERS / row_lock_time:.0f}/s, "
+        f"sharded ledger {RESERVERS / sharded_time:.0f}/s"
+    )
@@ -0,0 +1,93 @@
+"""
+Throughput benchmark for image variant processing
+A directory of camera-sized JPEGs processed by the media worker pool
+"""
+
+import asyncio
+import time
+
+import pytest
+from PIL import Image, ImageOps
+
+from app.services.media_processing import MediaWorkerPool, render_image_variants
+
+SAMPLE_IMAGES = 8
+SAMPLE_SIZE = (4000, 3000)
+IMAGE_SIZES = {
+    "thumbnail": (150, 150),
+    "small": (300, 300),
+    "medium": (600, 600),
+    "large": (1200, 1200),
+    "original": None,
+}
+
+
+@pytest.fixture(scope="module")
+def sample_dir(tmp_path_factory):
+    """Smooth gradients with noise, roughly as compressible as photos"""
+    directory = tmp_path_factory.mktemp("samples")
+    gradient = Image.linear_gradient("L").resize(SAMPLE_SIZE)
+    for i in range(SAMPLE_IMAGES):
+        noise = Image.effect_noise(SAMPLE_SIZE, 20 + i)
+        Image.merge("RGB", (gradient, noise, gradient.rotate(180))).save(
+            directory / f"sample_{i}.jpg", quality=90
+        )
+    return directory
+
+
+def render_each_variant_from_original(source, output_dir, stem):
+    """Previous approach: full decode, every variant fitted from the original"""
+    with Image.open(source) as img:
+        for name, size in IMAGE_SIZES.items():
+            if size:
+                variant = ImageOps.fit(img, size, Image.Resampling.LANCZOS)
+                variant.save(output_dir / f"{stem}_{name}.jpg", optimize=True)
+
+
+@pytest.mark.asyncio
+async def test_image_variant_throughput(sample_dir, tmp_path):
+    """Sample directory rendered in the worker pool vs. the old inline path"""
+    sources = sorted(sample_dir.glob("*.jpg"))
+
+    start_time = time.perf_counter()
+    for source in sources:
+        render_each_variant_from_original(source, tmp_path, source.stem)
+    baseline = time.perf_counter() - start_time
+
+    pool = MediaWorkerPool()
+    try:
+        # Start the worker processes outside the measurement
+        await pool.run(pow, 2, 2, timeout=60)
+
+        start_time = time.perf_counter()
+        results = await asyncio.gather(
+            *(
+                pool.run(
+                    render_image_variants,
+                    str(tmp_path),
+                    str(source),
+                    source.stem,
+                    ".jpg",
+                    IMAGE_SIZES,
+                    timeout=60,
+                )
+                for source in sources
+            )
+        )
+        elapsed = time.perf_counter() - start_time
+    finally:
+        pool.shutdown()
+
+    assert all(len(result["variants"]) == 4 for result in results)
+    assert all(
+        result["dimensions"] == {"width": 4000, "height": 3000} for result in results
+    )
+
+    # Faster even on a single core, and the event loop stayed free throughout
+    assert elapsed < baseline
+
+    print(
+        f"Image variants ({len(sources)} x {SAMPLE_SIZE[0]}x{SAMPLE_SIZE[1]}): "
+        f"{len(sources) / elapsed:.1f} images/s on {pool.max_workers} workers, "
+        f"inline baseline {len(sources) / baseline:.1f} images/s"
+    )
@@ -0,0 +1,123 @@
+"""
+Fan-out benchmark for rule-driven notifications
+A company-wide announcement rendered and inserted for 50k recipients
+"""
+
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.crud.notification_v31 import (
+    FANOUT_CHUNK_SIZE,
+    NotificationService,
+)
+from app.models.notification_extended import NotificationTemplate
+
+RECIPIENTS = 50000
+
+
+def announcement_rule(target_users, template_id="tmpl-announce"):
+    return SimpleNamespace(
+        organization_id="org-123",
+        template_id=template_id,
+        notification_type=None,
+        priority_override=None,
+        channels=["in_app", "email"],
+        target_users=target_users,
+        delay_seconds=0,
+        variable_mappings={},
+        execution_count=0,
+        success_count=0,
+        last_executed_at=None,
+    )
+
+
+def announcement_event():
+    return SimpleNamespace(
+        organization_id="org-123",
+        event_name="company_announcement",
+        event_type="broadcast",
+        event_data={"headline": "Office closed Friday"},
+        event_timestamp=datetime(2024, 1, 5, 9, 0),
+        source_system="hr",
+        entity_type=None,
+        entity_id=None,
+    )
+
+
+def announcement_template(message_template):
+    return SimpleNamespace(
+        id="tmpl-announce",
+        name="Announcement",
+        title_template="{{headline}}",
+        message_template=message_template,
+        html_template=None,
+        updated_at=None,
+        created_at=datetime(2024, 1, 1),
+    )
+
+
+def template_session(template):
+    session = MagicMock()
+    session.query.return_value.filter.return_value.first.return_value = template
+    return session
+
+
+@pytest.mark.asyncio
+async def test_company_wide_fanout_throughput():
+    """50k recipients inserted in chunks with shared content rendered once"""
+    service = NotificationService()
+    session = template_session(
+        announcement_template("{{headline}} - please plan accordingly")
+    )
+    rule = announcement_rule([f"user-{i}" for i in range(RECIPIENTS)])
+
+    start_time = time.perf_counter()
+    notifications = await service._generate_notifications_from_rule(
+        session, rule, announcement_event()
+    )
+    elapsed = time.perf_counter() - start_time
+
+    chunks = RECIPIENTS // FANOUT_CHUNK_SIZE
+    assert len(notifications) == RECIPIENTS
+    assert rule.success_count == RECIPIENTS
+
+    # Notifications and queue entries per chunk, one commit per chunk
+    assert session.execute.call_count == 2 * chunks
+    assert session.commit.call_count == chunks + 1
+    notification_rows = session.execute.call_args_list[0][0][1]
+    queue_rows = session.execute.call_args_list[1][0][1]
+    assert len(notification_rows) == len(queue_rows) == FANOUT_CHUNK_SIZE
+    assert notification_rows[0]["title"] == "Office closed Friday"
+    assert notification_rows[0]["message"] == (
+        "Office closed Friday - please plan accordingly"
+    )
+    assert queue_rows[0]["notification_id"] == notification_rows[0]["id"]
+
+    # Template looked up once for the whole audience
+    session.query.assert_called_once_with(NotificationTemplate)
+
+    assert elapsed < 10.0
+    print(f"Rule fan-out ({RECIPIENTS} recipients): {RECIPIENTS / elapsed:.0f}/s")
+
+
+@pytest.mark.asyncio
+async def test_fanout_personalizes_recipient_fields():
+    """Only fields using recipient variables are rendered per recipient"""
+    service = NotificationService()
+    session = template_session(
+        announcement_template("{{headline}} (sent to {{recipient_user_id}})")
+    )
+    rule = announcement_rule(["user-1", "user-2"])
+
+    await service._generate_notifications_from_rule(session, rule, announcement_event())
+
+    rows = session.execute.call_args_list[0][0][1]
+    assert [row["message"] for row in rows] == [
+        "Office closed Friday (sent to user-1)",
+        "Office closed Friday (sent to user-2)",
+    ]
+    assert rows[0]["title"] == rows[1]["title"] == "Office closed Friday"
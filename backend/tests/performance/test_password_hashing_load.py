@@ -0,0 +1,86 @@
+"""
+Event loop latency during a login burst
+Password checks inline on the loop vs. on the bounded hashing pool
+"""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+from passlib.context import CryptContext
+
+from app.core.security import PasswordHashingPool, verify_password
+
+LOGINS = 16
+# Production cost is 12; 10 keeps the benchmark short with the same shape
+ROUNDS = 10
+TICK = 0.005
+
+
+async def measure_loop_lag(burst):
+    """Largest delay of a periodic tick while the burst runs"""
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            start_time = time.perf_counter()
+            await asyncio.sleep(TICK)
+            lags.append(time.perf_counter() - start_time - TICK)
+
+    ticker_task = asyncio.create_task(ticker())
+    await asyncio.sleep(TICK * 4)
+    start_time = time.perf_counter()
+    results = await burst()
+    elapsed = time.perf_counter() - start_time
+    done.set()
+    await ticker_task
+    return max(lags), elapsed, results
+
+
+@pytest.mark.asyncio
+async def test_loop_latency_during_login_burst():
+    context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=ROUNDS)
+    hashed = context.hash("SecurePassword123!")
+    pool = PasswordHashingPool(max_queued=LOGINS)
+
+    async def inline_login():
+        return verify_password("SecurePassword123!", hashed)
+
+    async def inline_burst():
+        return await asyncio.gather(*(inline_login() for _ in range(LOGINS)))
+
+    async def pooled_burst():
+        return await asyncio.gather(
+            *(
+                pool.run(verify_password, "SecurePassword123!", hashed)
+                for _ in range(LOGINS)
+            )
+        )
+
+    try:
+        with patch("app.core.security.pwd_context", context):
+            inline_lag, inline_elapsed, inline_results = await measure_loop_lag(
+                inline_burst
+            )
+            pooled_lag, pooled_elapsed, pooled_results = await measure_loop_lag(
+                pooled_burst
+            )
+    finally:
+        pool.shutdown()
+
+    assert all(inline_results) and all(pooled_results)
+
+    # Inline, the loop stalls for the whole burst; pooled, it keeps ticking
+    single_hash = inline_elapsed / LOGINS
+    assert inline_lag > single_hash * (LOGINS - 1)
+    assert pooled_lag < single_hash
+
+    print(
+        f"Login burst ({LOGINS} x bcrypt rounds={ROUNDS}): "
+        f"max loop lag {pooled_lag * 1e3:.1f}ms on the pool "
+        f"vs {inline_lag * 1e3:.1f}ms inline; "
+        f"burst {pooled_elapsed * 1e3:.0f}ms vs {inline_elapsed * 1e3:.0f}ms "
+        f"on {pool.max_workers} workers"
+    )
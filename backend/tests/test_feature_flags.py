@@ -3,9 +3,12 @@ Feature Flag System Tests
 Comprehensive test suite for feature flag functionality
 """
 
+import asyncio
+import json
 from datetime import datetime, timezone
 from unittest.mock import AsyncMock, MagicMock
 
+import fakeredis
 import pytest
 
 from app.core.feature_flags import (
@@ -25,6 +28,11 @@ class TestFeatureFlagService:
     def mock_redis(self):
         """Mock Redis client"""
         redis_mock = AsyncMock()
+
+        pipe = MagicMock()
+        pipe.__aenter__.return_value = pipe
+        pipe.execute = AsyncMock(return_value=[1, 2])
+        redis_mock.pipeline = MagicMock(return_value=pipe)
         return redis_mock
 
     @pytest.fixture
@@ -54,15 +62,12 @@ class TestFeatureFlagService:
             "rules": [],
             "environments": {},
         }
-        mock_redis.get.return_value = None  # No cache
-        service._get_flag_config = AsyncMock(return_value=flag_config)
-        service._cache_evaluation = AsyncMock()
-        service._log_evaluation = AsyncMock()
+        service._apply_snapshot(1, {"test_flag": flag_config})
 
         result = await service.get_flag("test_flag", context)
 
         assert result is True
-        service._log_evaluation.assert_called_once()
+        assert service._evaluations["test_flag", True] == 1
 
     @pytest.mark.asyncio
     async def test_get_flag_all_off(self, service, context, mock_redis):
@@ -74,9 +79,7 @@ class TestFeatureFlagService:
             "rules": [],
             "environments": {},
         }
-        service._get_flag_config = AsyncMock(return_value=flag_config)
-        service._cache_evaluation = AsyncMock()
-        service._log_evaluation = AsyncMock()
+        service._apply_snapshot(1, {"test_flag": flag_config})
 
         result = await service.get_flag("test_flag", context)
 
@@ -92,9 +95,7 @@ class TestFeatureFlagService:
             "rules": [],
             "environments": {},
         }
-        service._get_flag_config = AsyncMock(return_value=flag_config)
-        service._cache_evaluation = AsyncMock()
-        service._log_evaluation = AsyncMock()
+        service._apply_snapshot(1, {"test_flag": flag_config})
 
         result = await service.get_flag("test_flag", context)
 
@@ -103,7 +104,7 @@ class TestFeatureFlagService:
     @pytest.mark.asyncio
     async def test_get_flag_nonexistent(self, service, context):
         """Test nonexistent flag returns False"""
-        service._get_flag_config = AsyncMock(return_value=None)
+        service._apply_snapshot(1, {})
 
         result = await service.get_flag("nonexistent_flag", context)
 
@@ -120,9 +121,7 @@ class TestFeatureFlagService:
             "rules": [],
             "environments": {},
         }
-        service._get_flag_config = AsyncMock(return_value=flag_config)
-        service._cache_evaluation = AsyncMock()
-        service._log_evaluation = AsyncMock()
+        service._apply_snapshot(1, {"test_flag": flag_config})
 
         # Mock consistent hash result
         service._evaluate_percentage = MagicMock(return_value=True)
@@ -143,9 +142,7 @@ class TestFeatureFlagService:
             "rules": [],
             "environments": {},
         }
-        service._get_flag_config = AsyncMock(return_value=flag_config)
-        service._cache_evaluation = AsyncMock()
-        service._log_evaluation = AsyncMock()
+        service._apply_snapshot(1, {"test_flag": flag_config})
 
         result = await service.get_flag("test_flag", context)
 
@@ -167,9 +164,7 @@ class TestFeatureFlagService:
             "rules": [],
             "environments": {},
         }
-        service._get_flag_config = AsyncMock(return_value=flag_config)
-        service._cache_evaluation = AsyncMock()
-        service._log_evaluation = AsyncMock()
+        service._apply_snapshot(1, {"test_flag": flag_config})
 
         result = await service.get_flag("test_flag", context)
 
@@ -186,9 +181,7 @@ class TestFeatureFlagService:
             "rules": [],
             "environments": {},
         }
-        service._get_flag_config = AsyncMock(return_value=flag_config)
-        service._cache_evaluation = AsyncMock()
-        service._log_evaluation = AsyncMock()
+        service._apply_snapshot(1, {"test_flag": flag_config})
 
         result = await service.get_flag("test_flag", context)
 
@@ -212,9 +205,7 @@ class TestFeatureFlagService:
                 "production": {"enabled": True},
             },
         }
-        service._get_flag_config = AsyncMock(return_value=flag_config)
-        service._cache_evaluation = AsyncMock()
-        service._log_evaluation = AsyncMock()
+        service._apply_snapshot(1, {"test_flag": flag_config})
 
         # Should be disabled in development
         result = await service.get_flag("test_flag", context)
@@ -228,7 +219,7 @@ class TestFeatureFlagService:
     @pytest.mark.asyncio
     async def test_a_b_testing_variant(self, service, context):
         """Test A/B testing variant assignment"""
-        service._log_variant_assignment = AsyncMock()
+        service._log_variant_assignment = MagicMock()
 
         variant = await service.get_variant("test_flag", context, ["A", "B"])
 
@@ -240,7 +231,6 @@ class TestFeatureFlagService:
     @pytest.mark.asyncio
     async def test_variant_consistency(self, service, context):
         """Test that variant assignment is consistent for same user"""
-        service._log_variant_assignment = AsyncMock()
 
         variant1 = await service.get_variant("test_flag", context, ["A", "B", "C"])
         variant2 = await service.get_variant("test_flag", context, ["A", "B", "C"])
@@ -260,9 +250,7 @@ class TestFeatureFlagService:
             "environments": {},
         }
         service._get_flag_config = AsyncMock(return_value=flag_config)
-        mock_redis = service.redis
-        mock_redis.setex = AsyncMock()
-        service._invalidate_flag_cache = AsyncMock()
+        pipe = service.redis.pipeline.return_value
 
         # Test getting rollout percentage
         percentage = await service.get_rollout_percentage("test_flag")
@@ -270,25 +258,51 @@ class TestFeatureFlagService:
 
         # Test updating rollout percentage
         await service.update_rollout_percentage("test_flag", 75.0)
-        mock_redis.setex.assert_called()
+        stored = json.loads(pipe.hset.call_args.args[2])
+        assert stored["rules"][0]["percentage"] == 75.0
+        service.redis.publish.assert_awaited_once_with("feature_flags:updates", 2)
 
     @pytest.mark.asyncio
-    async def test_caching(self, service, context, mock_redis):
-        """Test evaluation result caching"""
-        # Setup cache hit
-        mock_redis.get.return_value = b"true"
-        service._get_cached_evaluation = AsyncMock(return_value=True)
+    async def test_evaluation_is_local(self, service, context, mock_redis):
+        """Test evaluations after the snapshot load make no Redis calls"""
+        flag_config = {"key": "test_flag", "enabled": True, "strategy": "all_on"}
+        service._apply_snapshot(1, {"test_flag": flag_config})
 
-        result = await service.get_flag("test_flag", context)
+        for _ in range(100):
+            assert await service.get_flag("test_flag", context) is True
 
-        assert result is True
-        # Should not call flag config or evaluation since cached
-        service._get_cached_evaluation.assert_called_once()
+        assert mock_redis.method_calls == []
+        assert service._evaluations["test_flag", True] == 100
+
+    @pytest.mark.asyncio
+    async def test_older_snapshot_ignored(self, service, context):
+        """Test a late reply cannot roll the snapshot back"""
+        flag_config = {"key": "test_flag", "enabled": True, "strategy": "all_on"}
+        service._apply_snapshot(5, {"test_flag": flag_config})
+        service._apply_snapshot(4, {})
+
+        assert service.version == 5
+        assert await service.get_flag("test_flag", context) is True
+
+    @pytest.mark.asyncio
+    async def test_rule_fields_used_by_strategy(self, service, context):
+        """Test flags created with rules evaluate their rule settings"""
+        flag_config = {
+            "key": "test_flag",
+            "enabled": True,
+            "strategy": FeatureFlagStrategy.USER_LIST,
+            "rules": [
+                {"strategy": FeatureFlagStrategy.USER_LIST, "user_ids": ["user123"]}
+            ],
+        }
+        service._apply_snapshot(1, {"test_flag": flag_config})
+
+        assert await service.get_flag("test_flag", context) is True
 
     @pytest.mark.asyncio
     async def test_error_handling(self, service, context):
         """Test error handling returns safe default"""
-        service._get_flag_config = AsyncMock(side_effect=Exception("Redis error"))
+        service.refresh = AsyncMock(side_effect=Exception("Redis error"))
 
         result = await service.get_flag("test_flag", context)
 
@@ -298,9 +312,7 @@ class TestFeatureFlagService:
     @pytest.mark.asyncio
     async def test_flag_creation_and_deletion(self, service, mock_redis):
         """Test flag creation and deletion"""
-        mock_redis.setex = AsyncMock()
-        mock_redis.delete = AsyncMock()
-        service._invalidate_flag_cache = AsyncMock()
+        pipe = mock_redis.pipeline.return_value
 
         # Create flag
         rule = FeatureFlagRule(strategy=FeatureFlagStrategy.PERCENTAGE, percentage=50.0)
@@ -311,12 +323,13 @@ class TestFeatureFlagService:
             rules=[rule],
         )
 
-        mock_redis.setex.assert_called()
-        service._invalidate_flag_cache.assert_called_with("new_flag")
+        assert pipe.hset.call_args.args[:2] == ("feature_flags", "new_flag")
+        pipe.incr.assert_called_with("feature_flags:version")
+        mock_redis.publish.assert_awaited_with("feature_flags:updates", 2)
 
         # Delete flag
         await service.delete_flag("new_flag")
-        mock_redis.delete.assert_called_with("feature_flag:new_flag")
+        pipe.hdel.assert_called_with("feature_flags", "new_flag")
 
     def test_rule_to_dict_conversion(self, service):
         """Test rule object to dictionary conversion"""
@@ -415,59 +428,54 @@ class TestFeatureFlagIntegration:
 
     @pytest.mark.asyncio
     async def test_full_workflow(self):
-        """Test complete feature flag workflow"""
-        # This would typically use a real Redis instance or test container
-        # For now, we'll mock the workflow
-
-        service = FeatureFlagService()
+        """Test a flag change reaches another process through pub/sub"""
+        server = fakeredis.FakeServer()
+        admin = FeatureFlagService(
+            redis_client=fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+        )
+        worker = FeatureFlagService(
+            redis_client=fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+        )
+        worker.SYNC_INTERVAL = 0.05
         context = FeatureFlagContext(
             user_id="integration_test_user",
             organization_id="test_org",
             environment="testing",
         )
 
-        with pytest.mock.patch.object(service, "redis") as mock_redis:
-            mock_redis.get.return_value = None
-            mock_redis.setex = AsyncMock()
-            mock_redis.delete = AsyncMock()
-            mock_redis.keys.return_value = []
-            mock_redis.lpush = AsyncMock()
-            mock_redis.ltrim = AsyncMock()
+        try:
+            # First evaluation loads the snapshot and starts following updates
+            assert await worker.get_flag("integration_test_flag", context) is False
+            await asyncio.sleep(0.1)
 
-            # Create a feature flag
             rule = FeatureFlagRule(
                 strategy=FeatureFlagStrategy.PERCENTAGE, percentage=100.0
             )
-            await service.set_flag(
+            await admin.set_flag(
                 key="integration_test_flag",
                 enabled=True,
                 strategy=FeatureFlagStrategy.PERCENTAGE,
                 rules=[rule],
             )
 
-            # Mock flag config for evaluation
-            flag_config = {
-                "key": "integration_test_flag",
-                "enabled": True,
-                "strategy": FeatureFlagStrategy.PERCENTAGE,
-                "rules": [
-                    {
-                        "strategy": FeatureFlagStrategy.PERCENTAGE,
-                        "percentage": 100.0,
-                        "enabled": True,
-                    }
-                ],
-                "environments": {},
-            }
-            service._get_flag_config = AsyncMock(return_value=flag_config)
-
-            # Evaluate the flag
-            result = await service.get_flag("integration_test_flag", context)
-            assert result is True
-
-            # Clean up
-            await service.delete_flag("integration_test_flag")
-            mock_redis.delete.assert_called_with("feature_flag:integration_test_flag")
+            for _ in range(50):
+                if worker.version == 1:
+                    break
+                await asyncio.sleep(0.01)
+            assert await worker.get_flag("integration_test_flag", context) is True
+
+            # Counts reach Redis on the periodic flush; unknown flags are
+            # not counted
+            await asyncio.sleep(0.2)
+            status = await admin.get_flag_status("integration_test_flag")
+            assert status["statistics"]["total_evaluations"] == 1
+            assert status["statistics"]["enabled_count"] == 1
+            assert status["last_evaluated"] is not None
+
+            await admin.delete_flag("integration_test_flag")
+            assert await admin.list_flags() == []
+        finally:
+            await worker.close()
 
 
 if __name__ == "__main__":
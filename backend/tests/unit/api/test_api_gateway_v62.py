@@ -3,13 +3,17 @@ Tests for CC02 v62.0 Advanced API Gateway & Microservices Architecture
 Comprehensive test suite for service registry, load balancing, circuit breaker, and security
 """
 
+import asyncio
 import time
 from datetime import datetime, timedelta
 from unittest.mock import AsyncMock, MagicMock, patch
 from uuid import uuid4
 
+import fakeredis
+import httpx
 import pytest
 import redis.asyncio as redis
+from fastapi import HTTPException, Request
 
 from app.api.v1.api_gateway_v62 import (
     APIGatewayCore,
@@ -19,6 +23,7 @@ from app.api.v1.api_gateway_v62 import (
     GatewayMetrics,
     LoadBalancer,
     LoadBalancerConfigRequest,
+    RateLimitAlgorithm,
     RateLimiter,
     RateLimitType,
     RouteConfigurationRequest,
@@ -27,6 +32,7 @@ from app.api.v1.api_gateway_v62 import (
     ServiceRegistrationRequest,
     ServiceRegistry,
     ServiceStatus,
+    SharedCircuitBreaker,
 )
 from app.core.exceptions import BusinessLogicError
 from app.models.user import User
@@ -53,6 +59,7 @@ def mock_redis():
     redis_mock.zremrangebyscore = AsyncMock()
     redis_mock.pipeline = MagicMock()
     redis_mock.hincrby = AsyncMock()
+    redis_mock.eval = AsyncMock()
     return redis_mock
 
 
@@ -389,118 +396,115 @@ class TestLoadBalancer:
 # Unit Tests for CircuitBreaker
 class TestCircuitBreaker:
     @pytest.mark.asyncio
-    async def test_get_state_closed(self, circuit_breaker, mock_redis):
-        """Test getting circuit breaker state - closed"""
-
-        # Mock Redis response
-        mock_redis.hget.return_value = CircuitBreakerState.CLOSED.value
+    async def test_get_state_default(self, circuit_breaker, mock_redis):
+        """Test getting circuit breaker state - default when none exists"""
 
-        # Execute state check
         state = await circuit_breaker.get_state("test-service", "/api/test")
 
-        # Assertions
+        # Should default to closed without asking Redis
         assert state == CircuitBreakerState.CLOSED
+        mock_redis.hget.assert_not_called()
 
     @pytest.mark.asyncio
-    async def test_get_state_default(self, circuit_breaker, mock_redis):
-        """Test getting circuit breaker state - default when none exists"""
+    async def test_record_failure_opens_at_threshold(self, circuit_breaker):
+        """Test consecutive failures open the circuit"""
 
-        # Mock Redis response - no state
-        mock_redis.hget.return_value = None
+        for _ in range(4):
+            state = await circuit_breaker.record_failure("test-service", "/api/test")
+            assert state == CircuitBreakerState.CLOSED
 
-        # Execute state check
-        state = await circuit_breaker.get_state("test-service", "/api/test")
+        state = await circuit_breaker.record_failure("test-service", "/api/test")
 
-        # Assertions - should default to closed
-        assert state == CircuitBreakerState.CLOSED
+        assert state == CircuitBreakerState.OPEN
+        assert not await circuit_breaker.can_execute("test-service", "/api/test")
 
     @pytest.mark.asyncio
-    async def test_record_success(self, circuit_breaker, mock_redis):
-        """Test recording successful request"""
+    async def test_record_success_resets_failures(self, circuit_breaker):
+        """Test a success resets the consecutive failure count"""
 
-        # Mock pipeline
-        mock_pipeline = AsyncMock()
-        mock_redis.pipeline.return_value.__aenter__.return_value = mock_pipeline
+        for _ in range(4):
+            await circuit_breaker.record_failure("test-service", "/api/test")
+        await circuit_breaker.record_success("test-service", "/api/test")
+        state = await circuit_breaker.record_failure("test-service", "/api/test")
 
-        # Mock current state
-        with patch.object(circuit_breaker, "get_state") as mock_get_state:
-            mock_get_state.return_value = CircuitBreakerState.HALF_OPEN
-            mock_redis.hget.return_value = "2"  # Success count
+        assert state == CircuitBreakerState.CLOSED
 
-            # Execute success recording
-            await circuit_breaker.record_success("test-service", "/api/test")
+    @pytest.mark.asyncio
+    async def test_can_execute_closed(self, circuit_breaker):
+        """Test can execute when circuit is closed"""
 
-            # Verify pipeline operations
-            mock_pipeline.hincrby.assert_called()
-            mock_pipeline.hset.assert_called()
-            mock_pipeline.execute.assert_called()
+        can_execute = await circuit_breaker.can_execute("test-service", "/api/test")
 
-    @pytest.mark.asyncio
-    async def test_record_failure(self, circuit_breaker, mock_redis):
-        """Test recording failed request"""
+        assert can_execute
 
-        # Mock pipeline
-        mock_pipeline = AsyncMock()
-        mock_redis.pipeline.return_value.__aenter__.return_value = mock_pipeline
+    @pytest.mark.asyncio
+    async def test_can_execute_open_after_timeout(self, circuit_breaker):
+        """Test open circuit goes half-open after timeout and closes on recovery"""
 
-        # Mock failure count reaching threshold
-        mock_redis.hget.return_value = "4"  # One below threshold
+        for _ in range(5):
+            await circuit_breaker.record_failure("test-service", "/api/test")
+        circuit = circuit_breaker.circuits[("test-service", "/api/test")]
+        circuit["next_attempt"] = datetime.utcnow() - timedelta(seconds=1)
 
-        # Execute failure recording
-        await circuit_breaker.record_failure("test-service", "/api/test")
+        # Should allow execution and transition to half-open
+        assert await circuit_breaker.can_execute("test-service", "/api/test")
+        assert circuit["state"] == CircuitBreakerState.HALF_OPEN
 
-        # Verify pipeline operations
-        mock_pipeline.hincrby.assert_called()
-        mock_pipeline.hset.assert_called()
-        mock_pipeline.execute.assert_called()
+        await circuit_breaker.record_success("test-service", "/api/test")
+        assert circuit["state"] == CircuitBreakerState.HALF_OPEN
+        await circuit_breaker.record_success("test-service", "/api/test")
+        assert circuit["state"] == CircuitBreakerState.CLOSED
 
     @pytest.mark.asyncio
-    async def test_can_execute_closed(self, circuit_breaker):
-        """Test can execute when circuit is closed"""
+    async def test_half_open_failure_reopens(self, circuit_breaker):
+        """Test a failed trial request opens the circuit again"""
 
-        with patch.object(circuit_breaker, "get_state") as mock_get_state:
-            mock_get_state.return_value = CircuitBreakerState.CLOSED
+        for _ in range(5):
+            await circuit_breaker.record_failure("test-service", "/api/test")
+        circuit = circuit_breaker.circuits[("test-service", "/api/test")]
+        circuit["next_attempt"] = datetime.utcnow() - timedelta(seconds=1)
+        await circuit_breaker.can_execute("test-service", "/api/test")
 
-            # Execute can execute check
-            can_execute = await circuit_breaker.can_execute("test-service", "/api/test")
+        state = await circuit_breaker.record_failure("test-service", "/api/test")
 
-            # Should allow execution
-            assert can_execute
+        assert state == CircuitBreakerState.OPEN
+        assert circuit["next_attempt"] > datetime.utcnow()
 
     @pytest.mark.asyncio
-    async def test_can_execute_open_before_timeout(self, circuit_breaker, mock_redis):
-        """Test can execute when circuit is open before timeout"""
+    async def test_sync_batches_changed_circuits(self, circuit_breaker, mock_redis):
+        """Test changed circuits are written in one pipeline, then not again"""
 
-        with patch.object(circuit_breaker, "get_state") as mock_get_state:
-            mock_get_state.return_value = CircuitBreakerState.OPEN
+        mock_pipeline = MagicMock()
+        mock_pipeline.execute = AsyncMock()
+        mock_redis.pipeline.return_value.__aenter__.return_value = mock_pipeline
 
-            # Mock next attempt time in future
-            future_time = datetime.utcnow() + timedelta(seconds=30)
-            mock_redis.hget.return_value = future_time.isoformat()
+        for _ in range(3):
+            await circuit_breaker.record_success("test-service", "/api/a")
+        await circuit_breaker.record_failure("test-service", "/api/b")
 
-            # Execute can execute check
-            can_execute = await circuit_breaker.can_execute("test-service", "/api/test")
+        await circuit_breaker.sync()
+        await circuit_breaker.sync()
 
-            # Should not allow execution
-            assert not can_execute
+        mock_redis.pipeline.assert_called_once()
+        mock_pipeline.execute.assert_awaited_once()
+        written = {
+            call.args[0]: call.kwargs["mapping"]
+            for call in mock_pipeline.hset.call_args_list
+        }
+        assert written["circuit_breaker:test-service:/api/a"]["success_count"] == 3
+        assert written["circuit_breaker:test-service:/api/b"]["failure_count"] == 1
+        assert written["circuit_breaker:test-service:/api/b"]["state"] == "closed"
 
     @pytest.mark.asyncio
-    async def test_can_execute_open_after_timeout(self, circuit_breaker, mock_redis):
-        """Test can execute when circuit is open after timeout"""
-
-        with patch.object(circuit_breaker, "get_state") as mock_get_state:
-            mock_get_state.return_value = CircuitBreakerState.OPEN
+    async def test_sync_failure_keeps_changes(self, circuit_breaker, mock_redis):
+        """Test circuits are synced again after a Redis error"""
 
-            # Mock next attempt time in past
-            past_time = datetime.utcnow() - timedelta(seconds=30)
-            mock_redis.hget.return_value = past_time.isoformat()
+        mock_redis.pipeline.side_effect = Exception("Redis connection error")
+        await circuit_breaker.record_failure("test-service", "/api/test")
 
-            # Execute can execute check
-            can_execute = await circuit_breaker.can_execute("test-service", "/api/test")
+        await circuit_breaker.sync()
 
-            # Should allow execution and transition to half-open
-            assert can_execute
-            mock_redis.hset.assert_called()
+        assert circuit_breaker.changed == {("test-service", "/api/test")}
 
 
 # Unit Tests for RateLimiter
@@ -509,12 +513,8 @@ class TestRateLimiter:
     async def test_is_allowed_under_limit(self, rate_limiter, mock_redis):
         """Test rate limiting when under limit"""
 
-        # Mock pipeline
-        mock_pipeline = AsyncMock()
-        mock_redis.pipeline.return_value.__aenter__.return_value = mock_pipeline
-
-        # Mock current request count under limit
-        mock_pipeline.execute.return_value = [None, 5, None, None]  # 5 requests
+        # Script reply: allowed, remaining, retry after, reset after (ms)
+        mock_redis.eval.return_value = [1, 4, 0, 60000]
 
         # Execute rate limit check
         allowed, info = await rate_limiter.is_allowed("test-key", limit=10, window=60)
@@ -523,18 +523,17 @@ class TestRateLimiter:
         assert allowed
         assert info["allowed"]
         assert info["limit"] == 10
-        assert info["remaining"] == 4  # 10 - 5 - 1
+        assert info["remaining"] == 4
+        script, numkeys, key, *args = mock_redis.eval.call_args.args
+        assert script == RateLimiter.SLIDING_WINDOW_LOG_SCRIPT
+        assert key == "rate_limit:sliding_window_log:test-key"
+        assert args == [10, 60000]
 
     @pytest.mark.asyncio
     async def test_is_allowed_over_limit(self, rate_limiter, mock_redis):
         """Test rate limiting when over limit"""
 
-        # Mock pipeline
-        mock_pipeline = AsyncMock()
-        mock_redis.pipeline.return_value.__aenter__.return_value = mock_pipeline
-
-        # Mock current request count at limit
-        mock_pipeline.execute.return_value = [None, 10, None, None]  # At limit
+        mock_redis.eval.return_value = [0, 0, 1500, 1500]
 
         # Execute rate limit check
         allowed, info = await rate_limiter.is_allowed("test-key", limit=10, window=60)
@@ -543,13 +542,35 @@ class TestRateLimiter:
         assert not allowed
         assert not info["allowed"]
         assert info["remaining"] == 0
+        assert info["retry_after"] == 1.5
+
+    @pytest.mark.asyncio
+    async def test_refused_key_checked_locally(self, rate_limiter, mock_redis):
+        """Test a refused key is refused without Redis until its retry time"""
+
+        mock_redis.eval.return_value = [0, 0, 60000, 60000]
+        await rate_limiter.is_allowed("test-key", limit=10, window=60)
+
+        allowed, info = await rate_limiter.is_allowed("test-key", limit=10, window=60)
+
+        assert not allowed
+        assert 0 < info["retry_after"] <= 60
+        mock_redis.eval.assert_called_once()
+
+        # Other keys and algorithms still go to Redis
+        mock_redis.eval.return_value = [1, 9, 0, 60000]
+        allowed, _ = await rate_limiter.is_allowed(
+            "test-key", limit=10, window=60, algorithm=RateLimitAlgorithm.GCRA
+        )
+        assert allowed
+        assert mock_redis.eval.call_args.args[0] == RateLimiter.GCRA_SCRIPT
 
     @pytest.mark.asyncio
     async def test_is_allowed_redis_error(self, rate_limiter, mock_redis):
         """Test rate limiting with Redis error"""
 
         # Mock Redis error
-        mock_redis.pipeline.side_effect = Exception("Redis connection error")
+        mock_redis.eval.side_effect = Exception("Redis connection error")
 
         # Execute rate limit check
         allowed, info = await rate_limiter.is_allowed("test-key", limit=10, window=60)
@@ -559,20 +580,174 @@ class TestRateLimiter:
         assert "error" in info
 
 
+@pytest.fixture
+def fake_redis():
+    """In-process Redis with Lua scripting"""
+    return fakeredis.FakeAsyncRedis()
+
+
+# Scripts evaluated by a Redis stand-in
+class TestRateLimitScripts:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("algorithm", list(RateLimitAlgorithm))
+    async def test_burst_counted_exactly(self, fake_redis, algorithm):
+        """Test concurrent requests within one second are all counted"""
+
+        limiter = RateLimiter(fake_redis, algorithm)
+
+        results = await asyncio.gather(
+            *(limiter.is_allowed("client", limit=50, window=60) for _ in range(80))
+        )
+
+        assert sum(allowed for allowed, _ in results) == 50
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("algorithm", list(RateLimitAlgorithm))
+    async def test_limit_shared_between_instances(self, fake_redis, algorithm):
+        """Test gateway instances draw from the same limit"""
+
+        first = RateLimiter(fake_redis, algorithm)
+        second = RateLimiter(fake_redis, algorithm)
+
+        for _ in range(3):
+            assert (await first.is_allowed("client", limit=5, window=60))[0]
+        for _ in range(2):
+            assert (await second.is_allowed("client", limit=5, window=60))[0]
+
+        allowed, info = await second.is_allowed("client", limit=5, window=60)
+        assert not allowed
+        assert info["retry_after"] > 0
+
+    @pytest.mark.asyncio
+    async def test_sliding_window_releases_oldest(self, fake_redis):
+        limiter = RateLimiter(fake_redis)
+
+        for _ in range(2):
+            assert (await limiter.is_allowed("client", limit=2, window=1))[0]
+        allowed, info = await limiter.is_allowed("client", limit=2, window=1)
+        assert not allowed
+
+        await asyncio.sleep(info["retry_after"] + 0.05)
+        assert (await limiter.is_allowed("client", limit=2, window=1))[0]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "algorithm", [RateLimitAlgorithm.GCRA, RateLimitAlgorithm.TOKEN_BUCKET]
+    )
+    async def test_refill_spaced_over_window(self, fake_redis, algorithm):
+        """Test one request is released every window / limit after a burst"""
+
+        limiter = RateLimiter(fake_redis, algorithm)
+        for _ in range(4):
+            assert (await limiter.is_allowed("client", limit=4, window=1))[0]
+
+        allowed, info = await limiter.is_allowed("client", limit=4, window=1)
+        assert not allowed
+        assert 0.2 <= info["retry_after"] <= 0.26
+
+        await asyncio.sleep(info["retry_after"] + 0.02)
+        assert (await limiter.is_allowed("client", limit=4, window=1))[0]
+        assert not (await limiter.is_allowed("client", limit=4, window=1))[0]
+
+
+class TestSharedCircuitBreakerScripts:
+    @pytest.mark.asyncio
+    async def test_state_machine_shared_between_instances(self, fake_redis):
+        first = SharedCircuitBreaker(fake_redis, open_seconds=1)
+        second = SharedCircuitBreaker(fake_redis, open_seconds=1)
+
+        for _ in range(4):
+            await first.record_failure("test-service", "/api/test")
+        await second.record_success("test-service", "/api/test")
+        for _ in range(4):
+            await first.record_failure("test-service", "/api/test")
+
+        # A success in between resets the consecutive failures
+        assert await second.can_execute("test-service", "/api/test")
+
+        state = await second.record_failure("test-service", "/api/test")
+        assert state == CircuitBreakerState.OPEN
+        assert not await first.can_execute("test-service", "/api/test")
+
+        await asyncio.sleep(1.05)
+        assert await first.can_execute("test-service", "/api/test")
+        await first.record_success("test-service", "/api/test")
+        await second.record_success("test-service", "/api/test")
+
+        assert first.circuits[("test-service", "/api/test")]["total_requests"] == 11
+        assert (
+            await fake_redis.hget("circuit_breaker:test-service:/api/test", "state")
+            == b"closed"
+        )
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_refused_locally(self, fake_redis):
+        breaker = SharedCircuitBreaker(fake_redis, failure_threshold=1)
+        await breaker.record_failure("test-service", "/api/test")
+
+        with patch.object(fake_redis, "eval") as mock_eval:
+            assert not await breaker.can_execute("test-service", "/api/test")
+
+        mock_eval.assert_not_called()
+
+
+def make_request(method="GET", path="/api/test", headers=None, body_chunks=None):
+    """Starlette request whose body arrives in the given chunks"""
+    chunks = list(body_chunks or [])
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": True} for chunk in chunks
+    ]
+    messages.append({"type": "http.request", "body": b"", "more_body": False})
+
+    async def receive():
+        return messages.pop(0)
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": b"param=value",
+        "headers": [
+            (name.lower().encode(), value.encode())
+            for name, value in (headers or {}).items()
+        ],
+        "client": ("192.168.1.100", 50000),
+        "server": ("gateway", 80),
+        "scheme": "http",
+    }
+    return Request(scope, receive)
+
+
+def mock_upstream(gateway_core, handler):
+    """Route the gateway's upstream clients to an in-process handler"""
+    original = gateway_core.get_upstream_client
+
+    def client_for(base_url):
+        if base_url not in gateway_core.upstream_clients:
+            gateway_core.upstream_clients[base_url] = httpx.AsyncClient(
+                transport=httpx.MockTransport(handler)
+            )
+        return original(base_url)
+
+    return patch.object(gateway_core, "get_upstream_client", side_effect=client_for)
+
+
+async def stream_of(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+async def read_streaming_body(response):
+    return b"".join([chunk async for chunk in response.body_iterator])
+
+
 # Unit Tests for APIGatewayCore
 class TestAPIGatewayCore:
     @pytest.mark.asyncio
     async def test_proxy_request_success(self, gateway_core, mock_redis):
         """Test successful request proxying"""
 
-        # Mock request
-        mock_request = MagicMock()
-        mock_request.url.path = "/api/test"
-        mock_request.method = "GET"
-        mock_request.headers = {"Authorization": "Bearer token"}
-        mock_request.query_params = {"param": "value"}
-        mock_request.body = AsyncMock(return_value=b"")
-        mock_request.client.host = "192.168.1.100"
+        mock_request = make_request(headers={"Authorization": "Bearer token"})
 
         # Mock route config
         route_config = {
@@ -587,43 +762,101 @@ class TestAPIGatewayCore:
             "base_url": "http://backend:8000",
         }
 
-        # Mock HTTP response
-        mock_http_response = MagicMock()
-        mock_http_response.content = b'{"result": "success"}'
-        mock_http_response.status_code = 200
-        mock_http_response.headers = {"content-type": "application/json"}
-        mock_http_response.elapsed.total_seconds.return_value = 0.150
+        mock_pipeline = MagicMock()
+        mock_pipeline.execute = AsyncMock()
+        mock_redis.pipeline.return_value.__aenter__.return_value = mock_pipeline
+        received = []
+
+        def handler(upstream_request):
+            received.append(upstream_request)
+            return httpx.Response(
+                200,
+                headers={"content-type": "application/json"},
+                content=stream_of(b'{"result": ', b'"success"}'),
+            )
 
         with (
-            patch.object(
-                gateway_core.circuit_breaker, "can_execute"
-            ) as mock_can_execute,
+            mock_upstream(gateway_core, handler),
             patch.object(gateway_core.load_balancer, "select_service") as mock_select,
-            patch.object(gateway_core.http_client, "request") as mock_http_request,
-            patch.object(
-                gateway_core.circuit_breaker, "record_success"
-            ) as mock_record_success,
-            patch.object(
-                gateway_core.service_registry, "update_service_health"
-            ) as mock_update_health,
         ):
-            mock_can_execute.return_value = True
             mock_select.return_value = mock_service
-            mock_http_request.return_value = mock_http_response
 
             # Execute request proxying
             response = await gateway_core.proxy_request(mock_request, route_config)
+            body = await read_streaming_body(response)
+        await gateway_core.close()
 
-            # Assertions
-            assert response.status_code == 200
-            assert response.body == b'{"result": "success"}'
+        # Assertions
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        assert body == b'{"result": "success"}'
 
-            # Verify backend calls
-            mock_can_execute.assert_called_once()
-            mock_select.assert_called_once()
-            mock_http_request.assert_called_once()
-            mock_record_success.assert_called_once()
-            mock_update_health.assert_called_once()
+        upstream_request = received[0]
+        assert str(upstream_request.url) == "http://backend:8000/api/test?param=value"
+        assert upstream_request.headers["authorization"] == "Bearer token"
+        assert "transfer-encoding" not in upstream_request.headers
+
+        # Outcome recorded in memory and flushed on close
+        circuit = gateway_core.circuit_breaker.circuits[("test-service", "/api/test")]
+        assert circuit["success_count"] == 1
+        assert gateway_core.service_registry.pending_health == {}
+        mock_pipeline.execute.assert_awaited()
+
+    @pytest.mark.asyncio
+    async def test_proxy_request_streams_bodies(self, gateway_core):
+        """Test request and response bodies are streamed, not buffered"""
+
+        mock_request = make_request(
+            method="POST",
+            headers={"Transfer-Encoding": "chunked", "Keep-Alive": "timeout=5"},
+            body_chunks=[b"part-1,", b"part-2"],
+        )
+        route_config = {"service_name": "test-service", "timeout_seconds": 30}
+        mock_service = {
+            "service_id": "test-service:123",
+            "base_url": "http://backend:8000",
+        }
+        received = []
+
+        def handler(upstream_request):
+            received.append(upstream_request)
+            return httpx.Response(
+                200,
+                headers={"transfer-encoding": "chunked", "x-upstream": "1"},
+                content=stream_of(b"chunk-0;", b"chunk-1;", b"chunk-2;"),
+            )
+
+        with (
+            mock_upstream(gateway_core, handler),
+            patch.object(gateway_core.load_balancer, "select_service") as mock_select,
+        ):
+            mock_select.return_value = mock_service
+
+            response = await gateway_core.proxy_request(mock_request, route_config)
+            chunks = [chunk async for chunk in response.body_iterator]
+        await gateway_core.close()
+
+        # Request body was forwarded as a stream, never read by the gateway
+        assert not hasattr(mock_request, "_body")
+        assert received[0].content == b"part-1,part-2"
+        assert received[0].headers["transfer-encoding"] == "chunked"
+        assert "keep-alive" not in received[0].headers
+
+        # Response chunks relayed as they arrived, hop-by-hop headers dropped
+        assert chunks == [b"chunk-0;", b"chunk-1;", b"chunk-2;"]
+        assert response.headers["x-upstream"] == "1"
+        assert "transfer-encoding" not in response.headers
+
+    @pytest.mark.asyncio
+    async def test_upstream_client_reused(self, gateway_core):
+        """Test each upstream gets one pooled client with the gateway limits"""
+
+        client = gateway_core.get_upstream_client("http://backend:8000")
+
+        assert gateway_core.get_upstream_client("http://backend:8000") is client
+        assert gateway_core.get_upstream_client("http://other:8000") is not client
+        await gateway_core.close()
+        assert client.is_closed
 
     @pytest.mark.asyncio
     async def test_proxy_request_circuit_breaker_open(self, gateway_core):
@@ -641,9 +874,11 @@ class TestAPIGatewayCore:
             mock_can_execute.return_value = False
 
             # Execute request proxying - should raise HTTPException
-            with pytest.raises(Exception):  # HTTPException
+            with pytest.raises(HTTPException) as exc_info:
                 await gateway_core.proxy_request(mock_request, route_config)
 
+        assert exc_info.value.status_code == 503
+
     @pytest.mark.asyncio
     async def test_proxy_request_no_healthy_services(self, gateway_core):
         """Test request proxying with no healthy services"""
@@ -663,20 +898,16 @@ class TestAPIGatewayCore:
             mock_select.return_value = None  # No services available
 
             # Execute request proxying - should raise HTTPException
-            with pytest.raises(Exception):  # HTTPException
+            with pytest.raises(HTTPException) as exc_info:
                 await gateway_core.proxy_request(mock_request, route_config)
 
+        assert exc_info.value.status_code == 503
+
     @pytest.mark.asyncio
-    async def test_proxy_request_backend_error(self, gateway_core):
+    async def test_proxy_request_backend_error(self, gateway_core, mock_redis):
         """Test request proxying with backend error"""
 
-        mock_request = MagicMock()
-        mock_request.url.path = "/api/test"
-        mock_request.method = "GET"
-        mock_request.headers = {}
-        mock_request.query_params = {}
-        mock_request.body = AsyncMock(return_value=b"")
-        mock_request.client.host = "192.168.1.100"
+        mock_request = make_request()
 
         route_config = {"service_name": "test-service", "timeout_seconds": 30}
 
@@ -685,30 +916,41 @@ class TestAPIGatewayCore:
             "base_url": "http://backend:8000",
         }
 
+        def handler(upstream_request):
+            raise httpx.ConnectTimeout("Connection timeout")
+
         with (
-            patch.object(
-                gateway_core.circuit_breaker, "can_execute"
-            ) as mock_can_execute,
+            mock_upstream(gateway_core, handler),
             patch.object(gateway_core.load_balancer, "select_service") as mock_select,
-            patch.object(gateway_core.http_client, "request") as mock_http_request,
-            patch.object(
-                gateway_core.circuit_breaker, "record_failure"
-            ) as mock_record_failure,
-            patch.object(
-                gateway_core.service_registry, "update_service_health"
-            ) as mock_update_health,
         ):
-            mock_can_execute.return_value = True
             mock_select.return_value = mock_service
-            mock_http_request.side_effect = Exception("Connection timeout")
 
             # Execute request proxying - should raise HTTPException
-            with pytest.raises(Exception):  # HTTPException
+            with pytest.raises(HTTPException) as exc_info:
                 await gateway_core.proxy_request(mock_request, route_config)
 
-            # Verify failure recording
-            mock_record_failure.assert_called_once()
-            mock_update_health.assert_called_once()
+        assert exc_info.value.status_code == 502
+
+        # Verify failure recording, without waiting on Redis
+        circuit = gateway_core.circuit_breaker.circuits[("test-service", "/api/test")]
+        assert circuit["failure_count"] == 1
+        health = gateway_core.service_registry.pending_health["test-service:123"]
+        assert health["status"] == ServiceStatus.UNHEALTHY.value
+        assert health["consecutive_failures"] == 1
+        mock_redis.hget.assert_not_called()
+        await gateway_core.close()
+
+    @pytest.mark.asyncio
+    async def test_gateway_closed_on_shutdown(self):
+        from app.api.v1 import api_gateway_v62 as module
+
+        core = MagicMock(close=AsyncMock())
+        with patch.object(module, "gateway_core", core):
+            await module.close_gateway()
+
+        core.close.assert_awaited_once()
+        # Nothing to close when the gateway was never initialised
+        await module.close_gateway()
 
 
 # Unit Tests for GatewayMetrics
@@ -1044,12 +1286,8 @@ class TestGatewayIntegration:
     async def test_rate_limiting_integration(self, gateway_core, mock_redis):
         """Test rate limiting integration"""
 
-        # Mock pipeline for rate limiting
-        mock_pipeline = AsyncMock()
-        mock_redis.pipeline.return_value.__aenter__.return_value = mock_pipeline
-
         # Test rate limiting under limit
-        mock_pipeline.execute.return_value = [None, 5, None, None]  # 5 requests
+        mock_redis.eval.return_value = [1, 4, 0, 60000]
 
         allowed, info = await gateway_core.rate_limiter.is_allowed(
             "user:123", limit=10, window=60
@@ -1059,7 +1297,7 @@ class TestGatewayIntegration:
         assert info["remaining"] == 4
 
         # Test rate limiting over limit
-        mock_pipeline.execute.return_value = [None, 10, None, None]  # At limit
+        mock_redis.eval.return_value = [0, 0, 30000, 30000]
 
         allowed, info = await gateway_core.rate_limiter.is_allowed(
             "user:123", limit=10, window=60
@@ -1108,17 +1346,16 @@ class TestGatewayPerformance:
     async def test_high_frequency_rate_limiting(self, rate_limiter, mock_redis):
         """Test rate limiting under high frequency requests"""
 
-        # Mock pipeline for consistent responses
-        mock_pipeline = AsyncMock()
-        mock_redis.pipeline.return_value.__aenter__.return_value = mock_pipeline
-
         # Simulate many requests from same key
         request_count = 100
         allowed_count = 0
 
         for i in range(request_count):
-            # Mock current request count
-            mock_pipeline.execute.return_value = [None, i, None, None]
+            # Mock the script reply for the current request count
+            if i < 50:
+                mock_redis.eval.return_value = [1, 49 - i, 0, 60000]
+            else:
+                mock_redis.eval.return_value = [0, 0, 60000, 60000]
 
             allowed, info = await rate_limiter.is_allowed(
                 "test-key", limit=50, window=60
@@ -1126,8 +1363,9 @@ class TestGatewayPerformance:
             if allowed:
                 allowed_count += 1
 
-        # Should allow up to limit
-        assert allowed_count <= 50
+        # Should allow up to limit, refusals after the first are local
+        assert allowed_count == 50
+        assert mock_redis.eval.call_count == 51
 
     @pytest.mark.asyncio
     async def test_load_balancer_distribution(self, load_balancer):
@@ -8,10 +8,12 @@ from decimal import Decimal
 from unittest.mock import AsyncMock, MagicMock, patch
 from uuid import uuid4
 
+import numpy as np
 import pytest
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.v1.customer_advanced_v58 import (
+    RFM_SEGMENT_ORDER,
     CommunicationChannel,
     CRMManager,
     CustomerInteractionRequest,
@@ -28,7 +30,15 @@ from app.api.v1.customer_advanced_v58 import (
     LTVCalculationRequest,
     RFMAnalysisEngine,
     RFMAnalysisRequest,
+    RFMBatchScoringEngine,
+    RFMBatchScoringRequest,
     RFMSegment,
+    classify_ltv_segments,
+    classify_rfm_segments,
+    compute_churn_probability,
+    compute_ltv,
+    percentile_thresholds,
+    score_values,
 )
 from app.core.exceptions import NotFoundError
 from app.models.customer import Customer
@@ -300,13 +310,14 @@ class TestRFMAnalysisEngine:
 
         metrics_result.all.return_value = [metrics_row]
 
-        # Mock customer lookup
+        # Mock bulk customer lookup
         mock_customer = MagicMock()
+        mock_customer.id = sample_customer_metrics.customer_id
         mock_customer.full_name = "Test Customer"
         mock_customer.email = "test@example.com"
 
         customer_result = MagicMock()
-        customer_result.scalar_one_or_none.return_value = mock_customer
+        customer_result.all.return_value = [mock_customer]
 
         mock_db_session.execute.side_effect = [metrics_result, customer_result]
 
@@ -426,13 +437,14 @@ class TestLTVCalculationEngine:
 
         metrics_result.all.return_value = [metrics_row]
 
-        # Mock customer lookup
+        # Mock bulk customer lookup
         mock_customer = MagicMock()
+        mock_customer.id = sample_customer_metrics.customer_id
         mock_customer.full_name = "Test Customer"
         mock_customer.email = "test@example.com"
 
         customer_result = MagicMock()
-        customer_result.scalar_one_or_none.return_value = mock_customer
+        customer_result.all.return_value = [mock_customer]
 
         mock_db_session.execute.side_effect = [metrics_result, customer_result]
 
@@ -801,17 +813,19 @@ class TestPerformanceAndEdgeCases:
         metrics_result = MagicMock()
         metrics_result.all.return_value = large_dataset
 
-        # Mock customer lookup for all customers
-        mock_customer = MagicMock()
-        mock_customer.full_name = "Test Customer"
-        mock_customer.email = "test@example.com"
+        # Mock one bulk customer lookup for all customers
+        contacts = []
+        for row in large_dataset:
+            contact = MagicMock()
+            contact.id = row.customer_id
+            contact.full_name = "Test Customer"
+            contact.email = "test@example.com"
+            contacts.append(contact)
 
         customer_result = MagicMock()
-        customer_result.scalar_one_or_none.return_value = mock_customer
+        customer_result.all.return_value = contacts
 
-        mock_db_session.execute.side_effect = [metrics_result] + [
-            customer_result
-        ] * 1000
+        mock_db_session.execute.side_effect = [metrics_result, customer_result]
 
         request = RFMAnalysisRequest(date_range_days=365)
 
@@ -828,8 +842,12 @@ class TestPerformanceAndEdgeCases:
         assert len(results) == 1000
         assert execution_time < 10.0  # Should complete within 10 seconds
 
+        # Customer details are fetched in one query, not once per customer
+        assert mock_db_session.execute.await_count == 2
+
         # Verify all customers have valid RFM scores
         for result in results:
+            assert result.customer_name == "Test Customer"
             assert 1 <= result.rfm_scores.recency_score <= 5
             assert 1 <= result.rfm_scores.frequency_score <= 5
             assert 1 <= result.rfm_scores.monetary_score <= 5
@@ -911,5 +929,144 @@ class TestPerformanceAndEdgeCases:
             RFMSegment("invalid_segment")
 
 
+# Unit Tests for vectorized batch scoring
+class TestVectorizedScoring:
+    def test_thresholds_and_scores_match_scalar_engine(self, rfm_engine):
+        """Vectorized scoring must agree with the per-customer implementation"""
+
+        rng = np.random.default_rng(58)
+        values = rng.integers(0, 400, size=997).astype(np.float64)
+
+        for reverse in (False, True):
+            for bins in (3, 5, 7, 10):
+                scalar_thresholds = rfm_engine._calculate_percentile_thresholds(
+                    values.tolist(), bins, reverse=reverse
+                )
+                thresholds = percentile_thresholds(values, bins, reverse=reverse)
+                assert thresholds.tolist() == scalar_thresholds
+
+                scores = score_values(values, thresholds, reverse=reverse)
+                expected = [
+                    rfm_engine._calculate_score(v, scalar_thresholds, reverse=reverse)
+                    for v in values.tolist()
+                ]
+                assert scores.tolist() == expected
+
+    def test_segments_match_scalar_engine(self, rfm_engine):
+        """Vectorized segment classification covers every score combination"""
+
+        grid = np.array(
+            [(r, f, m) for r in range(1, 6) for f in range(1, 6) for m in range(1, 6)]
+        )
+        indexes = classify_rfm_segments(grid[:, 0], grid[:, 1], grid[:, 2])
+
+        for (r, f, m), index in zip(grid.tolist(), indexes.tolist()):
+            assert RFM_SEGMENT_ORDER[index] == rfm_engine._determine_rfm_segment(
+                r, f, m
+            )
+
+    def test_ltv_formulas(self, ltv_engine, sample_customer_metrics):
+        """Vectorized LTV, churn and segments follow the LTV engine formulas"""
+
+        m = sample_customer_metrics
+        base = 300.0 * (30.0 / 18.5) * 12 / 1.1
+        arrays = (
+            np.array([300.0, 300.0]),
+            np.array([5.0, 5.0]),
+            np.array([30.0, 30.0]),
+            np.array([74.0, 74.0]),
+            np.array([60.0, 1000.0]),
+        )
+
+        historic = compute_ltv(*arrays, 12, 0.1, "historic")
+        predictive = compute_ltv(*arrays, 12, 0.1, "predictive")
+        cohort = compute_ltv(*arrays, 12, 0.1, "cohort")
+
+        assert historic[0] == pytest.approx(base)
+        assert predictive[0] == pytest.approx(base * (1 - 30 / 365) * (5 / 12))
+        assert cohort.tolist() == pytest.approx([base * 1.2, base * 0.8])
+
+        for value in (2500.0, 1500.0, 750.0, 300.0, 50.0):
+            assert classify_ltv_segments(np.array([value]))[
+                0
+            ] == ltv_engine._determine_ltv_segment(Decimal(str(value)))
+
+        churn = compute_churn_probability(
+            np.array([float(m.days_since_last_order)]), np.array([float(m.order_count)])
+        )
+        assert churn[0] == ltv_engine._calculate_churn_probability(m)
+
+    @pytest.mark.asyncio
+    async def test_batch_scoring_persists_in_chunks(self, mock_db_session):
+        """Batch engine streams aggregates once and persists per chunk"""
+
+        rows = []
+        for i in range(2500):
+            row = MagicMock()
+            row.customer_id = i + 1
+            row.total_revenue = Decimal(str(100 + i))
+            row.order_count = i % 12 + 1
+            row.avg_order_value = Decimal("80.00")
+            row.first_order_date = date.today() - timedelta(days=400)
+            row.last_order_date = date.today() - timedelta(days=i % 300)
+            rows.append(row)
+
+        async def partitions(size):
+            for offset in range(0, len(rows), size):
+                yield rows[offset : offset + size]
+
+        stream_result = MagicMock()
+        stream_result.partitions = partitions
+        mock_db_session.stream = AsyncMock(return_value=stream_result)
+
+        engine = RFMBatchScoringEngine(mock_db_session)
+        response = await engine.score_customer_base(
+            RFMBatchScoringRequest(chunk_size=1000)
+        )
+
+        assert response.customers_scored == 2500
+        assert response.chunks_processed == 3
+        assert response.segments_persisted == 2500
+        assert sum(response.rfm_distribution.values()) == 2500
+        assert sum(response.ltv_distribution.values()) == 2500
+        assert len(response.thresholds["recency"]) == 4
+
+        # One delete + one executemany insert per chunk, one commit per chunk,
+        # then a final purge of rows from earlier runs
+        assert mock_db_session.stream.await_count == 1
+        assert mock_db_session.execute.await_count == 7
+        assert mock_db_session.commit.await_count == 4
+        calls = mock_db_session.execute.await_args_list
+        inserted = calls[1].args[1]
+        assert len(inserted) == 1000
+        assert {"rfm_segment", "ltv_segment", "predicted_ltv"} <= inserted[0].keys()
+        run_ids = {row["run_id"] for call in calls[1:6:2] for row in call.args[1]}
+        assert len(run_ids) == 1
+        purge = calls[6].args[0]
+        assert purge.is_delete
+        assert purge.whereclause.right.value == run_ids.pop()
+
+    @pytest.mark.asyncio
+    async def test_batch_scoring_dry_run_skips_persistence(self, mock_db_session):
+        """Batch engine can score without writing segments"""
+
+        async def partitions(size):
+            return
+            yield
+
+        stream_result = MagicMock()
+        stream_result.partitions = partitions
+        mock_db_session.stream = AsyncMock(return_value=stream_result)
+
+        engine = RFMBatchScoringEngine(mock_db_session)
+        response = await engine.score_customer_base(
+            RFMBatchScoringRequest(persist_segments=False)
+        )
+
+        assert response.customers_scored == 0
+        assert response.segments_persisted == 0
+        mock_db_session.execute.assert_not_awaited()
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -5,10 +5,12 @@ Comprehensive test suite covering message queues, integration patterns, and SAGA
 
 import asyncio
 import json
+import time
 from datetime import datetime
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from uuid import UUID, uuid4
 
+import fakeredis
 import pytest
 
 from app.api.v1.enterprise_integration_v63 import (
@@ -37,13 +39,12 @@ from app.core.exceptions import BusinessLogicError, NotFoundError
 @pytest.fixture
 def mock_redis():
     """Mock Redis client"""
-    redis_mock = MagicMock()
+    redis_mock = AsyncMock()
     redis_mock.ping.return_value = True
     redis_mock.hset.return_value = True
     redis_mock.hget.return_value = None
     redis_mock.hgetall.return_value = {}
     redis_mock.zadd.return_value = True
-    redis_mock.zrevrange.return_value = []
     redis_mock.zrem.return_value = True
     redis_mock.zcard.return_value = 0
     redis_mock.hincrby.return_value = 1
@@ -52,6 +53,12 @@ def mock_redis():
     redis_mock.lrange.return_value = []
     redis_mock.delete.return_value = True
     redis_mock.expire.return_value = True
+    redis_mock.eval.return_value = []
+
+    pipe = MagicMock()
+    pipe.__aenter__.return_value = pipe
+    pipe.execute = AsyncMock(return_value=[])
+    redis_mock.pipeline = MagicMock(return_value=pipe)
     return redis_mock
 
 
@@ -73,6 +80,13 @@ def saga_orchestrator_instance(message_queue_instance):
     return SagaOrchestrator(message_queue_instance)
 
 
+@pytest.fixture
+def saga_redis(mock_redis):
+    """Patch the module Redis client used for saga state"""
+    with patch("app.api.v1.enterprise_integration_v63.redis_client", mock_redis):
+        yield mock_redis
+
+
 @pytest.fixture
 def sample_queue_config():
     """Sample queue configuration"""
@@ -241,9 +255,11 @@ class TestMessageQueue:
         assert result.queue_name == "test-queue"
         assert result.processing_time_ms is not None
 
-        # Verify Redis calls
-        mock_redis.hset.assert_called()
-        mock_redis.zadd.assert_called()
+        # Message and queue entry are written together
+        pipe = mock_redis.pipeline.return_value
+        pipe.hset.assert_called()
+        pipe.zadd.assert_called()
+        pipe.execute.assert_awaited()
 
     @pytest.mark.asyncio
     async def test_send_message_with_expiration(
@@ -266,22 +282,19 @@ class TestMessageQueue:
         result = await message_queue_instance.send_message(request)
 
         assert result.status == ProcessingStatus.PENDING
-        mock_redis.hset.assert_called()
+        mock_redis.pipeline.return_value.hset.assert_called()
 
     @pytest.mark.asyncio
     async def test_receive_message_success(self, message_queue_instance, mock_redis):
         """Test successful message receiving"""
 
-        # Mock Redis to return a message
+        # Mock the claim script to return a message
         message_id = str(uuid4())
-        mock_redis.zrevrange.return_value = [message_id]
-        mock_redis.hgetall.return_value = {
-            "message_id": message_id,
-            "message_type": "command",
-            "payload": '{"test": "data"}',
-            "created_at": datetime.utcnow().isoformat(),
-            "retry_count": "0",
-        }
+        mock_redis.eval.return_value = [
+            message_id,
+            datetime.utcnow().isoformat(),
+            "0",
+        ]
 
         result = await message_queue_instance.receive_message(
             "test-queue", "consumer-1"
@@ -292,10 +305,15 @@ class TestMessageQueue:
         assert result.status == ProcessingStatus.PROCESSING
         assert result.retry_count == 0
 
-        # Verify Redis operations
-        mock_redis.zrem.assert_called()
-        mock_redis.zadd.assert_called()
-        mock_redis.hset.assert_called()
+        # Claimed atomically in one script
+        mock_redis.eval.assert_awaited_once()
+        args = mock_redis.eval.await_args.args
+        assert args[1:4] == (
+            2,
+            "queue:pending:test-queue",
+            "queue:processing:test-queue",
+        )
+        assert args[4] == 1
 
     @pytest.mark.asyncio
     async def test_receive_message_empty_queue(
@@ -303,7 +321,7 @@ class TestMessageQueue:
     ):
         """Test receiving from empty queue"""
 
-        mock_redis.zrevrange.return_value = []
+        mock_redis.eval.return_value = []
 
         result = await message_queue_instance.receive_message(
             "test-queue", "consumer-1"
@@ -311,6 +329,26 @@ class TestMessageQueue:
 
         assert result is None
 
+    @pytest.mark.asyncio
+    async def test_receive_messages_batch(self, message_queue_instance, mock_redis):
+        """Test batch receive claims up to the requested count"""
+
+        message_ids = [str(uuid4()) for _ in range(3)]
+        created_at = datetime.utcnow().isoformat()
+        mock_redis.eval.return_value = [
+            field
+            for message_id in message_ids
+            for field in (message_id, created_at, "1")
+        ]
+
+        results = await message_queue_instance.receive_messages(
+            "test-queue", "consumer-1", max_messages=5, visibility_timeout_ms=5000
+        )
+
+        assert [str(r.message_id) for r in results] == message_ids
+        assert all(r.retry_count == 1 for r in results)
+        assert mock_redis.eval.await_args.args[4] == 5
+
     @pytest.mark.asyncio
     async def test_complete_message_success(self, message_queue_instance, mock_redis):
         """Test successful message completion"""
@@ -323,8 +361,9 @@ class TestMessageQueue:
         assert result["status"] == "completed"
 
         # Verify Redis operations
-        mock_redis.zrem.assert_called()
-        mock_redis.hset.assert_called()
+        pipe = mock_redis.pipeline.return_value
+        pipe.zrem.assert_any_call("queue:processing:test-queue", str(message_id))
+        pipe.hset.assert_called()
 
     @pytest.mark.asyncio
     async def test_fail_message_with_retry(self, message_queue_instance, mock_redis):
@@ -444,7 +483,9 @@ class TestIntegrationPatternEngine:
     ):
         """Test successful integration pattern creation"""
 
-        with patch("app.api.v1.enterprise_integration_v63.redis_client") as mock_redis:
+        with patch(
+            "app.api.v1.enterprise_integration_v63.redis_client", new_callable=AsyncMock
+        ) as mock_redis:
             mock_redis.hset.return_value = True
 
             result = await integration_engine_instance.create_pattern(
@@ -476,7 +517,9 @@ class TestIntegrationPatternEngine:
             enabled=False,
         )
 
-        with patch("app.api.v1.enterprise_integration_v63.redis_client") as mock_redis:
+        with patch(
+            "app.api.v1.enterprise_integration_v63.redis_client", new_callable=AsyncMock
+        ) as mock_redis:
             mock_redis.hset.return_value = True
 
             result = await integration_engine_instance.create_pattern(pattern)
@@ -622,7 +665,9 @@ class TestIntegrationPatternEngine:
 
         message = {"transaction_id": "tx123", "payload": {"payment": 100}}
 
-        with patch("app.api.v1.enterprise_integration_v63.redis_client") as mock_redis:
+        with patch(
+            "app.api.v1.enterprise_integration_v63.redis_client", new_callable=AsyncMock
+        ) as mock_redis:
             # Mock Redis list operations
             mock_redis.lpush.return_value = 1
             mock_redis.expire.return_value = True
@@ -728,7 +773,9 @@ class TestSagaOrchestrator:
     ):
         """Test successful SAGA definition"""
 
-        with patch("app.api.v1.enterprise_integration_v63.redis_client") as mock_redis:
+        with patch(
+            "app.api.v1.enterprise_integration_v63.redis_client", new_callable=AsyncMock
+        ) as mock_redis:
             mock_redis.hset.return_value = True
 
             result = await saga_orchestrator_instance.define_saga(
@@ -746,7 +793,7 @@ class TestSagaOrchestrator:
 
     @pytest.mark.asyncio
     async def test_execute_saga_success(
-        self, saga_orchestrator_instance, sample_saga_definition
+        self, saga_orchestrator_instance, sample_saga_definition, saga_redis
     ):
         """Test successful SAGA execution start"""
 
@@ -756,26 +803,31 @@ class TestSagaOrchestrator:
 
         initial_context = {"order_id": "12345", "customer_id": "cust456"}
 
-        with patch("app.api.v1.enterprise_integration_v63.redis_client") as mock_redis:
-            mock_redis.hset.return_value = True
-
-            with patch.object(
-                saga_orchestrator_instance, "_execute_saga_step"
-            ) as mock_step:
-                result = await saga_orchestrator_instance.execute_saga(
-                    sample_saga_definition.saga_id, initial_context
-                )
-
-                assert isinstance(result, SagaExecutionResponse)
-                assert result.saga_id == sample_saga_definition.saga_id
-                assert result.saga_name == "Order Processing Saga"
-                assert result.status == SagaStatus.STARTED
-                assert result.current_step == 0
-                assert result.total_steps == 3
-                assert result.execution_context == initial_context
+        with patch.object(saga_orchestrator_instance, "_run_saga") as mock_run:
+            result = await saga_orchestrator_instance.execute_saga(
+                sample_saga_definition.saga_id, initial_context
+            )
 
-                # Verify step execution started
-                mock_step.assert_called_once()
+            assert isinstance(result, SagaExecutionResponse)
+            assert result.saga_id == sample_saga_definition.saga_id
+            assert result.saga_name == "Order Processing Saga"
+            assert result.status == SagaStatus.STARTED
+            assert result.current_step == 0
+            assert result.total_steps == 3
+            assert result.execution_context == initial_context
+
+            # Verify execution started
+            mock_run.assert_called_once()
+
+        # State, active index and lease written together
+        pipe = saga_redis.pipeline.return_value
+        stored = pipe.hset.call_args.kwargs["mapping"]
+        assert stored["status"] == "started"
+        assert stored["completed_steps"] == "[]"
+        pipe.sadd.assert_called_once_with(
+            "saga:executions:active", str(result.execution_id)
+        )
+        pipe.set.assert_called_once()
 
     @pytest.mark.asyncio
     async def test_execute_saga_not_found(self, saga_orchestrator_instance):
@@ -791,9 +843,9 @@ class TestSagaOrchestrator:
 
     @pytest.mark.asyncio
     async def test_execute_saga_step_success(
-        self, saga_orchestrator_instance, sample_saga_definition
+        self, saga_orchestrator_instance, sample_saga_definition, saga_redis
     ):
-        """Test successful SAGA step execution"""
+        """Test successful SAGA step execution is checkpointed"""
 
         execution_id = uuid4()
         execution_context = {
@@ -820,28 +872,25 @@ class TestSagaOrchestrator:
                 "context_updates": {"inventory_reserved": True},
             }
 
-            with patch.object(
-                saga_orchestrator_instance, "_update_execution_status"
-            ) as mock_status:
-                with patch.object(
-                    saga_orchestrator_instance, "_update_execution_context"
-                ) as mock_context:
-                    with patch.object(
-                        saga_orchestrator_instance, "_execute_saga_step"
-                    ) as mock_next_step:
-                        await saga_orchestrator_instance._execute_saga_step(
-                            execution_id, 0
-                        )
-
-                        # Verify step execution
-                        mock_action.assert_called_once()
-                        mock_status.assert_called()
-                        mock_context.assert_called()
-                        mock_next_step.assert_called_with(execution_id, 1)
+            await saga_orchestrator_instance._execute_saga_step(execution_id, 0)
+
+            mock_action.assert_called_once()
+
+        assert execution_context["completed_steps"] == [0]
+        assert execution_context["execution_context"]["inventory_reserved"]
+
+        # Completed steps and context persisted in one write
+        checkpoint = saga_redis.hset.call_args.kwargs["mapping"]
+        assert checkpoint["completed_steps"] == "[0]"
+        assert json.loads(checkpoint["execution_context"]) == {
+            "order_id": "12345",
+            "inventory_reserved": True,
+        }
+        saga_redis.expire.assert_awaited_once()
 
     @pytest.mark.asyncio
     async def test_execute_saga_step_failure_with_compensation(
-        self, saga_orchestrator_instance, sample_saga_definition
+        self, saga_orchestrator_instance, sample_saga_definition, saga_redis
     ):
         """Test SAGA step failure triggering compensation"""
 
@@ -870,12 +919,14 @@ class TestSagaOrchestrator:
             with patch.object(
                 saga_orchestrator_instance, "_start_compensation"
             ) as mock_compensation:
-                await saga_orchestrator_instance._execute_saga_step(execution_id, 1)
+                await saga_orchestrator_instance._run_saga(execution_id)
 
                 # Verify compensation started
                 mock_compensation.assert_called_once_with(
                     execution_id, 1, "Payment failed"
                 )
+                # Step 2 depends on step 1 and never ran
+                mock_action.assert_called_once()
 
     @pytest.mark.asyncio
     async def test_execute_saga_step_completion(
@@ -903,7 +954,7 @@ class TestSagaOrchestrator:
         with patch.object(
             saga_orchestrator_instance, "_complete_saga"
         ) as mock_complete:
-            await saga_orchestrator_instance._execute_saga_step(execution_id, 3)
+            await saga_orchestrator_instance._run_saga(execution_id)
 
             # Verify saga completion
             mock_complete.assert_called_once_with(execution_id)
@@ -1054,7 +1105,7 @@ class TestSagaOrchestrator:
             mock_action.return_value = {"success": True}
 
             with patch.object(
-                saga_orchestrator_instance, "_update_execution_context"
+                saga_orchestrator_instance, "_update_execution_status"
             ) as mock_context:
                 await saga_orchestrator_instance._execute_compensation_step(
                     execution_id, 0, compensation_step
@@ -1066,6 +1117,160 @@ class TestSagaOrchestrator:
                 mock_context.assert_called_once()
 
 
+# Saga scheduling and checkpoints against a Redis stand-in
+@pytest.fixture
+def fake_saga_redis():
+    """Patch the module Redis client with an in-process Redis"""
+    fake = fakeredis.FakeAsyncRedis(decode_responses=True)
+    with patch("app.api.v1.enterprise_integration_v63.redis_client", fake):
+        yield fake
+
+
+def diamond_saga():
+    """Order saga where stock and payment only depend on validation"""
+    step_names = ["validate", "reserve_stock", "authorize_payment", "ship"]
+    return SagaDefinition(
+        saga_name="Diamond Saga",
+        steps=[
+            {"name": "validate"},
+            {"name": "reserve_stock", "depends_on": ["validate"]},
+            {"name": "authorize_payment", "depends_on": ["validate"]},
+            {"name": "ship", "depends_on": ["reserve_stock", "authorize_payment"]},
+        ],
+        compensation_steps=[{"name": f"undo_{name}"} for name in step_names],
+    )
+
+
+class TestSagaScheduling:
+    def test_steps_default_to_sequential(self, sample_saga_definition):
+        assert sample_saga_definition.step_dependencies() == [set(), {0}, {1}]
+
+    def test_dependencies_resolved_by_name_or_index(self):
+        assert diamond_saga().step_dependencies() == [set(), {0}, {0}, {1, 2}]
+
+    def test_unknown_or_later_dependency_rejected(self):
+        saga = SagaDefinition(
+            saga_name="Broken",
+            steps=[{"name": "a", "depends_on": ["b"]}, {"name": "b"}],
+            compensation_steps=[],
+        )
+
+        with pytest.raises(ValueError, match="not an earlier step"):
+            saga.step_dependencies()
+
+    @pytest.mark.asyncio
+    async def test_independent_steps_run_concurrently(
+        self, saga_orchestrator_instance, fake_saga_redis
+    ):
+        saga = diamond_saga()
+        saga_orchestrator_instance.sagas[saga.saga_id] = saga
+        events = []
+
+        async def action(step, context):
+            events.append(("start", step["name"]))
+            await asyncio.sleep(0.01)
+            events.append(("end", step["name"]))
+            return {"context_updates": {step["name"]: True}}
+
+        with patch.object(saga_orchestrator_instance, "_execute_step_action", action):
+            result = await saga_orchestrator_instance.execute_saga(saga.saga_id, {})
+
+        assert events[2:6] == [
+            ("start", "reserve_stock"),
+            ("start", "authorize_payment"),
+            ("end", "reserve_stock"),
+            ("end", "authorize_payment"),
+        ]
+        assert events[-2:] == [("start", "ship"), ("end", "ship")]
+
+        stored = await fake_saga_redis.hgetall(f"saga:execution:{result.execution_id}")
+        assert stored["status"] == "completed"
+        assert sorted(json.loads(stored["completed_steps"])) == [0, 1, 2, 3]
+        assert json.loads(stored["execution_context"])["ship"] is True
+        assert await fake_saga_redis.smembers("saga:executions:active") == set()
+
+    @pytest.mark.asyncio
+    async def test_compensation_in_reverse_dependency_order(
+        self, saga_orchestrator_instance, fake_saga_redis
+    ):
+        saga = diamond_saga()
+        saga_orchestrator_instance.sagas[saga.saga_id] = saga
+        compensated = []
+
+        async def action(step, context):
+            if step["name"] == "ship":
+                raise RuntimeError("carrier unavailable")
+            if step["name"].startswith("undo_"):
+                compensated.append(step["name"])
+            return {}
+
+        with patch.object(saga_orchestrator_instance, "_execute_step_action", action):
+            result = await saga_orchestrator_instance.execute_saga(saga.saga_id, {})
+
+        # Both branches are undone before the step they depend on
+        assert sorted(compensated[:2]) == [
+            "undo_authorize_payment",
+            "undo_reserve_stock",
+        ]
+        assert compensated[2:] == ["undo_validate"]
+
+        stored = await fake_saga_redis.hgetall(f"saga:execution:{result.execution_id}")
+        assert stored["status"] == "compensated"
+        assert stored["error_details"] == "carrier unavailable"
+        assert sorted(json.loads(stored["compensation_steps_executed"])) == [0, 1, 2]
+
+    @pytest.mark.asyncio
+    async def test_restarted_worker_resumes_from_checkpoint(
+        self, message_queue_instance, fake_saga_redis
+    ):
+        saga = diamond_saga()
+        crashed = SagaOrchestrator(message_queue_instance)
+        await crashed.define_saga(saga)
+        payment_started = asyncio.Event()
+
+        async def stalled_action(step, context):
+            if step["name"] == "authorize_payment":
+                payment_started.set()
+                await asyncio.Event().wait()
+            return {"context_updates": {step["name"]: True}}
+
+        with patch.object(crashed, "_execute_step_action", stalled_action):
+            execution = asyncio.create_task(crashed.execute_saga(saga.saga_id, {}))
+            await payment_started.wait()
+            await asyncio.sleep(0.01)
+            execution.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await execution
+
+        (execution_id,) = await fake_saga_redis.smembers("saga:executions:active")
+        restarted = SagaOrchestrator(message_queue_instance)
+
+        # Not resumed while the crashed worker's lease is live
+        assert await restarted.resume_sagas() == []
+
+        await fake_saga_redis.delete(f"saga:lease:{execution_id}")
+        executed = []
+
+        async def action(step, context):
+            executed.append(step["name"])
+            return {"context_updates": {step["name"]: True}}
+
+        with patch.object(restarted, "_execute_step_action", action):
+            assert await restarted.resume_sagas() == [execution_id]
+
+        # Checkpointed steps are not repeated
+        assert executed == ["authorize_payment", "ship"]
+        stored = await fake_saga_redis.hgetall(f"saga:execution:{execution_id}")
+        assert stored["status"] == "completed"
+        assert json.loads(stored["execution_context"]) == {
+            "validate": True,
+            "reserve_stock": True,
+            "authorize_payment": True,
+            "ship": True,
+        }
+        assert await fake_saga_redis.smembers("saga:executions:active") == set()
+
+
 # Integration Tests
 class TestIntegrationWorkflows:
     @pytest.mark.asyncio
@@ -1096,12 +1301,7 @@ class TestIntegrationWorkflows:
 
         # 3. Receive message
         message_id = str(uuid4())
-        mock_redis.zrevrange.return_value = [message_id]
-        mock_redis.hgetall.return_value = {
-            "message_id": message_id,
-            "created_at": datetime.utcnow().isoformat(),
-            "retry_count": "0",
-        }
+        mock_redis.eval.return_value = [message_id, datetime.utcnow().isoformat(), "0"]
 
         receive_result = await message_queue_instance.receive_message(
             "integration-test-queue", "test-consumer"
@@ -1138,7 +1338,9 @@ class TestIntegrationWorkflows:
             target_endpoints=["high-priority-queue", "default-queue"],
         )
 
-        with patch("app.api.v1.enterprise_integration_v63.redis_client") as mock_redis:
+        with patch(
+            "app.api.v1.enterprise_integration_v63.redis_client", new_callable=AsyncMock
+        ) as mock_redis:
             mock_redis.hset.return_value = True
 
             pattern_result = await integration_engine_instance.create_pattern(pattern)
@@ -1159,7 +1361,7 @@ class TestIntegrationWorkflows:
 
     @pytest.mark.asyncio
     async def test_saga_with_integration_patterns(
-        self, saga_orchestrator_instance, integration_engine_instance
+        self, saga_orchestrator_instance, integration_engine_instance, saga_redis
     ):
         """Test SAGA orchestration with integration patterns"""
 
@@ -1184,14 +1386,16 @@ class TestIntegrationWorkflows:
             ],
         )
 
-        with patch("app.api.v1.enterprise_integration_v63.redis_client") as mock_redis:
+        with patch(
+            "app.api.v1.enterprise_integration_v63.redis_client", new_callable=AsyncMock
+        ) as mock_redis:
             mock_redis.hset.return_value = True
 
             define_result = await saga_orchestrator_instance.define_saga(saga)
             assert define_result["status"] == "defined"
 
         # Execute SAGA
-        with patch.object(saga_orchestrator_instance, "_execute_saga_step"):
+        with patch.object(saga_orchestrator_instance, "_run_saga"):
             execute_result = await saga_orchestrator_instance.execute_saga(
                 saga.saga_id, {"test": "data"}
             )
@@ -1249,7 +1453,9 @@ class TestPerformance:
             patterns.append(pattern)
 
         # Create patterns concurrently
-        with patch("app.api.v1.enterprise_integration_v63.redis_client") as mock_redis:
+        with patch(
+            "app.api.v1.enterprise_integration_v63.redis_client", new_callable=AsyncMock
+        ) as mock_redis:
             mock_redis.hset.return_value = True
 
             create_tasks = [
@@ -1278,6 +1484,128 @@ class TestPerformance:
                 assert not result["filtered"]  # All should pass filter
 
 
+# Claim and requeue scripts evaluated by a Redis stand-in
+@pytest.fixture
+async def fake_queue():
+    """Message queue on an in-process Redis with Lua scripting"""
+    queue = MessageQueue(fakeredis.FakeAsyncRedis(decode_responses=True))
+    await queue.create_queue(
+        QueueConfiguration(queue_name="orders", queue_type=QueueType.DIRECT)
+    )
+    return queue
+
+
+async def send_messages(queue, count, priority=MessagePriority.NORMAL):
+    message_ids = []
+    for i in range(count):
+        response = await queue.send_message(
+            MessageRequest(
+                message_type=MessageType.COMMAND,
+                queue_name="orders",
+                payload={"order": i},
+                priority=priority,
+            )
+        )
+        message_ids.append(str(response.message_id))
+    return message_ids
+
+
+class TestMessageQueueClaims:
+    @pytest.mark.asyncio
+    async def test_concurrent_consumers_claim_each_message_once(self, fake_queue):
+        sent = await send_messages(fake_queue, 50)
+
+        async def consumer(consumer_id):
+            claimed = []
+            while batch := await fake_queue.receive_messages(
+                "orders", consumer_id, max_messages=3
+            ):
+                claimed.extend(str(message.message_id) for message in batch)
+                await asyncio.sleep(0)
+            return claimed
+
+        results = await asyncio.gather(*(consumer(f"c{i}") for i in range(10)))
+        claimed = [message_id for result in results for message_id in result]
+
+        assert sorted(claimed) == sorted(sent)
+        assert await fake_queue.redis.zcard("queue:pending:orders") == 0
+        assert await fake_queue.redis.zcard("queue:processing:orders") == 50
+
+    @pytest.mark.asyncio
+    async def test_claims_follow_priority_then_age(self, fake_queue):
+        normal = await send_messages(fake_queue, 2)
+        critical = await send_messages(fake_queue, 1, MessagePriority.CRITICAL)
+
+        claimed = await fake_queue.receive_messages("orders", "c1", max_messages=10)
+
+        assert [str(m.message_id) for m in claimed] == critical + normal
+
+    @pytest.mark.asyncio
+    async def test_expired_claim_requeued_for_next_consumer(self, fake_queue):
+        (message_id,) = await send_messages(fake_queue, 1)
+        await fake_queue.receive_messages("orders", "c1", visibility_timeout_ms=0)
+
+        result = await fake_queue.requeue_expired("orders")
+        (message,) = await fake_queue.receive_messages("orders", "c2")
+
+        assert result == {"expired_claims": 1, "due_retries": 0}
+        assert str(message.message_id) == message_id
+        stored = await fake_queue.redis.hgetall(f"message:{message_id}")
+        assert stored["consumer_id"] == "c2"
+        assert stored["status"] == "processing"
+
+    @pytest.mark.asyncio
+    async def test_unexpired_claim_stays_invisible(self, fake_queue):
+        await send_messages(fake_queue, 1)
+        await fake_queue.receive_messages("orders", "c1")
+
+        result = await fake_queue.requeue_expired("orders")
+
+        assert result == {"expired_claims": 0, "due_retries": 0}
+        assert await fake_queue.receive_messages("orders", "c2") == []
+
+    @pytest.mark.asyncio
+    async def test_due_retry_requeued(self, fake_queue):
+        (message_id,) = await send_messages(fake_queue, 1)
+        await fake_queue.receive_messages("orders", "c1")
+        await fake_queue.fail_message(UUID(message_id), "orders", "timeout")
+
+        assert await fake_queue.requeue_expired("orders") == {
+            "expired_claims": 0,
+            "due_retries": 0,
+        }
+
+        later = time.time() + 3600
+        with patch(
+            "app.api.v1.enterprise_integration_v63.time.time", return_value=later
+        ):
+            result = await fake_queue.requeue_expired("orders")
+        (message,) = await fake_queue.receive_messages("orders", "c2")
+
+        assert result == {"expired_claims": 0, "due_retries": 1}
+        assert str(message.message_id) == message_id
+        assert message.retry_count == 1
+
+    @pytest.mark.asyncio
+    async def test_reaper_runs_with_the_app(self):
+        from app.api.v1 import enterprise_integration_v63 as module
+
+        reaped = asyncio.Event()
+
+        async def run_reaper():
+            reaped.set()
+            await asyncio.Event().wait()
+
+        with patch.object(module.message_queue, "run_reaper", run_reaper):
+            await module.start_queue_reaper()
+            task = module._queue_reaper
+            await asyncio.wait_for(reaped.wait(), 1)
+            await module.stop_background_tasks()
+
+        assert task.cancelled()
+        assert module._queue_reaper is None
+
+
 # Error Handling and Edge Cases
 class TestErrorHandlingEdgeCases:
     @pytest.mark.asyncio
@@ -1321,7 +1649,9 @@ class TestErrorHandlingEdgeCases:
             assert result["target_endpoint"] == "output"
 
     @pytest.mark.asyncio
-    async def test_saga_step_timeout_handling(self, saga_orchestrator_instance):
+    async def test_saga_step_timeout_handling(
+        self, saga_orchestrator_instance, saga_redis
+    ):
         """Test SAGA step timeout handling"""
 
         saga = SagaDefinition(
@@ -1356,7 +1686,7 @@ class TestErrorHandlingEdgeCases:
             with patch.object(
                 saga_orchestrator_instance, "_start_compensation"
             ) as mock_compensation:
-                await saga_orchestrator_instance._execute_saga_step(execution_id, 0)
+                await saga_orchestrator_instance._run_saga(execution_id)
 
                 # Should trigger compensation due to timeout
                 mock_compensation.assert_called_once()
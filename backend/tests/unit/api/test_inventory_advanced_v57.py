@@ -5,15 +5,18 @@ Comprehensive test suite for inventory transactions, reservations, and alerts
 
 from datetime import date, datetime, timedelta
 from decimal import Decimal
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock, patch
 from uuid import uuid4
 
 import pytest
+from sqlalchemy import create_engine
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.v1.inventory_advanced_v57 import (
     AlertSeverity,
     AlertType,
+    BulkInventoryPostingEngine,
     BulkTransactionRequest,
     InventoryAdjustmentRequest,
     InventoryLevelResponse,
@@ -38,10 +41,39 @@ def mock_db_session():
     """Mock database session"""
     session = AsyncMock(spec=AsyncSession)
     session.begin.return_value.__aenter__ = AsyncMock()
-    session.begin.return_value.__aexit__ = AsyncMock()
+    session.begin.return_value.__aexit__ = AsyncMock(return_value=False)
     return session
 
 
+def rows_result(rows):
+    """Mock result whose .all() returns the given rows"""
+    result = MagicMock()
+    result.all.return_value = rows
+    return result
+
+
+def stock_result(available):
+    """Mock result for availability reads with no pending reservations"""
+    result = rows_result([(None, available)])
+    result.scalar.return_value = available
+    return result
+
+
+def product_row(product):
+    return SimpleNamespace(id=product.id, name=product.name, sku=product.sku)
+
+
+def locked_row(item):
+    return MagicMock(
+        id=item.id,
+        product_id=item.product_id,
+        location=item.location,
+        current_quantity=item.current_quantity,
+        available_quantity=item.available_quantity,
+        reserved_quantity=item.reserved_quantity,
+    )
+
+
 @pytest.fixture
 def sample_product():
     """Sample product for testing"""
@@ -210,26 +242,18 @@ class TestInventoryTransactionManager:
     ):
         """Test successful bulk transaction execution"""
 
-        # Mock product lookup
-        product_result = MagicMock()
-        product_result.scalar_one_or_none.return_value = sample_product
-
-        # Mock stock availability (high enough for all transactions)
-        stock_result = MagicMock()
-        stock_result.scalar.return_value = 1000
-
-        # Mock inventory item lookup
-        inventory_result = MagicMock()
-        inventory_result.scalar_one_or_none.return_value = None
-
+        # Product lookup, row lock (no rows yet), key lock, row re-check,
+        # item insert, transaction insert, alert level scan, active alert scan
         mock_db_session.execute.side_effect = [
-            product_result,
-            stock_result,
-            inventory_result,  # First transaction
-            product_result,
-            stock_result,
-            inventory_result,  # Second transaction
-        ] * 3  # Repeat for validation and execution phases
+            rows_result([product_row(sample_product)]),
+            rows_result([]),
+            MagicMock(),
+            rows_result([]),
+            MagicMock(),
+            MagicMock(),
+            rows_result([]),
+            rows_result([]),
+        ]
 
         mock_db_session.flush = AsyncMock()
         mock_db_session.add = MagicMock()
@@ -261,9 +285,19 @@ class TestInventoryTransactionManager:
         assert results[0].quantity == 25
         assert results[1].quantity == 30
 
-        # Verify database interactions
-        assert mock_db_session.add.call_count >= 2
-        assert mock_db_session.flush.call_count >= 2
+        # Verify set-based database interactions
+        assert mock_db_session.execute.await_count == 8
+        mock_db_session.add.assert_not_called()
+        mock_db_session.flush.assert_not_called()
+
+        key_lock = mock_db_session.execute.await_args_list[2].args
+        assert "pg_advisory_xact_lock" in str(key_lock[0])
+        assert key_lock[1]["keys"] == [f"inventory_item:{sample_product.id}:default"]
+        item_insert = mock_db_session.execute.await_args_list[4].args
+        assert item_insert[1][0]["current_quantity"] == 55
+        assert item_insert[1][0]["available_quantity"] == 55
+        transaction_insert = mock_db_session.execute.await_args_list[5].args
+        assert [r["quantity"] for r in transaction_insert[1]] == [25, 30]
 
     @pytest.mark.asyncio
     async def test_create_alert_low_stock(self, transaction_manager, mock_db_session):
@@ -370,6 +404,257 @@ class TestInventoryTransactionManager:
             await transaction_manager._process_location_transfer(request)
 
 
+# Unit Tests for BulkInventoryPostingEngine
+class TestBulkInventoryPostingEngine:
+    @pytest.mark.asyncio
+    async def test_existing_rows_locked_and_updated_with_deltas(
+        self, mock_db_session, sample_product, sample_inventory_item, sample_user
+    ):
+        """Lines for the same row fold into a single atomic delta update"""
+
+        mock_db_session.execute.side_effect = [
+            rows_result([product_row(sample_product)]),
+            rows_result([locked_row(sample_inventory_item)]),
+            MagicMock(),
+            MagicMock(),
+            rows_result([]),
+            rows_result([]),
+        ]
+        location = sample_inventory_item.location
+        requests = [
+            InventoryTransactionRequest(
+                product_id=sample_product.id,
+                transaction_type=transaction_type,
+                quantity=quantity,
+                from_location=location,
+                reason="Bulk posting",
+            )
+            for transaction_type, quantity in [
+                (TransactionType.INBOUND, 5),
+                (TransactionType.OUTBOUND, 3),
+                (TransactionType.RESERVATION, 2),
+            ]
+        ]
+
+        engine = BulkInventoryPostingEngine(mock_db_session)
+        results = await engine.post(requests, sample_user.id)
+
+        assert len(results) == 3
+        lock_statement = str(mock_db_session.execute.await_args_list[1].args[0])
+        assert "FOR UPDATE" in lock_statement
+        assert "ORDER BY" in lock_statement
+
+        update_statement, params = mock_db_session.execute.await_args_list[2].args
+        assert "current_quantity + " in str(update_statement)
+        assert params == [
+            {
+                "item_id": sample_inventory_item.id,
+                "d_current": 2,
+                "d_available": 0,
+                "d_reserved": 2,
+                "b_updated_at": params[0]["b_updated_at"],
+            }
+        ]
+
+    @pytest.mark.asyncio
+    async def test_delta_update_applies_to_existing_row(
+        self, mock_db_session, sample_product, sample_inventory_item, sample_user
+    ):
+        """The executemany UPDATE compiles and moves a stored balance row"""
+
+        mock_db_session.execute.side_effect = [
+            rows_result([product_row(sample_product)]),
+            rows_result([locked_row(sample_inventory_item)]),
+            MagicMock(),
+            MagicMock(),
+            rows_result([]),
+            rows_result([]),
+        ]
+        request = InventoryTransactionRequest(
+            product_id=sample_product.id,
+            transaction_type=TransactionType.OUTBOUND,
+            quantity=30,
+            from_location=sample_inventory_item.location,
+            reason="Picking",
+        )
+
+        engine = BulkInventoryPostingEngine(mock_db_session)
+        await engine.post([request], sample_user.id)
+        update_statement, params = mock_db_session.execute.await_args_list[2].args
+
+        # SQLAlchemy reserves column names for the SET clause
+        assert not set(params[0]) & set(InventoryItem.__table__.columns.keys())
+
+        table = InventoryItem.__tablename__
+        database = create_engine("sqlite://")
+        with database.begin() as connection:
+            connection.exec_driver_sql(
+                f"CREATE TABLE {table} (id CHAR(32) PRIMARY KEY, "
+                "current_quantity INTEGER, available_quantity INTEGER, "
+                "reserved_quantity INTEGER, last_updated DATETIME, "
+                "updated_at DATETIME)"
+            )
+            connection.exec_driver_sql(
+                f"INSERT INTO {table} VALUES (?, 100, 80, 20, NULL, NULL)",
+                (sample_inventory_item.id.hex,),
+            )
+            # Bind names clashing with columns fail to compile here
+            connection.execute(update_statement, params)
+            row = connection.exec_driver_sql(
+                "SELECT current_quantity, available_quantity, reserved_quantity, "
+                f"last_updated FROM {table}"
+            ).one()
+        database.dispose()
+
+        assert row[:3] == (70, 50, 20)
+        assert row.last_updated is not None
+
+    @pytest.mark.asyncio
+    async def test_row_created_concurrently_is_updated_not_duplicated(
+        self, mock_db_session, sample_product, sample_inventory_item, sample_user
+    ):
+        """A row committed while waiting on the key lock gets a delta update"""
+
+        mock_db_session.execute.side_effect = [
+            rows_result([product_row(sample_product)]),
+            rows_result([]),
+            MagicMock(),
+            rows_result([locked_row(sample_inventory_item)]),
+            MagicMock(),
+            MagicMock(),
+            rows_result([]),
+            rows_result([]),
+        ]
+        request = InventoryTransactionRequest(
+            product_id=sample_product.id,
+            transaction_type=TransactionType.INBOUND,
+            quantity=5,
+            to_location=sample_inventory_item.location,
+            reason="Receiving",
+        )
+
+        engine = BulkInventoryPostingEngine(mock_db_session)
+        await engine.post([request], sample_user.id)
+
+        statements = [
+            str(call.args[0]) for call in mock_db_session.execute.await_args_list
+        ]
+        assert "pg_advisory_xact_lock" in statements[2]
+        assert "FOR UPDATE" in statements[3]
+        assert statements[4].startswith("UPDATE")
+        # Only the transaction records are inserted
+        assert sum(s.startswith("INSERT INTO") for s in statements) == 1
+
+    @pytest.mark.asyncio
+    async def test_insufficient_stock_aborts_before_writes(
+        self, mock_db_session, sample_product, sample_inventory_item, sample_user
+    ):
+        """Running balance is checked per line against the locked snapshot"""
+
+        mock_db_session.execute.side_effect = [
+            rows_result([product_row(sample_product)]),
+            rows_result([locked_row(sample_inventory_item)]),
+        ]
+        requests = [
+            InventoryTransactionRequest(
+                product_id=sample_product.id,
+                transaction_type=TransactionType.OUTBOUND,
+                quantity=50,
+                from_location=sample_inventory_item.location,
+                reason="Bulk picking",
+            )
+            for _ in range(2)
+        ]
+
+        engine = BulkInventoryPostingEngine(mock_db_session)
+        with pytest.raises(BusinessLogicError, match="Insufficient stock"):
+            await engine.post(requests, sample_user.id)
+
+        assert mock_db_session.execute.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_missing_product_raises_not_found(
+        self, mock_db_session, sample_product, sample_user
+    ):
+        mock_db_session.execute.side_effect = [rows_result([])]
+        request = InventoryTransactionRequest(
+            product_id=sample_product.id,
+            transaction_type=TransactionType.INBOUND,
+            quantity=1,
+            reason="Receipt",
+        )
+
+        engine = BulkInventoryPostingEngine(mock_db_session)
+        with pytest.raises(NotFoundError, match="Product .* not found"):
+            await engine.post([request], sample_user.id)
+
+    def test_lock_keys_sorted_and_transfer_split(self, mock_db_session):
+        """Transfers touch both locations; keys sort deterministically"""
+
+        product_id = uuid4()
+        engine = BulkInventoryPostingEngine(mock_db_session)
+        legs = engine._legs(
+            InventoryTransactionRequest(
+                product_id=product_id,
+                transaction_type=TransactionType.TRANSFER,
+                quantity=10,
+                from_location="WH_B",
+                to_location="WH_A",
+                reason="Rebalance",
+            )
+        )
+
+        assert legs == [
+            ((product_id, "WH_B"), {"current": -10, "available": -10}),
+            ((product_id, "WH_A"), {"current": 10, "available": 10}),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_alerts_evaluated_once_per_product(
+        self, mock_db_session, sample_product, sample_inventory_item, sample_user
+    ):
+        """Alert levels and existing alerts are read once for the whole batch"""
+
+        low_item = MagicMock(
+            product_id=sample_product.id,
+            current_quantity=10,
+            available_quantity=10,
+            reorder_point=25,
+            max_stock_level=500,
+        )
+        existing_alert = MagicMock(
+            product_id=sample_product.id, alert_type=AlertType.OVERSTOCK.value
+        )
+        mock_db_session.execute.side_effect = [
+            rows_result([product_row(sample_product)]),
+            rows_result([locked_row(sample_inventory_item)]),
+            MagicMock(),
+            MagicMock(),
+            rows_result([low_item]),
+            rows_result([existing_alert]),
+            MagicMock(),
+        ]
+        requests = [
+            InventoryTransactionRequest(
+                product_id=sample_product.id,
+                transaction_type=TransactionType.OUTBOUND,
+                quantity=5,
+                from_location=sample_inventory_item.location,
+                reason="Bulk picking",
+            )
+            for _ in range(10)
+        ]
+
+        engine = BulkInventoryPostingEngine(mock_db_session)
+        await engine.post(requests, sample_user.id)
+
+        assert mock_db_session.execute.await_count == 7
+        alerts = mock_db_session.execute.await_args_list[6].args[1]
+        assert len(alerts) == 1
+        assert alerts[0]["alert_type"] == AlertType.LOW_STOCK.value
+        assert alerts[0]["severity"] == AlertSeverity.HIGH.value
+
+
 # Unit Tests for ReservationManager
 class TestReservationManager:
     @pytest.mark.asyncio
@@ -378,41 +663,137 @@ class TestReservationManager:
     ):
         """Test successful reservation creation"""
 
-        # Mock stock availability check
-        stock_result = MagicMock()
-        stock_result.scalar.return_value = 100  # Sufficient stock
-        mock_db_session.execute.return_value = stock_result
+        # 100 available, nothing pending: every shard may reserve 12
+        mock_db_session.execute.return_value = stock_result(100)
 
-        # Mock transaction manager execution
-        with patch(
-            "app.api.v1.inventory_advanced_v57.InventoryTransactionManager"
-        ) as mock_tm:
-            mock_tm_instance = mock_tm.return_value
-            mock_tm_instance.execute_transaction = AsyncMock()
+        request = ReservationRequest(
+            product_id=sample_product.id,
+            quantity=10,
+            reserved_for="ORDER-12345",
+            priority=5,
+            notes="Rush order reservation",
+        )
 
-            request = ReservationRequest(
-                product_id=sample_product.id,
-                quantity=25,
-                reserved_for="ORDER-12345",
-                priority=5,
-                notes="Rush order reservation",
+        # Execute reservation
+        with patch(
+            "app.api.v1.inventory_advanced_v57.random.randrange", return_value=3
+        ):
+            result = await reservation_manager.create_reservation(
+                request, sample_user.id
             )
 
-            # Execute reservation
+        # Assertions
+        assert isinstance(result, ReservationResponse)
+        assert result.product_id == sample_product.id
+        assert result.quantity == 10
+        assert result.reserved_for == "ORDER-12345"
+        assert result.priority == 5
+        assert result.status == "active"
+
+        # Shard lock, shard headroom, ledger append; inventory row untouched
+        calls = mock_db_session.execute.await_args_list
+        statements = [str(call.args[0]) for call in calls]
+        assert len(statements) == 3
+        assert "pg_advisory_xact_lock" in statements[0]
+        assert calls[0].args[1]["lock_key"].endswith(":3")
+        assert "UNION ALL" in statements[1]
+        assert statements[2].startswith("INSERT INTO")
+        assert not any(statement.startswith("UPDATE") for statement in statements)
+        [ledger_row] = calls[2].args[1]
+        assert ledger_row["id"] == result.reservation_id
+        assert ledger_row["to_location"] == "reserved:3"
+        assert ledger_row["status"] == TransactionStatus.PENDING.value
+        assert ledger_row["reason"] == "Reserved for ORDER-12345"
+
+    @pytest.mark.asyncio
+    async def test_create_reservation_split_across_shards(
+        self, reservation_manager, mock_db_session, sample_product, sample_user
+    ):
+        """A reservation larger than any shard's share takes all shard locks"""
+
+        reservation_manager.RESERVATION_SHARDS = 2
+        mock_db_session.execute.return_value = stock_result(10)
+        request = ReservationRequest(
+            product_id=sample_product.id, quantity=8, reserved_for="ORDER-1"
+        )
+
+        with patch(
+            "app.api.v1.inventory_advanced_v57.random.randrange", return_value=0
+        ):
             result = await reservation_manager.create_reservation(
                 request, sample_user.id
             )
 
-            # Assertions
-            assert isinstance(result, ReservationResponse)
-            assert result.product_id == sample_product.id
-            assert result.quantity == 25
-            assert result.reserved_for == "ORDER-12345"
-            assert result.priority == 5
-            assert result.status == "active"
+        calls = mock_db_session.execute.await_args_list
+        statements = [str(call.args[0]) for call in calls]
+        # Neither shard has room for 8 alone, so both are locked in order
+        assert "pg_advisory_xact_lock" in statements[0]
+        assert all("pg_advisory_xact_lock" in s for s in statements[2:4])
+        assert not any("pg_try_advisory_xact_lock" in s for s in statements)
+        rows = calls[-1].args[1]
+        assert [(row["to_location"], row["quantity"]) for row in rows] == [
+            ("reserved:0", 5),
+            ("reserved:1", 3),
+        ]
+        assert rows[0]["id"] == result.reservation_id
+        assert {row["reference_id"] for row in rows} == {result.reservation_id}
+
+    @pytest.mark.asyncio
+    async def test_compact_reservations_folds_pending_into_items(
+        self, reservation_manager, mock_db_session, sample_product, sample_user
+    ):
+        """Pending reservations are summed per product and marked completed"""
+
+        other_product_id = uuid4()
+        pending = [
+            MagicMock(id=uuid4(), product_id=sample_product.id, quantity=5),
+            MagicMock(id=uuid4(), product_id=sample_product.id, quantity=7),
+            MagicMock(id=uuid4(), product_id=other_product_id, quantity=3),
+        ]
+        mock_db_session.execute.side_effect = [
+            rows_result(pending),
+            rows_result(
+                [
+                    SimpleNamespace(product_id=sample_product.id),
+                    SimpleNamespace(product_id=other_product_id),
+                ]
+            ),
+            MagicMock(),
+            MagicMock(),
+        ]
+
+        summary = await reservation_manager.compact_reservations()
 
-            # Verify transaction manager was called
-            mock_tm_instance.execute_transaction.assert_called_once()
+        assert summary == {"reservations_compacted": 3, "items_updated": 2}
+        lock_statement = str(mock_db_session.execute.await_args_list[1].args[0])
+        assert "FOR UPDATE" in lock_statement
+        update_statement, params = mock_db_session.execute.await_args_list[2].args
+        assert "reserved_quantity + " in str(update_statement)
+        assert {p["b_product_id"]: p["b_reserved"] for p in params} == {
+            sample_product.id: 12,
+            other_product_id: 3,
+        }
+
+    @pytest.mark.asyncio
+    async def test_compact_reservations_skips_products_without_item_row(
+        self, reservation_manager, mock_db_session, sample_product, sample_user
+    ):
+        """Reservations with no default inventory row stay pending"""
+
+        matched = MagicMock(id=uuid4(), product_id=sample_product.id, quantity=5)
+        orphan = MagicMock(id=uuid4(), product_id=uuid4(), quantity=3)
+        mock_db_session.execute.side_effect = [
+            rows_result([matched, orphan]),
+            rows_result([SimpleNamespace(product_id=sample_product.id)]),
+            MagicMock(),
+            MagicMock(),
+        ]
+
+        summary = await reservation_manager.compact_reservations()
+
+        assert summary == {"reservations_compacted": 1, "items_updated": 1}
+        complete_statement = mock_db_session.execute.await_args_list[3].args[0]
+        assert complete_statement.compile().params["id_1"] == [matched.id]
 
     @pytest.mark.asyncio
     async def test_create_reservation_insufficient_stock(
@@ -420,10 +801,9 @@ class TestReservationManager:
     ):
         """Test reservation creation with insufficient stock"""
 
-        # Mock stock availability check - insufficient stock
-        stock_result = MagicMock()
-        stock_result.scalar.return_value = 10  # Only 10 available, but requesting 25
-        mock_db_session.execute.return_value = stock_result
+        # 10 available in total; no shard, nor all of them, can hold 25
+        reservation_manager.RESERVATION_SHARDS = 1
+        mock_db_session.execute.return_value = stock_result(10)
 
         request = ReservationRequest(
             product_id=sample_product.id, quantity=25, reserved_for="ORDER-12345"
@@ -431,10 +811,17 @@ class TestReservationManager:
 
         # Execute reservation - should raise BusinessLogicError
         with pytest.raises(
-            BusinessLogicError, match="Insufficient stock for reservation"
+            BusinessLogicError,
+            match="Insufficient stock for reservation. Available: 10",
         ):
             await reservation_manager.create_reservation(request, sample_user.id)
 
+        # Nothing is appended to the ledger
+        statements = [
+            str(call.args[0]) for call in mock_db_session.execute.await_args_list
+        ]
+        assert not any(statement.startswith("INSERT") for statement in statements)
+
 
 # API Endpoint Tests
 class TestInventoryAdvancedAPI:
@@ -736,21 +1123,16 @@ class TestPerformanceAndEdgeCases:
     ):
         """Test performance with large bulk transactions"""
 
-        # Mock successful validations and executions
-        product_result = MagicMock()
-        product_result.scalar_one_or_none.return_value = sample_product
-
-        stock_result = MagicMock()
-        stock_result.scalar.return_value = 10000  # High stock availability
-
-        inventory_result = MagicMock()
-        inventory_result.scalar_one_or_none.return_value = None
-
         mock_db_session.execute.side_effect = [
-            product_result,
-            stock_result,
-            inventory_result,
-        ] * 200  # Repeat for 100 transactions * 2 phases
+            rows_result([product_row(sample_product)]),
+            rows_result([]),
+            MagicMock(),
+            rows_result([]),
+            MagicMock(),
+            MagicMock(),
+            rows_result([]),
+            rows_result([]),
+        ]
 
         mock_db_session.flush = AsyncMock()
         mock_db_session.add = MagicMock()
@@ -780,8 +1162,10 @@ class TestPerformanceAndEdgeCases:
         # Assertions
         assert len(results) == 100
         assert execution_time < 5.0  # Should complete within 5 seconds
-        assert mock_db_session.add.call_count == 100
-        assert mock_db_session.flush.call_count == 100
+        # Round trips stay constant regardless of the number of lines
+        assert mock_db_session.execute.await_count == 8
+        mock_db_session.add.assert_not_called()
+        mock_db_session.flush.assert_not_called()
 
     @pytest.mark.asyncio
     async def test_concurrent_reservations_same_product(
@@ -790,49 +1174,43 @@ class TestPerformanceAndEdgeCases:
         """Test concurrent reservations for the same product"""
 
         # Mock sufficient stock initially
-        stock_result = MagicMock()
-        stock_result.scalar.return_value = 100
-        mock_db_session.execute.return_value = stock_result
+        mock_db_session.execute.return_value = stock_result(100)
 
-        with patch(
-            "app.api.v1.inventory_advanced_v57.InventoryTransactionManager"
-        ) as mock_tm:
-            mock_tm_instance = mock_tm.return_value
-            mock_tm_instance.execute_transaction = AsyncMock()
-
-            # Create multiple concurrent reservation requests
-            requests = [
-                ReservationRequest(
-                    product_id=sample_product.id,
-                    quantity=30,
-                    reserved_for=f"ORDER-{i:05d}",
-                )
-                for i in range(5)
-            ]
+        # Create multiple concurrent reservation requests
+        requests = [
+            ReservationRequest(
+                product_id=sample_product.id,
+                quantity=30,
+                reserved_for=f"ORDER-{i:05d}",
+            )
+            for i in range(5)
+        ]
 
-            # Execute concurrent reservations
-            import asyncio
+        # Execute concurrent reservations
+        import asyncio
 
-            tasks = [
-                reservation_manager.create_reservation(req, sample_user.id)
-                for req in requests
-            ]
+        tasks = [
+            reservation_manager.create_reservation(req, sample_user.id)
+            for req in requests
+        ]
 
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+        results = await asyncio.gather(*tasks, return_exceptions=True)
 
-            # Check that all reservations were processed
-            successful_reservations = [
-                r for r in results if isinstance(r, ReservationResponse)
-            ]
-            [r for r in results if isinstance(r, Exception)]
+        # Check that all reservations were processed
+        successful_reservations = [
+            r for r in results if isinstance(r, ReservationResponse)
+        ]
 
-            # At least some should succeed (depending on race conditions)
-            assert len(successful_reservations) > 0
+        # At least some should succeed (depending on race conditions)
+        assert len(successful_reservations) > 0
 
-            # Verify transaction manager was called for successful reservations
-            assert mock_tm_instance.execute_transaction.call_count == len(
-                successful_reservations
-            )
+        # Each successful reservation appended one ledger row
+        inserts = [
+            call
+            for call in mock_db_session.execute.await_args_list
+            if str(call.args[0]).startswith("INSERT INTO")
+        ]
+        assert len(inserts) == len(successful_reservations)
 
     def test_enum_edge_cases(self):
         """Test enum edge cases and invalid values"""
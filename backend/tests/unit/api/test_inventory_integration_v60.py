@@ -5,9 +5,11 @@ Comprehensive test suite for real-time tracking, prediction, and supplier integr
 
 from datetime import datetime, timedelta
 from decimal import Decimal
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock, patch
 from uuid import uuid4
 
+import numpy as np
 import pytest
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -26,6 +28,8 @@ from app.api.v1.inventory_integration_v60 import (
     SupplierIntegrationRequest,
     SupplierIntegrator,
     SupplierStatus,
+    predict_total_demand,
+    prediction_accuracy,
 )
 from app.core.exceptions import BusinessLogicError, NotFoundError
 from app.models.product import Product
@@ -92,6 +96,36 @@ def integration_manager(mock_db_session):
     return InventoryIntegrationManager(mock_db_session)
 
 
+def demand_stream(rows):
+    """Streamed result yielding the demand rows as a single partition"""
+
+    async def partitions(size):
+        yield rows
+
+    result = MagicMock()
+    result.partitions = partitions
+    return result
+
+
+def daily_sales(product_id, quantity, days=10):
+    """Aggregate demand rows for the last ``days`` complete days"""
+    today = datetime.utcnow().date()
+    return [
+        SimpleNamespace(
+            product_id=str(product_id),
+            date=today - timedelta(days=offset),
+            daily_demand=quantity,
+        )
+        for offset in range(1, days + 1)
+    ]
+
+
+def fetchall_result(rows):
+    result = MagicMock()
+    result.fetchall.return_value = rows
+    return result
+
+
 # Unit Tests for InventoryTracker
 class TestInventoryTracker:
     @pytest.mark.asyncio
@@ -315,178 +349,179 @@ class TestPredictionEngine:
 
         product_ids = [uuid4(), uuid4()]
 
-        # Mock database queries
-        products_result = MagicMock()
-        products_result.fetchall.return_value = [
-            MagicMock(id=str(product_ids[0])),
-            MagicMock(id=str(product_ids[1])),
-        ]
-        mock_db_session.execute.return_value = products_result
-
-        # Mock prediction methods
-        with patch.object(prediction_engine, "_predict_single_product") as mock_predict:
-            mock_predict.side_effect = [
-                {
-                    "product_id": product_ids[0],
-                    "current_stock": 50,
-                    "predicted_demand": 20,
-                    "predicted_stock": 30,
-                    "reorder_recommendation": False,
-                },
-                {
-                    "product_id": product_ids[1],
-                    "current_stock": 5,
-                    "predicted_demand": 15,
-                    "predicted_stock": 0,
-                    "reorder_recommendation": True,
-                },
-            ]
-
-            request = StockPredictionRequest(
-                prediction_days=30, method=PredictionMethod.MOVING_AVERAGE
+        # One aggregate demand query for all products
+        mock_db_session.stream = AsyncMock(
+            return_value=demand_stream(
+                daily_sales(product_ids[0], 2) + daily_sales(product_ids[1], 3)
             )
+        )
+        # Batched stock and reorder settings lookups
+        mock_db_session.execute.side_effect = [
+            fetchall_result(
+                [
+                    SimpleNamespace(product_id=str(product_ids[0]), current_stock=100),
+                    SimpleNamespace(product_id=str(product_ids[1]), current_stock=20),
+                ]
+            ),
+            fetchall_result(
+                [
+                    SimpleNamespace(
+                        product_id=str(product_ids[1]),
+                        reorder_point=10,
+                        max_stock_level=100,
+                        lead_time_days=7,
+                        safety_stock=5,
+                    )
+                ]
+            ),
+        ]
 
-            # Execute prediction generation
-            predictions = await prediction_engine.generate_stock_predictions(request)
+        request = StockPredictionRequest(
+            prediction_days=30, method=PredictionMethod.MOVING_AVERAGE
+        )
 
-            # Assertions
-            assert len(predictions) == 2
-            assert predictions[0]["product_id"] == product_ids[0]
-            assert not predictions[0]["reorder_recommendation"]
-            assert predictions[1]["product_id"] == product_ids[1]
-            assert predictions[1]["reorder_recommendation"]
+        # Execute prediction generation
+        predictions = await prediction_engine.generate_stock_predictions(request)
 
-            # Verify prediction method was called for each product
-            assert mock_predict.call_count == 2
+        # Assertions
+        assert len(predictions) == 2
+        assert predictions[0]["product_id"] == product_ids[0]
+        assert predictions[0]["predicted_demand"] == 60
+        assert predictions[0]["predicted_stock"] == 40
+        assert not predictions[0]["reorder_recommendation"]
+        assert predictions[1]["product_id"] == product_ids[1]
+        assert predictions[1]["predicted_demand"] == 90
+        assert predictions[1]["predicted_stock"] == 0
+        assert predictions[1]["reorder_recommendation"]
+        # Lead time demand (90 * 7 / 30) plus safety stock
+        assert predictions[1]["suggested_reorder_quantity"] == 26
+
+        # Accuracy is backtested rather than a fixed placeholder
+        assert all(0 <= p["accuracy_score"] <= 1 for p in predictions)
+
+        # No per-product queries
+        assert mock_db_session.stream.await_count == 1
+        assert mock_db_session.execute.await_count == 2
 
     @pytest.mark.asyncio
-    async def test_predict_single_product_insufficient_data(
+    async def test_generate_stock_predictions_skips_sparse_history(
         self, prediction_engine, mock_db_session
     ):
-        """Test single product prediction with insufficient historical data"""
+        """Test products with fewer than 7 sales days are not forecast"""
 
         product_id = uuid4()
 
-        # Mock insufficient historical data
-        with patch.object(
-            prediction_engine, "_get_historical_demand"
-        ) as mock_get_history:
-            mock_get_history.return_value = [5, 3]  # Only 2 data points, need minimum 7
+        mock_db_session.stream = AsyncMock(
+            return_value=demand_stream(daily_sales(product_id, 4, days=3))
+        )
 
-            request = StockPredictionRequest(prediction_days=30)
+        request = StockPredictionRequest(prediction_days=30)
 
-            # Execute prediction - should return None for insufficient data
-            result = await prediction_engine._predict_single_product(
-                product_id, request
-            )
+        predictions = await prediction_engine.generate_stock_predictions(request)
 
-            assert result is None
+        assert predictions == []
+        mock_db_session.execute.assert_not_awaited()
 
-    @pytest.mark.asyncio
-    async def test_predict_single_product_success(
-        self, prediction_engine, mock_db_session
-    ):
-        """Test successful single product prediction"""
-
-        product_id = uuid4()
+    def test_predict_total_demand_vectorized(self):
+        """Test matrix predictions match predicting each product alone"""
 
-        # Mock sufficient historical data
-        historical_data = [10, 12, 8, 15, 11, 9, 13, 14, 7, 16]
+        histories = [
+            [10, 12, 8, 15, 11, 9, 13, 14, 7, 16],
+            [5, 7, 9, 11, 13, 15, 17, 19, 21, 23],
+        ]
+        demand = np.array(histories, dtype=float)
 
-        with (
-            patch.object(
-                prediction_engine, "_get_historical_demand"
-            ) as mock_get_history,
-            patch.object(prediction_engine, "_get_current_stock") as mock_current_stock,
-            patch.object(prediction_engine, "_get_reorder_point") as mock_reorder_point,
-            patch.object(
-                prediction_engine, "_calculate_reorder_quantity"
-            ) as mock_reorder_qty,
+        totals = {}
+        for method in (
+            PredictionMethod.MOVING_AVERAGE,
+            PredictionMethod.EXPONENTIAL_SMOOTHING,
+            PredictionMethod.LINEAR_REGRESSION,
         ):
-            mock_get_history.return_value = historical_data
-            mock_current_stock.return_value = 50
-            mock_reorder_point.return_value = 10
-            mock_reorder_qty.return_value = 30
+            totals[method], margins = predict_total_demand(demand, method, 30)
+            for i, history in enumerate(histories):
+                alone, alone_margin = predict_total_demand(
+                    np.array([history], dtype=float), method, 30
+                )
+                assert totals[method][i] == alone[0]
+                assert margins[i] == alone_margin[0]
 
-            request = StockPredictionRequest(
-                prediction_days=30, method=PredictionMethod.MOVING_AVERAGE
-            )
+        # Upward trend is extrapolated past the moving average
+        assert (
+            totals[PredictionMethod.LINEAR_REGRESSION][1]
+            > totals[PredictionMethod.MOVING_AVERAGE][1]
+        )
 
-            # Execute prediction
-            result = await prediction_engine._predict_single_product(
-                product_id, request
-            )
+    def test_prediction_accuracy(self):
+        """Test backtested accuracy per product"""
 
-            # Assertions
-            assert result is not None
-            assert result["product_id"] == product_id
-            assert result["current_stock"] == 50
-            assert result["predicted_demand"] > 0
-            assert result["method_used"] == PredictionMethod.MOVING_AVERAGE
-            assert "confidence_interval_lower" in result
-            assert "confidence_interval_upper" in result
-
-    def test_moving_average_prediction(self, prediction_engine):
+        demand = np.array(
+            [
+                [10.0] * 28,
+                [10.0] * 21 + [20.0] * 7,
+            ]
+        )
+
+        accuracy = prediction_accuracy(demand, PredictionMethod.MOVING_AVERAGE)
+
+        assert accuracy[0] == 1.0
+        assert accuracy[1] == 0.5
+
+    def test_moving_average_prediction(self):
         """Test moving average prediction method"""
 
-        historical_data = [10, 12, 8, 15, 11, 9, 13]
+        historical_data = [20, 10, 12, 8, 15, 11, 9, 13]
         prediction_days = 30
 
-        result = prediction_engine._moving_average_prediction(
-            historical_data, prediction_days
+        result, _ = predict_total_demand(
+            np.array([historical_data], dtype=float),
+            PredictionMethod.MOVING_AVERAGE,
+            prediction_days,
         )
 
-        # Should be based on recent 7 days average
-        expected_avg = sum(historical_data[:7]) / 7
-        expected_result = int(expected_avg * prediction_days)
+        # Should be based on the most recent 7 days average
+        expected_avg = sum(historical_data[-7:]) / 7
+        assert result[0] == int(expected_avg * prediction_days)
 
-        assert result == expected_result
-
-    def test_exponential_smoothing_prediction(self, prediction_engine):
+    def test_exponential_smoothing_prediction(self):
         """Test exponential smoothing prediction method"""
 
         historical_data = [10, 12, 8, 15, 11, 9, 13]
-        prediction_days = 30
 
-        result = prediction_engine._exponential_smoothing_prediction(
-            historical_data, prediction_days
+        result, _ = predict_total_demand(
+            np.array([historical_data], dtype=float),
+            PredictionMethod.EXPONENTIAL_SMOOTHING,
+            30,
         )
 
         # Should apply exponential smoothing algorithm
-        assert isinstance(result, int)
-        assert result >= 0
+        assert 0 < result[0] <= max(historical_data) * 30
 
-    def test_linear_regression_prediction(self, prediction_engine):
+    def test_linear_regression_prediction(self):
         """Test linear regression prediction method"""
 
         # Trending up data
         historical_data = [5, 7, 9, 11, 13, 15, 17]
-        prediction_days = 30
 
-        result = prediction_engine._linear_regression_prediction(
-            historical_data, prediction_days
+        result, _ = predict_total_demand(
+            np.array([historical_data], dtype=float),
+            PredictionMethod.LINEAR_REGRESSION,
+            30,
         )
 
         # Should detect upward trend
-        assert isinstance(result, int)
-        assert result > 0
+        assert result[0] > 17 * 30
 
-    def test_calculate_confidence_interval(self, prediction_engine):
-        """Test confidence interval calculation"""
+    def test_confidence_margin(self):
+        """Test confidence margin calculation"""
 
-        historical_data = [10, 12, 8, 15, 11, 9, 13, 14, 7, 16]
-        prediction = 300
-        confidence = 0.95
+        demand = np.array([[10, 50, 5, 45, 10, 60, 0, 40, 5, 55]], dtype=float)
 
-        lower, upper = prediction_engine._calculate_confidence_interval(
-            historical_data, prediction, confidence
+        _, wide = predict_total_demand(demand, PredictionMethod.MOVING_AVERAGE, 30)
+        _, narrow = predict_total_demand(
+            demand, PredictionMethod.MOVING_AVERAGE, 30, confidence=0.9
         )
 
-        # Should return tuple with reasonable bounds
-        assert isinstance(lower, int)
-        assert isinstance(upper, int)
-        assert lower <= 0  # Lower bound should be negative (margin)
-        assert upper >= 0  # Upper bound should be positive (margin)
+        assert wide[0] > narrow[0] > 0
 
 
 # Unit Tests for SupplierIntegrator
@@ -1250,38 +1285,31 @@ class TestPerformanceAndScalability:
         """Test prediction performance with many products"""
 
         # Mock large number of products
-        num_products = 100
+        num_products = 5000
         product_ids = [uuid4() for _ in range(num_products)]
 
-        products_result = MagicMock()
-        products_result.fetchall.return_value = [
-            MagicMock(id=str(pid)) for pid in product_ids
-        ]
-        mock_db_session.execute.return_value = products_result
+        demand_rows = []
+        for i, product_id in enumerate(product_ids):
+            demand_rows.extend(daily_sales(product_id, i % 5 + 1, days=30))
+        mock_db_session.stream = AsyncMock(return_value=demand_stream(demand_rows))
+        mock_db_session.execute.return_value = fetchall_result([])
 
-        # Mock prediction method to return quick results
-        with patch.object(prediction_engine, "_predict_single_product") as mock_predict:
-            mock_predict.return_value = {
-                "product_id": uuid4(),
-                "predicted_demand": 20,
-                "reorder_recommendation": False,
-            }
+        request = StockPredictionRequest(prediction_days=30)
 
-            request = StockPredictionRequest(prediction_days=30)
+        # Measure execution time
+        import time
 
-            # Measure execution time
-            import time
+        start_time = time.time()
 
-            start_time = time.time()
+        predictions = await prediction_engine.generate_stock_predictions(request)
 
-            predictions = await prediction_engine.generate_stock_predictions(request)
+        execution_time = time.time() - start_time
 
-            execution_time = time.time() - start_time
-
-            # Assertions
-            assert len(predictions) == num_products
-            assert execution_time < 5.0  # Should complete within 5 seconds
-            assert mock_predict.call_count == num_products
+        # Assertions
+        assert len(predictions) == num_products
+        assert execution_time < 5.0  # Should complete within 5 seconds
+        # Stock and reorder lookups are chunked, not per product
+        assert mock_db_session.execute.await_count == 2 * (num_products // 1000)
 
     @pytest.mark.asyncio
     async def test_concurrent_stock_movements(self, inventory_tracker, mock_db_session):
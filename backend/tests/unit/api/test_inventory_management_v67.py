@@ -10,15 +10,26 @@ from datetime import datetime, timedelta
 from decimal import Decimal
 from unittest.mock import AsyncMock, Mock, patch
 
+import numpy as np
 import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
 from httpx import AsyncClient
+from sqlalchemy.exc import IntegrityError
 
 from app.api.v1.inventory_management_v67 import (
+    BatchDemandForecaster,
+    DemandForecastBatchRequest,
+    DemandMatrix,
+    ForecastMethod,
     InventoryManagementService,
+    InventoryReservationLedgerService,
+    LedgerEntryType,
     MovementType,
+    ReservationCreate,
 )
 from app.main import app
+from app.services.demand_forecasting import backtest_accuracy, fit_demand_forecast
 
 
 class TestInventoryLocationManagement:
@@ -308,6 +319,218 @@ class TestInventoryBalanceManagement:
             assert abs(mock_balance.average_cost - expected_avg_cost) < Decimal("0.01")
 
 
+class TestReservationLedger:
+    """Test append-only reservation ledger and compaction"""
+
+    @pytest.fixture
+    def ledger_db(self):
+        db = AsyncMock()
+        db.add = Mock()
+        db.execute = AsyncMock(return_value=Mock())
+        return db
+
+    @pytest.fixture
+    def ledger_redis(self):
+        redis_client = AsyncMock()
+        redis_client.eval = AsyncMock(return_value=1)
+        return redis_client
+
+    @pytest.fixture
+    def ledger_service(self, ledger_db, ledger_redis):
+        return InventoryReservationLedgerService(ledger_db, ledger_redis)
+
+    @pytest.fixture
+    def reservation(self):
+        return ReservationCreate(
+            product_id=uuid.uuid4(),
+            location_id=uuid.uuid4(),
+            quantity=Decimal("2"),
+            reference_type="sales_order",
+            reference_id="SO-1001",
+        )
+
+    async def test_reserve_appends_without_touching_balance(
+        self, ledger_service, ledger_db, ledger_redis, reservation
+    ):
+        """Admitted reservations are a single ledger insert"""
+        entry = await ledger_service.reserve(reservation)
+
+        assert entry.entry_type == LedgerEntryType.RESERVE
+        assert entry.quantity == Decimal("2")
+        ledger_db.add.assert_called_once_with(entry)
+        ledger_db.commit.assert_awaited_once()
+        ledger_db.execute.assert_not_awaited()
+
+        script, numkeys, key, quantity = ledger_redis.eval.await_args.args
+        assert script == InventoryReservationLedgerService.RESERVE_SCRIPT
+        assert key.endswith(f"{reservation.product_id}:{reservation.location_id}:-")
+        # Integer units of the 4-decimal ledger scale
+        assert quantity == "20000"
+
+    async def test_gate_seeded_from_balance_minus_pending(
+        self, ledger_service, ledger_db, ledger_redis, reservation
+    ):
+        """An unseeded gate is initialised from the database once"""
+        ledger_redis.eval.side_effect = [
+            InventoryReservationLedgerService.GATE_MISSING,
+            1,
+        ]
+        ledger_db.execute.return_value.scalar.return_value = Decimal("40")
+
+        await ledger_service.reserve(reservation)
+
+        ledger_db.execute.assert_awaited_once()
+        seed_query = str(ledger_db.execute.await_args.args[0])
+        assert "inventory_reservation_ledger.compacted_at IS NULL" in seed_query
+        ledger_redis.set.assert_awaited_once()
+        assert ledger_redis.set.await_args.args[1] == "400000"
+        assert ledger_redis.set.await_args.kwargs == {
+            "nx": True,
+            "ex": InventoryReservationLedgerService.GATE_TTL_SECONDS,
+        }
+
+    async def test_reserve_rejected_when_gate_exhausted(
+        self, ledger_service, ledger_db, ledger_redis, reservation
+    ):
+        ledger_redis.eval.return_value = 0
+
+        with pytest.raises(HTTPException) as exc_info:
+            await ledger_service.reserve(reservation)
+
+        assert exc_info.value.status_code == 400
+        ledger_db.add.assert_not_called()
+
+    async def test_failed_append_returns_quantity_to_gate(
+        self, ledger_service, ledger_db, ledger_redis, reservation
+    ):
+        ledger_db.commit.side_effect = RuntimeError("connection lost")
+
+        with pytest.raises(RuntimeError):
+            await ledger_service.reserve(reservation)
+
+        ledger_db.rollback.assert_awaited_once()
+        script, _, _, delta = ledger_redis.eval.await_args.args
+        assert script == InventoryReservationLedgerService.ADJUST_SCRIPT
+        assert delta == "20000"
+
+    async def test_release_twice_is_rejected(
+        self, ledger_service, ledger_db, ledger_redis
+    ):
+        """uq_reservation_ledger_reverses makes releases idempotent"""
+        ledger_db.execute.return_value.scalar_one_or_none.return_value = Mock(
+            id=uuid.uuid4(),
+            product_id=uuid.uuid4(),
+            location_id=uuid.uuid4(),
+            lot_number=None,
+            quantity=Decimal("3"),
+            reference_type=None,
+            reference_id=None,
+        )
+        ledger_db.commit.side_effect = IntegrityError("insert", {}, Exception())
+
+        with pytest.raises(HTTPException) as exc_info:
+            await ledger_service.release(uuid.uuid4())
+
+        assert exc_info.value.status_code == 400
+        ledger_redis.eval.assert_not_awaited()
+
+    async def test_expired_reservations_released_and_returned_to_gate(
+        self, ledger_service, ledger_db, ledger_redis
+    ):
+        """Reservations past expires_at get compensating release entries"""
+        product_id = uuid.uuid4()
+        location_id = uuid.uuid4()
+        expired = [
+            Mock(
+                id=uuid.uuid4(),
+                product_id=product_id,
+                location_id=location_id,
+                lot_number=None,
+                quantity=quantity,
+                reference_type="sales_order",
+                reference_id="SO-1",
+            )
+            for quantity in (Decimal("1.5"), Decimal("2"))
+        ]
+        ledger_db.add_all = Mock()
+        ledger_db.execute.return_value.scalars.return_value.all.return_value = expired
+
+        summary = await ledger_service.expire_reservations()
+
+        assert summary == {"reservations_expired": 2}
+        expiry_query = str(ledger_db.execute.await_args.args[0])
+        assert "expires_at <=" in expiry_query
+        assert "NOT (EXISTS" in expiry_query
+        releases = ledger_db.add_all.call_args.args[0]
+        assert [r.entry_type for r in releases] == [LedgerEntryType.RELEASE] * 2
+        assert [r.reverses_id for r in releases] == [r.id for r in expired]
+        assert [r.quantity for r in releases] == [Decimal("-1.5"), Decimal("-2")]
+        ledger_db.commit.assert_awaited_once()
+        # One gate adjustment per balance key
+        script, _, _, delta = ledger_redis.eval.await_args.args
+        assert script == InventoryReservationLedgerService.ADJUST_SCRIPT
+        assert delta == "35000"
+
+    async def test_resync_gates_reseeds_live_gates(
+        self, ledger_service, ledger_db, ledger_redis
+    ):
+        """Live gates are overwritten from balance minus pending entries"""
+        product_id = uuid.uuid4()
+        location_id = uuid.uuid4()
+        key = f"inventory:available:{product_id}:{location_id}:LOT-1"
+
+        async def scan_iter(match):
+            assert match == "inventory:available:*:*:*"
+            yield key.encode()
+
+        ledger_redis.scan_iter = scan_iter
+        ledger_db.execute.return_value.scalar.return_value = Decimal("12.25")
+
+        summary = await ledger_service.resync_gates()
+
+        assert summary == {"gates_resynced": 1}
+        assert "lot_number" in str(ledger_db.execute.await_args.args[0])
+        ledger_redis.set.assert_awaited_once_with(
+            key,
+            "122500",
+            ex=InventoryReservationLedgerService.GATE_TTL_SECONDS,
+        )
+
+    async def test_compact_folds_pending_entries_per_balance(
+        self, ledger_service, ledger_db
+    ):
+        """Pending entries are summed per balance key and marked by id"""
+        product_id = uuid.uuid4()
+        location_id = uuid.uuid4()
+        entries = [
+            Mock(
+                id=uuid.uuid4(),
+                product_id=product_id,
+                location_id=location_id,
+                lot_number=None,
+                quantity=quantity,
+            )
+            for quantity in (Decimal("5"), Decimal("2"), Decimal("-2"))
+        ]
+        ledger_db.execute.return_value.all.return_value = entries
+
+        summary = await ledger_service.compact()
+
+        assert summary == {"entries_compacted": 3, "balances_updated": 1}
+        assert ledger_db.execute.await_count == 3
+        balance_update, params = ledger_db.execute.await_args_list[1].args
+        assert "quantity_reserved" in str(balance_update)
+        assert params == [
+            {
+                "b_product_id": product_id,
+                "b_location_id": location_id,
+                "b_lot_number": None,
+                "b_reserved": Decimal("5"),
+            }
+        ]
+        ledger_db.commit.assert_awaited_once()
+
+
 class TestStockTransfers:
     """Test stock transfer functionality"""
 
@@ -488,15 +711,22 @@ class TestDemandForecasting:
     def inventory_service(self, mock_db, mock_redis):
         return InventoryManagementService(mock_db, mock_redis)
 
-    async def test_moving_average_forecast(self, inventory_service):
-        """Test moving average forecasting"""
+    def history_values(self, demand):
         historical_data = [
-            {"date": datetime.utcnow() - timedelta(days=i), "demand": 100 + i}
+            {"date": datetime.utcnow() - timedelta(days=i), "demand": demand(i)}
             for i in range(30, 0, -1)
         ]
+        return DemandMatrix.from_history(historical_data, None).values
 
-        forecasts = await inventory_service._moving_average_forecast(
-            historical_data, periods=7, window=7
+    async def test_moving_average_forecast(self, inventory_service):
+        """Test moving average forecasting"""
+        values = self.history_values(lambda i: 100 + i)
+
+        fitted = fit_demand_forecast(
+            values, ForecastMethod.MOVING_AVERAGE, periods=7, window=7
+        )
+        forecasts = inventory_service._forecast_rows(
+            fitted, ForecastMethod.MOVING_AVERAGE
         )
 
         assert len(forecasts) == 7
@@ -504,16 +734,17 @@ class TestDemandForecasting:
         assert all("lower_bound" in f for f in forecasts)
         assert all("upper_bound" in f for f in forecasts)
         assert all(f["method"] == "moving_average" for f in forecasts)
+        assert all(f["model_params"]["window"] == 7 for f in forecasts)
 
     async def test_exponential_smoothing_forecast(self, inventory_service):
         """Test exponential smoothing forecasting"""
-        historical_data = [
-            {"date": datetime.utcnow() - timedelta(days=i), "demand": 80 + (i % 10)}
-            for i in range(30, 0, -1)
-        ]
+        values = self.history_values(lambda i: 80 + (i % 10))
 
-        forecasts = await inventory_service._exponential_smoothing_forecast(
-            historical_data, periods=5, alpha=0.3
+        fitted = fit_demand_forecast(
+            values, ForecastMethod.EXPONENTIAL_SMOOTHING, periods=5, alpha=0.3
+        )
+        forecasts = inventory_service._forecast_rows(
+            fitted, ForecastMethod.EXPONENTIAL_SMOOTHING
         )
 
         assert len(forecasts) == 5
@@ -524,39 +755,28 @@ class TestDemandForecasting:
     async def test_linear_regression_forecast(self, inventory_service):
         """Test linear regression forecasting"""
         # Create trending data
-        historical_data = [
-            {"date": datetime.utcnow() - timedelta(days=i), "demand": 50 + (30 - i) * 2}
-            for i in range(30, 0, -1)
-        ]
+        values = self.history_values(lambda i: 50 + (30 - i) * 2)
 
-        forecasts = await inventory_service._linear_regression_forecast(
-            historical_data, periods=10
+        fitted = fit_demand_forecast(
+            values, ForecastMethod.LINEAR_REGRESSION, periods=10
+        )
+        forecasts = inventory_service._forecast_rows(
+            fitted, ForecastMethod.LINEAR_REGRESSION
         )
 
         assert len(forecasts) == 10
         assert all(f["method"] == "linear_regression" for f in forecasts)
-        assert all("model_params" in f for f in forecasts)
         assert all("slope" in f["model_params"] for f in forecasts)
         assert all("intercept" in f["model_params"] for f in forecasts)
+        assert forecasts[-1]["demand"] > forecasts[0]["demand"]
 
     async def test_forecast_accuracy_calculation(self, inventory_service):
         """Test forecast accuracy calculation"""
-        historical_data = [
-            {"demand": 100},
-            {"demand": 110},
-            {"demand": 95},
-            {"demand": 105},
-        ]
+        values = self.history_values(lambda i: 100 + (i % 3) * 5)
 
-        forecasts = [{"demand": 98}, {"demand": 108}, {"demand": 97}, {"demand": 103}]
-
-        accuracy = await inventory_service._calculate_forecast_accuracy(
-            historical_data, forecasts
-        )
+        accuracy = backtest_accuracy(values, ForecastMethod.MOVING_AVERAGE, 7)
 
-        assert isinstance(accuracy, Decimal)
-        assert accuracy >= 0
-        assert accuracy <= 100
+        assert 0 <= accuracy[0] <= 100
 
     async def test_generate_demand_forecast_complete(self, inventory_service):
         """Test complete demand forecast generation"""
@@ -608,6 +828,106 @@ class TestDemandForecasting:
                 await inventory_service.generate_demand_forecast(request)
 
 
+class TestBatchDemandForecasting:
+    """Test vectorized forecasting across many SKUs"""
+
+    @pytest.fixture
+    def demand_values(self):
+        rng = np.random.default_rng(7)
+        trend = np.arange(60, dtype=float)
+        return rng.uniform(5, 15, size=(50, 60)) + trend * rng.uniform(0, 0.5, (50, 1))
+
+    def test_exponential_smoothing_matches_recursion(self, demand_values):
+        fitted = fit_demand_forecast(
+            demand_values, ForecastMethod.EXPONENTIAL_SMOOTHING, 3, alpha=0.3
+        )
+
+        for row in (0, 17, 49):
+            level = demand_values[row, 0]
+            for value in demand_values[row, 1:]:
+                level = 0.3 * value + 0.7 * level
+            assert fitted.demand[row, 0] == pytest.approx(level)
+            assert np.allclose(fitted.demand[row], fitted.demand[row, 0])
+
+    def test_linear_regression_matches_polyfit(self, demand_values):
+        fitted = fit_demand_forecast(demand_values, ForecastMethod.LINEAR_REGRESSION, 5)
+
+        for row in (0, 25):
+            slope, intercept = np.polyfit(np.arange(60), demand_values[row], 1)
+            assert fitted.parameters["slope"][row] == pytest.approx(slope)
+            assert fitted.demand[row, 0] == pytest.approx(
+                max(intercept + slope * 60, 0)
+            )
+
+    def test_moving_average_bounds_use_confidence(self, demand_values):
+        fitted = fit_demand_forecast(
+            demand_values, ForecastMethod.MOVING_AVERAGE, 2, z_score=2.0, window=7
+        )
+
+        recent = demand_values[:, -7:]
+        assert np.allclose(fitted.demand[:, 0], recent.mean(axis=1))
+        assert np.allclose(
+            fitted.upper_bound[:, 0] - fitted.demand[:, 0], 2.0 * recent.std(axis=1)
+        )
+        assert (fitted.lower_bound >= 0).all()
+
+    def test_backtest_accuracy_is_perfect_for_flat_demand(self):
+        values = np.full((3, 40), 12.0)
+        values[2] = 0
+
+        accuracy = backtest_accuracy(values, ForecastMethod.MOVING_AVERAGE, 7)
+
+        assert accuracy.tolist() == [100.0, 100.0, 0.0]
+
+    async def test_batch_forecast_loads_once_and_persists_per_chunk(self):
+        """One aggregate query builds the matrix; inserts run per SKU chunk"""
+        product_ids = [uuid.uuid4() for _ in range(250)]
+        start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        rows = [
+            Mock(product_id=product_id, day=start - timedelta(days=day), demand=5)
+            for product_id in product_ids
+            for day in range(1, 16)
+        ]
+        # Product with too little history to forecast
+        rows.append(
+            Mock(product_id=uuid.uuid4(), day=start - timedelta(days=1), demand=3)
+        )
+
+        async def partitions(size):
+            for offset in range(0, len(rows), size):
+                yield rows[offset : offset + size]
+
+        stream_result = Mock()
+        stream_result.partitions = partitions
+        db = AsyncMock()
+        db.stream = AsyncMock(return_value=stream_result)
+
+        response = await BatchDemandForecaster(db).forecast(
+            DemandForecastBatchRequest(
+                forecast_method=ForecastMethod.MOVING_AVERAGE,
+                forecast_periods=7,
+                historical_periods=30,
+                chunk_size=100,
+            )
+        )
+
+        db.stream.assert_awaited_once()
+        # Today's partial day is not part of the history
+        params = db.stream.await_args.args[0].compile().params
+        assert start in params.values()
+        assert start - timedelta(days=30) in params.values()
+        assert response.skus_forecast == 250
+        assert response.skus_skipped == 1
+        assert response.forecast_rows_written == 250 * 7
+        assert db.execute.await_count == 3
+        assert db.commit.await_count == 3
+
+        records = db.execute.await_args_list[0].args[1]
+        assert len(records) == 100 * 7
+        assert records[0]["forecast_method"] == "moving_average"
+        assert records[0]["forecasted_demand"] == Decimal("5.0")
+
+
 class TestInventoryAlerts:
     """Test inventory alert system"""
 
@@ -4,20 +4,28 @@ Comprehensive test suite for product management functionality
 Day 8: Product Management Test Implementation
 """
 
+import asyncio
 import uuid
 from datetime import datetime, timedelta
 from decimal import Decimal
 from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
 from httpx import AsyncClient
 
 from app.api.v1.product_management_v66 import ProductManagementService
-from app.api.v1.product_media_v66 import MediaManagementService
-from app.api.v1.product_pricing_v66 import PricingEngine
+from app.api.v1.product_media_v66 import (
+    MEDIA_CONFIG,
+    MediaManagementService,
+    MediaProcessingWorker,
+)
+from app.api.v1.product_pricing_v66 import CompiledPricingRule, PricingEngine
 from app.api.v1.product_search_v66 import ElasticsearchService
 from app.main import app
+from app.services.blob_storage import ContentAddressedStore
+from app.services.media_processing import MediaJobTimeoutError
 
 
 class TestProductManagement:
@@ -263,23 +271,23 @@ class TestProductPricing:
 
     async def test_pricing_rule_evaluation(self, pricing_engine):
         """Test pricing rule evaluation"""
+        product_id = uuid.uuid4()
         rule = Mock(
+            id=uuid.uuid4(),
+            priority=0,
+            start_date=None,
+            end_date=None,
             conditions={
                 "quantity": {"min": 2},
-                "products": {"include": ["product-123"]},
-            }
-        )
-
-        product_id = uuid.uuid4()
-        customer_id = None
-        quantity = 3
-
-        result = await pricing_engine._evaluate_rule_conditions(
-            rule, product_id, customer_id, quantity
+                "products": {"include": [str(product_id)]},
+            },
         )
+        compiled = CompiledPricingRule.compile(rule)
+        now = datetime.utcnow()
 
-        # Should evaluate conditions properly
-        assert isinstance(result, bool)
+        assert compiled.matches(str(product_id), None, None, None, 3, now)
+        assert not compiled.matches(str(product_id), None, None, None, 1, now)
+        assert not compiled.matches(str(uuid.uuid4()), None, None, None, 3, now)
 
 
 class TestProductMedia:
@@ -295,10 +303,27 @@ class TestProductMedia:
         large_file = Mock()
         large_file.filename = "large_image.jpg"
         large_file.content_type = "image/jpeg"
-        large_file.read = AsyncMock(return_value=b"x" * (200 * 1024 * 1024))  # 200MB
+        large_file.size = 200 * 1024 * 1024  # 200MB
 
-        with pytest.raises(Exception):  # Should raise file too large error
+        with pytest.raises(HTTPException) as exc_info:
             await media_service._validate_upload(large_file)
+        assert exc_info.value.status_code == 413
+        large_file.read.assert_not_called()
+
+    async def test_upload_size_enforced_while_streaming(self, media_service, tmp_path):
+        """Test undeclared sizes are checked as chunks arrive"""
+        store = ContentAddressedStore(tmp_path)
+        media_service.storage_service.blob_store = store
+        upload = Mock(filename="clip.mp4", content_type="video/mp4", size=None)
+        upload.read = AsyncMock(side_effect=[b"x" * 8, b"x" * 8, b""])
+
+        with patch.dict(MEDIA_CONFIG, {"max_file_size": 10}):
+            with pytest.raises(HTTPException) as exc_info:
+                await media_service.upload_file(upload)
+
+        assert exc_info.value.status_code == 413
+        assert list(store.uploads_dir.iterdir()) == []
+        media_service.db.add.assert_not_called()
 
     async def test_media_type_determination(self, media_service):
         """Test media type determination from MIME type"""
@@ -307,25 +332,140 @@ class TestProductMedia:
         assert media_service._determine_media_type("application/pdf") == "document"
 
     async def test_image_processing(self, media_service):
-        """Test image processing functionality"""
+        """Test image variants are rendered in the worker pool and recorded"""
         media_file = Mock(
             id=uuid.uuid4(),
             filename="test_image.jpg",
             file_path="uploads/test_image.jpg",
             media_type="image",
         )
+        rendered = {
+            "dimensions": {"width": 1920, "height": 1080},
+            "metadata": {"format": "JPEG", "mode": "RGB", "size": [1920, 1080]},
+            "variants": [
+                {
+                    "variant_name": "thumbnail",
+                    "filename": "test_image_thumbnail.jpg",
+                    "file_path": "variants/test_image_thumbnail.jpg",
+                    "file_size": 2048,
+                    "dimensions": {"width": 150, "height": 150},
+                    "format": "JPEG",
+                }
+            ],
+        }
+        pool = Mock(run=AsyncMock(return_value=rendered))
+        media_service.db = AsyncMock(add_all=Mock())
+        media_service.processing_service.db = media_service.db
 
-        with patch("PIL.Image.open") as mock_image:
-            mock_img = Mock()
-            mock_img.size = (1920, 1080)
-            mock_img.format = "JPEG"
-            mock_img.mode = "RGB"
-            mock_image.return_value.__enter__.return_value = mock_img
-
+        with patch(
+            "app.api.v1.product_media_v66.get_media_worker_pool", return_value=pool
+        ):
             result = await media_service.processing_service.process_image(media_file)
 
-            assert result["status"] == "success"
-            assert "variants_created" in result
+        assert result["status"] == "success"
+        assert result["variants_created"] == 1
+        assert pool.run.call_args.args[1:4] == (
+            MEDIA_CONFIG["upload_path"],
+            f"{MEDIA_CONFIG['upload_path']}/uploads/test_image.jpg",
+            "test_image",
+        )
+        assert (
+            pool.run.call_args.kwargs["timeout"]
+            == (MEDIA_CONFIG["job_timeouts"]["image"])
+        )
+        assert media_file.processing_status == "completed"
+        assert media_file.dimensions == {"width": 1920, "height": 1080}
+        variants = list(media_service.db.add_all.call_args.args[0])
+        assert [v.variant_name for v in variants] == ["thumbnail"]
+
+    async def test_processing_worker_retries_and_fails_jobs(self, mock_redis):
+        """Test a worker pass records successes, retries and final failures"""
+        db = AsyncMock(add_all=Mock())
+        worker = MediaProcessingWorker(db, mock_redis)
+        files = [
+            Mock(id=uuid.uuid4(), media_type="image", filename=f"{i}.jpg")
+            for i in range(3)
+        ]
+        jobs = [
+            Mock(media_file_id=files[0].id, attempts=0, max_attempts=3),
+            Mock(media_file_id=files[1].id, attempts=0, max_attempts=3),
+            Mock(media_file_id=files[2].id, attempts=2, max_attempts=3),
+        ]
+        claimed = Mock()
+        claimed.scalars.return_value.all.return_value = jobs
+        loaded = Mock()
+        loaded.scalars.return_value = files
+        db.execute.side_effect = [claimed, loaded, Mock()]
+
+        rendered = {"dimensions": {}, "metadata": {}, "variants": []}
+        outcomes = {
+            files[0].id: rendered,
+            files[1].id: MediaJobTimeoutError("Media job exceeded 60s"),
+            files[2].id: OSError("cannot identify image file"),
+        }
+
+        async def render(media_file):
+            outcome = outcomes[media_file.id]
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        worker.processing_service.render = render
+
+        summary = await worker.run_once()
+
+        assert summary == {"claimed": 3, "completed": 1, "retried": 1, "failed": 1}
+        assert jobs[0].status == "completed"
+        assert files[0].processing_status == "completed"
+        assert jobs[1].status == "pending"
+        assert jobs[1].attempts == 1
+        assert jobs[1].scheduled_at > datetime.utcnow()
+        assert jobs[2].status == "failed"
+        assert files[2].processing_status == "failed"
+        assert files[2].processing_error == "cannot identify image file"
+        # Claim commit and one commit for the whole batch
+        assert db.commit.await_count == 2
+
+    async def test_processing_worker_retries_failed_result_writes(self, mock_redis):
+        """Test a job whose results cannot be recorded is retried, not lost"""
+        db = AsyncMock(add_all=Mock())
+        worker = MediaProcessingWorker(db, mock_redis)
+        media_file = Mock(id=uuid.uuid4(), media_type="image", filename="0.jpg")
+        job = Mock(media_file_id=media_file.id, attempts=0, max_attempts=3)
+        claimed = Mock()
+        claimed.scalars.return_value.all.return_value = [job]
+        loaded = Mock()
+        loaded.scalars.return_value = [media_file]
+        db.execute.side_effect = [claimed, loaded]
+        worker.processing_service.render = AsyncMock(return_value={})
+        worker.processing_service.apply_result = AsyncMock(
+            side_effect=OSError("variant directory missing")
+        )
+
+        summary = await worker.run_once()
+
+        assert summary == {"claimed": 1, "completed": 0, "retried": 1, "failed": 0}
+        assert job.status == "pending"
+        assert job.error_message == "variant directory missing"
+
+    async def test_processing_worker_backs_off_after_failed_pass(self, mock_redis):
+        """Test the worker loop survives a failing pass and backs off"""
+        db = AsyncMock()
+        worker = MediaProcessingWorker(db, mock_redis)
+        worker.run_once = AsyncMock(
+            side_effect=[ConnectionError("database down")] * 3
+            + [{"claimed": 0}, asyncio.CancelledError()]
+        )
+
+        with patch(
+            "app.api.v1.product_media_v66.asyncio.sleep", new=AsyncMock()
+        ) as sleep:
+            with pytest.raises(asyncio.CancelledError):
+                await worker.run_forever(poll_interval=1.0, max_backoff=3.0)
+
+        assert [call.args[0] for call in sleep.await_args_list] == [1.0, 2.0, 3.0]
+        assert db.rollback.await_count == 3
+        mock_redis.brpop.assert_awaited_once()
 
     async def test_media_search(self, media_service):
         """Test media search functionality"""
@@ -0,0 +1,199 @@
+"""
+Tests for Product Pricing v66 compiled pricing rule index and cache
+"""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+import pytest
+
+from app.api.v1.product_pricing_v66 import (
+    CompiledPricingRule,
+    PricingEngine,
+    PricingRuleCache,
+    PricingRuleIndex,
+    QuantityBreakpoints,
+)
+
+
+def make_rule(priority=0, conditions=None, actions=None, **kwargs):
+    """Build a lightweight stand-in for a PricingRule row"""
+    return SimpleNamespace(
+        id=kwargs.get("id", uuid4()),
+        name=kwargs.get("name", f"rule-{priority}"),
+        rule_type="conditional",
+        priority=priority,
+        conditions=conditions,
+        actions=actions or {"percentage_discount": 5},
+        start_date=kwargs.get("start_date"),
+        end_date=kwargs.get("end_date"),
+    )
+
+
+@pytest.fixture
+def mock_redis():
+    redis_mock = AsyncMock()
+    redis_mock.get = AsyncMock(return_value=b"1")
+    redis_mock.incr = AsyncMock(return_value=2)
+    return redis_mock
+
+
+@pytest.fixture
+def mock_db_session():
+    def execute_result(rules):
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = rules
+        return result
+
+    session = AsyncMock()
+    session.execute_result = execute_result
+    return session
+
+
+class TestCompiledPricingRule:
+    def test_matches_product_and_quantity(self):
+        product_id = uuid4()
+        rule = CompiledPricingRule.compile(
+            make_rule(
+                conditions={
+                    "products": {"include": [str(product_id)]},
+                    "quantity": {"min": 10, "max": 50},
+                }
+            )
+        )
+        now = datetime.utcnow()
+
+        assert rule.matches(str(product_id), None, None, None, 10, now)
+        assert not rule.matches(str(product_id), None, None, None, 9, now)
+        assert not rule.matches(str(product_id), None, None, None, 51, now)
+        assert not rule.matches(str(uuid4()), None, None, None, 10, now)
+
+    def test_customer_conditions_skipped_for_anonymous_lookups(self):
+        customer_id = uuid4()
+        rule = CompiledPricingRule.compile(
+            make_rule(conditions={"customers": {"include": [str(customer_id)]}})
+        )
+        now = datetime.utcnow()
+
+        assert rule.matches("p", None, None, None, 1, now)
+        assert rule.matches("p", None, str(customer_id), None, 1, now)
+        assert not rule.matches("p", None, str(uuid4()), None, 1, now)
+
+    def test_schedule_checked_at_lookup_time(self):
+        now = datetime.utcnow()
+        rule = CompiledPricingRule.compile(
+            make_rule(start_date=now + timedelta(hours=1))
+        )
+
+        assert not rule.matches("p", None, None, None, 1, now)
+        assert rule.matches("p", None, None, None, 1, now + timedelta(hours=2))
+
+
+class TestQuantityBreakpoints:
+    def test_bands_follow_rule_ranges(self):
+        small = CompiledPricingRule.compile(
+            make_rule(conditions={"quantity": {"max": 9}})
+        )
+        large = CompiledPricingRule.compile(
+            make_rule(conditions={"quantity": {"min": 10}})
+        )
+        bands = QuantityBreakpoints([small, large])
+
+        assert bands.rules_for(1) == (small,)
+        assert bands.rules_for(9) == (small,)
+        assert bands.rules_for(10) == (large,)
+        assert bands.rules_for(10_000) == (large,)
+        assert bands.rules_for(0) == ()
+
+
+class TestPricingRuleIndex:
+    def test_lookup_merges_buckets_in_priority_order(self):
+        product_id = uuid4()
+        category_id = 42
+        product_rule = make_rule(
+            priority=5, conditions={"products": {"include": [str(product_id)]}}
+        )
+        category_rule = make_rule(
+            priority=10, conditions={"categories": {"include": [str(category_id)]}}
+        )
+        group_rule = make_rule(
+            priority=1, conditions={"customer_groups": {"include": ["wholesale"]}}
+        )
+        generic_rule = make_rule(priority=0, conditions=None)
+
+        index = PricingRuleIndex.build(
+            [generic_rule, product_rule, group_rule, category_rule]
+        )
+        rules = index.lookup(
+            product_id, 1, category_id=category_id, customer_group="wholesale"
+        )
+
+        assert [rule.id for rule in rules] == [
+            category_rule.id,
+            product_rule.id,
+            group_rule.id,
+            generic_rule.id,
+        ]
+        assert index.rule_count == 4
+
+    def test_lookup_excludes_other_buckets(self):
+        index = PricingRuleIndex.build(
+            [
+                make_rule(conditions={"products": {"include": [str(uuid4())]}}),
+                make_rule(conditions={"customer_groups": {"include": ["vip"]}}),
+            ]
+        )
+
+        assert index.lookup(uuid4(), 1) == []
+
+
+class TestPricingRuleCache:
+    @pytest.mark.asyncio
+    async def test_index_reused_until_version_changes(
+        self, mock_db_session, mock_redis
+    ):
+        mock_db_session.execute = AsyncMock(
+            return_value=mock_db_session.execute_result([make_rule()])
+        )
+        cache = PricingRuleCache(version_check_interval=0)
+
+        first = await cache.get_index(mock_db_session, mock_redis)
+        second = await cache.get_index(mock_db_session, mock_redis)
+        assert first is second
+        assert mock_db_session.execute.await_count == 1
+
+        mock_redis.get.return_value = b"2"
+        third = await cache.get_index(mock_db_session, mock_redis)
+        assert third is not first
+        assert mock_db_session.execute.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_invalidate_bumps_shared_version(self, mock_db_session, mock_redis):
+        mock_db_session.execute = AsyncMock(
+            return_value=mock_db_session.execute_result([])
+        )
+        cache = PricingRuleCache()
+        await cache.get_index(mock_db_session, mock_redis)
+
+        await cache.invalidate(mock_redis)
+
+        mock_redis.incr.assert_awaited_once_with(PricingRuleCache.VERSION_KEY)
+        await cache.get_index(mock_db_session, mock_redis)
+        assert mock_db_session.execute.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_engine_reads_rules_from_cache(self, mock_db_session, mock_redis):
+        product_id = uuid4()
+        rule = make_rule(conditions={"products": {"include": [str(product_id)]}})
+        mock_db_session.execute = AsyncMock(
+            return_value=mock_db_session.execute_result([rule])
+        )
+        engine = PricingEngine(mock_db_session, mock_redis, PricingRuleCache())
+
+        for _ in range(3):
+            rules = await engine._get_applicable_pricing_rules(product_id, None, 1)
+            assert [r["id"] for r in rules] == [rule.id]
+
+        assert mock_db_session.execute.await_count == 1
@@ -354,6 +354,62 @@ class TestDashboardEngine:
         assert result["datasets"][0]["label"] == "New Customers"
         assert result["datasets"][0]["data"] == [5, 8]
 
+    @pytest.mark.asyncio
+    async def test_dashboard_widgets_share_queries_and_cache(
+        self, dashboard_engine, mock_db_session
+    ):
+        """Test identical widget queries run once and widget data is cached"""
+
+        widgets = []
+        for i, data_source in enumerate(["sales", "sales", "inventory", "sales"]):
+            widget = MagicMock()
+            widget.id = str(uuid4())
+            widget.title = f"Widget {i}"
+            widget.chart_type = "line"
+            widget.data_source = data_source
+            widget.metrics = '["order_count", "stock_level"]'
+            widget.dimensions = "[]"
+            widget.filters = "{}"
+            widget.time_range = "30d"
+            widget.refresh_interval = 300
+            widget.position = "{}"
+            widget.updated_at = datetime.utcnow()
+            widgets.append(widget)
+
+        async def execute(query, params=None):
+            result = MagicMock()
+            if "FROM dashboard_widgets" in str(query):
+                result.fetchall.return_value = widgets
+            elif "FROM orders" in str(query):
+                result.fetchall.return_value = [
+                    MagicMock(date=date(2024, 1, 1), order_count=10)
+                ]
+            else:
+                result.fetchall.return_value = [
+                    MagicMock(product_name="Product A", stock_level=50)
+                ]
+            return result
+
+        mock_db_session.execute.side_effect = execute
+
+        result = await dashboard_engine.get_dashboard_data(uuid4())
+
+        # Widgets, then one sales and one inventory query
+        assert mock_db_session.execute.await_count == 3
+        assert [w["title"] for w in result["widgets"]] == [
+            "Widget 0",
+            "Widget 1",
+            "Widget 2",
+            "Widget 3",
+        ]
+        assert result["widgets"][1]["data"] == result["widgets"][0]["data"]
+        assert result["widgets"][2]["data"]["labels"] == ["Product A"]
+
+        await dashboard_engine.get_dashboard_data(uuid4())
+
+        # Widget data still fresh is not queried again
+        assert mock_db_session.execute.await_count == 4
+
     def test_generate_financial_data(self, dashboard_engine):
         """Test financial data generation for widgets"""
 
@@ -0,0 +1,190 @@
+"""
+Tests for the content-addressed blob store
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+
+import pytest
+
+from app.services.blob_storage import (
+    BLOB_CHUNK_SIZE,
+    UPLOAD_MAX_AGE_SECONDS,
+    BlobTooLargeError,
+    ChecksumMismatchError,
+    ContentAddressedStore,
+    UploadNotFoundError,
+    UploadOffsetError,
+)
+
+
+async def chunked(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+class FakeUpload:
+    """Minimal UploadFile stand-in recording read sizes"""
+
+    def __init__(self, content: bytes):
+        self.content = content
+        self.position = 0
+        self.read_sizes = []
+
+    async def read(self, size: int = -1) -> bytes:
+        self.read_sizes.append(size)
+        chunk = self.content[self.position : self.position + size]
+        self.position += len(chunk)
+        return chunk
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ContentAddressedStore(tmp_path)
+
+
+class TestStreamingStore:
+    @pytest.mark.asyncio
+    async def test_stream_is_hashed_and_stored_by_digest(self, store):
+        content = b"scan page " * 1000
+
+        blob = await store.store_stream(chunked(content[:4000], content[4000:]))
+
+        assert blob.sha256 == hashlib.sha256(content).hexdigest()
+        assert blob.md5 == hashlib.md5(content).hexdigest()
+        assert blob.size == len(content)
+        assert blob.created
+        assert blob.path == f"blobs/{blob.sha256[:2]}/{blob.sha256[2:4]}/{blob.sha256}"
+        assert store.blob_path(blob.sha256).read_bytes() == content
+        assert list(store.uploads_dir.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_identical_content_stored_once(self, store):
+        first = await store.store_bytes(b"same invoice")
+        second = await store.store_stream(chunked(b"same ", b"invoice"))
+
+        assert second.sha256 == first.sha256
+        assert not second.created
+        assert len([p for p in (store.root / "blobs").rglob("*") if p.is_file()]) == 1
+
+    @pytest.mark.asyncio
+    async def test_upload_read_in_chunks(self, store):
+        """Test uploads are never read whole"""
+        upload = FakeUpload(b"v" * (2 * BLOB_CHUNK_SIZE + 10))
+
+        blob = await store.store_upload(upload)
+
+        assert blob.size == 2 * BLOB_CHUNK_SIZE + 10
+        assert upload.read_sizes == [BLOB_CHUNK_SIZE] * 4
+
+    @pytest.mark.asyncio
+    async def test_size_limit_discards_spool(self, store):
+        with pytest.raises(BlobTooLargeError):
+            await store.store_stream(chunked(b"x" * 6, b"x" * 6), max_size=10)
+
+        assert list(store.uploads_dir.iterdir()) == []
+        assert not (store.root / "blobs").exists()
+
+
+class TestResumableUpload:
+    @pytest.mark.asyncio
+    async def test_chunks_appended_and_completed(self, store):
+        upload_id = store.start_upload()
+
+        offset = await store.append_chunk(upload_id, 0, chunked(b"part one, "))
+        offset = await store.append_chunk(upload_id, offset, chunked(b"part two"))
+        blob = await store.complete_upload(
+            upload_id, hashlib.sha256(b"part one, part two").hexdigest()
+        )
+
+        assert offset == 18
+        assert store.blob_path(blob.sha256).read_bytes() == b"part one, part two"
+        with pytest.raises(UploadNotFoundError):
+            store.upload_offset(upload_id)
+
+    @pytest.mark.asyncio
+    async def test_wrong_offset_rejected(self, store):
+        upload_id = store.start_upload()
+        await store.append_chunk(upload_id, 0, chunked(b"12345"))
+
+        with pytest.raises(UploadOffsetError) as exc_info:
+            await store.append_chunk(upload_id, 0, chunked(b"12345"))
+
+        assert exc_info.value.expected_offset == 5
+        assert store.upload_offset(upload_id) == 5
+
+    @pytest.mark.asyncio
+    async def test_interrupted_chunk_is_rolled_back(self, store):
+        """Test a dropped connection leaves the upload at its last offset"""
+        upload_id = store.start_upload()
+        await store.append_chunk(upload_id, 0, chunked(b"12345"))
+
+        async def dropped():
+            yield b"678"
+            raise ConnectionResetError
+
+        with pytest.raises(ConnectionResetError):
+            await store.append_chunk(upload_id, 5, dropped())
+
+        assert store.upload_offset(upload_id) == 5
+
+    @pytest.mark.asyncio
+    async def test_checksum_mismatch(self, store):
+        upload_id = store.start_upload()
+        await store.append_chunk(upload_id, 0, chunked(b"content"))
+
+        with pytest.raises(ChecksumMismatchError):
+            await store.complete_upload(upload_id, "0" * 64)
+
+        assert store.upload_offset(upload_id) == 7
+
+    @pytest.mark.asyncio
+    async def test_concurrent_chunks_serialised(self, store):
+        """Test two requests at the same offset cannot both append"""
+        upload_id = store.start_upload()
+        release = asyncio.Event()
+
+        async def slow():
+            yield b"12"
+            await release.wait()
+            yield b"345"
+
+        first = asyncio.create_task(store.append_chunk(upload_id, 0, slow()))
+        second = asyncio.create_task(store.append_chunk(upload_id, 0, chunked(b"abc")))
+        await asyncio.sleep(0.01)
+        release.set()
+
+        assert await first == 5
+        with pytest.raises(UploadOffsetError) as exc_info:
+            await second
+        assert exc_info.value.expected_offset == 5
+        blob = await store.complete_upload(upload_id)
+        assert store.blob_path(blob.sha256).read_bytes() == b"12345"
+
+    @pytest.mark.asyncio
+    async def test_chunks_beyond_size_limit_rejected(self, store):
+        upload_id = store.start_upload()
+        await store.append_chunk(upload_id, 0, chunked(b"x" * 8), max_size=10)
+
+        with pytest.raises(BlobTooLargeError):
+            await store.append_chunk(upload_id, 8, chunked(b"x" * 3), max_size=10)
+
+        assert store.upload_offset(upload_id) == 8
+
+    def test_stale_uploads_expired(self, store):
+        stale = store.start_upload()
+        old = time.time() - UPLOAD_MAX_AGE_SECONDS - 60
+        os.utime(store.uploads_dir / stale, (old, old))
+
+        fresh = store.start_upload()
+
+        with pytest.raises(UploadNotFoundError):
+            store.upload_offset(stale)
+        assert store.upload_offset(fresh) == 0
+        assert store.expire_stale_uploads() == 0
+
+    def test_upload_ids_cannot_escape_store(self, store):
+        with pytest.raises(UploadNotFoundError):
+            store.upload_offset("../../etc/passwd")
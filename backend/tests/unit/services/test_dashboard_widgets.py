@@ -0,0 +1,240 @@
+"""Tests for concurrent dashboard widget resolution."""
+
+import asyncio
+from datetime import datetime
+from decimal import Decimal
+from functools import partial
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import app.crud.analytics_v31 as analytics_crud
+from app.crud.analytics_v31 import AnalyticsService
+from app.models.analytics_extended import (
+    AggregationType,
+    AnalyticsDashboard,
+    AnalyticsDataPoint,
+    AnalyticsMetric,
+    AnalyticsType,
+    DashboardType,
+    MetricType,
+    PeriodType,
+)
+from app.models.base import Base
+from app.services.dashboard_widgets import (
+    DashboardViewCounter,
+    SingleFlight,
+    WidgetCache,
+    resolve_widgets,
+    widget_query,
+)
+
+TABLES = {
+    "organizations",
+    "users",
+    "analytics_data_sources",
+    "analytics_metrics",
+    "analytics_data_points",
+    "analytics_dashboards",
+}
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    # A file database so widget queries on worker threads get own connections
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'analytics.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    Base.metadata.create_all(
+        engine, tables=[t for t in Base.metadata.sorted_tables if t.name in TABLES]
+    )
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def dashboard(session_factory):
+    db = session_factory()
+    for code, value in [("revenue", "1250.5"), ("orders", "42")]:
+        db.add(
+            AnalyticsMetric(
+                id=code,
+                organization_id="org-1",
+                name=code.title(),
+                code=code,
+                metric_type=MetricType.KPI,
+                analytics_type=AnalyticsType.FINANCIAL,
+                aggregation_type=AggregationType.SUM,
+                calculation_formula=f"SUM({code})",
+                created_by="user-1",
+            )
+        )
+        db.add(
+            AnalyticsDataPoint(
+                organization_id="org-1",
+                metric_id=code,
+                timestamp=datetime(2026, 10, 18, 9),
+                period_type=PeriodType.DAY,
+                value=Decimal(value),
+            )
+        )
+    widgets = [
+        {"id": f"w{n}", "type": "metric", "metric_id": ("revenue", "orders")[n % 2]}
+        for n in range(6)
+    ]
+    widgets.append({"id": "w6", "type": "metric", "metric_id": "missing"})
+    db.add(
+        AnalyticsDashboard(
+            id="dash-1",
+            organization_id="org-1",
+            name="Sales",
+            slug="sales",
+            dashboard_type=DashboardType.EXECUTIVE,
+            widgets=widgets,
+            refresh_interval=300,
+            view_count=0,
+            created_by="user-1",
+        )
+    )
+    db.commit()
+    db.close()
+    return "dash-1"
+
+
+@pytest.fixture
+def views(session_factory, monkeypatch):
+    counter = DashboardViewCounter(session_factory, flush_interval=3600)
+    monkeypatch.setattr(analytics_crud, "dashboard_views", counter)
+    yield counter
+    counter.stop()
+
+
+class MetricQueryCounter:
+    """Counts SELECTs on analytics_metrics across all connections."""
+
+    def __init__(self, engine) -> None:
+        self.engine = engine
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += "FROM analytics_metrics" in statement
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self)
+
+
+class TestResolveWidgets:
+    """Test the concurrency cap, result order and query sharing."""
+
+    def test_queries_run_concurrently_up_to_cap(self):
+        running = 0
+        peak = 0
+
+        async def query(widget):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01 * (5 - widget % 5))
+            running -= 1
+            return widget * 10
+
+        async def resolve(widget):
+            return await widget_query(("widget", widget), partial(query, widget))
+
+        results = asyncio.run(resolve_widgets(range(12), resolve, concurrency=4))
+
+        assert results == [n * 10 for n in range(12)]
+        assert peak == 4
+
+    def test_single_flight_shares_in_flight_call(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def query():
+            calls.append(True)
+            await asyncio.sleep(0.01)
+            return ["row"]
+
+        async def run():
+            shared = await asyncio.gather(
+                *(flight.do(("sales", 30), query) for _ in range(5))
+            )
+            again = await flight.do(("sales", 30), query)
+            return shared, again
+
+        shared, again = asyncio.run(run())
+
+        assert shared == [["row"]] * 5
+        assert again == ["row"]
+        # Five concurrent callers shared one call; the later one ran anew
+        assert len(calls) == 2
+
+    def test_widget_cache_expires_and_evicts(self):
+        now = [0.0]
+        cache = WidgetCache(max_entries=2, clock=lambda: now[0])
+        cache.put("a", {"value": 1}, ttl=60)
+        cache.put("b", {"value": 2}, ttl=300)
+        cache.put("skipped", {"value": 0}, ttl=0)
+
+        now[0] = 59
+        assert cache.get("a") == {"value": 1}
+        assert cache.get("skipped") is None
+        cache.put("c", {"value": 3}, ttl=300)
+        # "b" was the least recently used
+        assert cache.get("b") is None
+
+        now[0] = 60
+        assert cache.get("a") is None
+        assert cache.get("c") == {"value": 3}
+
+
+class TestAnalyticsDashboardData:
+    """Test dashboard rendering in the analytics service."""
+
+    def test_widgets_share_metric_queries_and_cache(
+        self, session_factory, dashboard, views
+    ):
+        service = AnalyticsService(session_factory, widget_concurrency=3)
+        db = session_factory()
+        engine = db.get_bind()
+
+        with MetricQueryCounter(engine) as counter:
+            first = asyncio.run(service.get_dashboard_data(db, dashboard))
+        # One lookup per distinct metric, not per widget
+        assert counter.count == 3
+
+        data = first["widget_data"]
+        assert list(data) == [f"w{n}" for n in range(7)]
+        assert data["w0"]["data"]["current_value"] == 1250.5
+        assert data["w1"]["data"]["current_value"] == 42.0
+        assert data["w2"] == data["w0"]
+        assert data["w6"]["status"] == "metric_not_found"
+
+        with MetricQueryCounter(engine) as counter:
+            second = asyncio.run(service.get_dashboard_data(db, dashboard))
+        # Widget data is served from cache within the refresh interval
+        assert counter.count == 0
+        assert second["widget_data"] == data
+        db.close()
+
+    def test_views_counted_without_commit(self, session_factory, dashboard, views):
+        service = AnalyticsService(session_factory)
+        db = session_factory()
+
+        for _ in range(3):
+            asyncio.run(service.get_dashboard_data(db, dashboard))
+        assert not db.dirty
+        assert db.get(AnalyticsDashboard, dashboard).view_count == 0
+
+        assert views.flush() == 1
+        db.expire_all()
+        stored = db.get(AnalyticsDashboard, dashboard)
+        assert stored.view_count == 3
+        assert stored.last_viewed_at is not None
+        db.close()
@@ -0,0 +1,161 @@
+"""Tests for the shared document number allocator."""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.models.document_sequence import DocumentSequence
+from app.services.document_numbers import (
+    CYCLE_COUNT,
+    JOURNAL_ENTRY,
+    PURCHASE_ORDER,
+    DocumentNumberAllocator,
+)
+
+WRITERS = 64
+NUMBERS_PER_WRITER = 25
+ON = datetime(2026, 10, 21, 9, 30)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    # A file database so every thread gets its own connection
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'sequences.db'}",
+        connect_args={"timeout": 30, "check_same_thread": False},
+    )
+    DocumentSequence.__table__.create(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def run_writers(writer):
+    start = threading.Barrier(WRITERS)
+
+    def run(index):
+        start.wait()
+        return writer(index)
+
+    with ThreadPoolExecutor(max_workers=WRITERS) as pool:
+        return list(pool.map(run, range(WRITERS)))
+
+
+class TestDocumentNumberAllocator:
+    """Test uniqueness, gap policies and seeding of document numbers."""
+
+    def test_block_numbers_unique_across_writers_and_workers(self, session_factory):
+        series = replace(CYCLE_COUNT, block_size=10)
+        # Two allocators stand in for two worker processes sharing the table
+        workers = [DocumentNumberAllocator(session_factory) for _ in range(2)]
+
+        def writer(index):
+            allocator = workers[index % 2]
+            return [
+                allocator.allocate(series, "wh-1", on=ON)
+                for _ in range(NUMBERS_PER_WRITER)
+            ]
+
+        numbers = [n for batch in run_writers(writer) for n in batch]
+
+        assert len(numbers) == WRITERS * NUMBERS_PER_WRITER
+        assert len(set(numbers)) == len(numbers)
+        # Only the unused tail of each worker's last block is skipped
+        assert max(numbers) <= len(numbers) + 2 * series.block_size
+
+        db = session_factory()
+        rows = db.scalars(select(DocumentSequence)).all()
+        assert [(r.scope, r.series, r.period) for r in rows] == [
+            ("wh-1", "cycle_count", "202610")
+        ]
+        # Whole blocks were reserved and every reserved number was handed out
+        # except what is still cached in the workers
+        reserved = rows[0].next_value - 1
+        cached = sum(end - next_ for w in workers for next_, end in w._blocks.values())
+        assert reserved % series.block_size == 0
+        assert reserved == len(numbers) + cached
+        db.close()
+
+    def test_gapless_numbers_consecutive_under_concurrency(self, session_factory):
+        allocator = DocumentNumberAllocator(session_factory)
+
+        def writer(index):
+            db = session_factory()
+            try:
+                number = allocator.next_number(JOURNAL_ENTRY, "org-1", on=ON, db=db)
+                db.commit()
+                return number
+            finally:
+                db.close()
+
+        numbers = run_writers(writer)
+
+        assert sorted(numbers) == [f"JE202610{n:04d}" for n in range(1, WRITERS + 1)]
+
+    def test_gapless_rollback_returns_number(self, session_factory):
+        allocator = DocumentNumberAllocator(session_factory)
+        db = session_factory()
+
+        assert allocator.allocate(JOURNAL_ENTRY, "org-1", on=ON, db=db) == 1
+        db.rollback()
+        assert allocator.allocate(JOURNAL_ENTRY, "org-1", on=ON, db=db) == 1
+        db.commit()
+        assert allocator.allocate(JOURNAL_ENTRY, "org-1", on=ON, db=db) == 2
+        db.close()
+
+        with pytest.raises(ValueError, match="caller's transaction"):
+            allocator.allocate(JOURNAL_ENTRY, "org-1", on=ON)
+
+    def test_series_scoped_by_owner_and_period(self, session_factory):
+        allocator = DocumentNumberAllocator(session_factory)
+
+        assert allocator.next_number(CYCLE_COUNT, "wh-1", on=ON) == "CC-202610-0001"
+        assert allocator.next_number(CYCLE_COUNT, "wh-1", on=ON) == "CC-202610-0002"
+        assert allocator.next_number(CYCLE_COUNT, "wh-2", on=ON) == "CC-202610-0001"
+        assert (
+            allocator.next_number(CYCLE_COUNT, "wh-1", on=datetime(2026, 11, 1))
+            == "CC-202611-0001"
+        )
+
+    def test_seed_continues_legacy_numbering(self, session_factory):
+        allocator = DocumentNumberAllocator(session_factory)
+        seeded = []
+
+        def legacy_highest():
+            seeded.append(True)
+            return 41
+
+        numbers = [
+            allocator.next_number(CYCLE_COUNT, "wh-1", on=ON, seed=legacy_highest)
+            for _ in range(3)
+        ]
+
+        assert numbers == ["CC-202610-0042", "CC-202610-0043", "CC-202610-0044"]
+        assert seeded == [True]
+
+    def test_async_numbers_served_from_block(self, session_factory):
+        allocator = DocumentNumberAllocator(session_factory)
+        seeded = []
+
+        async def legacy_counter():
+            seeded.append(True)
+            return 7
+
+        async def allocate_many():
+            return [
+                await allocator.next_number_async(
+                    PURCHASE_ORDER, "*", on=ON, seed=legacy_counter
+                )
+                for _ in range(PURCHASE_ORDER.block_size + 1)
+            ]
+
+        numbers = asyncio.run(allocate_many())
+
+        assert numbers[0] == "PO-20261021-000008"
+        assert numbers[-1] == f"PO-20261021-{PURCHASE_ORDER.block_size + 8:06d}"
+        assert seeded == [True]
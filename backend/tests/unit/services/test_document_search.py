@@ -0,0 +1,280 @@
+"""
+Tests for the document full-text search service
+"""
+
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.document_extended import DocumentStatus
+from app.services import document_search
+from app.services.document_search import (
+    InMemoryDocumentSearch,
+    PostgresDocumentSearch,
+    get_document_search_backend,
+    highlight,
+    query_terms,
+)
+
+
+def document(document_id, title="", description=None, extracted_text=None, **kw):
+    return SimpleNamespace(
+        id=document_id,
+        organization_id=kw.get("organization_id", "org-1"),
+        title=title,
+        description=description,
+        filename=kw.get("filename", f"{document_id}.pdf"),
+        extracted_text=extracted_text,
+        ocr_text=kw.get("ocr_text"),
+        status=kw.get("status", DocumentStatus.PUBLISHED),
+    )
+
+
+def fields(doc):
+    return {field: getattr(doc, field) for field in document_search.SEARCH_FIELDS}
+
+
+def row(doc):
+    return (doc.id, doc.organization_id, doc.status, *fields(doc).values())
+
+
+def stats_result(count, latest_change):
+    result = Mock()
+    result.one.return_value = (count, latest_change)
+    return result
+
+
+def synced_db(index):
+    """Session whose freshness check reports the index as current"""
+    db = Mock(spec=Session)
+    db.execute.return_value = stats_result(index.document_count, None)
+    return db
+
+
+def filtered_query(documents):
+    """Query mock returning the documents whose ids are requested"""
+    query = Mock()
+
+    def filter_ids(condition):
+        requested = set(condition.right.value)
+        result = Mock()
+        result.all.return_value = [d for d in documents if d.id in requested]
+        return result
+
+    query.filter.side_effect = filter_ids
+    return query
+
+
+class TestInMemoryDocumentSearch:
+    @pytest.fixture
+    def documents(self):
+        return [
+            document("d1", "Quarterly invoice report", "Invoices for Q3"),
+            document("d2", "Travel policy", extracted_text="Submit invoice copies"),
+            document("d3", "Invoice template", "Standard invoicing layout"),
+            document("d4", "Invoice archive", "Old invoices", organization_id="org-2"),
+        ]
+
+    @pytest.fixture
+    def index(self, documents):
+        index = InMemoryDocumentSearch()
+        for doc in documents:
+            index.add(doc.id, doc.organization_id, fields(doc))
+        index.loaded = True
+        return index
+
+    def test_title_matches_rank_above_body_matches(self, index):
+        """Test BM25 with field weights prefers title hits"""
+        scores = index.score(["invoice"], "org-1")
+
+        assert set(scores) == {"d1", "d2", "d3"}
+        assert scores["d3"] > scores["d2"]
+        assert scores["d1"] > scores["d2"]
+
+    def test_prefix_matching(self, index):
+        """Test query terms match indexed words by prefix"""
+        scores = index.score(["invoic"], "org-1")
+
+        assert set(scores) == {"d1", "d2", "d3"}
+
+    def test_all_terms_required(self, index):
+        """Test multi-term queries use AND semantics"""
+        assert set(index.score(["invoice", "template"], "org-1")) == {"d3"}
+        assert index.score(["invoice", "payroll"], "org-1") == {}
+
+    def test_organization_isolation(self, index):
+        """Test other organizations' documents are never returned"""
+        assert "d4" not in index.score(["invoice"], "org-1")
+        assert set(index.score(["invoice"], "org-2")) == {"d4"}
+
+    def test_reindex_and_remove(self, index):
+        """Test updates replace postings and removals drop them"""
+        index.add("d2", "org-1", fields(document("d2", "Travel policy")))
+        assert "d2" not in index.score(["invoice"], "org-1")
+
+        index.remove("d3")
+        assert set(index.score(["invoice"], "org-1")) == {"d1"}
+        assert index.document_count == 3
+
+    def test_search_pages_and_highlights(self, index, documents):
+        """Test ranked pagination through the filtered query"""
+        query = filtered_query(documents)
+
+        page = index.search(synced_db(index), query, "org-1", ["invoice"], 0, 2)
+
+        # Title matches outrank the body-only match
+        assert {d.id for d in page} == {"d1", "d3"}
+        assert page[0].search_score >= page[1].search_score
+        template = next(d for d in page if d.id == "d3")
+        assert template.search_highlights[0] == "<mark>Invoice</mark> template"
+
+        next_page = index.search(synced_db(index), query, "org-1", ["invoice"], 2, 2)
+        assert [d.id for d in next_page] == ["d2"]
+
+    def test_filters_applied_by_query(self, index, documents):
+        """Test documents rejected by the SQL filters are skipped"""
+        query = filtered_query([d for d in documents if d.id != "d3"])
+
+        page = index.search(synced_db(index), query, "org-1", ["invoice"], 0, 10)
+
+        assert [d.id for d in page] == ["d1", "d2"]
+        assert page[0].search_score > page[1].search_score
+
+    def test_initial_load_from_database(self, documents):
+        """Test the index is built from the database on first search"""
+        db = Mock(spec=Session)
+        db.execute.side_effect = [
+            stats_result(4, "t1"),
+            [row(doc) for doc in documents],
+            stats_result(4, "t1"),
+        ]
+        index = InMemoryDocumentSearch()
+
+        index.refresh(db)
+        index.refresh(db)
+
+        assert index.document_count == 4
+        # The second refresh only runs the freshness check
+        assert db.execute.call_count == 3
+
+    def test_refresh_picks_up_outside_writes(self, index, documents):
+        """Test rows changed by another process are re-read"""
+        index.refresh(synced_db(index))
+        renamed = document("d2", "Invoice policy")
+        deleted = document("d3", status=DocumentStatus.DELETED)
+        db = Mock(spec=Session)
+        db.execute.side_effect = [stats_result(3, "t2"), [row(renamed), row(deleted)]]
+
+        index.refresh(db)
+
+        assert set(index.score(["invoice"], "org-1")) == {"d1", "d2"}
+        assert index.document_count == 3
+
+    def test_refresh_rebuilds_on_count_mismatch(self, index, documents):
+        """Test hard deletes elsewhere trigger a full rebuild"""
+        db = Mock(spec=Session)
+        db.execute.side_effect = [
+            stats_result(2, None),
+            [row(doc) for doc in documents[:2]],
+        ]
+
+        index.refresh(db)
+
+        assert index.document_count == 2
+        assert set(index.score(["invoice"], "org-1")) == {"d1", "d2"}
+
+    def test_index_document_before_load_is_deferred(self, documents):
+        """Test writes before the first search wait for the initial load"""
+        index = InMemoryDocumentSearch()
+
+        index.index_document(Mock(spec=Session), documents[0])
+
+        assert index.document_count == 0
+
+    def test_index_document_removes_deleted(self, index, documents):
+        """Test a soft-deleted document leaves the index"""
+        index.index_document(
+            Mock(spec=Session), document("d1", status=DocumentStatus.DELETED)
+        )
+
+        assert "d1" not in index.score(["invoice"], "org-1")
+
+
+class TestSearchHelpers:
+    def test_query_terms(self):
+        assert query_terms("Invoice  REPORT, invoice-2024") == [
+            "invoice",
+            "report",
+            "2024",
+        ]
+        assert query_terms(None) == []
+
+    def test_highlight_fragments(self):
+        text = "Payment terms. " + "x " * 200 + "Invoices are due in 30 days."
+
+        fragments = highlight(text, ["invoice"], fragment_chars=40)
+
+        assert len(fragments) == 1
+        assert "<mark>Invoices</mark>" in fragments[0]
+        assert fragments[0].startswith("...")
+
+    def test_highlight_escapes_text(self):
+        text = "<script>alert(1)</script> Invoice & receipt"
+
+        [fragment] = highlight(text, ["invoice", "script"])
+
+        assert fragment == (
+            "&lt;<mark>script</mark>&gt;alert(1)&lt;/<mark>script</mark>&gt; "
+            "<mark>Invoice</mark> &amp; receipt"
+        )
+
+    def test_postgres_headline_escaped(self):
+        backend = PostgresDocumentSearch()
+        query = Mock()
+        # Every query builder step returns the same mock
+        for step in ("filter", "add_columns", "order_by", "offset", "limit"):
+            getattr(query, step).return_value = query
+        query.all.return_value = [(document("d1"), 0.5)]
+        db = Mock(spec=Session)
+        db.execute.return_value.all.return_value = [
+            ("d1", "<b>\x02Invoice\x03</b> total")
+        ]
+
+        [result] = backend.search(db, query, "org-1", ["invoice"])
+
+        assert result.search_highlights == [
+            "&lt;b&gt;<mark>Invoice</mark>&lt;/b&gt; total"
+        ]
+
+    def test_backend_selection(self):
+        """Test auto mode follows the database dialect"""
+        postgres_db = Mock(spec=Session)
+        postgres_db.get_bind.return_value.dialect.name = "postgresql"
+        sqlite_db = Mock(spec=Session)
+        sqlite_db.get_bind.return_value.dialect.name = "sqlite"
+
+        with patch.object(document_search, "_backends", {}):
+            with patch.object(
+                document_search.settings, "DOCUMENT_SEARCH_BACKEND", "auto"
+            ):
+                assert isinstance(
+                    get_document_search_backend(postgres_db), PostgresDocumentSearch
+                )
+                backend = get_document_search_backend(sqlite_db)
+                assert isinstance(backend, InMemoryDocumentSearch)
+                assert get_document_search_backend(sqlite_db) is backend
+
+            with patch.object(
+                document_search.settings, "DOCUMENT_SEARCH_BACKEND", "memory"
+            ):
+                assert isinstance(
+                    get_document_search_backend(postgres_db), InMemoryDocumentSearch
+                )
+
+            with patch.object(
+                document_search.settings, "DOCUMENT_SEARCH_BACKEND", "elastic"
+            ):
+                with pytest.raises(ValueError):
+                    get_document_search_backend(sqlite_db)
@@ -0,0 +1,101 @@
+"""
+Tests for the process-pool media workers
+"""
+
+import time
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+from PIL.JpegImagePlugin import JpegImageFile
+
+from app.services.media_processing import (
+    MediaJobTimeoutError,
+    MediaWorkerPool,
+    render_image_variants,
+)
+
+IMAGE_SIZES = {
+    "thumbnail": (150, 150),
+    "small": (300, 300),
+    "large": (1200, 1200),
+    "original": None,
+}
+
+
+def sample_image(path, size, image_format):
+    Image.linear_gradient("L").resize(size).convert("RGB").save(path, image_format)
+    return str(path)
+
+
+class TestRenderImageVariants:
+    def test_variants_written_from_single_decode(self, tmp_path):
+        source = sample_image(tmp_path / "photo.jpg", (4000, 3000), "JPEG")
+
+        with patch.object(Image, "open", wraps=Image.open) as opened:
+            result = render_image_variants(
+                str(tmp_path), source, "abc", ".jpg", IMAGE_SIZES
+            )
+
+        opened.assert_called_once()
+        assert result["dimensions"] == {"width": 4000, "height": 3000}
+        assert result["metadata"]["format"] == "JPEG"
+        assert [v["variant_name"] for v in result["variants"]] == [
+            "large",
+            "small",
+            "thumbnail",
+        ]
+        for variant in result["variants"]:
+            path = tmp_path / variant["file_path"]
+            with Image.open(path) as written:
+                assert written.format == "JPEG"
+                assert written.size == (
+                    variant["dimensions"]["width"],
+                    variant["dimensions"]["height"],
+                )
+            assert variant["file_size"] == path.stat().st_size
+        assert result["variants"][0]["file_path"] == "variants/abc_large.jpg"
+
+    def test_large_jpeg_decoded_at_reduced_scale(self, tmp_path):
+        """Test small variants do not need a full-resolution decode"""
+        source = sample_image(tmp_path / "scan.jpg", (4000, 3200), "JPEG")
+        decoded = []
+        original_draft = JpegImageFile.draft
+
+        def record_draft(image, mode, size):
+            result = original_draft(image, mode, size)
+            decoded.append(image.size)
+            return result
+
+        with patch.object(JpegImageFile, "draft", record_draft):
+            render_image_variants(
+                str(tmp_path), source, "scan", ".jpg", {"small": (300, 300)}
+            )
+
+        # 600x600 with headroom fits in a 1/4 scale decode
+        assert decoded == [(1000, 800)]
+
+    def test_png_variants(self, tmp_path):
+        source = sample_image(tmp_path / "logo.png", (800, 400), "PNG")
+
+        result = render_image_variants(
+            str(tmp_path), source, "logo", ".png", {"thumbnail": (150, 150)}
+        )
+
+        assert result["variants"][0]["dimensions"] == {"width": 150, "height": 150}
+        assert result["variants"][0]["format"] == "PNG"
+
+
+class TestMediaWorkerPool:
+    @pytest.mark.asyncio
+    async def test_timeout_terminates_job_and_pool_recovers(self):
+        pool = MediaWorkerPool(max_workers=1)
+        try:
+            started = time.perf_counter()
+            with pytest.raises(MediaJobTimeoutError):
+                await pool.run(time.sleep, 30, timeout=0.5)
+            assert time.perf_counter() - started < 10
+
+            assert await pool.run(pow, 2, 10, timeout=30) == 1024
+        finally:
+            pool.shutdown()
@@ -0,0 +1,263 @@
+"""Tests for analytics metric rollups, retention and range queries."""
+
+import asyncio
+import random
+import statistics
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.crud.analytics_v31 import AnalyticsService
+from app.models.analytics_extended import (
+    AggregationType,
+    AnalyticsDataPoint,
+    AnalyticsMetric,
+    AnalyticsRollup,
+    AnalyticsType,
+    MetricType,
+    PeriodType,
+)
+from app.models.base import Base
+from app.services.metric_timeseries import (
+    DAILY,
+    FIVE_MINUTES,
+    HOURLY,
+    RAW,
+    MetricRollupJob,
+    MetricTimeSeries,
+    QuantileSketch,
+)
+
+TABLES = {
+    "organizations",
+    "users",
+    "analytics_data_sources",
+    "analytics_metrics",
+    "analytics_data_points",
+    "analytics_rollups",
+}
+START = datetime(2026, 10, 17, 22)
+NOW = datetime(2026, 10, 18, 1, 2)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(
+        engine, tables=[t for t in Base.metadata.sorted_tables if t.name in TABLES]
+    )
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def add_points(db, metric_id, start, minutes, period_type=PeriodType.DAY):
+    for minute in range(minutes):
+        db.add(
+            AnalyticsDataPoint(
+                organization_id="org-1",
+                metric_id=metric_id,
+                timestamp=start + timedelta(minutes=minute),
+                period_type=period_type,
+                value=Decimal(minute),
+            )
+        )
+    db.commit()
+
+
+def add_metric(db, metric_id):
+    metric = AnalyticsMetric(
+        id=metric_id,
+        organization_id="org-1",
+        name=metric_id.title(),
+        code=metric_id,
+        metric_type=MetricType.KPI,
+        analytics_type=AnalyticsType.OPERATIONAL,
+        aggregation_type=AggregationType.AVERAGE,
+        calculation_formula=f"AVG({metric_id})",
+        created_by="user-1",
+    )
+    db.add(metric)
+    db.commit()
+    return metric
+
+
+@pytest.fixture
+def metric(db):
+    metric = add_metric(db, "latency")
+    # One point a minute from 22:00 to 00:59, across midnight
+    add_points(db, "latency", START, 180)
+    return metric
+
+
+def rollups(db, resolution):
+    return {
+        row.bucket_start: row
+        for row in db.query(AnalyticsRollup).filter(
+            AnalyticsRollup.resolution == resolution.name
+        )
+    }
+
+
+class TestQuantileSketch:
+    """Test sketch accuracy and merging."""
+
+    def test_quantiles_within_relative_accuracy(self):
+        generator = random.Random(7)
+        values = [generator.gauss(100, 80) for _ in range(5000)]
+        sketch = QuantileSketch()
+        for value in values:
+            sketch.add(value)
+
+        ordered = sorted(values)
+        for q in (0.05, 0.25, 0.5, 0.75, 0.99):
+            expected = ordered[int(q * (len(values) - 1))]
+            assert sketch.quantile(q) == pytest.approx(
+                expected, rel=QuantileSketch.RELATIVE_ACCURACY
+            )
+
+    def test_merged_sketch_equals_sketch_of_all_values(self):
+        left, right, both = QuantileSketch(), QuantileSketch(), QuantileSketch()
+        for value in range(-50, 50):
+            (left if value % 2 else right).add(value)
+            both.add(value)
+        left.merge(QuantileSketch.from_json(right.to_json()))
+
+        assert left.to_json() == both.to_json()
+        assert QuantileSketch().quantile(0.5) is None
+
+
+class TestRollUp:
+    """Test folding data points into buckets."""
+
+    def test_roll_up_fills_every_resolution(self, db, metric):
+        series = MetricTimeSeries(db, clock=lambda: NOW)
+
+        assert series.roll_up(metric) == 180
+        assert metric.rollup_watermark == datetime(2026, 10, 18, 1)
+
+        assert len(rollups(db, FIVE_MINUTES)) == 36
+        hourly = rollups(db, HOURLY)
+        assert sorted(hourly) == [START + timedelta(hours=n) for n in range(3)]
+        last_hour = hourly[datetime(2026, 10, 18)]
+        assert (last_hour.count, last_hour.sum_value) == (60, sum(range(120, 180)))
+        assert (last_hour.min_value, last_hour.max_value) == (120, 179)
+
+        daily = rollups(db, DAILY)
+        assert [daily[day].count for day in sorted(daily)] == [120, 60]
+
+        # Nothing new before the next 5-minute boundary
+        assert series.roll_up(metric) == 0
+
+    def test_later_points_merge_into_existing_buckets(self, db, metric):
+        MetricTimeSeries(db, clock=lambda: NOW).roll_up(metric)
+        add_points(db, "latency", datetime(2026, 10, 18, 1), 30)
+
+        later = datetime(2026, 10, 18, 1, 31)
+        assert MetricTimeSeries(db, clock=lambda: later).roll_up(metric) == 30
+
+        day = rollups(db, DAILY)[datetime(2026, 10, 18)]
+        assert day.count == 90
+        assert day.max_value == 179
+        assert rollups(db, HOURLY)[datetime(2026, 10, 18, 1)].count == 30
+
+    def test_roll_up_capped_per_call(self, db, metric):
+        series = MetricTimeSeries(db, clock=lambda: NOW)
+
+        # Only the first day; the watermark stops at its end
+        assert series.roll_up(metric, max_days=1) == 120
+        assert metric.rollup_watermark == datetime(2026, 10, 18)
+        assert series.roll_up(metric, max_days=1) == 60
+        assert metric.rollup_watermark == datetime(2026, 10, 18, 1)
+
+    def test_job_rolls_up_every_metric(self, db, metric):
+        add_metric(db, "errors")
+        add_points(db, "errors", START, 10)
+        job = MetricRollupJob(session_factory=lambda: db, clock=lambda: NOW)
+
+        assert job.run_once(db) == 190
+        assert job.run_once(db) == 0
+
+
+class TestSeries:
+    """Test range queries and retention."""
+
+    def test_series_uses_coarsest_sufficient_resolution(self, db, metric):
+        series = MetricTimeSeries(db, clock=lambda: NOW)
+        series.roll_up(metric)
+
+        hourly = series.get_series(metric, START, NOW, step=timedelta(hours=1))
+        assert hourly["resolution"] == HOURLY.name
+        first = hourly["points"][0]
+        assert first["count"] == 60
+        assert first["avg"] == 29.5
+        assert first["median"] == pytest.approx(29.5, rel=0.05)
+        assert first["std_deviation"] == pytest.approx(statistics.pstdev(range(60)))
+
+        fine = series.get_series(metric, START, NOW, step=timedelta(minutes=10))
+        assert fine["resolution"] == FIVE_MINUTES.name
+        assert len(fine["points"]) == 36
+        assert series.get_series(metric, START, NOW)["resolution"] == RAW.name
+
+        # 5-minute buckets are gone after 30 days
+        old = NOW - timedelta(days=60)
+        assert series.pick_resolution(metric, old, timedelta(minutes=10), NOW) is HOURLY
+
+    def test_series_includes_points_not_rolled_up(self, db, metric):
+        series = MetricTimeSeries(db, clock=lambda: NOW)
+        series.roll_up(metric)
+        add_points(db, "latency", datetime(2026, 10, 18, 1), 2)
+
+        result = series.get_series(metric, START, NOW, step=timedelta(days=1))
+
+        assert result["resolution"] == DAILY.name
+        assert [point["count"] for point in result["points"]] == [120, 62]
+
+    def test_retention_keeps_points_not_rolled_up(self, db, metric):
+        metric.retention_policy = {"raw": 0, "5m": 0}
+        series = MetricTimeSeries(db, clock=lambda: NOW)
+
+        # The first roll-up completes a day and applies retention
+        series.roll_up(metric, until=datetime(2026, 10, 17, 23))
+
+        assert db.query(AnalyticsDataPoint).count() == 120
+        assert rollups(db, FIVE_MINUTES) == {}
+        assert rollups(db, HOURLY)[START].count == 60
+        assert series.enforce_retention(metric) == {"raw": 0, "5m": 0, "1h": 0}
+
+
+class TestMetricTrends:
+    """Test trends in the analytics service."""
+
+    def test_hourly_trend_read_from_rollups(self, db):
+        metric = add_metric(db, "throughput")
+        hour = HOURLY.bucket_start(datetime.utcnow())
+        add_points(db, "throughput", hour - timedelta(hours=3), 180, PeriodType.HOUR)
+        # Daily values of the same metric stay out of the hourly trend
+        add_points(db, "throughput", hour - timedelta(hours=3), 30, PeriodType.DAY)
+        MetricTimeSeries(db).roll_up(metric)
+        # Not rolled up yet
+        add_points(db, "throughput", datetime.utcnow(), 1, PeriodType.HOUR)
+        add_points(db, "throughput", datetime.utcnow(), 1, PeriodType.DAY)
+
+        trends = asyncio.run(
+            AnalyticsService().get_metric_trends(
+                db, "throughput", PeriodType.HOUR, period_count=5
+            )
+        )
+
+        assert [trend["count"] for trend in trends] == [60, 60, 60, 1]
+        assert trends[1]["value"] == 89.5
+        assert trends[1]["period_start"] == (hour - timedelta(hours=2)).isoformat()
+        assert trends[1]["period_end"] == (hour - timedelta(hours=1)).isoformat()
+
+        # The daily values have buckets of their own
+        day_buckets = db.query(AnalyticsRollup).filter(
+            AnalyticsRollup.resolution == HOURLY.name,
+            AnalyticsRollup.period_type == PeriodType.DAY,
+        )
+        assert [row.count for row in day_buckets] == [30]
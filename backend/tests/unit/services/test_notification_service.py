@@ -0,0 +1,257 @@
+"""
+Unit tests for notification queue processing, fan-out and template caching
+"""
+
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.crud.notification_v31 import (
+    CLAIM_TIMEOUT,
+    FANOUT_CHUNK_SIZE,
+    NotificationService,
+    compile_template,
+)
+from app.models.notification_extended import (
+    NotificationExtended,
+    NotificationQueue,
+    NotificationStatus,
+)
+
+
+def notification(notification_id=None):
+    return SimpleNamespace(
+        id=notification_id or str(uuid.uuid4()),
+        organization_id="org-123",
+        channels=[],
+        status=NotificationStatus.PENDING,
+        sent_at=None,
+    )
+
+
+def queue_item(notification_id, status="pending", attempts=0, max_attempts=3):
+    return SimpleNamespace(
+        id=str(uuid.uuid4()),
+        notification_id=notification_id,
+        status=status,
+        attempts=attempts,
+        max_attempts=max_attempts,
+        process_after=datetime.utcnow() - timedelta(minutes=1),
+        error_message=None,
+    )
+
+
+def queue_session(queue_items, notifications=()):
+    queue_query = MagicMock()
+    queue_query.filter.return_value.order_by.return_value.limit.return_value.with_for_update.return_value.all.return_value = queue_items
+
+    notification_query = MagicMock()
+    notification_query.filter.return_value.all.return_value = list(notifications)
+
+    session = MagicMock()
+    session.query.side_effect = lambda model: {
+        NotificationQueue: queue_query,
+        NotificationExtended: notification_query,
+    }[model]
+    return session, queue_query
+
+
+def announcement_rule(target_users):
+    return SimpleNamespace(
+        organization_id="org-123",
+        template_id="tmpl-announce",
+        notification_type=None,
+        priority_override=None,
+        channels=["in_app"],
+        target_users=target_users,
+        delay_seconds=0,
+        variable_mappings={},
+        execution_count=0,
+        success_count=0,
+        last_executed_at=None,
+    )
+
+
+def announcement_event():
+    return SimpleNamespace(
+        organization_id="org-123",
+        event_name="company_announcement",
+        event_type="broadcast",
+        event_data={"headline": "Office closed Friday"},
+        event_timestamp=datetime(2024, 1, 5, 9, 0),
+        source_system="hr",
+        entity_type=None,
+        entity_id=None,
+    )
+
+
+def announcement_template(message_template="{{headline}}"):
+    return SimpleNamespace(
+        id="tmpl-announce",
+        name="Announcement",
+        title_template="{{headline}}",
+        message_template=message_template,
+        html_template=None,
+        updated_at=None,
+        created_at=datetime(2024, 1, 1),
+    )
+
+
+class TestQueueClaim:
+    def test_claim_marks_batch_processing(self):
+        """Test claimed items are locked, batched and given a claim deadline"""
+        items = [queue_item("n1"), queue_item("n2")]
+        session, queue_query = queue_session(items)
+        started_at = datetime.utcnow()
+
+        claimed = NotificationService()._claim_queue_items(session, "default", 10)
+
+        assert claimed == items
+        queue_query.filter.return_value.order_by.return_value.limit.return_value.with_for_update.assert_called_once_with(
+            skip_locked=True
+        )
+        assert {item.status for item in items} == {"processing"}
+        assert len({item.batch_id for item in items}) == 1
+        assert all(item.batch_size == 2 for item in items)
+        assert all(item.process_after >= started_at + CLAIM_TIMEOUT for item in items)
+        session.commit.assert_called_once()
+
+    def test_stale_claim_is_reclaimed(self):
+        """Test items left processing past their deadline count an attempt"""
+        stale = queue_item("n1", status="processing", attempts=1)
+        session, _ = queue_session([stale])
+
+        claimed = NotificationService()._claim_queue_items(session, "default", 10)
+
+        assert claimed == [stale]
+        assert stale.status == "processing"
+        assert stale.attempts == 2
+        assert stale.error_message == "Processing timed out"
+
+    def test_stale_claim_out_of_attempts_fails(self):
+        """Test a reclaimed item with no attempts left is failed, not retried"""
+        stale = queue_item("n1", status="processing", attempts=2)
+        fresh = queue_item("n2")
+        session, _ = queue_session([stale, fresh])
+
+        claimed = NotificationService()._claim_queue_items(session, "default", 10)
+
+        assert claimed == [fresh]
+        assert stale.status == "failed"
+        assert fresh.batch_size == 1
+
+    def test_empty_claim_releases_locks(self):
+        session, _ = queue_session([])
+
+        assert NotificationService()._claim_queue_items(session, "default", 10) == []
+        session.commit.assert_called_once()
+
+
+class TestQueueProcessing:
+    @pytest.mark.asyncio
+    async def test_failed_items_are_requeued_not_sent(self):
+        """Test only notifications whose item completed are marked sent"""
+        ok, broken = notification("ok"), notification("broken")
+        ok_item, broken_item = queue_item("ok"), queue_item("broken")
+        session, _ = queue_session([ok_item, broken_item], [ok, broken])
+        service = NotificationService()
+
+        def build(target):
+            if target is broken:
+                raise ValueError("Unknown channel")
+            return []
+
+        service._build_deliveries = build
+        started_at = datetime.utcnow()
+
+        processed = await service.process_notification_queue(session)
+
+        assert processed == [ok]
+        assert ok_item.status == "completed"
+        assert ok.status == NotificationStatus.SENT
+        assert ok.sent_at is not None
+
+        assert broken_item.status == "pending"
+        assert broken_item.attempts == 1
+        assert broken_item.error_message == "Unknown channel"
+        assert broken_item.process_after >= started_at + timedelta(minutes=5)
+        assert broken.status == NotificationStatus.PENDING
+        assert broken.sent_at is None
+
+    @pytest.mark.asyncio
+    async def test_failed_item_out_of_attempts_stays_failed(self):
+        target = notification("n1")
+        item = queue_item("n1", attempts=2)
+        session, _ = queue_session([item], [target])
+        service = NotificationService()
+        service._build_deliveries = MagicMock(side_effect=ValueError("Bad address"))
+
+        assert await service.process_notification_queue(session) == []
+        assert item.status == "failed"
+        assert item.attempts == 3
+        assert target.status == NotificationStatus.PENDING
+
+
+class TestRuleFanout:
+    @pytest.mark.parametrize(
+        "recipients, chunks",
+        [
+            (1, 1),
+            (FANOUT_CHUNK_SIZE, 1),
+            (FANOUT_CHUNK_SIZE + 1, 2),
+            (2 * FANOUT_CHUNK_SIZE, 2),
+        ],
+    )
+    @pytest.mark.asyncio
+    async def test_one_queue_row_per_notification(self, recipients, chunks):
+        """Test chunk boundaries neither drop nor duplicate queue rows"""
+        session = MagicMock()
+        session.query.return_value.filter.return_value.first.return_value = (
+            announcement_template()
+        )
+        rule = announcement_rule([f"user-{i}" for i in range(recipients)])
+
+        notifications = await NotificationService()._generate_notifications_from_rule(
+            session, rule, announcement_event()
+        )
+
+        calls = session.execute.call_args_list
+        assert len(calls) == 2 * chunks
+        assert session.commit.call_count == chunks + 1
+        notification_rows = [row for call in calls[0::2] for row in call[0][1]]
+        queue_rows = [row for call in calls[1::2] for row in call[0][1]]
+
+        assert len(notifications) == len(notification_rows) == recipients
+        notification_ids = [row["id"] for row in notification_rows]
+        assert len(set(notification_ids)) == recipients
+        assert [row["notification_id"] for row in queue_rows] == notification_ids
+        assert rule.success_count == recipients
+
+
+class TestTemplateCache:
+    def test_compiled_template_matches_substitution(self):
+        """Compiled templates render like plain placeholder replacement"""
+        template = compile_template("Hi {{name}}, {{count}} new {{unknown}} items")
+
+        assert template.render({"name": "Ana", "count": 3}) == (
+            "Hi Ana, 3 new {{unknown}} items"
+        )
+        assert compile_template("Hi {{name}}") is compile_template("Hi {{name}}")
+
+    def test_template_cache_follows_version(self):
+        """Editing a template invalidates its compiled form"""
+        service = NotificationService()
+        template = announcement_template("{{headline}} today")
+
+        first = service._get_compiled_template(template)
+        assert service._get_compiled_template(template) is first
+
+        template.message_template = "{{headline}} tomorrow"
+        template.updated_at = datetime(2024, 2, 1)
+        second = service._get_compiled_template(template)
+
+        assert second is not first
+        assert second["message"].render({"headline": "Closed"}) == "Closed tomorrow"
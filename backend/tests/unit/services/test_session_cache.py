@@ -0,0 +1,150 @@
+"""Tests for cached session validation and write-behind activity tracking."""
+
+import secrets
+import time
+from datetime import UTC, datetime, timedelta
+from unittest.mock import patch
+
+import fakeredis
+import pytest
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.dependencies import get_current_session
+from app.models.session import UserSession
+from app.services.session_cache import (
+    ActivityTracker,
+    SessionValidationCache,
+    hash_token,
+)
+from tests.factories import UserFactory
+
+
+@pytest.fixture
+def redis_server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def cache(redis_server):
+    cache = SessionValidationCache(
+        fakeredis.FakeRedis(server=redis_server, decode_responses=True)
+    )
+    with (
+        patch("app.services.session_service.session_cache", cache),
+        patch("app.services.session_cache.session_cache", cache),
+    ):
+        yield cache
+    cache.close()
+
+
+@pytest.fixture
+def tracker():
+    tracker = ActivityTracker(flush_interval=3600)
+    with patch("app.services.session_service.activity_tracker", tracker):
+        yield tracker
+    tracker.stop()
+
+
+@pytest.fixture
+def user_session(db_session: Session) -> UserSession:
+    user = UserFactory.create_with_password(db_session, password="password123")
+    session = UserSession(
+        user_id=user.id,
+        session_token=secrets.token_urlsafe(32),
+        refresh_token=secrets.token_urlsafe(32),
+        ip_address="127.0.0.1",
+        user_agent="pytest",
+        expires_at=datetime.now(UTC) + timedelta(hours=8),
+        refresh_expires_at=datetime.now(UTC) + timedelta(days=30),
+    )
+    db_session.add(session)
+    db_session.flush()
+    return session
+
+
+def credentials_for(session: UserSession) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(
+        scheme="Bearer", credentials=session.session_token
+    )
+
+
+class StatementCounter:
+    """Counts statements touching the user_sessions table."""
+
+    def __init__(self, db_session: Session) -> None:
+        self.engine = db_session.get_bind().engine
+        self.selects = 0
+        self.updates = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if "user_sessions" not in statement:
+            return
+        if statement.lstrip().upper().startswith("SELECT"):
+            self.selects += 1
+        elif statement.lstrip().upper().startswith("UPDATE"):
+            self.updates += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self)
+
+
+class TestSessionValidationCache:
+    """Test cached validation, batched activity writes and revocation."""
+
+    def test_repeated_requests_write_activity_in_batches(
+        self, db_session, cache, tracker, user_session
+    ):
+        credentials = credentials_for(user_session)
+
+        with StatementCounter(db_session) as counter:
+            for _ in range(1000):
+                session = get_current_session(credentials, db_session)
+                assert session.id == user_session.id
+            assert counter.updates == 0
+
+            assert tracker.flush(db_session) == 1
+
+        # One lookup to fill the cache and one coalesced activity write
+        assert counter.selects <= 1
+        assert counter.updates == 1
+
+        db_session.expire_all()
+        assert db_session.get(UserSession, user_session.id).last_activity_at
+
+    def test_cache_entries_keyed_by_token_hash(
+        self, db_session, cache, tracker, user_session, redis_server
+    ):
+        get_current_session(credentials_for(user_session), db_session)
+
+        keys = fakeredis.FakeRedis(server=redis_server).keys("session:valid:*")
+        assert keys == [
+            f"session:valid:{hash_token(user_session.session_token)}".encode()
+        ]
+        assert user_session.session_token.encode() not in (
+            fakeredis.FakeRedis(server=redis_server).get(keys[0])
+        )
+
+    def test_revocation_evicts_other_processes(
+        self, request, db_session, cache, tracker, user_session, redis_server
+    ):
+        token_hash = hash_token(user_session.session_token)
+        other_process = SessionValidationCache(
+            fakeredis.FakeRedis(server=redis_server, decode_responses=True)
+        )
+        get_current_session(credentials_for(user_session), db_session)
+        assert other_process.get(token_hash) is not None
+        request.addfinalizer(other_process.close)
+
+        user_session.revoke(db_session, reason="Logged out elsewhere")
+
+        deadline = time.monotonic() + 5
+        while other_process.get(token_hash) is not None:
+            assert time.monotonic() < deadline, "revocation was not broadcast"
+            time.sleep(0.05)
+        assert cache.get(token_hash) is None
@@ -0,0 +1,222 @@
+"""Unit tests for period-summarized ledger balances."""
+
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.crud.finance_v31 import (
+    AccountPeriodBalanceCRUD,
+    FinancialPeriodCRUD,
+    FinancialReportCRUD,
+    JournalEntryCRUD,
+)
+from app.models.finance_extended import (
+    Account,
+    AccountPeriodBalance,
+    AccountType,
+    FinancialPeriod,
+    JournalEntry,
+    JournalEntryLine,
+    TransactionType,
+)
+
+ORG_ID = "org-ledger"
+
+
+@pytest.fixture
+def ledger(db_session: Session) -> dict:
+    accounts = {
+        "cash": Account(
+            organization_id=ORG_ID,
+            account_code="10001",
+            account_name="Cash",
+            account_type=AccountType.ASSET,
+            normal_balance=TransactionType.DEBIT,
+        ),
+        "capital": Account(
+            organization_id=ORG_ID,
+            account_code="30001",
+            account_name="Capital",
+            account_type=AccountType.EQUITY,
+            normal_balance=TransactionType.CREDIT,
+        ),
+        "sales": Account(
+            organization_id=ORG_ID,
+            account_code="40001",
+            account_name="Sales",
+            account_type=AccountType.REVENUE,
+            normal_balance=TransactionType.CREDIT,
+        ),
+        "rent": Account(
+            organization_id=ORG_ID,
+            account_code="50001",
+            account_name="Rent",
+            account_type=AccountType.EXPENSE,
+            normal_balance=TransactionType.DEBIT,
+        ),
+    }
+    periods = {
+        month: FinancialPeriod(
+            organization_id=ORG_ID,
+            period_name=f"2026-{month:02d}",
+            period_code=f"P{month:02d}",
+            fiscal_year=2026,
+            period_number=month,
+            start_date=datetime(2026, month, 1),
+            end_date=datetime(2026, month + 1, 1),
+        )
+        for month in (1, 2)
+    }
+    db_session.add_all([*accounts.values(), *periods.values()])
+    db_session.commit()
+    return {"accounts": accounts, "periods": periods}
+
+
+def post_entry(db_session, ledger, month, day, debit, credit, amount):
+    accounts = ledger["accounts"]
+    entry = JournalEntry(
+        organization_id=ORG_ID,
+        entry_number=f"JE{month:02d}{day:02d}{debit}{credit}",
+        transaction_date=datetime(2026, month, day),
+        period_id=ledger["periods"][month].id,
+        description=f"{debit} / {credit}",
+        total_debit=amount,
+        total_credit=amount,
+    )
+    entry.lines = [
+        JournalEntryLine(
+            account_id=accounts[debit].id,
+            line_number=1,
+            debit_amount=amount,
+            credit_amount=0,
+        ),
+        JournalEntryLine(
+            account_id=accounts[credit].id,
+            line_number=2,
+            debit_amount=0,
+            credit_amount=amount,
+        ),
+    ]
+    db_session.add(entry)
+    db_session.commit()
+    return JournalEntryCRUD(db_session).post_journal_entry(entry.id, "tester")
+
+
+def statements(db_session):
+    reports = FinancialReportCRUD(db_session)
+    as_of = datetime(2026, 3, 1)
+    return (
+        JournalEntryCRUD(db_session).get_trial_balance(ORG_ID, as_of),
+        reports.generate_balance_sheet(ORG_ID, as_of),
+        reports.generate_income_statement(ORG_ID, datetime(2026, 1, 1), as_of),
+    )
+
+
+class TestPeriodBalances:
+    """Test period summaries and statements built from them."""
+
+    def test_posting_maintains_period_totals(self, db_session, ledger):
+        post_entry(db_session, ledger, 1, 5, "cash", "capital", Decimal("1000"))
+        post_entry(db_session, ledger, 1, 20, "cash", "sales", Decimal("300"))
+        post_entry(db_session, ledger, 1, 25, "rent", "cash", Decimal("100"))
+
+        cash = (
+            db_session.query(AccountPeriodBalance)
+            .filter(AccountPeriodBalance.account_id == ledger["accounts"]["cash"].id)
+            .one()
+        )
+        assert cash.debit_total == Decimal("1300")
+        assert cash.credit_total == Decimal("100")
+        assert not cash.is_frozen
+        assert AccountPeriodBalanceCRUD(db_session).check_consistency(ORG_ID) == []
+
+    def test_statements_unchanged_by_closing(self, db_session, ledger):
+        post_entry(db_session, ledger, 1, 5, "cash", "capital", Decimal("1000"))
+        post_entry(db_session, ledger, 1, 20, "cash", "sales", Decimal("300"))
+        post_entry(db_session, ledger, 2, 3, "rent", "cash", Decimal("100"))
+        post_entry(db_session, ledger, 2, 14, "cash", "sales", Decimal("50"))
+        before = statements(db_session)
+
+        FinancialPeriodCRUD(db_session).close_period(ledger["periods"][1].id, "tester")
+
+        assert statements(db_session) == before
+        trial_balance, balance_sheet, income_statement = before
+        assert balance_sheet["balanced"] is False  # net income not yet closed out
+        assert balance_sheet["assets"]["total"] == 1250
+        assert income_statement["net_income"] == 250
+        assert {row["account_code"]: row["total_debits"] for row in trial_balance} == {
+            "10001": 1350,
+            "30001": 0,
+            "40001": 0,
+            "50001": 100,
+        }
+
+    def test_closed_period_read_from_summaries(self, db_session, ledger):
+        post_entry(db_session, ledger, 1, 5, "cash", "capital", Decimal("1000"))
+        post_entry(db_session, ledger, 2, 14, "cash", "sales", Decimal("50"))
+        FinancialPeriodCRUD(db_session).close_period(ledger["periods"][1].id, "tester")
+
+        # Alter a closed period's line behind the ledger's back
+        db_session.query(JournalEntryLine).filter(
+            JournalEntryLine.account_id == ledger["accounts"]["capital"].id
+        ).update({JournalEntryLine.credit_amount: Decimal("900")})
+        db_session.commit()
+
+        _, balance_sheet, _ = statements(db_session)
+        assert balance_sheet["equity"]["total"] == 1000
+
+        checker = AccountPeriodBalanceCRUD(db_session)
+        differences = checker.check_consistency(ORG_ID, repair=True)
+        assert [
+            (d["account_id"], d["stored_credits"], d["actual_credits"])
+            for d in differences
+        ] == [(ledger["accounts"]["capital"].id, 1000, 900)]
+
+        _, balance_sheet, _ = statements(db_session)
+        assert balance_sheet["equity"]["total"] == 900
+        assert checker.check_consistency(ORG_ID) == []
+        assert all(
+            row.is_frozen
+            for row in db_session.query(AccountPeriodBalance).filter(
+                AccountPeriodBalance.period_id == ledger["periods"][1].id
+            )
+        )
+
+    def test_closed_period_without_frozen_rows_read_from_lines(
+        self, db_session, ledger
+    ):
+        post_entry(db_session, ledger, 1, 5, "cash", "capital", Decimal("1000"))
+        post_entry(db_session, ledger, 2, 14, "cash", "sales", Decimal("50"))
+        before = statements(db_session)
+
+        # Closed before period balances were kept
+        FinancialPeriodCRUD(db_session).close_period(ledger["periods"][1].id, "tester")
+        db_session.query(AccountPeriodBalance).delete()
+        db_session.commit()
+
+        assert statements(db_session) == before
+
+    def test_reapplied_entry_adds_to_existing_row(self, db_session, ledger):
+        post_entry(db_session, ledger, 2, 3, "cash", "sales", Decimal("40"))
+        entry = post_entry(db_session, ledger, 2, 4, "rent", "cash", Decimal("15"))
+        AccountPeriodBalanceCRUD(db_session).apply_entry(entry)
+
+        cash = (
+            db_session.query(AccountPeriodBalance)
+            .filter(AccountPeriodBalance.account_id == ledger["accounts"]["cash"].id)
+            .one()
+        )
+        assert (cash.debit_total, cash.credit_total) == (40, 30)
+
+    def test_posting_to_closed_period_rejected(self, db_session, ledger):
+        entry = post_entry(db_session, ledger, 1, 5, "cash", "capital", Decimal("10"))
+        FinancialPeriodCRUD(db_session).close_period(ledger["periods"][1].id, "tester")
+
+        with pytest.raises(ValueError, match="closed period"):
+            post_entry(db_session, ledger, 1, 6, "cash", "sales", Decimal("10"))
+        with pytest.raises(ValueError, match="closed period"):
+            JournalEntryCRUD(db_session).reverse_journal_entry(
+                entry.id, "mistake", "tester"
+            )
@@ -0,0 +1,272 @@
+"""Unit tests for HR metrics and headcount snapshots."""
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.crud.hr_v31 import HRAnalyticsCRUD
+from app.models.hr_extended import (
+    Employee,
+    EmployeeStatus,
+    EmploymentType,
+    HeadcountSnapshot,
+    LeaveRequest,
+    LeaveStatus,
+    LeaveType,
+    PayrollRecord,
+    TrainingRecord,
+    TrainingStatus,
+)
+from app.services.headcount_snapshots import HeadcountSnapshotJob
+
+Q1 = (date(2026, 1, 1), date(2026, 3, 31))
+
+
+def add_employee(db_session, organization_id, number, hired, **fields):
+    employee = Employee(
+        organization_id=organization_id,
+        user_id=f"user-{organization_id}-{number}",
+        employee_number=f"{organization_id}-{number:04d}",
+        first_name="Hanako",
+        last_name=f"Suzuki{number}",
+        employment_type=fields.pop("employment_type", EmploymentType.FULL_TIME),
+        hire_date=hired,
+        job_title="Analyst",
+        **fields,
+    )
+    db_session.add(employee)
+    return employee
+
+
+def add_workforce(db_session, organization_id, size):
+    for n in range(size):
+        add_employee(db_session, organization_id, n, date(2024, 4, 1))
+    add_employee(
+        db_session,
+        organization_id,
+        100,
+        date(2026, 2, 1),
+        employment_type=EmploymentType.PART_TIME,
+    )
+    add_employee(
+        db_session,
+        organization_id,
+        101,
+        date(2025, 1, 6),
+        employment_type=EmploymentType.CONTRACT,
+        employee_status=EmployeeStatus.TERMINATED,
+        termination_date=date(2026, 3, 15),
+        termination_reason="voluntary resignation",
+    )
+    add_employee(
+        db_session,
+        organization_id,
+        102,
+        date(2020, 1, 6),
+        employee_status=EmployeeStatus.TERMINATED,
+        termination_date=date(2025, 12, 31),
+    )
+
+
+@pytest.fixture
+def workforce(db_session: Session) -> None:
+    add_workforce(db_session, "org-a", 8)
+    add_workforce(db_session, "org-b", 3)
+    for n, status in enumerate([TrainingStatus.COMPLETED, TrainingStatus.IN_PROGRESS]):
+        db_session.add(
+            TrainingRecord(
+                organization_id="org-a",
+                employee_id="employee",
+                training_title=f"Course {n}",
+                training_type="compliance",
+                start_date=datetime(2026, 2, 1, 9),
+                status=status,
+            )
+        )
+    db_session.add(
+        PayrollRecord(
+            organization_id="org-a",
+            employee_id="employee",
+            pay_period_start=date(2026, 1, 1),
+            pay_period_end=date(2026, 1, 31),
+            pay_date=date(2026, 2, 3),
+            gross_pay=Decimal("400000"),
+            net_pay=Decimal("300000"),
+        )
+    )
+    db_session.commit()
+
+
+class StatementCounter:
+    """Counts statements on the session's engine, and those on employees."""
+
+    def __init__(self, db_session: Session) -> None:
+        self.engine = db_session.get_bind().engine
+        self.statements = 0
+        self.employee_scans = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            self.statements += 1
+            self.employee_scans += "FROM hr_employees" in statement
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self)
+
+
+class TestHRMetrics:
+    """Test single-scan metric calculation for one or many organizations."""
+
+    def test_metrics_from_single_employee_scan(self, db_session, workforce):
+        with StatementCounter(db_session) as counter:
+            analytics = HRAnalyticsCRUD(db_session).calculate_hr_metrics(
+                "org-a", *Q1, calculated_by="hr-admin"
+            )
+
+        # One aggregate per source table
+        assert counter.employee_scans == 1
+        assert counter.statements == 4
+
+        assert analytics.total_employees == 10
+        assert analytics.active_employees == 9
+        assert analytics.full_time_employees == 8
+        assert analytics.part_time_employees == 1
+        assert analytics.contract_employees == 1
+        assert analytics.new_hires == 1
+        assert analytics.total_terminations == 1
+        assert analytics.voluntary_terminations == 1
+        assert analytics.turnover_rate == Decimal("11.11")
+        assert analytics.retention_rate == Decimal("88.89")
+        assert analytics.training_completion_rate == Decimal("50.0")
+        assert analytics.performance_review_completion_rate == Decimal("0")
+        assert analytics.payroll_cost_total == Decimal("400000")
+
+    def test_group_metrics_match_single_organization_runs(self, db_session, workforce):
+        crud = HRAnalyticsCRUD(db_session)
+        with StatementCounter(db_session) as counter:
+            group = crud.calculate_hr_metrics_batch(
+                ["org-a", "org-b", "org-empty"], *Q1, calculated_by="hr-admin"
+            )
+        assert counter.employee_scans == 1
+
+        columns = [
+            "total_employees",
+            "active_employees",
+            "new_hires",
+            "total_terminations",
+            "turnover_rate",
+            "training_completion_rate",
+            "average_salary",
+        ]
+        for analytics in group:
+            single = crud.calculate_hr_metrics(
+                analytics.organization_id, *Q1, calculated_by="hr-admin"
+            )
+            for column in columns:
+                assert getattr(single, column) == getattr(analytics, column), column
+
+        assert [a.total_employees for a in group] == [10, 5, 0]
+
+
+class TestHeadcountSnapshots:
+    """Test daily snapshots and trends read from them."""
+
+    def test_trend_read_from_snapshots(self, db_session, workforce):
+        crud = HRAnalyticsCRUD(db_session)
+        days = [date(2026, 3, 14), date(2026, 3, 15), date(2026, 3, 16)]
+        for day in days:
+            crud.capture_headcount_snapshots(["org-a", "org-b"], day)
+
+        with StatementCounter(db_session) as counter:
+            trends = crud.get_headcount_trends(
+                ["org-a", "org-b"], days[0], days[-1] + timedelta(days=1)
+            )
+
+        # History comes from snapshots alone
+        assert counter.employee_scans == 0
+        assert counter.statements == 1
+
+        trend = trends["org-a"]
+        assert [point["headcount"] for point in trend["history"]] == [10, 9, 9]
+        assert trend["terminations"] == 1
+        assert trend["days_captured"] == 3
+        assert trend["days_missing"] == 1
+        assert trend["turnover_rate"] == round(100 / (28 / 3), 2)
+        assert trends["org-b"]["ending_headcount"] == 4
+
+    def test_capture_refreshes_existing_day(self, db_session, workforce):
+        crud = HRAnalyticsCRUD(db_session)
+        day = date(2026, 3, 20)
+        crud.capture_headcount_snapshots(["org-a"], day)
+        add_employee(db_session, "org-a", 200, date(2026, 3, 20))
+        db_session.commit()
+
+        crud.capture_headcount_snapshots(["org-a"], day)
+
+        snapshot = db_session.query(HeadcountSnapshot).one()
+        assert (snapshot.headcount, snapshot.new_hires) == (10, 1)
+
+    def test_trend_captures_today_when_missing(self, db_session, workforce):
+        today = date.today()
+
+        trend = HRAnalyticsCRUD(db_session).get_headcount_trend(
+            "org-b", today - timedelta(days=6), today
+        )
+
+        assert trend["days_captured"] == 1
+        assert trend["ending_headcount"] == 4
+        assert db_session.query(HeadcountSnapshot).count() == 1
+
+    def test_job_captures_days_without_trend_reads(self, db_session, workforce):
+        day = date(2026, 3, 16)
+        crud = HRAnalyticsCRUD(db_session)
+        # Taken during the day before, so it is recaptured
+        (partial,) = crud.capture_headcount_snapshots(
+            ["org-a"], day - timedelta(days=1)
+        )
+        partial.captured_at = datetime(2026, 3, 15, 12)
+        db_session.commit()
+        job = HeadcountSnapshotJob(clock=lambda: day)
+
+        assert job.run_once(db_session) == 4
+        assert job.run_once(db_session) == 0
+
+        history = crud.get_headcount_trend("org-b", day - timedelta(days=1), day)
+        assert history["days_captured"] == 2
+
+
+class TestDashboardMetrics:
+    """Test dashboard counts."""
+
+    def test_dashboard_counts_in_one_round_trip(self, db_session, workforce):
+        crud = HRAnalyticsCRUD(db_session)
+        crud.calculate_hr_metrics("org-a", *Q1, calculated_by="hr-admin")
+        db_session.add(
+            LeaveRequest(
+                organization_id="org-a",
+                employee_id="employee",
+                leave_type=LeaveType.ANNUAL,
+                start_date=date(2026, 4, 1),
+                end_date=date(2026, 4, 2),
+                total_days=2,
+                status=LeaveStatus.PENDING,
+                requested_date=datetime(2026, 3, 25),
+            )
+        )
+        db_session.commit()
+
+        with StatementCounter(db_session) as counter:
+            metrics = crud.get_hr_dashboard_metrics("org-a", date(2026, 4, 1))
+
+        assert counter.statements == 2
+        assert metrics["current_active_employees"] == 9
+        assert metrics["pending_leave_requests"] == 1
+        assert metrics["upcoming_performance_reviews"] == 0
+        assert metrics["new_hires_this_period"] == 1
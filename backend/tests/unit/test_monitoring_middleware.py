@@ -0,0 +1,123 @@
+"""Tests for the ASGI monitoring middleware"""
+
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from prometheus_client import REGISTRY
+
+from app.core.monitoring import UNMATCHED_ROUTE, MonitoringMiddleware
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def make_app(**middleware_options):
+    app = FastAPI()
+    app.add_middleware(MonitoringMiddleware, **middleware_options)
+
+    @app.get("/orders/{order_id}")
+    async def get_order(order_id: str):
+        return {"order_id": order_id}
+
+    @app.get("/export")
+    async def export():
+        async def rows():
+            for i in range(3):
+                yield f"row-{i}\n".encode() * 100
+
+        return StreamingResponse(rows(), media_type="text/csv")
+
+    @app.get("/broken")
+    async def broken():
+        raise RuntimeError("boom")
+
+    return app
+
+
+def client_for(app):
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app, raise_app_exceptions=False),
+        base_url="http://test",
+    )
+
+
+class TestMonitoringMiddleware:
+    """Test route labelling, size accounting and log sampling."""
+
+    @pytest.mark.asyncio
+    async def test_requests_labelled_by_route_template(self):
+        labels = {"method": "GET", "endpoint": "/orders/{order_id}"}
+        before = sample("http_requests_total", status_code="200", **labels)
+
+        async with client_for(make_app()) as client:
+            for order_id in ("a1", "b2", "c3"):
+                assert (await client.get(f"/orders/{order_id}")).status_code == 200
+
+        assert sample("http_requests_total", status_code="200", **labels) == before + 3
+        assert (
+            sample(
+                "http_requests_total",
+                status_code="200",
+                method="GET",
+                endpoint="/orders/a1",
+            )
+            == 0
+        )
+
+    @pytest.mark.asyncio
+    async def test_unmatched_paths_share_one_label(self):
+        labels = {"method": "GET", "endpoint": UNMATCHED_ROUTE, "status_code": "404"}
+        before = sample("http_requests_total", **labels)
+
+        async with client_for(make_app()) as client:
+            await client.get("/wp-admin")
+            await client.get("/.env")
+
+        assert sample("http_requests_total", **labels) == before + 2
+
+    @pytest.mark.asyncio
+    async def test_streaming_response_size_counted(self):
+        before = sample("api_response_size_bytes_sum", endpoint="/export")
+
+        async with client_for(make_app()) as client:
+            response = await client.get("/export")
+
+        assert len(response.content) == 1800
+        assert (
+            sample("api_response_size_bytes_sum", endpoint="/export") == before + 1800
+        )
+
+    @pytest.mark.asyncio
+    async def test_errors_counted_and_logged(self):
+        before = sample("errors_total", error_type="RuntimeError", endpoint="/broken")
+
+        with patch("app.core.monitoring.logger") as logger:
+            async with client_for(make_app()) as client:
+                response = await client.get("/broken")
+
+        assert response.status_code == 500
+        assert (
+            sample("errors_total", error_type="RuntimeError", endpoint="/broken")
+            == before + 1
+        )
+        assert logger.error.call_args.kwargs["route"] == "/broken"
+
+    @pytest.mark.asyncio
+    async def test_access_log_sampled(self):
+        with patch("app.core.monitoring.logger") as logger:
+            async with client_for(make_app(access_log_sample_rate=0)) as client:
+                await client.get("/orders/a1")
+            logger.info.assert_not_called()
+
+            async with client_for(make_app(access_log_sample_rate=1)) as client:
+                await client.get("/orders/a1")
+
+        fields = logger.info.call_args.kwargs
+        assert fields["path"] == "/orders/a1"
+        assert fields["route"] == "/orders/{order_id}"
+        assert fields["status_code"] == 200
+        assert fields["response_size"] == len(b'{"order_id":"a1"}')
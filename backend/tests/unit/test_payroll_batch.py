@@ -0,0 +1,194 @@
+"""Unit tests for batch payroll runs."""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.crud.hr_v31 import PayrollCRUD
+from app.models.hr_extended import (
+    Employee,
+    EmployeeStatus,
+    EmploymentType,
+    PayrollRecord,
+)
+
+ORG_ID = "org-payroll"
+JANUARY = (date(2026, 1, 1), date(2026, 1, 15))
+FEBRUARY = (date(2026, 2, 1), date(2026, 2, 15))
+
+AMOUNT_COLUMNS = [
+    "regular_hours",
+    "regular_rate",
+    "regular_pay",
+    "overtime_rate",
+    "gross_pay",
+    "health_insurance_employee",
+    "retirement_contribution_employee",
+    "taxable_income",
+    "federal_income_tax",
+    "social_security_tax",
+    "medicare_tax",
+    "net_pay",
+    "ytd_gross_pay",
+    "ytd_tax_withheld",
+    "ytd_net_pay",
+]
+
+
+def add_employee(db_session, number, **pay):
+    employee = Employee(
+        organization_id=ORG_ID,
+        user_id=f"user-{number}",
+        employee_number=f"EMP{number:06d}",
+        first_name="Taro",
+        last_name=f"Yamada{number}",
+        employment_type=pay.pop("employment_type", EmploymentType.FULL_TIME),
+        employee_status=pay.pop("employee_status", EmployeeStatus.ACTIVE),
+        hire_date=date(2020, 4, 1),
+        job_title="Engineer",
+        **pay,
+    )
+    db_session.add(employee)
+    return employee
+
+
+@pytest.fixture
+def employees(db_session: Session) -> list:
+    staff = [
+        add_employee(db_session, n, base_salary=Decimal(5_000_000 + n * 12_345))
+        for n in range(1, 21)
+    ]
+    staff.append(
+        add_employee(
+            db_session,
+            21,
+            employment_type=EmploymentType.PART_TIME,
+            hourly_rate=Decimal("1234.56"),
+        )
+    )
+    add_employee(
+        db_session,
+        22,
+        base_salary=Decimal("6000000"),
+        employee_status=EmployeeStatus.TERMINATED,
+    )
+    db_session.commit()
+    return staff
+
+
+class StatementCounter:
+    """Counts SELECT and INSERT statements on the session's engine."""
+
+    def __init__(self, db_session: Session) -> None:
+        self.engine = db_session.get_bind().engine
+        self.selects = 0
+        self.inserts = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        verb = statement.lstrip().split(None, 1)[0].upper()
+        if verb == "SELECT":
+            self.selects += 1
+        elif verb == "INSERT":
+            self.inserts += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self)
+
+
+class TestPayrollBatch:
+    """Test batch payroll computation, writes and error capture."""
+
+    def test_batch_uses_constant_number_of_statements(self, db_session, employees):
+        with StatementCounter(db_session) as counter:
+            result = PayrollCRUD(db_session).process_payroll_batch(
+                ORG_ID, *JANUARY, processed_by="payroll-admin"
+            )
+
+        assert result["processed_count"] == len(employees)
+        assert result["error_count"] == 0
+        # Employees and YTD totals, then one batched insert
+        assert counter.selects == 2
+        assert counter.inserts == 1
+
+        records = db_session.query(PayrollRecord).all()
+        assert len(records) == len(employees)
+        assert all(
+            r.is_processed and r.processed_by == "payroll-admin" for r in records
+        )
+
+    def test_batch_matches_single_employee_calculation(self, db_session, employees):
+        crud = PayrollCRUD(db_session)
+        crud.process_payroll_batch(ORG_ID, *JANUARY, processed_by="payroll-admin")
+        preview = crud.process_payroll_batch(
+            ORG_ID, *FEBRUARY, processed_by="payroll-admin", dry_run=True
+        )
+
+        assert db_session.query(PayrollRecord).count() == len(employees)
+        batch = {row["employee_id"]: row for row in preview["records"]}
+        for employee in employees:
+            single = crud.calculate_payroll(employee.id, *FEBRUARY)
+            for column in AMOUNT_COLUMNS:
+                assert getattr(single, column) == batch[employee.id][column], column
+            assert single.pay_date == batch[employee.id]["pay_date"]
+
+    def test_amounts_exact_to_the_cent(self, db_session, employees):
+        result = PayrollCRUD(db_session).process_payroll_batch(
+            ORG_ID, *JANUARY, processed_by="payroll-admin", dry_run=True
+        )
+
+        for row in result["records"]:
+            for column in ("gross_pay", "taxable_income", "federal_income_tax"):
+                assert row[column] == row[column].quantize(Decimal("0.01"))
+            assert row["net_pay"] == (
+                row["gross_pay"]
+                - row["health_insurance_employee"]
+                - row["retirement_contribution_employee"]
+                - row["federal_income_tax"]
+                - row["social_security_tax"]
+                - row["medicare_tax"]
+            )
+        assert result["total_gross_pay"] == sum(
+            row["gross_pay"] for row in result["records"]
+        )
+
+    def test_errors_captured_per_employee(self, db_session, employees):
+        crud = PayrollCRUD(db_session)
+        crud.process_payroll_batch(ORG_ID, *JANUARY, processed_by="payroll-admin")
+        unpaid = add_employee(db_session, 23)
+        db_session.commit()
+
+        result = crud.process_payroll_batch(
+            ORG_ID, *JANUARY, processed_by="payroll-admin"
+        )
+
+        assert result["processed_count"] == 0
+        assert {e["employee_id"]: e["error"] for e in result["errors"]} == {
+            **{
+                employee.id: "Payroll already recorded for this pay period"
+                for employee in employees
+            },
+            unpaid.id: "Employee has no hourly rate or base salary",
+        }
+        assert db_session.query(PayrollRecord).count() == len(employees)
+
+    def test_year_to_date_totals_accumulate(self, db_session, employees):
+        crud = PayrollCRUD(db_session)
+        january = crud.process_payroll_batch(
+            ORG_ID, *JANUARY, processed_by="payroll-admin"
+        )
+        february = crud.process_payroll_batch(
+            ORG_ID, *FEBRUARY, processed_by="payroll-admin"
+        )
+
+        first = {row["employee_id"]: row for row in january["records"]}
+        for row in february["records"]:
+            earlier = first[row["employee_id"]]
+            assert row["ytd_gross_pay"] == earlier["gross_pay"] + row["gross_pay"]
+            assert row["ytd_net_pay"] == earlier["net_pay"] + row["net_pay"]
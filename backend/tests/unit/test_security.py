@@ -1,15 +1,28 @@
 """Unit tests for security utilities."""
 
+import threading
 from datetime import timedelta
+from unittest.mock import patch
 
 import pytest
+from passlib.context import CryptContext
 
-from app.core.exceptions import ExpiredTokenError, InvalidTokenError
+from app.core.exceptions import (
+    ExpiredTokenError,
+    InvalidTokenError,
+    PasswordHashingBusyError,
+)
 from app.core.security import (
+    PasswordHashingPool,
     create_access_token,
     create_refresh_token,
     hash_password,
+    hash_password_async,
+    hash_password_pooled,
+    verify_and_update_password,
     verify_password,
+    verify_password_async,
+    verify_password_pooled,
     verify_token,
 )
 
@@ -223,6 +236,82 @@ class TestPasswordHashingEdgeCases:
             verify_password(password, malformed_hash)
 
 
+class TestPasswordHashingPool:
+    """Test off-loop password hashing and rehash on login."""
+
+    @pytest.mark.asyncio
+    async def test_async_hash_and_verify(self) -> None:
+        """Test that the pooled functions match the inline ones."""
+        hashed = await hash_password_async("SecurePassword123!")
+
+        assert verify_password("SecurePassword123!", hashed)
+        assert await verify_password_async("SecurePassword123!", hashed)
+        assert not await verify_password_async("WrongPassword123!", hashed)
+
+    def test_pooled_hash_and_verify_from_worker_thread(self) -> None:
+        """Test that sync endpoints can wait on the pool from their thread."""
+        hashed = hash_password_pooled("SecurePassword123!")
+
+        assert verify_password_pooled("SecurePassword123!", hashed)
+        assert not verify_password_pooled("WrongPassword123!", hashed)
+
+        pool = PasswordHashingPool(max_workers=1, max_queued=0)
+        release = threading.Event()
+        try:
+            running = pool.submit(release.wait)
+            with pytest.raises(PasswordHashingBusyError):
+                pool.call(release.wait)
+        finally:
+            release.set()
+            pool.shutdown()
+        assert running.result()
+
+    @pytest.mark.asyncio
+    async def test_excess_work_rejected(self) -> None:
+        """Test that jobs beyond the workers and queue are refused."""
+        pool = PasswordHashingPool(max_workers=1, max_queued=1)
+        release = threading.Event()
+        try:
+            running = pool.submit(release.wait)
+            queued = pool.submit(release.wait)
+
+            with pytest.raises(PasswordHashingBusyError):
+                await pool.run(release.wait)
+            assert pool.in_flight == 2
+        finally:
+            release.set()
+            pool.shutdown()
+
+        assert running.result() and queued.result()
+        assert pool.in_flight == 0
+
+    def test_outdated_hash_rehashed(self) -> None:
+        """Test that hashes below the configured cost get a replacement."""
+        old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash(
+            "SecurePassword123!"
+        )
+        context = CryptContext(
+            schemes=["bcrypt"], bcrypt__rounds=5, bcrypt__min_rounds=5
+        )
+
+        with patch("app.core.security.pwd_context", context):
+            verified, new_hash = verify_and_update_password(
+                "SecurePassword123!", old_hash
+            )
+            assert verified
+            assert new_hash.startswith("$2b$05$")
+
+            # Current hashes and wrong passwords are left alone
+            assert verify_and_update_password("SecurePassword123!", new_hash) == (
+                True,
+                None,
+            )
+            assert verify_and_update_password("WrongPassword123!", old_hash) == (
+                False,
+                None,
+            )
+
+
 class TestJWTTokenEdgeCases:
     """Test edge cases for JWT tokens."""
 
@@ -0,0 +1,203 @@
+"""Unit tests for warehouse analytics and utilization refresh."""
+
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.crud.warehouse_v30 import WarehouseCRUD
+from app.models.warehouse_extended import Warehouse, WarehouseLocation, WarehouseZone
+
+
+def add_warehouse(db_session, number, **fields):
+    warehouse = Warehouse(
+        organization_id="org-1",
+        warehouse_code=f"WH{number:03d}",
+        warehouse_name=f"Warehouse {number}",
+        warehouse_manager_id=fields.pop("warehouse_manager_id", "manager"),
+        **fields,
+    )
+    db_session.add(warehouse)
+    return warehouse
+
+
+def add_locations(db_session, warehouse, total, occupied):
+    zone = WarehouseZone(
+        warehouse_id=warehouse.id,
+        zone_code=f"{warehouse.warehouse_code}-Z",
+        zone_name="Zone",
+    )
+    db_session.add(zone)
+    db_session.flush()
+    for n in range(total):
+        db_session.add(
+            WarehouseLocation(
+                warehouse_id=warehouse.id,
+                zone_id=zone.id,
+                location_code=f"{zone.zone_code}-{n:03d}",
+                is_occupied=n < occupied,
+            )
+        )
+
+
+@pytest.fixture
+def warehouses(db_session: Session) -> list:
+    fleet = [
+        add_warehouse(
+            db_session,
+            n,
+            warehouse_type="distribution" if n % 3 else "cold_storage",
+            automation_level="automated" if n % 4 == 0 else "manual",
+            storage_area=Decimal(1000 + n),
+            current_utilization=Decimal(5 * n),
+            receiving_capacity=100 * n,
+            shipping_capacity=50 * (15 - n),
+        )
+        for n in range(1, 15)
+    ]
+    fleet.append(
+        add_warehouse(
+            db_session,
+            15,
+            warehouse_type="distribution",
+            status="inactive",
+            warehouse_manager_id=None,
+        )
+    )
+    db_session.commit()
+    return fleet
+
+
+class StatementCounter:
+    """Counts SELECT and UPDATE statements on the session's engine."""
+
+    def __init__(self, db_session: Session) -> None:
+        self.engine = db_session.get_bind().engine
+        self.selects = 0
+        self.updates = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        verb = statement.lstrip().split(None, 1)[0].upper()
+        if verb == "SELECT":
+            self.selects += 1
+        elif verb == "UPDATE":
+            self.updates += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self)
+
+
+class TestWarehouseAnalytics:
+    """Test analytics computed with grouped queries."""
+
+    def test_summary_and_distributions(self, db_session, warehouses):
+        with StatementCounter(db_session) as counter:
+            analytics = WarehouseCRUD(db_session).get_analytics()
+
+        # Summary, two distributions, two top lists and attention warehouses
+        assert counter.selects == 6
+
+        assert analytics["total_warehouses"] == 15
+        assert analytics["active_warehouses"] == 14
+        assert analytics["inactive_warehouses"] == 1
+        assert analytics["total_storage_area"] == sum(1000 + n for n in range(1, 15))
+        assert analytics["total_utilization"] == 525.0
+        assert analytics["avg_utilization"] == 35.0
+        assert analytics["warehouses_by_type"] == {
+            "distribution": 11,
+            "cold_storage": 4,
+        }
+        assert analytics["warehouses_by_automation_level"] == {
+            "automated": 3,
+            "manual": 12,
+        }
+        assert analytics["capacity_analysis"] == {
+            "total_receiving_capacity": 10500,
+            "total_shipping_capacity": 5250,
+            "avg_receiving_capacity": 700,
+            "avg_shipping_capacity": 350,
+        }
+
+    def test_top_lists_limited_to_ten(self, db_session, warehouses):
+        analytics = WarehouseCRUD(db_session).get_analytics()
+
+        by_utilization = analytics["top_warehouses_by_utilization"]
+        assert [w["code"] for w in by_utilization] == [
+            f"WH{n:03d}" for n in range(14, 4, -1)
+        ]
+        assert by_utilization[0]["utilization"] == 70.0
+
+        by_throughput = analytics["top_warehouses_by_throughput"]
+        assert len(by_throughput) == 10
+        assert by_throughput[0]["code"] == "WH014"
+        assert by_throughput[0]["total_capacity"] == 1450
+        assert by_throughput[-1]["code"] == "WH005"
+        assert by_throughput[-1]["total_capacity"] == 1000
+
+    def test_only_warehouses_needing_attention_loaded(self, db_session, warehouses):
+        analytics = WarehouseCRUD(db_session).get_analytics()
+
+        issues = {
+            w["name"]: w["issues"] for w in analytics["warehouses_needing_attention"]
+        }
+        assert issues == {
+            "Warehouse 1": ["low_utilization"],
+            "Warehouse 2": ["low_utilization"],
+            "Warehouse 3": ["low_utilization"],
+            "Warehouse 15": ["inactive", "no_manager"],
+        }
+
+
+class TestUtilizationRefresh:
+    """Test per-warehouse and batch utilization calculation."""
+
+    def test_refresh_all_from_one_aggregate(self, db_session, warehouses):
+        add_locations(db_session, warehouses[0], 4, 1)
+        add_locations(db_session, warehouses[1], 3, 3)
+        add_locations(db_session, warehouses[2], 3, 1)
+        db_session.commit()
+
+        with StatementCounter(db_session) as counter:
+            updated = WarehouseCRUD(db_session).refresh_utilization()
+
+        assert counter.selects == 1
+        assert counter.updates == 1
+        # Three from locations and the rest to zero; WH015 was already zero
+        assert updated == 14
+
+        utilization = dict(
+            db_session.query(Warehouse.warehouse_code, Warehouse.current_utilization)
+        )
+        assert utilization["WH001"] == Decimal("25.00")
+        assert utilization["WH002"] == Decimal("100.00")
+        assert utilization["WH003"] == Decimal("33.33")
+        assert utilization["WH004"] == Decimal("0")
+
+        # Unchanged warehouses are not written again
+        assert WarehouseCRUD(db_session).refresh_utilization() == 0
+
+    def test_refresh_selected_warehouses(self, db_session, warehouses):
+        add_locations(db_session, warehouses[0], 2, 1)
+        db_session.commit()
+
+        crud = WarehouseCRUD(db_session)
+        assert crud.refresh_utilization([warehouses[0].id, warehouses[1].id]) == 2
+
+        db_session.expire_all()
+        assert warehouses[0].current_utilization == Decimal("50.00")
+        assert warehouses[1].current_utilization == Decimal("0")
+        assert warehouses[2].current_utilization == Decimal("15")
+
+    def test_single_warehouse_matches_batch(self, db_session, warehouses):
+        add_locations(db_session, warehouses[3], 8, 6)
+        db_session.commit()
+
+        utilization = WarehouseCRUD(db_session).calculate_utilization(warehouses[3].id)
+
+        assert utilization == Decimal("75")
+        assert WarehouseCRUD(db_session).refresh_utilization([warehouses[3].id]) == 0